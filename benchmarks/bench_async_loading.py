@@ -0,0 +1,105 @@
+"""Benchmark asynchronous resource loading.
+
+Many images and sounds (copies of the fake project's resources) are
+loaded while a coroutine ticks at 60 FPS on the same event loop,
+simulating frames rendered by :meth:`pyglet_desper.Loop.async_loop`.
+Resources are loaded either through synchronous handles (see
+:attr:`pyglet_desper.resource_populator`) or concurrently through
+asynchronous ones (see :attr:`pyglet_desper.async_resource_populator`).
+
+The longest stall of the ticking coroutine is reported, along with
+the total loading time.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_async_loading.py [resources ...]
+"""
+import asyncio
+import os
+import os.path as pt
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (50, 200)
+FRAME_TIME = 1 / 60
+
+
+def write_project(directory: str, resources: int):
+    """Write a project with the given number of images and sounds."""
+    for name in 'image', 'media':
+        os.makedirs(pt.join(directory, name), exist_ok=True)
+
+    for i in range(resources):
+        shutil.copy(pt.join(FAKE_PROJECT, 'image', 'logo.png'),
+                    pt.join(directory, 'image', f'logo{i}.png'))
+        shutil.copy(pt.join(FAKE_PROJECT, 'media', 'yayuh.wav'),
+                    pt.join(directory, 'media', f'yayuh{i}.wav'))
+
+
+async def tick(stop: asyncio.Event) -> float:
+    """Tick as a rendering loop, return the longest stall."""
+    longest = 0.
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(FRAME_TIME)
+        now = time.perf_counter()
+        longest = max(longest, now - last - FRAME_TIME)
+        last = now
+
+    return longest
+
+
+async def bench(directory: str, populator) -> tuple[float, float]:
+    """Return loading time and longest stall."""
+    resource_map = desper.ResourceMap()
+    populator(resource_map, directory, trim_extensions=True)
+    handles = [handle for map_name in ('image', 'media')
+               for handle in resource_map.get(map_name).handles.values()]
+
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(tick(stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    if populator is pdesper.async_resource_populator:
+        await asyncio.gather(*map(pdesper.load_handle_async, handles))
+    else:
+        for handle in handles:
+            handle()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return elapsed, await ticker
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_project(tmp_dir, size)
+            for name, populator in (
+                    ('sync', pdesper.resource_populator),
+                    ('async', pdesper.async_resource_populator)):
+                elapsed, stall = asyncio.run(bench(tmp_dir, populator))
+                pdesper.clear_image_cache()
+                print(f'{size:>5} images + sounds | {name:<5} | '
+                      f'load {elapsed:7.3f}s | '
+                      f'longest stall {stall * 1000:8.1f}ms')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
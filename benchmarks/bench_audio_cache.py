@@ -0,0 +1,106 @@
+"""Benchmark the audio cache of :class:`pyglet_desper.MediaFileHandle`.
+
+A bank of sound effects (synthetic WAV files) is referenced by many
+worlds, i.e. each world has its own resource map and handles. Sounds
+are loaded for each world either with decoding repeated every time
+(:class:`pyglet_desper.AudioCache` with no budget) or shared through
+a cache.
+
+Preloading the whole bank in background
+(:func:`pyglet_desper.preload_media`) is also measured, as the time
+spent by the main thread before it can continue.
+
+Run from the repository root::
+
+    python benchmarks/bench_audio_cache.py [sounds ...]
+"""
+import array
+import math
+import os
+import os.path as pt
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (20, 80)
+WORLDS = 5
+SECONDS = 2.
+RATE = 44100
+
+
+def write_bank(directory: str, sounds: int):
+    """Write a bank of stereo 16 bit WAV files."""
+    samples = array.array('h', (
+        int(10000 * math.sin(i * 440 * 2 * math.pi / RATE))
+        for i in range(int(SECONDS * RATE)) for _ in range(2)))
+
+    for i in range(sounds):
+        with wave.open(pt.join(directory, f'sfx{i}.wav'), 'wb') as fout:
+            fout.setnchannels(2)
+            fout.setsampwidth(2)
+            fout.setframerate(RATE)
+            fout.writeframes(samples.tobytes())
+
+
+def build_map(directory: str, audio_cache: pdesper.AudioCache
+              ) -> desper.ResourceMap:
+    resource_map = desper.ResourceMap()
+    for filename in sorted(os.listdir(directory)):
+        resource_map[filename] = pdesper.MediaFileHandle(
+            pt.join(directory, filename), audio_cache=audio_cache)
+    return resource_map
+
+
+def bench(directory: str, audio_cache: pdesper.AudioCache) -> float:
+    """Return the time spent loading the bank for all worlds."""
+    start = time.perf_counter()
+    for _ in range(WORLDS):
+        resource_map = build_map(directory, audio_cache)
+        for handle in resource_map.handles.values():
+            handle()
+    return time.perf_counter() - start
+
+
+def bench_preload(directory: str) -> tuple[float, float]:
+    """Return main thread time and total time of a preload."""
+    audio_cache = pdesper.AudioCache()
+    resource_map = build_map(directory, audio_cache)
+
+    start = time.perf_counter()
+    futures = []
+    for handle in resource_map.handles.values():
+        futures.append(handle.preload())
+    blocking = time.perf_counter() - start
+
+    for future in futures:
+        future.result()
+    total = time.perf_counter() - start
+    audio_cache.shutdown()
+    return blocking, total
+
+
+def main(sizes):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_bank(tmp_dir, size)
+
+            uncached = bench(tmp_dir, pdesper.AudioCache(0))
+            audio_cache = pdesper.AudioCache(2 ** 30)
+            cached = bench(tmp_dir, audio_cache)
+            blocking, total = bench_preload(tmp_dir)
+
+            print(f'{size:>4} sounds x {WORLDS} worlds | '
+                  f'uncached {uncached:7.3f}s | cached {cached:7.3f}s '
+                  f'({audio_cache.size / 2 ** 20:6.1f} MiB) | '
+                  f'preload blocks {blocking * 1000:6.2f}ms '
+                  f'of {total:6.3f}s')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,125 @@
+"""Benchmark positional audio synchronization.
+
+Many entities with a :class:`desper.Transform2D` emit a sound each
+(a :class:`pyglet.media.AudioPlayer`), spread over an area larger than
+the audible range. All of them move twice per frame (e.g. physics
+substeps).
+
+Players are positioned either by a per-entity controller updating the
+player at each position change (as done by graphic synchronization
+components), or by a :class:`pyglet_desper.AudioSyncProcessor` with
+:class:`pyglet_desper.AudioEmitter` components, once per frame and
+skipping emitters out of range.
+
+Besides time, player position updates are counted, as each of them
+is a call into the audio driver (pyglet's silent driver makes them
+cheap here).
+
+Run from the repository root::
+
+    python benchmarks/bench_audio_sync.py [emitters ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (100, 1000)
+FRAMES = 200
+SUBSTEPS = 2
+AREA = 4000.
+AUDIBLE_RANGE = 800.
+
+
+class CountingPlayer(pyglet.media.AudioPlayer):
+    """Player counting position updates (i.e. driver calls)."""
+    updates = 0
+
+    @property
+    def position(self):
+        return pyglet.media.AudioPlayer.position.__get__(self)
+
+    @position.setter
+    def position(self, value):
+        CountingPlayer.updates += 1
+        pyglet.media.AudioPlayer.position.__set__(self, value)
+
+
+@desper.event_handler(desper.ON_POSITION_CHANGE_EVENT_NAME)
+class PlayerSync(desper.Controller):
+    """Update a player at each position change."""
+    transform = desper.ComponentReference(desper.Transform2D)
+
+    def __init__(self, player: pyglet.media.AudioPlayer):
+        self.player = player
+
+    def on_add(self, entity, world):
+        super().on_add(entity, world)
+        self.transform.add_handler(self)
+
+    def on_position_change(self, position):
+        self.player.position = (position[0] - AREA / 2,
+                                position[1] - AREA / 2, 0.)
+
+
+def populate(world: desper.World, emitters: int,
+             processor: bool) -> tuple[list, list]:
+    """Return created players and the transforms of the emitters."""
+    players = []
+    transforms = []
+    for i in range(emitters):
+        player = CountingPlayer()
+        players.append(player)
+        transform = desper.Transform2D(((i * 37.) % AREA, (i * 91.) % AREA))
+        transforms.append(transform)
+        if processor:
+            emitter = pdesper.AudioEmitter(AUDIBLE_RANGE)
+            world.create_entity(transform, emitter)
+            emitter.attach(player)
+        else:
+            world.create_entity(transform, PlayerSync(player))
+
+    if processor:
+        world.create_entity(desper.Transform2D((AREA / 2, AREA / 2)),
+                            pdesper.AudioListener())
+        world.add_processor(pdesper.AudioSyncProcessor())
+
+    return players, transforms
+
+
+def bench(emitters: int, processor: bool) -> tuple[float, float]:
+    """Return elapsed time and position updates per frame."""
+    world = desper.World()
+    players, transforms = populate(world, emitters, processor)
+
+    CountingPlayer.updates = 0
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for _ in range(SUBSTEPS):
+            for transform in transforms:
+                transform.position += (1., 1.)
+        world.process(0)
+    elapsed = time.perf_counter() - start
+
+    for player in players:
+        player.delete()
+    return elapsed / FRAMES, CountingPlayer.updates / FRAMES
+
+
+def main(sizes):
+    for size in sizes:
+        for name, processor in (('per-event', False),
+                                ('processor', True)):
+            elapsed, updates = bench(size, processor)
+            print(f'{size:>6} emitters | {name:<9} | '
+                  f'{elapsed * 1000:7.3f}ms/frame | '
+                  f'{updates:8.1f} player updates/frame')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,111 @@
+"""Benchmark level restarts through world checkpoints.
+
+A world containing many sprite entities (each with a
+:class:`desper.Transform2D`, a :class:`pyglet_desper.Sprite` and a
+:class:`pyglet_desper.SpriteSync`) is loaded through
+:func:`pyglet_desper.world_from_file_handle`. Entities are then
+moved around and a tenth of them is deleted, to simulate a played
+level. The level is restarted by either loading the world again or by
+restoring a :class:`pyglet_desper.WorldCheckpoint` captured right
+after the first loading.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_checkpoint.py [entities ...]
+"""
+import json
+import os
+import os.path as pt
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (10_000, 50_000)
+
+
+def write_world(filename: str, entities: int):
+    """Write a world file with the given number of sprites."""
+    world_dict = {
+        'entities': [
+            {'components': [
+                {'type': 'desper.Transform2D',
+                 'args': [[float(i % 800), float(i // 800)]]},
+                {'type': 'pyglet_desper.Sprite',
+                 'args': ['$res{image.logo}']},
+                {'type': 'pyglet_desper.SpriteSync'},
+                {'type': 'pyglet_desper.WantsGroupBatch'}
+            ]}
+            for i in range(entities)]
+    }
+
+    with open(filename, 'w') as fout:
+        json.dump(world_dict, fout)
+
+
+def play(world: desper.World):
+    """Alter the world as a played level would."""
+    for i, (entity, transform) in enumerate(world.get(desper.Transform2D)):
+        if i % 10 == 0:
+            world.delete_entity(entity)
+        else:
+            transform.position += (1., 1.)
+    world.process(0)
+
+
+def bench(filename: str) -> tuple[float, float, float]:
+    """Return load time, capture time and restart times."""
+    resource_map = desper.ResourceMap()
+    pdesper.resource_populator(resource_map, FAKE_PROJECT,
+                               trim_extensions=True)
+    resource_map['level'] = handle = pdesper.world_from_file_handle(filename)
+
+    start = time.perf_counter()
+    world = handle()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    checkpoint = pdesper.WorldCheckpoint(world)
+    capture_time = time.perf_counter() - start
+
+    play(world)
+    start = time.perf_counter()
+    checkpoint.restore()
+    restore_time = time.perf_counter() - start
+
+    play(world)
+    start = time.perf_counter()
+    handle.clear()
+    handle()
+    reload_time = time.perf_counter() - start
+
+    handle.clear()
+    pdesper.clear_group_cache()
+    return load_time, capture_time, restore_time, reload_time
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'level.json')
+        for size in sizes:
+            write_world(filename, size)
+            load, capture, restore, reload = bench(filename)
+            print(f'{size:>7} entities | load {load:7.3f}s | '
+                  f'capture {capture:7.3f}s | restore {restore:7.3f}s | '
+                  f'reload {reload:7.3f}s')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,72 @@
+"""Benchmark cooking of resource directories.
+
+A project is built with many copies of the fake project's images and
+of a generated JSON world, then cooked (see
+:func:`pyglet_desper.cook_resources`) with a single worker process
+and with the default number of workers. A second, incremental,
+cooking of the unchanged project is also timed.
+
+Run from the repository root::
+
+    python benchmarks/bench_cooking.py [resources ...]
+"""
+import json
+import os
+import os.path as pt
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (20, 100)
+WORLD_ENTITIES = 2000
+
+
+def write_project(directory: str, resources: int):
+    """Write a project with the given number of images and worlds."""
+    for name in 'image', 'world':
+        os.makedirs(pt.join(directory, name), exist_ok=True)
+
+    world_dict = {'entities': [
+        {'components': [{'type': 'desper.Transform2D',
+                         'args': [[i, i * 2]], 'kwargs': {'rotation': 0.}}]}
+        for i in range(WORLD_ENTITIES)]}
+
+    for i in range(resources):
+        shutil.copy(pt.join(FAKE_PROJECT, 'image', 'logo.png'),
+                    pt.join(directory, 'image', f'logo{i}.png'))
+        with open(pt.join(directory, 'world', f'level{i}.json'), 'w') as fout:
+            json.dump(world_dict, fout)
+
+
+def bench(source: str, destination: str, max_workers) -> float:
+    start = time.perf_counter()
+    report = pdesper.cook_resources(source, destination, max_workers)
+    assert not report.errors
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = pt.join(tmp_dir, 'source')
+            write_project(source, size)
+
+            for name, max_workers in (('1 worker', 1),
+                                      (f'{os.cpu_count()} workers', None)):
+                destination = pt.join(tmp_dir, name)
+                elapsed = bench(source, destination, max_workers)
+                incremental = bench(source, destination, max_workers)
+                print(f'{size:>5} images + worlds | {name:<11} | '
+                      f'cook {elapsed:7.3f}s | '
+                      f'incremental {incremental:7.3f}s')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
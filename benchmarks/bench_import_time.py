@@ -0,0 +1,57 @@
+"""Benchmark import times of the package.
+
+Each statement is executed in a fresh interpreter, multiple times,
+timing only the statement itself. The best time is reported.
+
+Importing the package alone shall not import any submodule (see
+:mod:`pyglet_desper`), hence its time is asserted to stay below
+:attr:`PACKAGE_IMPORT_BOUND`.
+
+Run from the repository root::
+
+    python benchmarks/bench_import_time.py [repeats]
+"""
+import os.path as pt
+import subprocess
+import sys
+
+ROOT = pt.abspath(pt.join(pt.dirname(__file__), '..'))
+DEFAULT_SIZES = (5,)
+PACKAGE_IMPORT_BOUND = 0.05
+
+STATEMENTS = (
+    'import pyglet_desper',
+    'import pyglet_desper.binary_world',
+    'from pyglet_desper import parse_spritesheet',
+    'from pyglet_desper import *',
+)
+
+
+def time_statement(statement: str, repeats: int) -> float:
+    """Return the best execution time of an import statement."""
+    code = ('import time\n'
+            'start = time.perf_counter()\n'
+            f'{statement}\n'
+            'print(time.perf_counter() - start)')
+
+    return min(float(subprocess.run(
+        [sys.executable, '-c', code], check=True, capture_output=True,
+        text=True, cwd=ROOT).stdout.split()[-1])
+        for _ in range(repeats))
+
+
+def main(sizes):
+    for repeats in sizes:
+        for statement in STATEMENTS:
+            elapsed = time_statement(statement, repeats)
+            print(f'{statement:<45} | best of {repeats} | '
+                  f'{elapsed * 1000:8.1f}ms')
+
+            if statement == 'import pyglet_desper':
+                assert elapsed < PACKAGE_IMPORT_BOUND, (
+                    f'Importing the package took {elapsed:.3f}s, '
+                    f'bound is {PACKAGE_IMPORT_BOUND}s')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
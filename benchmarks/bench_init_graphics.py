@@ -0,0 +1,110 @@
+"""Benchmark graphics initialization of worlds loaded from file.
+
+A world containing many sprite entities (each with a
+:class:`pyglet_desper.WantsGroupBatch`) is generated, loaded through
+:func:`pyglet_desper.world_from_file_handle` and finalized with
+:func:`pyglet_desper.init_graphics_transformer`. The previous,
+per-type implementation of the transformer is kept here as reference.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_init_graphics.py [entities ...]
+"""
+import json
+import os
+import os.path as pt
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (10_000, 50_000)
+
+
+def legacy_init_graphics_transformer(world_handle, world):
+    """Former implementation, one query per type and entity."""
+    for graphics_type in pdesper.GRAPHIC_BASE_CLASSES:
+        for entity, graphics in world.get(graphics_type):
+            wants = world.get_component(entity, pdesper.WantsGroupBatch)
+            if wants is not None:
+                graphics.group = wants.build_group()
+                graphics.batch = pdesper.retrieve_batch(world)
+
+    for entity, _ in world.get(pdesper.WantsGroupBatch):
+        world.remove_component(entity, pdesper.WantsGroupBatch)
+
+
+def write_world(filename: str, entities: int):
+    """Write a world file with the given number of sprites."""
+    world_dict = {
+        'entities': [
+            {'components': [
+                {'type': 'pyglet_desper.Sprite',
+                 'args': ['$res{image.logo}'],
+                 'kwargs': {'x': i % 800, 'y': i // 800}},
+                {'type': 'pyglet_desper.WantsGroupBatch',
+                 'args': [i % 4]}
+            ]}
+            for i in range(entities)]
+    }
+
+    with open(filename, 'w') as fout:
+        json.dump(world_dict, fout)
+
+
+def load(filename: str, graphics_transformer) -> tuple[float, float]:
+    """Load world, return (total time, graphics transformer time)."""
+    resource_map = desper.ResourceMap()
+    pdesper.resource_populator(resource_map, FAKE_PROJECT,
+                               trim_extensions=True)
+
+    handle = pdesper.world_from_file_handle(filename)
+    handle.transform_functions.remove(pdesper.init_graphics_transformer)
+
+    transformer_time = 0.
+
+    def timed_transformer(world_handle, world):
+        nonlocal transformer_time
+        start = time.perf_counter()
+        graphics_transformer(world_handle, world)
+        transformer_time = time.perf_counter() - start
+
+    handle.transform_functions.append(timed_transformer)
+    resource_map['bench'] = handle
+
+    start = time.perf_counter()
+    world = handle()
+    total_time = time.perf_counter() - start
+
+    world.clear()
+    pdesper.clear_group_cache()
+    return total_time, transformer_time
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'bench.json')
+        for size in sizes:
+            write_world(filename, size)
+            for name, transformer in (
+                    ('legacy', legacy_init_graphics_transformer),
+                    ('single pass', pdesper.init_graphics_transformer)):
+                total, graphics = load(filename, transformer)
+                print(f'{size:>7} entities | {name:<11} | '
+                      f'load {total:7.3f}s | graphics init {graphics:7.3f}s')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
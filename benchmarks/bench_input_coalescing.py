@@ -0,0 +1,80 @@
+"""Benchmark coalescing of high rate window events.
+
+A world containing many components listening to ``on_mouse_motion``
+receives the events of a 1000 Hz mouse (about 16 per frame at 60
+FPS) through :meth:`pyglet_desper.Loop.connect_window_events`, with
+and without :attr:`pyglet_desper.DEFAULT_COALESCED_EVENTS`.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_input_coalescing.py [listeners ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (100, 1000)
+FRAMES = 600
+EVENTS_PER_FRAME = 16
+
+
+@desper.event_handler('on_mouse_motion')
+class MotionListener:
+    x = y = 0
+
+    def on_mouse_motion(self, x, y, dx, dy):
+        self.x = x
+        self.y = y
+
+
+def bench(window: pyglet.window.Window, listeners: int,
+          coalesced_events) -> tuple[float, int, int]:
+    """Return elapsed time, raw and delivered events."""
+    loop = pdesper.Loop(coalesced_events=coalesced_events)
+    handle = desper.WorldHandle()
+    for _ in range(listeners):
+        handle().create_entity(MotionListener())
+    loop.switch(handle)
+
+    window.push_handlers()
+    loop.connect_window_events(window, 'on_mouse_motion')
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for i in range(EVENTS_PER_FRAME):
+            window.dispatch_event('on_mouse_motion', frame, i, 1, 0)
+        loop.iteration(0)
+    elapsed = time.perf_counter() - start
+
+    window.pop_handlers()
+    pyglet.clock.unschedule(loop.iteration)
+    return (elapsed, loop.raw_event_counts['on_mouse_motion'],
+            loop.delivered_event_counts['on_mouse_motion'])
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+    # Dispatch events immediately, as done by pyglet.app.run
+    window._enable_event_queue = False
+
+    for size in sizes:
+        for name, coalesced_events in (
+                ('direct', None),
+                ('coalesced', pdesper.DEFAULT_COALESCED_EVENTS)):
+            elapsed, raw, delivered = bench(window, size, coalesced_events)
+            print(f'{size:>5} listeners | {name:<9} | '
+                  f'{elapsed / FRAMES * 1000:7.3f}ms/frame | '
+                  f'raw {raw:>6} | delivered {delivered:>6}')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,101 @@
+"""Benchmark particles as sprites against a particle emitter.
+
+A constant number of particles is kept alive and moved every frame.
+Particles emulated through entities (a :class:`desper.Transform2D`,
+a :class:`pyglet_desper.Sprite` and a
+:class:`pyglet_desper.SpriteSync` each, moved by a processor) are
+compared with a single :class:`pyglet_desper.ParticleEmitter`, updated
+by a :class:`pyglet_desper.ParticleProcessor`.
+
+Requires NumPy. Run from the repository root (a window, or a headless
+context, is needed)::
+
+    python benchmarks/bench_particles.py [particles ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (1_000, 10_000)
+FRAMES = 20
+DT = 1 / 60
+
+
+class Velocity:
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class VelocityProcessor(desper.Processor):
+
+    def process(self, dt):
+        for entity, velocity in self.world.get(Velocity):
+            transform = self.world.get_component(entity, desper.Transform2D)
+            transform.position += (velocity.x * dt, velocity.y * dt)
+
+
+def populate_sprites(world, batch, image, particles):
+    for i in range(particles):
+        world.create_entity(desper.Transform2D((400, 300)),
+                            Velocity(i % 100, i // 100),
+                            pdesper.Sprite(image, batch=batch),
+                            pdesper.SpriteSync())
+    world.add_processor(VelocityProcessor())
+
+
+def populate_emitter(world, batch, image, particles):
+    emitter = pdesper.ParticleEmitter(image, 400, 300, capacity=particles,
+                                      rate=0, lifetime=1000, batch=batch)
+    emitter.emit(particles)
+    world.create_entity(emitter)
+    world.add_processor(pdesper.ParticleProcessor())
+
+
+def run(populate, image, particles: int) -> tuple[float, float]:
+    """Update and draw all particles for some frames.
+
+    Return creation time and time per frame.
+    """
+    world = desper.World()
+    batch = pyglet.graphics.Batch()
+
+    start = time.perf_counter()
+    populate(world, batch, image, particles)
+    creation = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        world.process(DT)
+        batch.draw()
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    world.clear()
+    return creation, elapsed
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+    image = pyglet.image.SolidColorImagePattern(
+        (255, 255, 255, 255)).create_image(4, 4)
+
+    for size in sizes:
+        for name, populate in (('sprites', populate_sprites),
+                               ('emitter', populate_emitter)):
+            creation, frame_time = run(populate, image, size)
+            print(f'{size:>7} particles | {name:<7} | '
+                  f'create {creation * 1000:8.2f}ms | '
+                  f'{frame_time * 1000:8.2f}ms per frame')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
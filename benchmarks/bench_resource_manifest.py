@@ -0,0 +1,120 @@
+"""Benchmark preloading worlds through resource manifests.
+
+A world pulls a number of images (copies of the fake project's logo)
+lazily while playing, one per frame, as happens when new kinds of
+enemies first appear. A first session records a
+:class:`pyglet_desper.ResourceManifest`; following sessions either
+ignore it or give it to the :class:`pyglet_desper.Loop`, which
+preloads the recorded images on switch.
+
+The switch time and the worst frame time are reported.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_resource_manifest.py [images ...]
+"""
+import os.path as pt
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+LOGO = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+               'fake_project', 'image', 'logo.png')
+DEFAULT_SIZES = (20, 100)
+
+
+class SpawnProcessor(desper.Processor):
+    """Pull a new image at each frame."""
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        self.frame = 0
+
+    def process(self, dt):
+        if self.frame < len(self.keys):
+            resource_map = desper.default_loop.resource_map
+            resource_map[self.keys[self.frame]]
+        self.frame += 1
+
+
+def make_resource_map(directory: str, size: int) -> desper.ResourceMap:
+    resource_map = desper.ResourceMap()
+    resource_map['image'] = desper.ResourceMap()
+    resource_map['world'] = desper.ResourceMap()
+    keys = []
+    for i in range(size):
+        filename = pt.join(directory, f'logo{i}.png')
+        shutil.copy(LOGO, filename)
+        resource_map[f'image/logo{i}'] = pdesper.ImageFileHandle(
+            filename, atlas=False)
+        keys.append(f'image/logo{i}')
+
+    def add_spawner(handle, world):
+        world.add_processor(SpawnProcessor(keys))
+
+    world_handle = desper.WorldHandle()
+    world_handle.transform_functions.append(add_spawner)
+    resource_map['world/level'] = world_handle
+    return resource_map
+
+
+def play(resource_map: desper.ResourceMap, size: int,
+         manifest=None) -> tuple[float, float]:
+    """Return switch time and worst frame time."""
+    loop = pdesper.Loop(resource_manifest=manifest)
+    loop.resource_map = resource_map
+    desper.default_loop = loop
+
+    start = time.perf_counter()
+    loop.switch(resource_map.get('world/level'))
+    switch_time = time.perf_counter() - start
+
+    worst = 0.
+    for _ in range(size + 1):
+        start = time.perf_counter()
+        loop.iteration(1 / 60)
+        worst = max(worst, time.perf_counter() - start)
+
+    pyglet.clock.unschedule(loop.iteration)
+    return switch_time, worst
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            resource_map = make_resource_map(tmp_dir, size)
+
+            # Recording session
+            manifest = pdesper.ResourceManifest()
+            manifest.attach()
+            play(resource_map, size, manifest)
+            manifest.detach()
+
+            for name, session_manifest in (('lazy', None),
+                                           ('manifest', manifest)):
+                for handle in resource_map.get('image').handles.values():
+                    handle.clear()
+                resource_map.get('world/level').clear()
+                pdesper.clear_image_cache()
+
+                switch_time, worst = play(resource_map, size,
+                                          session_manifest)
+                print(f'{size:>5} images | {name:<8} | '
+                      f'switch {switch_time * 1000:8.2f}ms | '
+                      f'worst frame {worst * 1000:6.2f}ms')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,113 @@
+"""Benchmark world switches freeing resources selectively.
+
+Two worlds use a number of images each (copies of the fake project's
+logo), sharing most of them. The game switches back and forth between
+them, clearing the current world at each switch, either:
+
+- clearing all resources (handles and image cache), as done by
+    :func:`pyglet_desper.clear_image_cache`, so that nothing leaks
+- through a :class:`pyglet_desper.ResourceUsage`, which frees only
+    the resources the next world does not use
+
+The time of each switch and the number of images decoded are
+reported, along with the images retained after each switch.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_resource_usage.py [images ...]
+"""
+import os.path as pt
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+LOGO = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+               'fake_project', 'image', 'logo.png')
+DEFAULT_SIZES = (50, 200)
+SHARED_RATIO = 0.8
+SWITCHES = 10
+
+
+class CountingImageFileHandle(pdesper.ImageFileHandle):
+    """Count the images actually decoded."""
+    loads = 0
+
+    def load(self):
+        if pt.abspath(self.filename) not in pdesper.model._image_cache:
+            CountingImageFileHandle.loads += 1
+        return super().load()
+
+
+def make_world_handle(handles: list) -> desper.WorldHandle:
+    def use_images(world_handle, world):
+        for handle in handles:
+            handle()
+
+    world_handle = desper.WorldHandle()
+    world_handle.transform_functions.append(use_images)
+    return world_handle
+
+
+def bench(directory: str, size: int, tracked: bool
+          ) -> tuple[float, float, int]:
+    """Return average switch time, decoded images per switch and
+    retained images."""
+    handles = []
+    for i in range(size * 2):
+        filename = pt.join(directory, f'logo{i}.png')
+        shutil.copy(LOGO, filename)
+        handles.append(CountingImageFileHandle(filename, atlas=False))
+
+    shared = int(size * SHARED_RATIO)
+    world_handles = (make_world_handle(handles[:size]),
+                     make_world_handle(handles[:shared]
+                                       + handles[size:size * 2 - shared]))
+
+    usage = pdesper.ResourceUsage() if tracked else None
+    loop = pdesper.Loop(resource_usage=usage)
+    loop.switch(world_handles[0])
+    CountingImageFileHandle.loads = 0
+
+    start = time.perf_counter()
+    for i in range(1, SWITCHES + 1):
+        if not tracked:
+            for handle in handles:
+                handle.clear()
+            pdesper.clear_image_cache()
+        loop.switch(world_handles[i % 2], clear_current=True)
+    elapsed = time.perf_counter() - start
+
+    retained = len(pdesper.model._image_cache)
+    pyglet.clock.unschedule(loop.iteration)
+    if usage is not None:
+        usage.detach()
+    pdesper.clear_image_cache()
+
+    return (elapsed / SWITCHES, CountingImageFileHandle.loads / SWITCHES,
+            retained)
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    for size in sizes:
+        for name, tracked in (('clear all', False), ('tracked', True)):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                elapsed, loads, retained = bench(tmp_dir, size, tracked)
+            print(f'{size:>5} images/world | {name:<9} | '
+                  f'switch {elapsed * 1000:8.2f}ms | '
+                  f'decoded {loads:6.1f}/switch | retained {retained:>5}')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,78 @@
+"""Benchmark synchronization of moving shapes with ``Transform2D``.
+
+Many entities composed of a :class:`desper.Transform2D`, a rectangle
+and a sync component are moved every frame. Default pyglet shapes (one
+vertex list each, rewritten on each change) synchronized through
+:class:`pyglet_desper.PositionRotationSync2D` are compared with
+:class:`pyglet_desper.BatchedRectangle` (one record in a
+:class:`pyglet_desper.ShapeBatch`, uploaded once per frame)
+synchronized through :class:`pyglet_desper.BatchedShapeSync`.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_shape_batch.py [entities ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (1_000, 10_000)
+FRAMES = 20
+
+
+def run(shape_type, sync_factory, entities: int) -> tuple[float, float]:
+    """Move all shapes for some frames.
+
+    Return creation time and time per frame.
+    """
+    world = desper.World()
+    batch = pyglet.graphics.Batch()
+
+    start = time.perf_counter()
+    transforms = []
+    for i in range(entities):
+        transform = desper.Transform2D((i % 800, i // 800))
+        world.create_entity(transform,
+                            shape_type(0, 0, 4, 4, batch=batch),
+                            sync_factory())
+        transforms.append(transform)
+    creation = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for transform in transforms:
+            transform.position += (1, 0)
+            transform.rotation += 1
+        batch.draw()
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    world.clear()
+    return creation, elapsed
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    for size in sizes:
+        for name, shape_type, sync_factory in (
+                ('pyglet', pyglet.shapes.Rectangle,
+                 pdesper.rectangle_sync_component),
+                ('batched', pdesper.BatchedRectangle,
+                 pdesper.batched_rectangle_sync_component)):
+            creation, frame_time = run(shape_type, sync_factory, size)
+            print(f'{size:>7} entities | {name:<7} | '
+                  f'create {creation * 1000:8.2f}ms | '
+                  f'{frame_time * 1000:8.2f}ms per frame')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,151 @@
+"""Benchmark chunk streaming of large levels.
+
+A level of sprite entities spread over a large area is loaded
+entirely through :func:`pyglet_desper.world_from_file_handle`, then
+split through :func:`pyglet_desper.split_world_file` and streamed
+through a :class:`pyglet_desper.ChunkStreamingProcessor` while the
+camera pans across it. Reported are the time needed to get the
+first playable frame, the number of entities kept in the world and
+the worst frame while panning.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_streaming.py [entities ...]
+"""
+import json
+import os
+import os.path as pt
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (20_000, 100_000)
+DENSITY = 1 / 400               # One entity each 20x20 pixels
+CHUNK_SIZE = 512
+PAN_FRAMES = 300
+PAN_SPEED = 20
+
+
+def write_level(filename: str, entities: int) -> int:
+    """Write a square level with the given number of sprites.
+
+    Return the level side.
+    """
+    side = int((entities / DENSITY) ** .5)
+    columns = side // 20
+    world_dict = {
+        'entities': [
+            {'components': [
+                {'type': 'desper.Transform2D',
+                 'args': [[i % columns * 20., i // columns * 20.]]},
+                {'type': 'pyglet_desper.Sprite',
+                 'args': ['$res{image.logo}']},
+                {'type': 'pyglet_desper.SpriteSync'},
+                {'type': 'pyglet_desper.WantsGroupBatch'}
+            ]}
+            for i in range(entities)]
+    }
+
+    with open(filename, 'w') as fout:
+        json.dump(world_dict, fout)
+    return side
+
+
+def get_resource_map() -> desper.ResourceMap:
+    resource_map = desper.ResourceMap()
+    pdesper.resource_populator(resource_map, FAKE_PROJECT,
+                               trim_extensions=True)
+    return resource_map
+
+
+def create_camera(world: desper.World) -> desper.Transform2D:
+    transform = desper.Transform2D()
+    world.create_entity(transform,
+                        pdesper.Camera(pdesper.retrieve_batch(world)),
+                        pdesper.CameraTransform2D())
+    return transform
+
+
+def bench_full(filename: str) -> tuple[float, int, float]:
+    resource_map = get_resource_map()
+    resource_map['level'] = handle = pdesper.world_from_file_handle(filename)
+
+    start = time.perf_counter()
+    world = handle()
+    camera_transform = create_camera(world)
+    world.process(0)
+    startup = time.perf_counter() - start
+
+    worst = 0.
+    for _ in range(PAN_FRAMES):
+        start = time.perf_counter()
+        camera_transform.position += (PAN_SPEED, PAN_SPEED)
+        world.process(0)
+        worst = max(worst, time.perf_counter() - start)
+
+    entities = len(world.get(desper.Transform2D))
+    world.clear()
+    return startup, entities, worst
+
+
+def bench_streaming(directory: str) -> tuple[float, int, float]:
+    resource_map = get_resource_map()
+    world = desper.World()
+
+    start = time.perf_counter()
+    processor = pdesper.ChunkStreamingProcessor(
+        directory, resource_handle=resource_map)
+    world.add_processor(processor)
+    camera_transform = create_camera(world)
+    world.process(0)
+    processor.flush()
+    startup = time.perf_counter() - start
+
+    worst = 0.
+    max_entities = 0
+    for _ in range(PAN_FRAMES):
+        start = time.perf_counter()
+        camera_transform.position += (PAN_SPEED, PAN_SPEED)
+        world.process(0)
+        worst = max(worst, time.perf_counter() - start)
+        max_entities = max(max_entities, len(world.get(desper.Transform2D)))
+
+    processor.shutdown()
+    world.clear()
+    return startup, max_entities, worst
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'level.json')
+        directory = os.path.join(tmp_dir, 'chunks')
+        for size in sizes:
+            write_level(filename, size)
+            pdesper.split_world_file(filename, directory, CHUNK_SIZE)
+
+            for name, bench, source in (('full', bench_full, filename),
+                                        ('stream', bench_streaming,
+                                         directory)):
+                startup, entities, worst = bench(source)
+                print(f'{size:>7} entities | {name:<6} | '
+                      f'startup {startup:7.3f}s | '
+                      f'max live entities {entities:>7} | '
+                      f'worst frame {worst * 1000:7.1f}ms')
+                pdesper.clear_group_cache()
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,107 @@
+"""Benchmark track switches on streamed audio.
+
+Many copies of the fake project's sound are streamed, one after the
+other, as done when switching music tracks. Sources are either plain
+streamed sources (opened on load) or prebuffered ones (see
+:class:`pyglet_desper.PrebufferedSource`), loaded ahead of the
+switch.
+
+For each switch, the time spent on the main thread to get the first
+chunk of audio data out of the next source is measured (i.e. the gap
+between tracks). The number of files left open by the loaded
+sources is also reported.
+
+Run from the repository root::
+
+    python benchmarks/bench_streaming_audio.py [tracks ...]
+"""
+import gc
+import os
+import os.path as pt
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+SOUND = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                'fake_project', 'media', 'yayuh.wav')
+DEFAULT_SIZES = (20, 100)
+CHUNK_SIZE = 4096
+
+
+def write_tracks(directory: str, tracks: int) -> list[str]:
+    """Write the given number of tracks, return their filenames."""
+    filenames = []
+    for i in range(tracks):
+        filename = pt.join(directory, f'track{i}.wav')
+        shutil.copy(SOUND, filename)
+        filenames.append(filename)
+
+    return filenames
+
+
+def count_open(filenames: list[str]) -> int:
+    """Count the open file descriptors pointing to the given files."""
+    filenames = set(map(pt.realpath, filenames))
+    fd_dir = '/proc/self/fd'
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            count += os.readlink(pt.join(fd_dir, fd)) in filenames
+        except OSError:
+            pass
+
+    return count
+
+
+def bench(filenames: list[str], prebuffer) -> tuple[float, float, int]:
+    """Return average and worst gap, and open files."""
+    file_pool = pdesper.StreamingFilePool()
+    handles = [pdesper.MediaFileHandle(filename, streaming=True,
+                                       prebuffer=prebuffer,
+                                       file_pool=file_pool)
+               for filename in filenames]
+    # Tracks are loaded ahead, e.g. on world load
+    sources = [handle() for handle in handles]
+    for source in sources:
+        if isinstance(source, pdesper.PrebufferedSource):
+            source.wait()
+
+    gaps = []
+    for source in sources:
+        start = time.perf_counter()
+        source.get_audio_data(CHUNK_SIZE)
+        gaps.append(time.perf_counter() - start)
+
+    open_files = count_open(filenames)
+    for source in sources:
+        source.delete()
+    # Plain sources only release their files once collected
+    del sources, source
+    gc.collect()
+
+    return sum(gaps) / len(gaps), max(gaps), open_files
+
+
+def main(sizes):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filenames = write_tracks(tmp_dir, size)
+            for name, prebuffer in (('plain', None),
+                                    ('prebuffered', 0.5)):
+                # Drop OS caches effects by warming up all files
+                bench(filenames, None)
+                average, worst, open_files = bench(filenames, prebuffer)
+                print(f'{size:>5} tracks | {name:<11} | '
+                      f'gap avg {average * 1e6:8.1f}us | '
+                      f'worst {worst * 1e6:8.1f}us | '
+                      f'open files {open_files:>4}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,111 @@
+"""Benchmark tile backgrounds built from sprites against a tilemap.
+
+A square map of tiles is built and rendered for some frames through a
+:class:`pyglet_desper.Camera` framing a window sized area, while one
+tile per frame is changed. Tiles as entities (a
+:class:`desper.Transform2D`, a :class:`pyglet_desper.Sprite` and a
+:class:`pyglet_desper.SpriteSync` each) are compared with a single
+:class:`pyglet_desper.Tilemap`, culled by a
+:class:`pyglet_desper.TilemapCullProcessor`.
+
+Frame times include rendering (i.e. they wait for the GL to finish),
+so that culling is accounted for.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_tilemap.py [side ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+from pyglet.graphics.api.gl import glFinish     # NOQA
+
+DEFAULT_SIDES = (64, 256)
+FRAMES = 20
+TILE_SIZE = 16
+
+
+def get_tileset() -> list:
+    texture = pyglet.image.SolidColorImagePattern(
+        (255, 255, 255, 255)).create_image(TILE_SIZE * 4,
+                                           TILE_SIZE).get_texture()
+    return [texture.get_region(x * TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)
+            for x in range(4)]
+
+
+def populate_sprites(world, batch, tileset, tiles):
+    sprites = {}
+    for row, row_tiles in enumerate(tiles):
+        for column, index in enumerate(row_tiles):
+            sprite = pdesper.Sprite(tileset[index], batch=batch)
+            world.create_entity(
+                desper.Transform2D((column * TILE_SIZE,
+                                    (len(tiles) - 1 - row) * TILE_SIZE)),
+                sprite, pdesper.SpriteSync())
+            sprites[column, row] = sprite
+
+    def set_tile(column, row, index):
+        sprites[column, row].image = tileset[index]
+
+    return set_tile
+
+
+def populate_tilemap(world, batch, tileset, tiles):
+    tilemap = pdesper.Tilemap(tileset, tiles, batch=batch)
+    world.create_entity(tilemap)
+    world.add_processor(pdesper.TilemapCullProcessor())
+    return tilemap.set_tile
+
+
+def run(populate, tileset, side: int) -> tuple[float, float]:
+    """Render the map for some frames.
+
+    Return creation time and time per frame.
+    """
+    world = desper.World()
+    batch = pyglet.graphics.Batch()
+    world.create_entity(pdesper.Camera(batch))
+    tiles = [[(row + column) % 4 for column in range(side)]
+             for row in range(side)]
+
+    start = time.perf_counter()
+    set_tile = populate(world, batch, tileset, tiles)
+    creation = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        set_tile(frame % side, 0, frame % 4)
+        world.process()
+        world.dispatch(pdesper.ON_CAMERA_DRAW_EVENT_NAME)
+        # Wait for rendering, so that it is accounted for
+        glFinish()
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    world.clear()
+    return creation, elapsed
+
+
+def main(sides):
+    window = pyglet.window.Window(800, 600, visible=False)
+    tileset = get_tileset()
+
+    for side in sides:
+        for name, populate in (('sprites', populate_sprites),
+                               ('tilemap', populate_tilemap)):
+            creation, frame_time = run(populate, tileset, side)
+            print(f'{side ** 2:>7} tiles | {name:<7} | '
+                  f'create {creation * 1000:8.2f}ms | '
+                  f'{frame_time * 1000:8.2f}ms per frame')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIDES)
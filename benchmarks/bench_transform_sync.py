@@ -0,0 +1,72 @@
+"""Benchmark synchronization of moving sprites with ``Transform2D``.
+
+Many entities composed of a :class:`desper.Transform2D`, a sprite and
+a sync component are moved every frame. Default pyglet sprites (vertex
+attributes rewritten on each change) synchronized through
+:class:`pyglet_desper.SpriteSync` are compared with
+:class:`pyglet_desper.BufferedSprite` (one record in a
+:class:`pyglet_desper.TransformBuffer`, uploaded once per frame)
+synchronized through :class:`pyglet_desper.BufferedSpriteSync`.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_transform_sync.py [entities ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (1_000, 10_000)
+FRAMES = 20
+
+
+def run(sprite_type, sync_factory, image, entities: int) -> float:
+    """Move all sprites for some frames, return time per frame."""
+    world = desper.World()
+    batch = pyglet.graphics.Batch()
+
+    transforms = []
+    for i in range(entities):
+        transform = desper.Transform2D((i % 800, i // 800))
+        world.create_entity(transform, sprite_type(image, batch=batch),
+                            sync_factory())
+        transforms.append(transform)
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for transform in transforms:
+            transform.position += (1, 0)
+            transform.rotation += 1
+        batch.draw()
+    elapsed = (time.perf_counter() - start) / FRAMES
+
+    world.clear()
+    return elapsed
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+    image = pyglet.image.SolidColorImagePattern(
+        (255, 255, 255, 255)).create_image(8, 8).get_texture()
+
+    for size in sizes:
+        for name, sprite_type, sync_factory in (
+                ('pyglet', pyglet.sprite.Sprite, pdesper.SpriteSync),
+                ('buffered', pdesper.BufferedSprite,
+                 pdesper.buffered_sprite_sync_component)):
+            frame_time = run(sprite_type, sync_factory, image, size)
+            print(f'{size:>7} entities | {name:<8} | '
+                  f'{frame_time * 1000:8.2f}ms per frame')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
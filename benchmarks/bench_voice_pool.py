@@ -0,0 +1,91 @@
+"""Benchmark pooled sound effect playback.
+
+Bursts of overlapping sound effects (e.g. explosions) are played for
+a number of frames, either creating a new
+:class:`pyglet.media.AudioPlayer` for each sound (deleting it once
+the sound has ended) or through a :class:`pyglet_desper.VoicePool`
+with a per-sound limit.
+
+The total time spent playing sounds and the peak of simultaneously
+alive players are reported. pyglet's silent audio driver is used when
+no other driver is available.
+
+Run from the repository root::
+
+    python benchmarks/bench_voice_pool.py [sounds_per_frame ...]
+"""
+import os.path as pt
+import sys
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+DEFAULT_SIZES = (2, 8)
+FRAMES = 300
+FRAME_TIME = 1 / 60
+SOUND_DURATION = 0.5
+VOICES = 16
+LIMIT = 4
+
+
+def bench_naive(sounds: list, sounds_per_frame: int) -> tuple[float, int]:
+    """Return elapsed time and peak of alive players."""
+    players = []
+    peak = 0
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for i in range(sounds_per_frame):
+            player = pyglet.media.AudioPlayer()
+            player.queue(sounds[i % len(sounds)])
+            player.play()
+            players.append((frame, player))
+
+        alive = []
+        for started, player in players:
+            if (frame - started) * FRAME_TIME >= SOUND_DURATION:
+                player.delete()
+            else:
+                alive.append((started, player))
+        players = alive
+        peak = max(peak, len(players))
+
+    elapsed = time.perf_counter() - start
+    for _, player in players:
+        player.delete()
+    return elapsed, peak
+
+
+def bench_pool(sounds: list, sounds_per_frame: int) -> tuple[float, int]:
+    """Return elapsed time and peak of alive players."""
+    voice_pool = pdesper.VoicePool(VOICES, default_limit=LIMIT)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for i in range(sounds_per_frame):
+            voice_pool.play(sounds[i % len(sounds)], priority=i % 3)
+        voice_pool.update()
+
+    elapsed = time.perf_counter() - start
+    peak = len(voice_pool.players)
+    voice_pool.delete()
+    return elapsed, peak
+
+
+def main(sizes):
+    sounds = [pyglet.media.StaticSource(
+        pyglet.media.synthesis.Sine(SOUND_DURATION, 220. * (i + 1)))
+        for i in range(4)]
+
+    for size in sizes:
+        for name, function in (('naive', bench_naive),
+                               ('pool', bench_pool)):
+            elapsed, peak = function(sounds, size)
+            print(f'{size:>3} sounds/frame | {name:<5} | '
+                  f'{elapsed / FRAMES * 1000:7.3f}ms/frame | '
+                  f'peak players {peak:>4}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
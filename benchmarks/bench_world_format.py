@@ -0,0 +1,102 @@
+"""Benchmark loading of JSON and binary world files.
+
+A world containing many entities (each with a
+:class:`desper.Transform2D`, a :class:`pyglet_desper.Sprite`
+referencing an image resource and a
+:class:`pyglet_desper.WantsGroupBatch`) is written as JSON, converted
+through :func:`pyglet_desper.convert_world_file` and loaded in both
+formats through :func:`pyglet_desper.world_from_file_handle`. The
+JSON file is also loaded a second time through a
+:class:`pyglet_desper.WorldCache`. The same is done for worlds
+without sprites, where decoding dominates.
+
+Run from the repository root (a window, or a headless context, is
+needed)::
+
+    python benchmarks/bench_world_format.py [entities ...]
+"""
+import json
+import os
+import os.path as pt
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, pt.abspath(pt.join(pt.dirname(__file__), '..')))
+
+import desper                   # NOQA
+import pyglet                   # NOQA
+import pyglet_desper as pdesper     # NOQA
+
+FAKE_PROJECT = pt.join(pt.dirname(__file__), '..', 'tests', 'files',
+                       'fake_project')
+DEFAULT_SIZES = (10_000, 50_000)
+
+
+def write_world(filename: str, entities: int, sprites: bool = True):
+    """Write a JSON world file with the given number of entities."""
+    world_dict = {'entities': []}
+    for i in range(entities):
+        components = [
+            {'type': 'desper.Transform2D',
+             'args': [[float(i % 800), float(i // 800)]],
+             'kwargs': {'rotation': float(i % 360)}},
+            {'type': 'pyglet_desper.WantsGroupBatch',
+             'args': [i % 4]}]
+        if sprites:
+            components.append({'type': 'pyglet_desper.Sprite',
+                               'args': ['$res{image.logo}'],
+                               'kwargs': {'x': i % 800, 'y': i // 800}})
+        world_dict['entities'].append({'components': components})
+
+    with open(filename, 'w') as fout:
+        json.dump(world_dict, fout)
+
+
+def load(filename: str, cache=None) -> float:
+    """Load world, return elapsed time."""
+    resource_map = desper.ResourceMap()
+    pdesper.resource_populator(resource_map, FAKE_PROJECT,
+                               trim_extensions=True)
+    resource_map['bench'] = handle = pdesper.world_from_file_handle(
+        filename, cache)
+
+    start = time.perf_counter()
+    world = handle()
+    elapsed = time.perf_counter() - start
+
+    world.clear()
+    pdesper.clear_group_cache()
+    return elapsed
+
+
+def main(sizes):
+    window = pyglet.window.Window(visible=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_filename = os.path.join(tmp_dir, 'bench.json')
+        binary_filename = os.path.join(tmp_dir, 'bench.bin')
+        for size in sizes:
+            for sprites in (True, False):
+                write_world(json_filename, size, sprites)
+                pdesper.convert_world_file(json_filename, binary_filename)
+
+                cache = pdesper.WorldCache()
+                load(json_filename, cache)
+
+                for name, filename, file_cache in (
+                        ('json', json_filename, None),
+                        ('binary', binary_filename, None),
+                        ('cached', json_filename, cache)):
+                    elapsed = load(filename, file_cache)
+                    print(f'{size:>7} entities | '
+                          f'{"sprites" if sprites else "no sprites":<10} | '
+                          f'{name:<6} | '
+                          f'{pt.getsize(filename) / 1024:8.0f} KiB | '
+                          f'load {elapsed:7.3f}s')
+
+    window.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -1,3 +1,126 @@
-from .loop import *             # NOQA
-from .logic import *            # NOQA
-from .model import *            # NOQA
+"""Extension package for desper and pyglet interoperation.
+
+Submodules are imported lazily: names are exposed at package level
+as usual (e.g. ``pyglet_desper.Loop``), but the submodule defining
+them (and hence pyglet's windowing, graphics and media modules) is
+only imported on first access. Importing a single submodule (e.g.
+``pyglet_desper.binary_world``) does not import the others.
+"""
+import importlib
+import importlib.util
+
+_SUBMODULE_NAMES = {
+    'loop': (
+        'DEFAULT_COALESCED_EVENTS', 'EventCoalescer', 'InputState', 'Loop',
+        'accumulate_deltas', 'get_input_state', 'keep_latest'),
+    'logic': (
+        'AnimationProcessor', 'BatchedCircle', 'BatchedLine',
+        'BatchedRectangle', 'BatchedShape', 'BatchedShapeSync',
+        'BufferedSprite', 'BufferedSpriteSync', 'CIRCLE_SEGMENTS', 'Camera',
+        'CameraProcessor', 'CameraTransform2D', 'DEFAULT_CHUNK_SIZE',
+        'EMPTY_TILE', 'GraphicPool', 'GraphicSync2D', 'INSTANCE_ATTRIBUTES',
+        'InstancedSprite', 'ON_CAMERA_DRAW_EVENT_NAME', 'PARAMETER_ALIASES',
+        'PositionRotationSync2D', 'PositionSync2D', 'RECORD_SIZE',
+        'RESET_PROPERTIES', 'SHAPE_ATTRIBUTES', 'ShapeBatch',
+        'ShapeBatchState', 'Sprite', 'SpriteInstancer', 'SpriteSync',
+        'TiledSprite', 'Tilemap', 'TilemapCullProcessor', 'TransformBuffer',
+        'TransformBufferSpriteGroup', 'TransformBufferState',
+        'arc_sync_component', 'batched_circle_sync_component',
+        'batched_line_sync_component', 'batched_rectangle_sync_component',
+        'borderedrectangle_sync_component', 'buffered_sprite_sync_component',
+        'circle_sync_component', 'documentlabel_sync_component',
+        'ellipse_sync_component', 'get_default_instanced_shader',
+        'get_default_shape_batch_shader', 'get_default_transform_buffer',
+        'get_shape_batch', 'get_transform_buffer_shader',
+        'htmllabel_sync_component', 'instanced_fragment_source',
+        'instanced_sprite_sync_component', 'instanced_vertex_source',
+        'label_sync_component', 'line_sync_component',
+        'polygon_sync_component', 'rectangle_sync_component',
+        'sector_sync_component', 'shape_batch_fragment_source',
+        'shape_batch_vertex_source', 'star_sync_component',
+        'tilemap_sync_component', 'transform_buffer_fragment_source',
+        'transform_buffer_vertex_source', 'triangle_sync_component'),
+    'model': (
+        'DEFAULT_DICT_TRANSFORMERS', 'FONT_DIRECTORY', 'FontFileHandle',
+        'GRAPHIC_BASE_CLASSES', 'IMAGE_DIRECTORY', 'ImageFileHandle',
+        'MEDIA_DIRECTORY', 'MEDIA_STREAMING_DIRECTORY', 'MediaFileHandle',
+        'RichImageFileHandle', 'TiledImage', 'WORLD_DIRECTORY',
+        'WantsGroupBatch', 'clear_group_cache', 'clear_image_cache',
+        'default_processors_transformer', 'default_texture_bin',
+        'get_image_filenames', 'init_graphics_transformer',
+        'load_spritesheet', 'parse_spritesheet', 'preload_media',
+        'resource_populator', 'retrieve_batch', 'split_image',
+        'world_from_file_handle'),
+    'audio': (
+        'AudioCache', 'AudioEmitter', 'AudioListener', 'AudioSyncProcessor',
+        'DEFAULT_AUDIO_CACHE_BYTES', 'DEFAULT_PREBUFFER_SECONDS',
+        'PrebufferedSource', 'StreamingFilePool', 'Voice', 'VoicePool',
+        'VoicePoolProcessor', 'default_audio_cache',
+        'default_streaming_file_pool', 'get_source_size'),
+    'binary_world': (
+        'BINARY_WORLD_MAGIC', 'BINARY_WORLD_VERSION',
+        'BinaryWorldFromFileTransformer', 'DEFAULT_BLOCK_SIZE',
+        'WorldSnapshot', 'convert_world_file', 'is_binary_world_file',
+        'read_binary_world', 'read_world_snapshot',
+        'world_snapshot_from_dict', 'write_binary_world'),
+    'world_cache': (
+        'CACHE_FILE_EXTENSION', 'CachedWorldFromFileTransformer',
+        'WorldCache'),
+    'streaming': (
+        'BASE_WORLD_FILENAME', 'CHUNK_INDEX_FILENAME', 'Chunk',
+        'ChunkStreamingProcessor', 'get_chunk', 'get_chunk_filename',
+        'split_world_file', 'transform_position'),
+    'checkpoint': (
+        'CHECKPOINT_GRAPHIC_CLASSES', 'GRAPHIC_STATE_PROPERTIES',
+        'SHARED_PACKAGES', 'SHARED_TYPES', 'WorldCheckpoint'),
+    'async_model': (
+        'AsyncFontFileHandle', 'AsyncHandle', 'AsyncImageFileHandle',
+        'AsyncMediaFileHandle', 'AsyncRichImageFileHandle',
+        'async_resource_populator', 'default_executor', 'get_resource_keys',
+        'load_handle_async', 'load_world_async', 'run_in_executor'),
+    'cook': (
+        'COOKED_DIRECTORIES', 'COOK_VERSION', 'CookReport',
+        'MANIFEST_FILENAME', 'cook_file', 'cook_resources',
+        'get_content_hash', 'iter_resource_files', 'load_manifest',
+        'normalize_spritesheet'),
+    'resource_usage': (
+        'RESOURCE_MANIFEST_VERSION', 'ResourceManifest', 'ResourceUsage',
+        'TrackedHandle', 'get_handle_key'),
+    'particles': (
+        'ParticleEmitter', 'ParticleProcessor',
+        'particle_emitter_sync_component'),
+}
+
+# Submodules requiring optional dependencies: their names are left
+# out of star imports if such dependencies are missing
+_OPTIONAL_DEPENDENCIES = {'particles': 'numpy'}
+
+_NAME_SUBMODULES = {name: submodule
+                    for submodule, names in _SUBMODULE_NAMES.items()
+                    for name in names}
+
+_MISSING_SUBMODULES = {
+    submodule for submodule, dependency in _OPTIONAL_DEPENDENCIES.items()
+    if importlib.util.find_spec(dependency) is None}
+
+__all__ = [name for name, submodule in _NAME_SUBMODULES.items()
+           if submodule not in _MISSING_SUBMODULES]
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULE_NAMES:
+        return importlib.import_module(f'{__name__}.{name}')
+
+    if name not in _NAME_SUBMODULES:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(
+        f'{__name__}.{_NAME_SUBMODULES[name]}'), name)
+    # Cache at package level, following accesses skip this function
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted((*globals(), *_SUBMODULE_NAMES, *__all__))
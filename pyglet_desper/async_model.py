@@ -0,0 +1,320 @@
+"""Asynchronous loading of pyglet specific resources.
+
+Handles from :mod:`pyglet_desper.model` load their resources
+synchronously, blocking the event loop that drives
+:meth:`Loop.async_loop` (i.e. frames stop rendering). The handles
+provided here are their awaitable counterparts: file I/O and decoding
+are executed in an executor (see :attr:`default_executor`), while GL
+related work (uploading textures, packing atlases, registering fonts)
+is finished on the event loop thread.
+
+Resources and worlds can then be loaded concurrently, e.g.::
+
+    logo, sound, level = await asyncio.gather(
+        load_handle_async(resource_map.get('image/logo')),
+        load_handle_async(resource_map.get('media/yayuh')),
+        load_world_async(resource_map.get('world/level')))
+
+Asynchronous handles are still regular handles, they can be called
+synchronously as well. Use :attr:`async_resource_populator` to
+populate a resource map with them.
+"""
+import asyncio
+import concurrent.futures
+import json
+import os.path as pt
+from typing import Optional, TypeVar, Callable
+
+import desper
+import pyglet
+from pyglet.image import Animation
+
+from pyglet_desper.audio import PrebufferedSource
+from pyglet_desper.resource_usage import (TrackedHandle, _attached_usages,
+                                          _get_root_map)
+from pyglet_desper.binary_world import is_binary_world_file, read_binary_world
+from pyglet_desper.model import (MediaFileHandle, ImageFileHandle,
+                                 RichImageFileHandle, FontFileHandle,
+                                 parse_spritesheet, world_from_file_handle,
+                                 _image_cache, _get_sheet_filename,
+                                 MEDIA_DIRECTORY,
+                                 MEDIA_STREAMING_DIRECTORY, FONT_DIRECTORY,
+                                 IMAGE_DIRECTORY, WORLD_DIRECTORY)
+
+_T = TypeVar('_T')
+
+default_executor: Optional[concurrent.futures.Executor] = None
+"""Executor used by asynchronous handles for blocking work.
+
+If ``None``, the default executor of the running event loop is used
+(see :meth:`asyncio.loop.run_in_executor`).
+"""
+
+
+async def run_in_executor(function: Callable[..., _T], *args) -> _T:
+    """Run a blocking function in :attr:`default_executor`."""
+    return await asyncio.get_running_loop().run_in_executor(
+        default_executor, function, *args)
+
+
+class AsyncHandle(TrackedHandle[_T]):
+    """Base class for handles that can be loaded asynchronously.
+
+    :meth:`load_async` is the awaitable counterpart of :meth:`load`.
+    Override it to implement specific loading behaviours, executing
+    blocking work through :func:`run_in_executor`.
+
+    :meth:`call_async` is the awaitable counterpart of ``()``, and
+    shares its cache. Concurrent calls on the same handle await the
+    very same loading task.
+    """
+    _loading: Optional[asyncio.Future] = None
+
+    async def load_async(self) -> _T:
+        """Load the targeted resource and return it.
+
+        By default, :meth:`load` is simply executed on the event loop
+        thread.
+        """
+        return self.load()
+
+    async def call_async(self) -> _T:
+        """Cache and return the wrapped resource, asynchronously."""
+        for usage in _attached_usages:
+            usage.record(self)
+
+        if self._cached:
+            return self._cache
+
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load_and_cache())
+
+        # Cancelling one of the callers shall not cancel the loading
+        # for the others
+        return await asyncio.shield(self._loading)
+
+    async def _load_and_cache(self) -> _T:
+        try:
+            value = await self.load_async()
+            self._cache = value
+            self._cached = True
+            return value
+        finally:
+            self._loading = None
+
+
+class AsyncMediaFileHandle(MediaFileHandle, AsyncHandle):
+    """Asynchronous counterpart of :class:`MediaFileHandle`.
+
+    The source is entirely opened and decoded in an executor (static
+    sources are fully decoded into memory, prebuffered ones are
+    awaited until ready).
+    """
+
+    async def load_async(self) -> pyglet.media.Source:
+        """Load file with given parameters, in an executor."""
+        source = await run_in_executor(self.load)
+        if isinstance(source, PrebufferedSource):
+            await asyncio.wrap_future(source._ready)
+        return source
+
+
+class AsyncImageFileHandle(ImageFileHandle, AsyncHandle):
+    """Asynchronous counterpart of :class:`ImageFileHandle`.
+
+    The image is decoded in an executor, then uploaded (into an atlas,
+    if requested) on the event loop thread.
+    """
+
+    async def load_async(self):
+        """Load file with given parameters.
+
+        Decoding is skipped if the image is already cached.
+        """
+        abs_filename = pt.abspath(self.filename)
+        if abs_filename in _image_cache:
+            return _image_cache[abs_filename]
+
+        image = await run_in_executor(pyglet.image.load, abs_filename,
+                                      None, self.decoder)
+        return self._upload(abs_filename, image)
+
+
+class AsyncRichImageFileHandle(RichImageFileHandle, AsyncHandle):
+    """Asynchronous counterpart of :class:`RichImageFileHandle`.
+
+    Spritesheet metadata and animations are decoded in an executor.
+    Standard images are loaded as done by
+    :class:`AsyncImageFileHandle`. Animation frames are uploaded by
+    pyglet lazily, once drawn.
+    """
+
+    def _decode(self) -> tuple[Optional[dict], Optional[Animation]]:
+        """Try decoding the file as spritesheet or as animation."""
+        try:
+            with open(self.filename) as file:
+                return json.load(file), None
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass
+
+        # See RichImageFileHandle.load for the generic catch
+        try:
+            return None, pyglet.image.load_animation(self.filename)
+        except (Exception, pyglet.util.DecodeException):
+            return None, None
+
+    async def load_async(self):
+        """Load designated file, see :meth:`RichImageFileHandle.load`."""
+        metadata, animation = await run_in_executor(self._decode)
+
+        if metadata is not None:
+            self._sheet_filename = _get_sheet_filename(self.filename,
+                                                       metadata)
+            sheet = await AsyncImageFileHandle(
+                self._sheet_filename).load_async()
+            return parse_spritesheet(sheet, metadata)
+
+        if animation is not None:
+            return animation
+
+        return await AsyncImageFileHandle(
+            self.filename, split_oversized=self.split_oversized).load_async()
+
+
+def _read_bytes(filename: str) -> bytes:
+    with open(filename, 'rb') as file:
+        return file.read()
+
+
+class AsyncFontFileHandle(FontFileHandle, AsyncHandle):
+    """Asynchronous counterpart of :class:`FontFileHandle`.
+
+    The font file is read in an executor, font data is then added to
+    pyglet on the event loop thread.
+    """
+
+    async def load_async(self) -> None:
+        """Add file as font."""
+        pyglet.font.add_file(await run_in_executor(_read_bytes,
+                                                   self.filename))
+
+
+async def load_handle_async(handle: desper.Handle[_T]) -> _T:
+    """Cache and return the resource of any handle, asynchronously.
+
+    :class:`AsyncHandle` instances are loaded through
+    :meth:`AsyncHandle.call_async`, world handles through
+    :func:`load_world_async`. Any other handle is simply called,
+    blocking the event loop.
+    """
+    if isinstance(handle, AsyncHandle):
+        return await handle.call_async()
+
+    if isinstance(handle, desper.WorldHandle):
+        return await load_world_async(handle)
+
+    return handle()
+
+
+def get_resource_keys(filename: str) -> set[str]:
+    """Get the resources referenced by a world file.
+
+    That is, the keys (in the dotted form) of all ``$res{...}``
+    strings given as arguments to processors and components. Both JSON
+    and binary world files (see :mod:`pyglet_desper.binary_world`)
+    are supported.
+    """
+    if is_binary_world_file(filename):
+        world_dict = read_binary_world(filename)
+    else:
+        with open(filename) as fin:
+            world_dict = json.load(fin)
+
+    data_dicts = list(world_dict.get('processors', []))
+    for entity_dict in world_dict.get('entities', []):
+        data_dicts.extend(entity_dict.get('components', []))
+
+    keys = set()
+    for data_dict in data_dicts:
+        for value in (*data_dict.get('args', ()),
+                      *data_dict.get('kwargs', {}).values()):
+            if not isinstance(value, str):
+                continue
+
+            match = desper.RESOURCE_STRING_REGEX.match(value)
+            if match is not None:
+                keys.add(match.groups()[0])
+
+    return keys
+
+
+async def load_world_async(world_handle: desper.Handle[desper.World]
+                           ) -> desper.World:
+    """Cache and return a world, preloading its resources concurrently.
+
+    If ``world_handle`` is a :class:`desper.WorldFromFileHandle`
+    connected to a :class:`desper.ResourceMap`, its file is decoded in
+    an executor and all the resources it references (see
+    :func:`get_resource_keys`) are loaded concurrently through
+    :func:`load_handle_async`. The world is then built on the event
+    loop thread, finding said resources already cached.
+
+    Resources that cannot be found are left to the synchronous
+    loading, which reports them.
+    """
+    if world_handle.cached:
+        return world_handle()
+
+    root_map = _get_root_map(world_handle)
+    if (isinstance(world_handle, desper.WorldFromFileHandle)
+            and root_map is not None):
+        keys = await run_in_executor(get_resource_keys,
+                                     world_handle.filename)
+
+        handles = [
+            root_map.get(root_map.split_char.join(key.split('.')))
+            for key in keys]
+        await asyncio.gather(*(load_handle_async(handle)
+                               for handle in handles
+                               if isinstance(handle, desper.Handle)))
+
+    return world_handle()
+
+
+def _build_async_populator() -> desper.DirectoryResourcePopulator:
+    populator = desper.DirectoryResourcePopulator()
+    populator.add_rule(MEDIA_DIRECTORY, AsyncMediaFileHandle)
+    populator.add_rule(MEDIA_STREAMING_DIRECTORY, AsyncMediaFileHandle,
+                       streaming=True)
+    populator.add_rule(FONT_DIRECTORY, AsyncFontFileHandle)
+    populator.add_rule(IMAGE_DIRECTORY, AsyncRichImageFileHandle)
+    populator.add_rule(WORLD_DIRECTORY, world_from_file_handle)
+    return populator
+
+
+async_resource_populator: desper.DirectoryResourcePopulator
+"""Directory resource populator for asynchronous handles.
+
+Same as :attr:`resource_populator`, but the used :class:`Handle`
+factories are:
+
+- :class:`AsyncMediaFileHandle` for media resources
+- :class:`AsyncFontFileHandle` for font resources
+- :class:`AsyncRichImageFileHandle` for image and animation resources
+- :class:`world_from_file_handle` for world resources (load them
+    through :func:`load_world_async`)
+
+As for :attr:`resource_populator`, streamed media are not
+prebuffered unless a custom rule passing ``prebuffer`` is used.
+
+Built on first access.
+"""
+
+
+def __getattr__(name: str):
+    if name == 'async_resource_populator':
+        global async_resource_populator
+        async_resource_populator = _build_async_populator()
+        return async_resource_populator
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,912 @@
+"""Management of audio resources and playback.
+
+Non streaming sources (:class:`pyglet.media.StaticSource`) are fully
+decoded in memory. An :class:`AudioCache` shares them among all the
+handles that load the same file (see :class:`MediaFileHandle`),
+bounding the memory they use and optionally decoding them in
+background threads.
+
+Sound effects can be played through a :class:`VoicePool`, which
+reuses a fixed set of players, and positioned in space through
+:class:`AudioEmitter` components (see :class:`AudioSyncProcessor`).
+
+Streamed sources can be prebuffered, and the number of files they
+keep open bounded (see :class:`PrebufferedSource`).
+"""
+import collections
+import concurrent.futures
+import ctypes
+import math
+import os.path as pt
+import threading
+import time
+from typing import Optional, Hashable, Union
+
+import desper
+import pyglet
+from pyglet.media.codecs import MediaDecoder, AudioData
+
+from pyglet_desper.logic import Camera, CameraTransform2D
+
+DEFAULT_AUDIO_CACHE_BYTES = 64 * 2 ** 20
+"""Default byte budget of an :class:`AudioCache` (64 MiB)."""
+
+
+def get_source_size(source: pyglet.media.Source) -> int:
+    """Get the size in bytes of the decoded data of a source.
+
+    Data of a :class:`pyglet.media.StaticSource` is measured directly,
+    otherwise it is estimated through duration and audio format.
+    """
+    data = getattr(source, '_data', None)
+    if data is not None:
+        return len(data)
+
+    if source.audio_format is None or source.duration is None:
+        return 0
+    return int(source.duration * source.audio_format.bytes_per_second)
+
+
+class AudioCache:
+    """Cache of decoded (static) audio sources, with a byte budget.
+
+    Sources are keyed by absolute filename and decoder, so that the
+    same file is decoded only once and the resulting
+    :class:`pyglet.media.StaticSource` is shared (static sources can
+    be played by multiple players at the same time).
+
+    When the total size of the cached sources (see
+    :func:`get_source_size`) exceeds ``max_bytes``, the least recently
+    used ones are evicted. Evicted sources are still valid, they are
+    just decoded again when needed. Sources larger than the whole
+    budget are returned without being cached.
+
+    Sources can be decoded in background threads through
+    :meth:`preload` (at most ``max_workers`` at a time). Retrieving a
+    source that is being decoded waits for it instead of decoding it
+    again. All methods are thread safe.
+
+    :attr:`hits`, :attr:`misses` and :attr:`evictions` count the
+    respective events, for profiling purposes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_AUDIO_CACHE_BYTES,
+                 max_workers: int = 2):
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._sources: collections.OrderedDict[
+            Hashable, tuple[pyglet.media.StaticSource, int]] = \
+            collections.OrderedDict()
+        self._pending: dict[Hashable, concurrent.futures.Future] = {}
+        self._size = 0
+        self._lock = threading.RLock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    @staticmethod
+    def get_key(filename: str,
+                decoder: Optional[MediaDecoder] = None) -> Hashable:
+        """Get the key identifying a source in the cache."""
+        return pt.abspath(filename), decoder
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of the cached sources."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def is_cached(self, filename: str,
+                  decoder: Optional[MediaDecoder] = None) -> bool:
+        """Get whether a source is cached (and decoded)."""
+        return self.get_key(filename, decoder) in self._sources
+
+    def get(self, filename: str,
+            decoder: Optional[MediaDecoder] = None
+            ) -> pyglet.media.StaticSource:
+        """Retrieve a decoded source, decoding it if needed.
+
+        Decoding takes place on the calling thread, unless the source
+        is already being decoded in background (see :meth:`preload`),
+        in which case the result is awaited.
+        """
+        key = self.get_key(filename, decoder)
+        with self._lock:
+            cached = self._sources.get(key)
+            if cached is not None:
+                self._sources.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+
+            future = self._pending.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._pending[key] = concurrent.futures.Future()
+                owner = True
+            else:
+                owner = False
+
+        if owner:
+            self._decode(key, future)
+
+        return future.result()
+
+    def preload(self, filename: str,
+                decoder: Optional[MediaDecoder] = None
+                ) -> concurrent.futures.Future:
+        """Decode a source in background, if not cached yet.
+
+        Return a future resolving to the source.
+        """
+        key = self.get_key(filename, decoder)
+        with self._lock:
+            cached = self._sources.get(key)
+            if cached is not None:
+                future = concurrent.futures.Future()
+                future.set_result(cached[0])
+                return future
+
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+
+            self.misses += 1
+            future = self._pending[key] = concurrent.futures.Future()
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix='AudioCache')
+
+        self._executor.submit(self._decode, key, future)
+        return future
+
+    def _decode(self, key: Hashable, future: concurrent.futures.Future):
+        filename, decoder = key
+        try:
+            source = pyglet.media.load_audio(filename, streaming=False,
+                                             decoder=decoder)
+        except BaseException as exception:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(exception)
+            return
+
+        self._store(key, source)
+        future.set_result(source)
+
+    def _store(self, key: Hashable, source: pyglet.media.StaticSource):
+        size = get_source_size(source)
+        with self._lock:
+            self._pending.pop(key, None)
+            if size > self.max_bytes:
+                return
+
+            if key in self._sources:
+                self._size -= self._sources.pop(key)[1]
+            self._sources[key] = source, size
+            self._size += size
+            self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes: int):
+        """Evict least recently used sources to fit ``max_bytes``."""
+        while self._size > max_bytes:
+            _, (_, size) = self._sources.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+    def trim(self, max_bytes: int = 0):
+        """Evict least recently used sources to fit ``max_bytes``.
+
+        By default, all sources are evicted. The budget
+        (:attr:`max_bytes`) is not altered.
+        """
+        with self._lock:
+            self._evict(max_bytes)
+
+    def clear(self):
+        """Evict all sources and reset statistics.
+
+        Background decoding in progress is not interrupted.
+        """
+        with self._lock:
+            self._sources.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def shutdown(self, wait=True):
+        """Stop background decoding threads.
+
+        They are started again by following calls to :meth:`preload`.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait)
+
+
+default_audio_cache = AudioCache()
+"""Default cache for non streaming :class:`MediaFileHandle` loads.
+
+Its budget can be altered at any time through
+:attr:`AudioCache.max_bytes`.
+"""
+
+
+DEFAULT_PREBUFFER_SECONDS = 2.
+"""Default prebuffered time of streamed media, in seconds."""
+
+_prebuffer_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _get_prebuffer_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _prebuffer_executor
+    if _prebuffer_executor is None:
+        _prebuffer_executor = concurrent.futures.ThreadPoolExecutor(
+            2, thread_name_prefix='Prebuffer')
+
+    return _prebuffer_executor
+
+
+def _get_bytes(audio_data: AudioData) -> bytes:
+    data = audio_data.data
+    if isinstance(data, bytes):
+        return data[:audio_data.length]
+    return ctypes.string_at(audio_data.pointer, audio_data.length)
+
+
+class StreamingFilePool:
+    """Bound the number of files kept open by streamed sources.
+
+    Registered sources (see :class:`PrebufferedSource`) notify the
+    pool when they open their file (:meth:`acquire`) and each time they
+    read from it (:meth:`touch`). When more than ``max_open`` files are
+    open, the least recently used sources that are not queued on any
+    player are closed. Closed sources keep their prebuffered data and
+    transparently open their file again when needed.
+
+    Sources that are being played are never closed, hence the limit
+    can be temporarily exceeded if more than ``max_open`` of them are
+    queued on players.
+    """
+
+    def __init__(self, max_open: int = 8):
+        self.max_open = max_open
+        self._open: collections.OrderedDict[
+            'PrebufferedSource', None] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def open_count(self) -> int:
+        """Number of sources whose file is currently open."""
+        return len(self._open)
+
+    def acquire(self, source: 'PrebufferedSource'):
+        """Register an open source, closing idle ones if needed.
+
+        Idle sources are closed from the calling thread, which shall
+        not hold the lock of any source.
+        """
+        with self._lock:
+            # Closed in the meantime
+            if not source.is_open:
+                return
+
+            self._open[source] = None
+            self._open.move_to_end(source)
+            excess = len(self._open) - self.max_open
+            victims = [other for other in self._open
+                       if other is not source and not other.is_player_source
+                       ][:max(excess, 0)]
+
+        for victim in victims:
+            victim.close()
+
+    def touch(self, source: 'PrebufferedSource'):
+        """Mark an open source as the most recently used."""
+        with self._lock:
+            if source in self._open:
+                self._open.move_to_end(source)
+
+    def release(self, source: 'PrebufferedSource'):
+        """Unregister a source whose file has been closed."""
+        with self._lock:
+            self._open.pop(source, None)
+
+
+default_streaming_file_pool = StreamingFilePool()
+"""Default pool for :class:`PrebufferedSource` instances."""
+
+
+class PrebufferedSource(pyglet.media.StreamingSource):
+    """Streamed source whose beginning is decoded ahead of playback.
+
+    At construction, the file is opened and its first ``prebuffer``
+    seconds are decoded on a worker thread. Playback (from the start)
+    is then served from memory while the rest of the file is streamed,
+    so that starting the source causes no hitches. Accessing the
+    source before the prebuffering is complete waits for it.
+
+    The file is opened by the source itself, and registered to a
+    :class:`StreamingFilePool` (:attr:`default_streaming_file_pool`
+    if not specified), which may close it (see :meth:`close`) when
+    too many files are open. Prebuffered data is kept, and the file is
+    opened again (at the right position) once needed.
+
+    Just like any :class:`pyglet.media.StreamingSource`, it can be
+    queued on one player at a time.
+    """
+
+    def __init__(self, filename: str, decoder: MediaDecoder = None,
+                 prebuffer: float = DEFAULT_PREBUFFER_SECONDS,
+                 file_pool: Optional[StreamingFilePool] = None):
+        self.filename = filename
+        self.decoder = decoder
+        self.prebuffer = prebuffer
+        self.file_pool = file_pool
+        if file_pool is None:
+            self.file_pool = default_streaming_file_pool
+
+        self._lock = threading.RLock()
+        self._file = None
+        self._source: Optional[pyglet.media.Source] = None
+        self._buffer = b''
+        # Read offset in the buffer, then timestamp of the stream
+        self._offset = 0
+        self._stream_time = 0.
+        self._ready = _get_prebuffer_executor().submit(self._prebuffer)
+
+    @property
+    def ready(self) -> bool:
+        """Whether the prebuffering is complete."""
+        return self._ready.done()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the file is currently open."""
+        return self._source is not None
+
+    def wait(self):
+        """Wait for the prebuffering to end.
+
+        Exceptions raised while decoding are propagated.
+        """
+        self._ready.result()
+
+    def _open(self):
+        self._file = open(self.filename, 'rb')
+        try:
+            self._source = pyglet.media.load_audio(
+                self.filename, self._file, streaming=True,
+                decoder=self.decoder)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+
+    def _prebuffer(self):
+        with self._lock:
+            self._open()
+            self._prebuffer_data()
+        # Registered without holding the lock, the pool may close
+        # other sources (see StreamingFilePool.acquire)
+        self.file_pool.acquire(self)
+
+    def _prebuffer_data(self):
+        source = self._source
+        self.audio_format = source.audio_format
+        self._duration = source.duration
+        if self.audio_format is None:
+            return
+
+        target = self.audio_format.timestamp_to_bytes_aligned(
+            self.prebuffer)
+        chunks = []
+        size = 0
+        while size < target:
+            audio_data = source.get_audio_data(target - size)
+            if audio_data is None:
+                break
+            chunks.append(_get_bytes(audio_data))
+            size += audio_data.length
+
+        self._buffer = b''.join(chunks)
+        self._stream_time = (len(self._buffer)
+                             / self.audio_format.bytes_per_second)
+
+    def close(self):
+        """Close the file, keeping prebuffered data.
+
+        The file is opened again when data past the prebuffered one is
+        needed.
+        """
+        with self._lock:
+            if self._source is None:
+                return
+
+            self._source.delete()
+            self._source = None
+            self._file.close()
+            self._file = None
+
+        self.file_pool.release(self)
+
+    def delete(self):
+        """Close the file and discard prebuffered data."""
+        self.wait()
+        self.close()
+        self._buffer = b''
+
+    def get_queue_source(self) -> 'PrebufferedSource':
+        self.wait()
+        return super().get_queue_source()
+
+    @property
+    def duration(self) -> float:
+        self.wait()
+        return self._duration
+
+    def seek(self, timestamp: float):
+        self.wait()
+        with self._lock:
+            audio_format = self.audio_format
+            offset = audio_format.timestamp_to_bytes_aligned(
+                max(0., timestamp))
+            if offset < len(self._buffer):
+                self._offset = offset
+                timestamp = len(self._buffer) / audio_format.bytes_per_second
+            else:
+                self._offset = len(self._buffer)
+
+            self._stream_time = timestamp
+            if self._source is not None:
+                self._source.seek(timestamp)
+
+    def get_audio_data(self, num_bytes: int,
+                       compensation_time: float = 0.) -> Optional[AudioData]:
+        self.wait()
+        opened = False
+        with self._lock:
+            bytes_per_second = self.audio_format.bytes_per_second
+            buffer = self._buffer
+            if self._offset < len(buffer):
+                data = buffer[self._offset:self._offset + num_bytes]
+                timestamp = self._offset / bytes_per_second
+                self._offset += len(data)
+                return AudioData(data, len(data), timestamp,
+                                 len(data) / bytes_per_second, [])
+
+            if self._source is None:
+                self._open()
+                self._source.seek(self._stream_time)
+                opened = True
+            else:
+                self.file_pool.touch(self)
+
+            audio_data = self._source.get_audio_data(num_bytes)
+            if audio_data is not None:
+                self._stream_time += audio_data.length / bytes_per_second
+
+        if opened:
+            self.file_pool.acquire(self)
+        return audio_data
+
+
+class Voice:
+    """A sound played by a :class:`VoicePool`.
+
+    Returned by :meth:`VoicePool.play`, it can be used to control
+    the sound through :attr:`player` (e.g. to alter its volume) while
+    :attr:`active`. Once the sound ends, is stopped or is stolen by a
+    more important one, the voice becomes inactive and the player is
+    returned to the pool, meaning that it shall not be touched anymore.
+    """
+    __slots__ = ('player', 'sound', 'priority', 'start_time', 'active')
+
+    def __init__(self, player: pyglet.media.AudioPlayer,
+                 sound: pyglet.media.Source, priority: float,
+                 start_time: float):
+        self.player = player
+        self.sound = sound
+        self.priority = priority
+        self.start_time = start_time
+        self.active = True
+
+
+@desper.event_handler('on_switch_in', 'on_switch_out',
+                      desper.ON_REMOVE_EVENT_NAME)
+class VoicePool:
+    """Component playing sound effects on a fixed set of players.
+
+    At most ``max_voices`` players (see
+    :class:`pyglet.media.AudioPlayer`) are created (lazily) and reused
+    for all the sounds played through :meth:`play`. Players, and the
+    driver resources behind them, are kept alive between sounds.
+
+    The number of voices playing the same source can be limited
+    (``default_limit`` for all sources, :attr:`limits` for specific
+    ones, see :meth:`set_limit`). When a sound would exceed its limit,
+    or no voice is free, the active voice with the lowest priority
+    (the oldest one among equals) is stolen, if its priority is not
+    higher than the new sound's one. Otherwise, the new sound is
+    rejected.
+
+    Voices are reclaimed when their sound ends. This is detected
+    through :meth:`update` (see :class:`VoicePoolProcessor`), which
+    relies on the playback time only, so that the pool behaves the same
+    on all audio drivers, including pyglet's silent one.
+
+    Active voices are paused and resumed along with the world owning
+    the pool. Players are deleted when the pool is removed from the
+    world.
+
+    :attr:`played`, :attr:`stolen` and :attr:`rejected` count the
+    respective events, for profiling purposes.
+    """
+
+    def __init__(self, max_voices: int = 16,
+                 default_limit: Optional[int] = None):
+        self.max_voices = max_voices
+        self.default_limit = default_limit
+        self.limits: dict[pyglet.media.Source, int] = {}
+
+        self.played = 0
+        self.stolen = 0
+        self.rejected = 0
+
+        self._players: list[pyglet.media.AudioPlayer] = []
+        self._idle: list[pyglet.media.AudioPlayer] = []
+        self._active: list[Voice] = []
+
+    @property
+    def active_voices(self) -> tuple[Voice, ...]:
+        """Currently active voices, from the oldest."""
+        return tuple(self._active)
+
+    @property
+    def players(self) -> tuple[pyglet.media.AudioPlayer, ...]:
+        """All the players created by the pool."""
+        return tuple(self._players)
+
+    def get_active_count(self,
+                         sound: Optional[pyglet.media.Source] = None) -> int:
+        """Get the number of active voices.
+
+        If a ``sound`` is given, only voices playing it are counted.
+        """
+        if sound is None:
+            return len(self._active)
+        return sum(1 for voice in self._active if voice.sound is sound)
+
+    def set_limit(self, sound: pyglet.media.Source, limit: Optional[int]):
+        """Limit the number of voices playing the given source.
+
+        ``None`` removes the specific limit (``default_limit`` is
+        used).
+        """
+        if limit is None:
+            self.limits.pop(sound, None)
+        else:
+            self.limits[sound] = limit
+
+    def play(self, sound: pyglet.media.Source, priority: float = 0,
+             volume: float = 1., pitch: float = 1.,
+             position: tuple[float, float, float] = (0., 0., 0.),
+             limit: Optional[int] = None) -> Optional[Voice]:
+        """Play a source on a free (or stolen) voice.
+
+        ``limit`` overrides the limit of voices for the given source
+        (see :meth:`set_limit`). Return the :class:`Voice` playing the
+        sound, or ``None`` if the sound was rejected.
+        """
+        if limit is None:
+            limit = self.limits.get(sound, self.default_limit)
+
+        victim = None
+        if limit is not None:
+            same_voices = [voice for voice in self._active
+                           if voice.sound is sound]
+            if len(same_voices) >= limit:
+                victim = self._get_victim(same_voices, priority)
+                if victim is None:
+                    self.rejected += 1
+                    return None
+
+        if (victim is None and not self._idle
+                and len(self._players) >= self.max_voices):
+            victim = self._get_victim(self._active, priority)
+            if victim is None:
+                self.rejected += 1
+                return None
+
+        if victim is not None:
+            self._active.remove(victim)
+            victim.active = False
+            player = victim.player
+            self.stolen += 1
+        elif self._idle:
+            player = self._idle.pop()
+        else:
+            player = pyglet.media.AudioPlayer()
+            self._players.append(player)
+
+        player.volume = volume
+        player.pitch = pitch
+        player.position = position
+
+        # Switch source through the playlist, so that the driver player
+        # is reused when the audio format is the same
+        if player.source is not None:
+            player.queue(sound)
+            player.next_source()
+        else:
+            player.queue(sound)
+        player.play()
+
+        voice = Voice(player, sound, priority, time.perf_counter())
+        self._active.append(voice)
+        self.played += 1
+        return voice
+
+    @staticmethod
+    def _get_victim(voices: list[Voice], priority: float) -> Optional[Voice]:
+        if not voices:
+            return None
+
+        victim = min(voices, key=lambda voice: (voice.priority,
+                                                voice.start_time))
+        if victim.priority > priority:
+            return None
+        return victim
+
+    @staticmethod
+    def _is_finished(voice: Voice) -> bool:
+        player = voice.player
+        source = player.source
+        if source is None:
+            return True
+
+        if player.loop or source.duration is None:
+            return False
+
+        return player.time * player.pitch >= source.duration
+
+    def update(self):
+        """Reclaim the voices whose sound has ended."""
+        finished = [voice for voice in self._active
+                    if self._is_finished(voice)]
+        for voice in finished:
+            self.stop(voice)
+
+    def stop(self, voice: Voice):
+        """Stop the sound of an active voice and reclaim it."""
+        if not voice.active:
+            return
+
+        voice.active = False
+        self._active.remove(voice)
+        voice.player.pause()
+        self._idle.append(voice.player)
+
+    def stop_all(self):
+        """Stop all active voices."""
+        for voice in tuple(self._active):
+            self.stop(voice)
+
+    def delete(self):
+        """Stop all voices and delete all players."""
+        self.stop_all()
+        for player in self._players:
+            player.delete()
+        self._players.clear()
+        self._idle.clear()
+
+    def on_switch_in(self, world_from: desper.World, world_to: desper.World):
+        """Resume active voices."""
+        for voice in self._active:
+            voice.player.play()
+
+    def on_switch_out(self, world_from: desper.World,
+                      world_to: desper.World):
+        """Pause active voices."""
+        for voice in self._active:
+            voice.player.pause()
+
+    def on_remove(self, entity, world: desper.World):
+        """Delete all players."""
+        self.delete()
+
+
+class VoicePoolProcessor(desper.Processor):
+    """Reclaim ended voices of all the voice pools in a world.
+
+    See :meth:`VoicePool.update`.
+    """
+
+    def process(self, dt):
+        for _, voice_pool in self.world.get(VoicePool):
+            voice_pool.update()
+
+
+class AudioListener:
+    """Mark the entity whose :class:`desper.Transform2D` is the listener.
+
+    See :class:`AudioSyncProcessor`.
+    """
+
+
+@desper.event_handler('on_add')
+class AudioEmitter:
+    """Component positioning sounds at its entity.
+
+    Players (:class:`pyglet.media.AudioPlayer`) and voices (see
+    :class:`VoicePool`) attached through :meth:`attach` (or played
+    through :meth:`play`) are positioned, relative to the listener,
+    at the :class:`desper.Transform2D` of the entity owning the
+    emitter, by an :class:`AudioSyncProcessor`. ``z`` is used as third
+    coordinate. The transform must be added to the entity before (or
+    together with) the emitter.
+
+    When farther than ``audible_range`` from the listener, the
+    emitter is not updated at all and its players are muted (their
+    volume is restored once back in range).
+
+    Voices are detached automatically once inactive, while players
+    stay attached until :meth:`detach` is called.
+    """
+    transform: Optional[desper.Transform2D] = None
+
+    def __init__(self, audible_range: float = math.inf, z: float = 0.):
+        self.audible_range = audible_range
+        self.z = z
+
+        self._sources: list = []
+        self._muted: dict[pyglet.media.AudioPlayer, float] = {}
+        self._position: Optional[tuple[float, float, float]] = None
+
+    def on_add(self, entity, world: desper.World):
+        """Retrieve the :class:`desper.Transform2D` of the entity."""
+        self.transform = world.get_component(entity, desper.Transform2D)
+        assert self.transform is not None, (
+            'A Transform2D component must be added first '
+            f'for {self.__class__} to work')
+
+    @property
+    def muted(self) -> bool:
+        """Whether the emitter is out of range, hence muted."""
+        return bool(self._muted)
+
+    def attach(self, source: Union[pyglet.media.AudioPlayer, Voice]):
+        """Position the given player or voice at the emitter."""
+        self._sources.append(source)
+        # Force the update of all players
+        self._position = None
+
+    def detach(self, source: Union[pyglet.media.AudioPlayer, Voice]):
+        """Stop positioning the given player or voice.
+
+        If muted, the player's volume is restored.
+        """
+        self._sources.remove(source)
+        player = source.player if isinstance(source, Voice) else source
+        if player in self._muted:
+            player.volume = self._muted.pop(player)
+
+    def play(self, voice_pool: VoicePool, sound: pyglet.media.Source,
+             **kwargs) -> Optional[Voice]:
+        """Play a sound on the given pool and attach its voice.
+
+        Keyword arguments are forwarded to :meth:`VoicePool.play`.
+        """
+        voice = voice_pool.play(sound, **kwargs)
+        if voice is not None:
+            self.attach(voice)
+        return voice
+
+    def get_players(self) -> list[pyglet.media.AudioPlayer]:
+        """Get the attached players, detaching inactive voices."""
+        players = []
+        for source in tuple(self._sources):
+            if not isinstance(source, Voice):
+                players.append(source)
+            elif source.active:
+                players.append(source.player)
+            else:
+                # The player may already be playing another sound,
+                # its volume is not restored
+                self._sources.remove(source)
+                self._muted.pop(source.player, None)
+
+        return players
+
+    def update(self, x: float, y: float, in_range: bool):
+        """Update players, given the position relative to the listener."""
+        if not in_range:
+            # Already muted, players attached since then have reset
+            # the position
+            if self._muted and self._position is not None:
+                return
+
+            for player in self.get_players():
+                if player not in self._muted:
+                    self._muted[player] = player.volume
+                    player.volume = 0.
+            self._position = ()
+            return
+
+        players = self.get_players()
+        if self._muted:
+            for player in players:
+                if player in self._muted:
+                    player.volume = self._muted.pop(player)
+
+        position = x, y, self.z
+        if position == self._position:
+            return
+
+        self._position = position
+        for player in players:
+            player.position = position
+
+
+class AudioSyncProcessor(desper.Processor):
+    """Position all the audio emitters of a world, once per frame.
+
+    Emitters are positioned relative to the listener (see
+    :meth:`get_listener_position`), so that the listener of the audio
+    driver can stay at the origin. Relative positions are multiplied by
+    ``scale`` (e.g. to convert pixels into the driver units).
+
+    Emitters with no active players are skipped, as well as those out
+    of their audible range (see :class:`AudioEmitter`). Players are
+    only updated when their relative position changes.
+    """
+
+    def __init__(self, scale: float = 1.):
+        self.scale = scale
+
+    def get_listener_position(self) -> tuple[float, float]:
+        """Get the position of the listener.
+
+        That is, the position of the first entity having an
+        :class:`AudioListener` and a :class:`desper.Transform2D`. If
+        not found, it is the center of the view of the first camera
+        driven by a :class:`CameraTransform2D` (rotation is ignored).
+        Otherwise, the origin.
+        """
+        for entity, _ in self.world.get(AudioListener):
+            transform = self.world.get_component(entity, desper.Transform2D)
+            if transform is not None:
+                return tuple(transform.position)
+
+        for entity, _ in self.world.get(CameraTransform2D):
+            transform = self.world.get_component(entity, desper.Transform2D)
+            camera = self.world.get_component(entity, Camera)
+            if transform is None or camera is None:
+                continue
+
+            _, _, width, height = camera.viewport
+            scale_x, scale_y = transform.scale
+            return (transform.position[0] + width / 2 / scale_x,
+                    transform.position[1] + height / 2 / scale_y)
+
+        return 0., 0.
+
+    def process(self, dt):
+        listener_x, listener_y = self.get_listener_position()
+        scale = self.scale
+
+        for _, emitter in self.world.get(AudioEmitter):
+            if not emitter._sources or emitter.transform is None:
+                continue
+
+            x, y = emitter.transform.position
+            dx = x - listener_x
+            dy = y - listener_y
+            audible_range = emitter.audible_range
+            emitter.update(dx * scale, dy * scale,
+                           dx * dx + dy * dy
+                           <= audible_range * audible_range)
@@ -0,0 +1,729 @@
+"""Compact binary format for world files.
+
+JSON world files (see :class:`desper.WorldFromFileHandle`) are decoded
+entirely and then processed one component at a time: types, objects
+and resources are resolved again for each component of each entity.
+
+In the binary format defined here, consecutive entities sharing the
+same structure (same component types, same number of positional
+arguments and same keyword arguments) are stored together in blocks,
+one column per argument. Numeric columns are packed arrays, strings
+are stored once in a table and referenced by index, while columns
+holding a single repeated value are stored once. On load, blocks are
+read and instantiated one at a time (the file is never decoded
+entirely) and each distinct string is resolved only once.
+
+Binary world files are obtained from JSON ones through
+:func:`convert_world_file` (also available from the command line,
+``python -m pyglet_desper.binary_world source.json destination``)
+and are detected and loaded transparently by
+:func:`world_from_file_handle`, so that the format can be chosen
+file by file.
+
+File layout (little endian)::
+
+    magic (BINARY_WORLD_MAGIC), version (u8)
+    blocks, each as: tag (u8), payload size (u32), payload
+        strings block: the string table
+        processors block: list of processor dictionaries
+        entities blocks: signature, entity IDs and argument columns
+        end block
+"""
+import array
+import json
+import struct
+import sys
+from typing import Any, BinaryIO, Iterator, Optional
+
+import desper
+
+BINARY_WORLD_MAGIC = b'PDWB'
+"""Leading bytes of binary world files."""
+
+BINARY_WORLD_VERSION = 1
+"""Current version of the binary world format."""
+
+DEFAULT_BLOCK_SIZE = 4096
+"""Default maximum number of entities in a single block."""
+
+_BLOCK_STRINGS = 0
+_BLOCK_PROCESSORS = 1
+_BLOCK_ENTITIES = 2
+_BLOCK_END = 3
+
+_COLUMN_CONSTANT = 0
+_COLUMN_FLOAT = 1
+_COLUMN_INT = 2
+_COLUMN_STRING = 3
+_COLUMN_GENERIC = 4
+
+_VALUE_NONE = 0
+_VALUE_TRUE = 1
+_VALUE_FALSE = 2
+_VALUE_INT = 3
+_VALUE_FLOAT = 4
+_VALUE_STRING = 5
+_VALUE_LIST = 6
+_VALUE_DICT = 7
+
+_HEADER = struct.Struct('<4sB')
+_BLOCK_HEADER = struct.Struct('<BI')
+_U8 = struct.Struct('<B')
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+
+_INT64_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _to_bytes(values: array.array) -> bytes:
+    """Get bytes of an array, in little endian."""
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data) -> list:
+    """Get a list from little endian bytes of an array."""
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist()
+
+
+class _BinaryWorldWriter:
+    """Encode world dictionaries into the binary format."""
+
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+
+    def string_index(self, string: str) -> int:
+        index = self.strings.get(string)
+        if index is None:
+            index = len(self.strings)
+            self.strings[string] = index
+        return index
+
+    def write_value(self, buffer: bytearray, value: Any):
+        if isinstance(value, (list, tuple)):
+            self.write_list(buffer, value)
+        elif isinstance(value, dict):
+            self.write_dict(buffer, value)
+        else:
+            self.write_scalar(buffer, value)
+
+    def write_scalar(self, buffer: bytearray, value: Any):
+        if value is None:
+            buffer.append(_VALUE_NONE)
+        elif value is True:
+            buffer.append(_VALUE_TRUE)
+        elif value is False:
+            buffer.append(_VALUE_FALSE)
+        elif type(value) is int:
+            buffer.append(_VALUE_INT)
+            buffer += _I64.pack(value)
+        elif type(value) is float:
+            buffer.append(_VALUE_FLOAT)
+            buffer += _F64.pack(value)
+        elif isinstance(value, str):
+            buffer.append(_VALUE_STRING)
+            buffer += _U32.pack(self.string_index(value))
+        else:
+            raise TypeError(f'Cannot encode {value!r} in a binary world')
+
+    def write_list(self, buffer: bytearray, value: list):
+        buffer.append(_VALUE_LIST)
+        buffer += _U32.pack(len(value))
+        for item in value:
+            self.write_value(buffer, item)
+
+    def write_dict(self, buffer: bytearray, value: dict):
+        buffer.append(_VALUE_DICT)
+        buffer += _U32.pack(len(value))
+        for key, item in value.items():
+            buffer += _U32.pack(self.string_index(key))
+            self.write_value(buffer, item)
+
+    def write_column(self, buffer: bytearray, values: list):
+        first = values[0]
+        value_types = set(map(type, values))
+
+        if len(value_types) == 1 and all(value == first for value in values):
+            buffer.append(_COLUMN_CONSTANT)
+            self.write_value(buffer, first)
+        elif value_types == {float}:
+            buffer.append(_COLUMN_FLOAT)
+            buffer += _to_bytes(array.array('d', values))
+        elif (value_types == {int}
+                and min(values) in _INT64_RANGE
+                and max(values) in _INT64_RANGE):
+            buffer.append(_COLUMN_INT)
+            buffer += _to_bytes(array.array('q', values))
+        elif value_types == {str}:
+            buffer.append(_COLUMN_STRING)
+            buffer += _to_bytes(array.array(
+                'I', map(self.string_index, values)))
+        else:
+            buffer.append(_COLUMN_GENERIC)
+            for value in values:
+                self.write_value(buffer, value)
+
+    def entities_block(self, signature: tuple, entity_dicts: list) -> bytes:
+        buffer = bytearray()
+        buffer += _U32.pack(len(entity_dicts))
+        self.write_value(buffer, [[type_name, args_count, list(kwargs_keys)]
+                                  for type_name, args_count, kwargs_keys
+                                  in signature])
+
+        self.write_column(buffer, [entity_dict.get('id')
+                                   for entity_dict in entity_dicts])
+
+        for component_index, (_, args_count, kwargs_keys) in enumerate(
+                signature):
+            component_dicts = [entity_dict['components'][component_index]
+                               for entity_dict in entity_dicts]
+            for arg_index in range(args_count):
+                self.write_column(buffer, [component_dict['args'][arg_index]
+                                           for component_dict
+                                           in component_dicts])
+            for key in kwargs_keys:
+                self.write_column(buffer, [component_dict['kwargs'][key]
+                                           for component_dict
+                                           in component_dicts])
+
+        return bytes(buffer)
+
+
+def _entity_signature(entity_dict: dict) -> tuple:
+    """Get the structure of an entity dictionary, as a hashable."""
+    return tuple((component_dict['type'],
+                  len(component_dict.get('args', ())),
+                  tuple(component_dict.get('kwargs', {})))
+                 for component_dict in entity_dict.get('components', ()))
+
+
+def _entity_runs(entity_dicts: list[dict],
+                 block_size: int) -> Iterator[tuple[tuple, list[dict]]]:
+    """Group consecutive entities with the same signature.
+
+    Iterate over ``(signature, entity dictionaries)``, each group
+    having at most ``block_size`` entities.
+    """
+    run_signature = None
+    run = []
+    for entity_dict in entity_dicts:
+        signature = _entity_signature(entity_dict)
+        if run and (signature != run_signature or len(run) >= block_size):
+            yield run_signature, run
+            run = []
+        run_signature = signature
+        run.append(entity_dict)
+
+    if run:
+        yield run_signature, run
+
+
+def write_binary_world(world_dict: dict, fout: BinaryIO,
+                       block_size: int = DEFAULT_BLOCK_SIZE):
+    """Write a world dictionary in the binary format.
+
+    The dictionary shall be formatted as a JSON world file (see
+    :func:`desper.populate_world_from_dict`), not yet transformed
+    (i.e. types and resources are still strings). Consecutive
+    entities with the same signature are grouped in blocks of at most
+    ``block_size`` entities.
+    """
+    writer = _BinaryWorldWriter()
+    blocks = []
+
+    processors_buffer = bytearray()
+    writer.write_value(processors_buffer, world_dict.get('processors', []))
+    blocks.append((_BLOCK_PROCESSORS, bytes(processors_buffer)))
+
+    for signature, run in _entity_runs(world_dict.get('entities', []),
+                                       block_size):
+        blocks.append((_BLOCK_ENTITIES,
+                       writer.entities_block(signature, run)))
+
+    # String table can only be built after encoding all the rest
+    strings_buffer = bytearray(_U32.pack(len(writer.strings)))
+    for string in writer.strings:
+        encoded = string.encode('utf-8')
+        strings_buffer += _U32.pack(len(encoded))
+        strings_buffer += encoded
+
+    fout.write(_HEADER.pack(BINARY_WORLD_MAGIC, BINARY_WORLD_VERSION))
+    for tag, payload in ((_BLOCK_STRINGS, strings_buffer), *blocks,
+                         (_BLOCK_END, b'')):
+        fout.write(_BLOCK_HEADER.pack(tag, len(payload)))
+        fout.write(payload)
+
+
+def convert_world_file(source: str, destination: str,
+                       block_size: int = DEFAULT_BLOCK_SIZE):
+    """Convert a JSON world file into a binary world file.
+
+    See :func:`write_binary_world`.
+    """
+    with open(source) as fin:
+        world_dict = json.load(fin)
+
+    with open(destination, 'wb') as fout:
+        write_binary_world(world_dict, fout, block_size)
+
+
+def is_binary_world_file(filename: str) -> bool:
+    """Get whether the given file is a binary world file.
+
+    Missing or unreadable files are not.
+    """
+    try:
+        with open(filename, 'rb') as fin:
+            return fin.read(len(BINARY_WORLD_MAGIC)) == BINARY_WORLD_MAGIC
+    except OSError:
+        return False
+
+
+def _iter_blocks(fin: BinaryIO) -> Iterator[tuple[int, bytes]]:
+    """Iterate over ``(tag, payload)`` of the blocks of a file."""
+    magic, version = _HEADER.unpack(fin.read(_HEADER.size))
+    name = getattr(fin, 'name', fin)
+    if magic != BINARY_WORLD_MAGIC:
+        raise ValueError(f'{name} is not a binary world file')
+    if version != BINARY_WORLD_VERSION:
+        raise ValueError(f'Unsupported binary world version {version} '
+                         f'in {name}')
+
+    while True:
+        tag, size = _BLOCK_HEADER.unpack(fin.read(_BLOCK_HEADER.size))
+        if tag == _BLOCK_END:
+            return
+        yield tag, fin.read(size)
+
+
+def _read_strings(data: bytes) -> list[str]:
+    count, = _U32.unpack_from(data)
+    offset = _U32.size
+    strings = []
+    for _ in range(count):
+        size, = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        strings.append(data[offset:offset + size].decode('utf-8'))
+        offset += size
+    return strings
+
+
+def _read_value(data: bytes, offset: int,
+                strings: list[str]) -> tuple[Any, int]:
+    """Decode a single value, return it with the updated offset."""
+    tag = data[offset]
+    offset += 1
+
+    if tag == _VALUE_NONE:
+        return None, offset
+    if tag == _VALUE_TRUE:
+        return True, offset
+    if tag == _VALUE_FALSE:
+        return False, offset
+    if tag == _VALUE_INT:
+        return _I64.unpack_from(data, offset)[0], offset + _I64.size
+    if tag == _VALUE_FLOAT:
+        return _F64.unpack_from(data, offset)[0], offset + _F64.size
+    if tag == _VALUE_STRING:
+        return (strings[_U32.unpack_from(data, offset)[0]],
+                offset + _U32.size)
+
+    count, = _U32.unpack_from(data, offset)
+    offset += _U32.size
+    if tag == _VALUE_LIST:
+        values = []
+        for _ in range(count):
+            value, offset = _read_value(data, offset, strings)
+            values.append(value)
+        return values, offset
+
+    values = {}
+    for _ in range(count):
+        key = strings[_U32.unpack_from(data, offset)[0]]
+        value, offset = _read_value(data, offset + _U32.size, strings)
+        values[key] = value
+    return values, offset
+
+
+def _copy_value(value: Any) -> Any:
+    """Copy lists and dictionaries, recursively."""
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    return value
+
+
+class _Column:
+    """Values of an argument, for all entities in a block.
+
+    Keep track of whether string resolution (top level strings) or
+    copying (lists and dictionaries, which shall not be shared between
+    instances) is needed.
+    """
+    __slots__ = ('values', 'strings', 'containers')
+
+    def __init__(self, values: list, strings: Optional[bool] = None,
+                 containers: Optional[bool] = None):
+        self.values = values
+        if strings is None:
+            strings = any(isinstance(value, str) for value in values)
+        if containers is None:
+            containers = any(isinstance(value, (list, dict))
+                             for value in values)
+        self.strings = strings
+        self.containers = containers
+
+    def get(self, resolve) -> list:
+        """Get values ready to be passed to constructors."""
+        values = self.values
+        if self.strings:
+            values = [resolve(value) if isinstance(value, str) else value
+                      for value in values]
+        if self.containers:
+            values = list(map(_copy_value, values))
+        return values
+
+
+def _read_column(data: bytes, offset: int, count: int,
+                 strings: list[str]) -> tuple[_Column, int]:
+    """Decode a column of values, return it with the updated offset."""
+    kind = data[offset]
+    offset += 1
+
+    if kind == _COLUMN_CONSTANT:
+        value, offset = _read_value(data, offset, strings)
+        # The value is shared here, lists and dictionaries are copied
+        # for each entity by the column (see _Column.get)
+        return _Column([value] * count), offset
+
+    if kind == _COLUMN_FLOAT:
+        end = offset + 8 * count
+        return _Column(_from_bytes('d', data[offset:end]), False, False), end
+
+    if kind == _COLUMN_INT:
+        end = offset + 8 * count
+        return _Column(_from_bytes('q', data[offset:end]), False, False), end
+
+    if kind == _COLUMN_STRING:
+        end = offset + 4 * count
+        return (_Column([strings[index]
+                         for index in _from_bytes('I', data[offset:end])],
+                        True, False), end)
+
+    values = []
+    for _ in range(count):
+        value, offset = _read_value(data, offset, strings)
+        values.append(value)
+    return _Column(values), offset
+
+
+class _StringResolver:
+    """Resolve strings like desper dict transformers, with caching.
+
+    See :func:`desper.object_dict_transformer` and
+    :func:`desper.resource_dict_transformer`.
+    """
+
+    def __init__(self, world_handle: Optional[desper.Handle]):
+        self.world_handle = world_handle
+        self.cache: dict[str, Any] = {}
+        self._root_map = None
+
+    @property
+    def root_map(self) -> desper.ResourceMap:
+        if self._root_map is None:
+            root_map = self.world_handle
+            while root_map is not None and root_map.parent is not None:
+                root_map = root_map.parent
+
+            if not isinstance(root_map, desper.ResourceMap):
+                raise TypeError('World Handle not connected to a '
+                                'ResourceMap. Unable to retrieve resources '
+                                r'through the $res{} format.')
+            self._root_map = root_map
+        return self._root_map
+
+    def __call__(self, string: str) -> Any:
+        try:
+            return self.cache[string]
+        except KeyError:
+            pass
+
+        value = string
+        match = desper.OBJECT_STRING_REGEX.match(string)
+        if match is not None:
+            value = desper.object_from_string(match.groups()[0])
+
+        match = desper.RESOURCE_STRING_REGEX.match(string)
+        if match is not None:
+            root_map = self.root_map
+            value = root_map[root_map.split_char.join(
+                match.groups()[0].split('.'))]
+
+        match = desper.HANDLE_STRING_REGEX.match(string)
+        if match is not None:
+            root_map = self.root_map
+            value = root_map.get(root_map.split_char.join(
+                match.groups()[0].split('.')))
+
+        self.cache[string] = value
+        return value
+
+
+def _resolve_type(type_name: str):
+    type_object = desper.object_from_string(type_name)
+    if not callable(type_object):
+        raise TypeError(f'Trying to use {type_object} as component type, '
+                        'which is not a callable')
+    return type_object
+
+
+class _ProcessorsBlock:
+    """Processors of a world, as dictionaries."""
+
+    def __init__(self, processor_dicts: list[dict]):
+        self.processor_dicts = processor_dicts
+
+    def iter_populate(self, world: desper.World, resolve) -> Iterator:
+        for processor_dict in self.processor_dicts:
+            args = _Column(processor_dict.get('args', [])).get(resolve)
+            kwargs = processor_dict.get('kwargs', {})
+            kwarg_values = _Column(list(kwargs.values())).get(resolve)
+            world.add_processor(
+                _resolve_type(processor_dict['type'])(
+                    *args, **dict(zip(kwargs, kwarg_values))))
+        return iter(())
+
+    def to_dict(self, world_dict: dict):
+        world_dict['processors'] += _copy_value(self.processor_dicts)
+
+
+class _EntitiesBlock:
+    """Entities sharing the same structure, stored by columns.
+
+    Each component is a ``(type_name, args_columns, kwargs_columns)``
+    triple, where ``kwargs_columns`` maps keyword names to columns.
+    """
+
+    def __init__(self, ids: _Column, components: list[tuple]):
+        self.ids = ids
+        self.components = components
+        self._types = None
+
+    @classmethod
+    def from_dicts(cls, signature: tuple,
+                   entity_dicts: list[dict]) -> '_EntitiesBlock':
+        components = []
+        for component_index, (type_name, args_count, kwargs_keys) in (
+                enumerate(signature)):
+            component_dicts = [entity_dict['components'][component_index]
+                               for entity_dict in entity_dicts]
+            args_columns = [
+                _Column([component_dict['args'][arg_index]
+                         for component_dict in component_dicts])
+                for arg_index in range(args_count)]
+            kwargs_columns = {
+                key: _Column([component_dict['kwargs'][key]
+                              for component_dict in component_dicts])
+                for key in kwargs_keys}
+            components.append((type_name, args_columns, kwargs_columns))
+
+        return cls(_Column([entity_dict.get('id')
+                            for entity_dict in entity_dicts], False, False),
+                   components)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, strings: list[str]) -> '_EntitiesBlock':
+        count, = _U32.unpack_from(data)
+        signature, offset = _read_value(data, _U32.size, strings)
+        ids, offset = _read_column(data, offset, count, strings)
+        # Entity IDs are never resolved
+        ids.strings = False
+
+        components = []
+        for type_name, args_count, kwargs_keys in signature:
+            args_columns = []
+            for _ in range(args_count):
+                column, offset = _read_column(data, offset, count, strings)
+                args_columns.append(column)
+
+            kwargs_columns = {}
+            for key in kwargs_keys:
+                column, offset = _read_column(data, offset, count, strings)
+                kwargs_columns[key] = column
+
+            components.append((type_name, args_columns, kwargs_columns))
+
+        return cls(ids, components)
+
+    def iter_populate(self, world: desper.World, resolve) -> Iterator:
+        # Types are resolved once for all, unlike other strings that
+        # may depend on the resource map
+        if self._types is None:
+            self._types = [_resolve_type(type_name)
+                           for type_name, _, _ in self.components]
+
+        components = [
+            (component_type,
+             [column.get(resolve) for column in args_columns],
+             [(key, column.get(resolve))
+              for key, column in kwargs_columns.items()])
+            for component_type, (_, args_columns, kwargs_columns)
+            in zip(self._types, self.components)]
+
+        create_entity = world.create_entity
+        for i, entity_id in enumerate(self.ids.get(resolve)):
+            yield create_entity(
+                *(component_type(
+                    *[column[i] for column in args_columns],
+                    **{key: column[i] for key, column in kwargs_columns})
+                  for component_type, args_columns, kwargs_columns
+                  in components),
+                entity_id=entity_id)
+
+    def to_dict(self, world_dict: dict):
+        entity_dicts = []
+        for entity_id in self.ids.values:
+            entity_dict = {'components': []}
+            if entity_id is not None:
+                entity_dict['id'] = entity_id
+            entity_dicts.append(entity_dict)
+
+        for type_name, args_columns, kwargs_columns in self.components:
+            for i, entity_dict in enumerate(entity_dicts):
+                entity_dict['components'].append({
+                    'type': type_name,
+                    'args': [_copy_value(column.values[i])
+                             for column in args_columns],
+                    'kwargs': {key: _copy_value(column.values[i])
+                               for key, column in kwargs_columns.items()}})
+
+        world_dict['entities'] += entity_dicts
+
+
+def _iter_world_blocks(fin: BinaryIO) -> Iterator:
+    """Iterate over decoded processors and entities blocks of a file."""
+    strings = []
+    for tag, data in _iter_blocks(fin):
+        if tag == _BLOCK_STRINGS:
+            strings = _read_strings(data)
+        elif tag == _BLOCK_PROCESSORS:
+            yield _ProcessorsBlock(_read_value(data, 0, strings)[0])
+        elif tag == _BLOCK_ENTITIES:
+            yield _EntitiesBlock.from_bytes(data, strings)
+
+
+class WorldSnapshot:
+    """Decoded world file, ready to populate worlds.
+
+    Obtained through :func:`read_world_snapshot` or
+    :func:`world_snapshot_from_dict`, a snapshot can populate any
+    number of worlds (see :meth:`populate`) without decoding the
+    source file again. Component types are resolved the first time
+    and kept, while other strings (``${...}``, ``$res{...}`` and
+    ``$handle{...}``) are resolved at each population, as they depend
+    on the world handle.
+    """
+
+    def __init__(self, blocks: list):
+        self.blocks = blocks
+
+    def populate(self, world_handle: Optional[desper.Handle],
+                 world: desper.World) -> list:
+        """Add processors and entities to the given world.
+
+        The handle is used to retrieve the :class:`desper.ResourceMap`
+        (its root), needed to resolve ``$res{...}`` and
+        ``$handle{...}`` strings. Return the IDs of the created
+        entities.
+        """
+        return list(self.iter_populate(world_handle, world))
+
+    def iter_populate(self, world_handle: Optional[desper.Handle],
+                      world: desper.World) -> Iterator:
+        """Add processors and entities to the given world, lazily.
+
+        Entities are created one at a time while iterating, and their
+        IDs are yielded. Useful to spread the population of large
+        worlds over multiple frames. See :meth:`populate`.
+        """
+        resolve = _StringResolver(world_handle)
+        for block in self.blocks:
+            yield from block.iter_populate(world, resolve)
+
+    def to_dict(self) -> dict:
+        """Get the snapshot as a (not transformed) world dictionary."""
+        world_dict = {'processors': [], 'entities': []}
+        for block in self.blocks:
+            block.to_dict(world_dict)
+        return world_dict
+
+
+def read_world_snapshot(filename: str) -> WorldSnapshot:
+    """Decode a binary world file into a :class:`WorldSnapshot`."""
+    with open(filename, 'rb') as fin:
+        return WorldSnapshot(list(_iter_world_blocks(fin)))
+
+
+def world_snapshot_from_dict(
+        world_dict: dict,
+        block_size: int = DEFAULT_BLOCK_SIZE) -> WorldSnapshot:
+    """Build a :class:`WorldSnapshot` from a world dictionary.
+
+    The dictionary shall be formatted as a JSON world file, not yet
+    transformed (see :func:`write_binary_world`).
+    """
+    blocks = [_ProcessorsBlock(_copy_value(world_dict.get('processors',
+                                                          [])))]
+    blocks += [_EntitiesBlock.from_dicts(signature, run)
+               for signature, run
+               in _entity_runs(world_dict.get('entities', []), block_size)]
+    return WorldSnapshot(blocks)
+
+
+class BinaryWorldFromFileTransformer:
+    """Populate a :class:`desper.World` from a binary world file.
+
+    Binary counterpart of :class:`desper.WorldFromFileTransformer`, to
+    be used as transformer function in
+    :class:`desper.WorldFromFileHandle`. Strings are resolved as done
+    by desper default dict transformers (types, ``${...}`` objects,
+    ``$res{...}`` resources and ``$handle{...}`` handles), but only
+    once for each distinct string. Custom dict transformers are not
+    supported.
+
+    The file is read one block at a time.
+    """
+
+    def __call__(self, world_handle: desper.WorldFromFileHandle,
+                 world: desper.World):
+        resolve = _StringResolver(world_handle)
+
+        with open(world_handle.filename, 'rb') as fin:
+            for block in _iter_world_blocks(fin):
+                for _ in block.iter_populate(world, resolve):
+                    pass
+
+
+def read_binary_world(filename: str) -> dict:
+    """Decode a binary world file into a world dictionary.
+
+    The result is formatted as a JSON world file, with no string
+    resolution applied. Mostly useful for inspection and debugging.
+    """
+    return read_world_snapshot(filename).to_dict()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python -m pyglet_desper.binary_world '
+                 'source.json destination')
+    convert_world_file(sys.argv[1], sys.argv[2])
@@ -0,0 +1,355 @@
+"""Capture the state of a world and restore it in memory.
+
+Restarting a level usually means loading its world again, i.e.
+decoding the world file, constructing all components and building
+the vertices of all graphics (see :func:`world_from_file_handle`).
+A :class:`WorldCheckpoint` instead captures a live world (e.g. right
+after its loading) and brings it back to the captured state on
+demand, reusing component instances, sprites and their vertices
+wherever possible.
+"""
+import collections
+import copy
+import inspect
+import types
+import weakref
+from typing import Any, Hashable
+
+import desper
+
+from pyglet_desper.logic import InstancedSprite
+from pyglet_desper.logic.pool import PARAMETER_ALIASES, _is_settable
+from pyglet_desper.model import GRAPHIC_BASE_CLASSES
+
+CHECKPOINT_GRAPHIC_CLASSES = GRAPHIC_BASE_CLASSES + (InstancedSprite,)
+"""Components captured as graphics by a :class:`WorldCheckpoint`."""
+
+GRAPHIC_STATE_PROPERTIES = ('batch', 'group', 'image', 'frame_index',
+                            'paused', 'text', 'position', 'rotation',
+                            'scale', 'scale_x', 'scale_y', 'color',
+                            'visible')
+"""Properties captured from graphical components, when settable.
+
+They are restored in the given order, and only if their value has
+changed.
+"""
+
+SHARED_PACKAGES = ('pyglet', 'pyglet_desper')
+"""Packages whose objects are never copied by a checkpoint."""
+
+SHARED_TYPES = (desper.World, desper.Handle, desper.ResourceMap,
+                desper.Processor, types.ModuleType, desper.math.Vec2,
+                desper.math.Vec3, desper.math.Vec4, desper.math.Mat3,
+                desper.math.Mat4)
+"""Types whose instances are never copied by a checkpoint.
+
+Besides resources and worlds, it includes immutable types that
+cannot be copied.
+
+Together with objects from :attr:`SHARED_PACKAGES` and with the
+components of the captured world, they are referenced as they are.
+"""
+
+_ATOMIC_TYPES = (type(None), bool, int, float, complex, str, bytes,
+                 range, type, types.FunctionType, types.BuiltinFunctionType,
+                 weakref.ref)
+
+# Map graphical types to their captured properties and to their
+# constructor parameters, along with the attributes to fill them with
+_graphic_types: dict[type, tuple[tuple[str, ...], dict[str, str]]] = {}
+
+
+def _get_graphic_type_info(graphic_type: type
+                           ) -> tuple[tuple[str, ...], dict[str, str]]:
+    info = _graphic_types.get(graphic_type)
+    if info is None:
+        properties = tuple(name for name in GRAPHIC_STATE_PROPERTIES
+                           if _is_settable(graphic_type, name))
+        parameters = {
+            name: PARAMETER_ALIASES.get(name, name)
+            for name, parameter
+            in inspect.signature(graphic_type).parameters.items()
+            if parameter.kind not in (parameter.VAR_POSITIONAL,
+                                      parameter.VAR_KEYWORD)}
+        info = _graphic_types[graphic_type] = properties, parameters
+
+    return info
+
+
+def _get_package(value) -> str:
+    return type(value).__module__.partition('.')[0]
+
+
+def _is_shared(value) -> bool:
+    """Get whether the given object shall be referenced, not copied."""
+    return (isinstance(value, SHARED_TYPES)
+            or _get_package(value) in SHARED_PACKAGES)
+
+
+def _find_shared(value, memo: dict, visited: set):
+    """Register in ``memo`` shared objects reachable from ``value``.
+
+    ``memo`` is then given to :func:`copy.deepcopy`, which will
+    leave said objects untouched.
+    """
+    fringe = [value]
+    while fringe:
+        value = fringe.pop()
+        if isinstance(value, _ATOMIC_TYPES) or id(value) in memo:
+            continue
+
+        if _is_shared(value):
+            memo[id(value)] = value
+            continue
+
+        if id(value) not in visited:
+            visited.add(id(value))
+            fringe.extend(_get_references(value))
+
+
+def _get_references(value) -> list:
+    """Get objects directly referenced by the given one."""
+    if isinstance(value, dict):
+        return [*value.keys(), *value.values()]
+    if isinstance(value, (list, tuple, set, frozenset, collections.deque)):
+        return list(value)
+    if isinstance(value, types.MethodType):
+        return [value.__self__]
+
+    references = list(getattr(value, '__dict__', {}).values())
+    for cls in type(value).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            if hasattr(value, slot):
+                references.append(getattr(value, slot))
+    return references
+
+
+def _get_graphic_state(graphic) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Get properties and constructor arguments of a graphic."""
+    properties, parameters = _get_graphic_type_info(type(graphic))
+    return ({name: getattr(graphic, name) for name in properties},
+            {name: getattr(graphic, attribute)
+             for name, attribute in parameters.items()
+             if hasattr(graphic, attribute)})
+
+
+def _apply_graphic_state(graphic, state: dict[str, Any]):
+    for name, value in state.items():
+        if getattr(graphic, name) != value:
+            setattr(graphic, name, value)
+
+
+class WorldCheckpoint:
+    """Captured state of a :class:`desper.World`, to restore it later.
+
+    All entities and components of the given world are captured at
+    construction. Then, :meth:`restore` brings the world back to such
+    state (as many times as needed), which is usually much faster
+    than loading the world again.
+
+    Graphical components (see :attr:`CHECKPOINT_GRAPHIC_CLASSES`) are
+    captured through their properties (see
+    :attr:`GRAPHIC_STATE_PROPERTIES`): image, position, batch, group,
+    etc. Other components are captured by deep copying their
+    attributes, except for objects that are shared with the rest of
+    the application: pyglet objects (textures, batches, groups,
+    etc.), pyglet-desper objects (e.g. a :class:`GraphicPool`),
+    instances of :attr:`SHARED_TYPES` and components of the world
+    itself, which are just referenced. Pyglet objects used as
+    components (e.g. a :class:`pyglet.graphics.Batch`) are kept as
+    they are.
+
+    Processors are not part of the checkpoint, they are left
+    untouched.
+    """
+
+    def __init__(self, world: desper.World):
+        self.world = world
+
+        self._entities: dict[Hashable, tuple] = {
+            entity: world.get_components(entity)
+            for entity in world.entities}
+
+        self._shared: dict[int, Any] = {id(world): world}
+        for component in self._iter_components():
+            self._shared[id(component)] = component
+
+        # Graphics are captured by id of the original instance. In
+        # case they are built again, the current instance is stored
+        # in _current
+        self._graphic_states: dict[int, tuple[dict, dict]] = {}
+        self._current: dict[int, Any] = {}
+        self._capture_graphics()
+
+        self._states: dict[int, tuple[dict[str, Any], dict[str, Any]]] = {}
+        self._capture_states()
+
+    def _iter_components(self):
+        for components in self._entities.values():
+            yield from components
+
+    def _capture_graphics(self):
+        """Capture graphics and find all shared objects."""
+        visited = set()
+        for component in self._iter_components():
+            if isinstance(component, CHECKPOINT_GRAPHIC_CLASSES):
+                state = _get_graphic_state(component)
+                self._graphic_states[id(component)] = state
+                _find_shared(state, self._shared, visited)
+            elif self._has_state(component):
+                _find_shared(vars(component), self._shared, visited)
+
+    def _capture_states(self):
+        """Capture attributes of non graphical components."""
+        # Attributes are split between the ones that can be restored
+        # as they are (immutable or shared values) and the ones that
+        # need to be copied at each restoration
+        memo = dict(self._shared)
+        for component in self._iter_components():
+            if (id(component) in self._graphic_states
+                    or not self._has_state(component)):
+                continue
+
+            plain, copied = {}, {}
+            for name, value in vars(component).items():
+                if self._is_plain(value):
+                    plain[name] = value
+                else:
+                    copied[name] = copy.deepcopy(value, memo)
+            self._states[id(component)] = plain, copied
+
+    @staticmethod
+    def _has_state(component) -> bool:
+        return (hasattr(component, '__dict__')
+                and _get_package(component) != 'pyglet')
+
+    def _is_plain(self, value) -> bool:
+        # Graphics may be built again, hence references to them are
+        # resolved during each restoration
+        return (isinstance(value, _ATOMIC_TYPES)
+                or (id(value) in self._shared
+                    and id(value) not in self._graphic_states))
+
+    @property
+    def entities(self) -> tuple[Hashable, ...]:
+        """Captured entities."""
+        return tuple(self._entities)
+
+    def restore(self):
+        """Bring the world back to the captured state.
+
+        Entities created after the capture are deleted, deleted ones
+        are created again (with the same ids). Components are
+        restored in place: graphics that are still in the world are
+        reused, only updating the properties that changed, while
+        graphics removed since the capture (and hence usually deleted,
+        see :class:`GraphicSync2D`) are built again. Removal and
+        addition events are dispatched only for components that are
+        actually removed or added.
+
+        Pending deletions (see :meth:`desper.World.delete_entity`) are
+        finalized first, so that removal events can't alter the
+        restored state later on.
+        """
+        world = self.world
+
+        for entity in world.entities:
+            if entity not in self._entities:
+                world.delete_entity(entity)
+        # Public counterpart is World.process, which would also run
+        # processors
+        world._clear_dead_entities()
+
+        current = {entity: [self._current.get(id(component), component)
+                            for component in components]
+                   for entity, components in self._entities.items()}
+        attached = self._remove_new_components(current)
+        memo = self._restore_graphics(current, attached)
+
+        for component in self._iter_components():
+            self._restore_state(component, memo)
+
+        self._add_missing_components(current, attached, memo)
+
+    def _remove_new_components(self, current: dict[Hashable, list]
+                               ) -> dict[Hashable, set[int]]:
+        """Remove components added since the capture.
+
+        Return, for each entity, ids of the captured components that
+        are still attached to it.
+        """
+        world = self.world
+        attached: dict[Hashable, set[int]] = {}
+        for entity, components in current.items():
+            captured = set(map(id, components))
+            attached[entity] = entity_attached = set()
+            for component in world.get_components(entity):
+                if id(component) in captured:
+                    entity_attached.add(id(component))
+                else:
+                    world.remove_component(entity, type(component))
+
+        return attached
+
+    def _restore_graphics(self, current: dict[Hashable, list],
+                          attached: dict[Hashable, set[int]]) -> dict:
+        """Restore graphics, building again the removed ones.
+
+        Return the memo to be used when copying components state.
+        """
+        memo = dict(self._shared)
+        memo.update(self._current)
+        for entity, components in self._entities.items():
+            for i, component in enumerate(components):
+                state = self._graphic_states.get(id(component))
+                if state is None:
+                    continue
+
+                graphic = current[entity][i]
+                properties, arguments = state
+                if id(graphic) in attached[entity]:
+                    _apply_graphic_state(graphic, properties)
+                    continue
+
+                graphic = type(component)(**arguments)
+                _apply_graphic_state(graphic, properties)
+                current[entity][i] = graphic
+                self._current[id(component)] = graphic
+                memo[id(component)] = graphic
+
+        return memo
+
+    def _add_missing_components(self, current: dict[Hashable, list],
+                                attached: dict[Hashable, set[int]],
+                                memo: dict):
+        """Add back removed components.
+
+        Events are dispatched once all the components of an entity are
+        in place. Then, state is restored again, so that it is the
+        captured one, regardless of the addition handlers.
+        """
+        world = self.world
+        for entity, components in current.items():
+            missing = [component for component in components
+                       if id(component) not in attached[entity]]
+            if not missing:
+                continue
+
+            if attached[entity]:
+                for component in missing:
+                    world.add_component(entity, component)
+            else:
+                world.create_entity(*missing, entity_id=entity)
+
+            for component in missing:
+                self._restore_state(component, memo)
+
+    def _restore_state(self, component, memo: dict):
+        state = self._states.get(id(component))
+        if state is not None:
+            plain, copied = state
+            attributes = component.__dict__
+            attributes.clear()
+            attributes.update(plain)
+            if copied:
+                attributes.update(copy.deepcopy(copied, memo))
@@ -0,0 +1,358 @@
+"""Build time cooking of resource directories.
+
+Resources are otherwise validated and converted at runtime, when
+loaded by their handles (see :attr:`resource_populator`). Cooking a
+resource directory (same layout as the one expected by
+:attr:`resource_populator`) does this work in advance, in a process
+pool, producing a directory that can be populated as usual:
+
+- images are decoded, to validate them (and copied unaltered)
+- spritesheet metadata (JSON files in the image directory) are
+    validated against their image and normalized, keeping only the
+    fields used by :func:`parse_spritesheet` (frames exported by
+    Aseprite as ``hash`` are converted to an ``array``)
+- JSON world files are converted into binary world files (see
+    :mod:`pyglet_desper.binary_world`), keeping their names
+- media and fonts are copied
+
+Cooking is incremental: a manifest (:attr:`MANIFEST_FILENAME`) is
+written in the output directory, keeping the content hash of each
+cooked file. Unchanged files are skipped by following cookings, while
+outputs of removed files are deleted.
+
+Also available from the command line::
+
+    python -m pyglet_desper.cook source destination [-j WORKERS] [--force]
+"""
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import os.path as pt
+import sys
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pyglet
+
+from pyglet_desper.binary_world import (DEFAULT_BLOCK_SIZE,
+                                        is_binary_world_file,
+                                        write_binary_world)
+from pyglet_desper.model import (MEDIA_DIRECTORY, FONT_DIRECTORY,
+                                 IMAGE_DIRECTORY, WORLD_DIRECTORY)
+
+COOK_VERSION = 1
+"""Version of the cooking process.
+
+Manifests written by different versions are ignored (everything is
+cooked again).
+"""
+
+MANIFEST_FILENAME = 'manifest.json'
+"""Name of the manifest, written in the root of cooked directories."""
+
+COOKED_DIRECTORIES = (MEDIA_DIRECTORY, FONT_DIRECTORY, IMAGE_DIRECTORY,
+                      WORLD_DIRECTORY)
+"""Directories of a resource directory that are cooked.
+
+Files outside them are ignored.
+"""
+
+
+@dataclass
+class CookReport:
+    """Outcome of :func:`cook_resources`.
+
+    All files are given as paths relative to the resource directories,
+    with forward slashes.
+    """
+    cooked: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def _hash_bytes(*data: bytes) -> str:
+    digest = hashlib.sha1()
+    for chunk in data:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_bytes(filename: str) -> bytes:
+    with open(filename, 'rb') as fin:
+        return fin.read()
+
+
+def _try_json(data: bytes) -> Optional[dict]:
+    try:
+        value = json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+    if isinstance(value, dict):
+        return value
+    return None
+
+
+def get_content_hash(filename: str, kind: str) -> str:
+    """Get the hash of a resource file, as stored in the manifest.
+
+    ``kind`` is the name of the directory containing it (see
+    :attr:`COOKED_DIRECTORIES`). The hash of spritesheet metadata
+    files includes the one of the referenced image, which is used to
+    validate them.
+    """
+    data = _read_bytes(filename)
+    if kind != IMAGE_DIRECTORY:
+        return _hash_bytes(data)
+
+    metadata = _try_json(data)
+    image = (metadata or {}).get('meta', {}).get('image')
+    if not isinstance(image, str):
+        return _hash_bytes(data)
+
+    try:
+        image_data = _read_bytes(pt.join(pt.dirname(filename), image))
+    except OSError:
+        image_data = b''
+    return _hash_bytes(data, image_data)
+
+
+def normalize_spritesheet(metadata: dict, width: int, height: int) -> dict:
+    """Validate and normalize spritesheet metadata.
+
+    See :func:`parse_spritesheet` for the format. ``width`` and
+    ``height`` are the sizes of the referenced image, used to validate
+    frame regions. Frames can be given as a list or as a dictionary
+    (Aseprite's ``hash`` format, whose order is retained). Fields not
+    used by :func:`parse_spritesheet` are removed.
+
+    :raises ValueError: On malformed metadata.
+    """
+    meta = metadata.get('meta', {})
+    image = meta.get('image')
+    if not isinstance(image, str):
+        raise ValueError('meta.image must be the path of the spritesheet')
+
+    frames = metadata.get('frames', [])
+    if isinstance(frames, dict):
+        frames = list(frames.values())
+    if not isinstance(frames, list):
+        raise ValueError('frames must be a list or a dictionary')
+
+    normalized_frames = []
+    for index, frame in enumerate(frames):
+        region = frame.get('frame', {})
+        x, y = region.get('x', 0), region.get('y', 0)
+        w, h = region.get('w', width), region.get('h', height)
+        if (x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > width
+                or y + h > height):
+            raise ValueError(f'frame {index} ({x}, {y}, {w}, {h}) '
+                             f'exceeds the image ({width}x{height})')
+
+        duration = frame.get('duration', 1000)
+        if duration <= 0:
+            raise ValueError(f'frame {index} has non positive duration')
+
+        normalized_frames.append({'frame': {'x': x, 'y': y, 'w': w, 'h': h},
+                                  'duration': duration})
+
+    normalized_meta = {'image': image}
+    if 'origin' in meta:
+        origin = meta['origin']
+        normalized_meta['origin'] = {'x': origin.get('x', 0),
+                                     'y': origin.get('y', 0)}
+
+    return {'frames': normalized_frames, 'meta': normalized_meta}
+
+
+def _write_atomic(destination: str, data: bytes):
+    os.makedirs(pt.dirname(destination), exist_ok=True)
+    temp_filename = f'{destination}.tmp'
+    with open(temp_filename, 'wb') as fout:
+        fout.write(data)
+    os.replace(temp_filename, destination)
+
+
+def _cook_image(source: str, destination: str) -> dict:
+    data = _read_bytes(source)
+    metadata = _try_json(data)
+
+    if metadata is None:
+        image = pyglet.image.load(source)
+        _write_atomic(destination, data)
+        return {'width': image.width, 'height': image.height}
+
+    image_filename = metadata.get('meta', {}).get('image')
+    if not isinstance(image_filename, str):
+        raise ValueError('meta.image must be the path of the spritesheet')
+    image = pyglet.image.load(pt.join(pt.dirname(source), image_filename))
+
+    normalized = normalize_spritesheet(metadata, image.width, image.height)
+    _write_atomic(destination,
+                  json.dumps(normalized, separators=(',', ':')).encode())
+    return {'spritesheet': True, 'frames': len(normalized['frames'])}
+
+
+def _cook_world(source: str, destination: str, block_size: int) -> dict:
+    if is_binary_world_file(source):
+        _write_atomic(destination, _read_bytes(source))
+        return {}
+
+    with open(source) as fin:
+        world_dict = json.load(fin)
+
+    fout = io.BytesIO()
+    write_binary_world(world_dict, fout, block_size)
+    _write_atomic(destination, fout.getvalue())
+    return {'entities': len(world_dict.get('entities', []))}
+
+
+def cook_file(source: str, destination: str, kind: str,
+              block_size: int = DEFAULT_BLOCK_SIZE) -> dict:
+    """Cook a single resource file, return its manifest metadata.
+
+    ``kind`` is the name of the directory containing it (see
+    :attr:`COOKED_DIRECTORIES`). The output is written atomically.
+    Executed in the worker processes of :func:`cook_resources`.
+    """
+    if kind == IMAGE_DIRECTORY:
+        metadata = _cook_image(source, destination)
+    elif kind == WORLD_DIRECTORY:
+        metadata = _cook_world(source, destination, block_size)
+    else:
+        _write_atomic(destination, _read_bytes(source))
+        metadata = {}
+
+    metadata['size'] = pt.getsize(destination)
+    return metadata
+
+
+def iter_resource_files(directory: str):
+    """Iterate over the files to cook in a resource directory.
+
+    Yield tuples ``(relative_path, kind)``, where paths use forward
+    slashes and ``kind`` is one of :attr:`COOKED_DIRECTORIES`.
+    """
+    for kind in COOKED_DIRECTORIES:
+        root = pt.join(directory, kind)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                relative = pt.relpath(pt.join(dirpath, filename), directory)
+                yield relative.replace(os.sep, '/'), kind
+
+
+def load_manifest(directory: str) -> dict:
+    """Load the manifest of a cooked directory.
+
+    Return the dictionary of assets, mapping relative paths to their
+    metadata (the ``hash`` key holding their content hash). An empty
+    dictionary is returned if the manifest is missing or written by a
+    different :attr:`COOK_VERSION`.
+    """
+    try:
+        with open(pt.join(directory, MANIFEST_FILENAME)) as fin:
+            manifest = json.load(fin)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+    if manifest.get('version') != COOK_VERSION:
+        return {}
+    return manifest.get('assets', {})
+
+
+def cook_resources(source: str, destination: str,
+                   max_workers: Optional[int] = None, force: bool = False,
+                   block_size: int = DEFAULT_BLOCK_SIZE) -> CookReport:
+    """Cook a resource directory into ``destination``.
+
+    Files whose content hash matches the one in the existing manifest
+    (and whose output exists) are skipped, unless ``force`` is given.
+    Others are cooked in a process pool of ``max_workers`` processes
+    (see :func:`cook_file`). Files that fail to cook are reported
+    in :attr:`CookReport.errors` and left out of the manifest, so
+    that they are cooked again next time.
+    """
+    old_assets = {} if force else load_manifest(destination)
+    assets = {}
+    report = CookReport()
+    jobs = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        for relative, kind in iter_resource_files(source):
+            source_filename = pt.join(source, relative)
+            destination_filename = pt.join(destination, relative)
+            content_hash = get_content_hash(source_filename, kind)
+
+            old_entry = old_assets.get(relative, {})
+            if (old_entry.get('hash') == content_hash
+                    and pt.isfile(destination_filename)):
+                assets[relative] = old_entry
+                report.skipped.append(relative)
+                continue
+
+            future = executor.submit(cook_file, source_filename,
+                                     destination_filename, kind, block_size)
+            jobs[future] = relative, kind, content_hash
+
+        for future in concurrent.futures.as_completed(jobs):
+            relative, kind, content_hash = jobs[future]
+            try:
+                metadata = future.result()
+            except Exception as error:
+                report.errors[relative] = f'{type(error).__name__}: {error}'
+                continue
+
+            assets[relative] = {'kind': kind, 'hash': content_hash,
+                                **metadata}
+            report.cooked.append(relative)
+
+    report.cooked.sort()
+    report.skipped.sort()
+
+    # Remove outputs of files that disappeared from the source
+    for relative in sorted(old_assets.keys() - assets.keys()
+                           - report.errors.keys()):
+        try:
+            os.remove(pt.join(destination, relative))
+        except FileNotFoundError:
+            pass
+        report.removed.append(relative)
+
+    os.makedirs(destination, exist_ok=True)
+    _write_atomic(pt.join(destination, MANIFEST_FILENAME), json.dumps(
+        {'version': COOK_VERSION, 'assets': dict(sorted(assets.items()))},
+        indent=1).encode())
+
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m pyglet_desper.cook',
+        description='Cook a resource directory.')
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--force', action='store_true',
+                        help='cook all files, ignoring the manifest')
+    arguments = parser.parse_args()
+
+    if pt.abspath(arguments.source) == pt.abspath(arguments.destination):
+        sys.exit('source and destination must differ')
+
+    result = cook_resources(arguments.source, arguments.destination,
+                            arguments.workers, arguments.force)
+    for relative, error in sorted(result.errors.items()):
+        print(f'{relative}: {error}', file=sys.stderr)
+    print(f'{len(result.cooked)} cooked, {len(result.skipped)} skipped, '
+          f'{len(result.removed)} removed, {len(result.errors)} errors')
+
+    if result.errors:
+        sys.exit(1)
@@ -1,16 +1,26 @@
 import math
+import weakref
 from typing import Optional
 
 import desper
 import pyglet
-from pyglet.enums import BlendFactor
+from pyglet.enums import BlendFactor, GeometryMode
 
+from .pool import *             # NOQA
 from .sync import *             # NOQA
+from .instancing import *       # NOQA
+from .transform_buffer import *  # NOQA
+from .shape_batch import *      # NOQA
+from .tilemap import *          # NOQA
 
 ON_CAMERA_DRAW_EVENT_NAME = 'on_camera_draw'
 
+# Internal sprite groups, shared by sprites with the same rendering state
+_sprite_groups = weakref.WeakValueDictionary()
 
-@desper.event_handler('on_switch_in', 'on_switch_out', 'on_add')
+
+@desper.event_handler('on_switch_in', 'on_switch_out', 'on_add',
+                      desper.ON_REMOVE_EVENT_NAME)
 class Sprite(pyglet.sprite.Sprite):
     """Specialized sprite for better integration into desper.
 
@@ -18,11 +28,20 @@ class Sprite(pyglet.sprite.Sprite):
     animations correctly. See module :mod:`pyglet.sprite` to know
     more about sprites.
 
+    If the world owning the sprite has an :class:`AnimationProcessor`,
+    animations are advanced by such processor instead of being
+    individually scheduled on :mod:`pyglet.clock`. In this case,
+    animations are naturally paused and resumed along with the world
+    (which is processed only when current) and the sprite stops
+    listening to ``on_switch_in`` and ``on_switch_out`` events.
+
     This assumes that the default event workflow is being followed.
     That is: world dispatching is disabled after creation and
     enabled just when it is used as current world (i.e. with
     :func:`desper.switch`).
     """
+    _animation_processor: Optional['AnimationProcessor'] = None
+    _frame_time = 0.
 
     def __init__(self,
                  img, x=0, y=0, z=0,
@@ -40,10 +59,93 @@ class Sprite(pyglet.sprite.Sprite):
 
     __init__.__doc__ = pyglet.sprite.Sprite.__init__.__doc__
 
-    def on_add(self, entity, world: desper.World):
-        """Start animation."""
+    def get_sprite_group(self):
+        """Get the internal group used to render the sprite.
+
+        Groups are shared among sprites with the same rendering state
+        (texture, blending, program and parent group), so that they
+        are built only once.
+        """
+        key = (self.group_class, self._texture.target, self._texture.id,
+               self._blend_src, self._blend_dest, self._program,
+               self._user_group)
+        group = _sprite_groups.get(key)
+        if group is None:
+            group = super().get_sprite_group()
+            _sprite_groups[key] = group
+        return group
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @paused.setter
+    def paused(self, pause: bool):
+        if self._animation_processor is None:
+            pyglet.sprite.Sprite.paused.fset(self, pause)
+            return
+
+        self._paused = pause
+
+    paused.__doc__ = pyglet.sprite.Sprite.paused.__doc__
+
+    @property
+    def image(self):
+        return pyglet.sprite.Sprite.image.fget(self)
+
+    @image.setter
+    def image(self, img):
+        pyglet.sprite.Sprite.image.fset(self, img)
+
+        if self._animation_processor is None:
+            return
+
         if self._animation is not None:
+            pyglet.clock.unschedule(self._animate)
+            self._frame_time = self._animation.frames[0].duration
+        else:
+            self._frame_time = None
+
+    image.__doc__ = pyglet.sprite.Sprite.image.__doc__
+
+    def delete(self):
+        """Force immediate removal of the sprite from video memory.
+
+        Also unregister from the :class:`AnimationProcessor`, if any.
+        """
+        if self._animation_processor is not None:
+            self._animation_processor.remove(self)
+        super().delete()
+
+    def on_add(self, entity, world: desper.World):
+        """Start animation.
+
+        If an :class:`AnimationProcessor` is present in the world,
+        the sprite registers to it and unsubscribes from the world's
+        events, as switching worlds is then handled for free.
+        """
+        if self._animation is None:
+            return
+
+        processor = None
+        if world is not None:
+            processor = world.get_processor(AnimationProcessor)
+
+        if processor is None:
             self.paused = False
+            return
+
+        processor.add(self)
+        world.remove_handler(self)
+
+    def on_remove(self, entity, world: desper.World):
+        """Unregister from the :class:`AnimationProcessor`, if any.
+
+        The animation is left paused, ready to be restarted if the
+        sprite is added to a world again.
+        """
+        if self._animation_processor is not None:
+            self._animation_processor.remove(self)
 
     def on_switch_in(self, world_from: desper.World, world_to: desper.World):
         """Start animation."""
@@ -56,6 +158,571 @@ class Sprite(pyglet.sprite.Sprite):
             self.paused = True
 
 
+class AnimationProcessor(desper.Processor):
+    """Advance all animated :class:`Sprite`s in a single pass.
+
+    Animated sprites added to a world that has this processor register
+    to it (see :meth:`Sprite.on_add`), instead of scheduling their
+    frames individually on :mod:`pyglet.clock`. Once per
+    :meth:`process`, frame timers of all registered sprites are
+    updated and textures are swapped only for those sprites that
+    actually change frame.
+
+    Since a world is only processed when current, pausing and resuming
+    all animations when switching worlds requires no work at all.
+    Individual sprites can still be paused through
+    :attr:`Sprite.paused`.
+
+    The ``on_animation_end`` pyglet event is dispatched by sprites
+    as usual.
+    """
+
+    def __init__(self):
+        self._sprites: set[Sprite] = set()
+
+    @property
+    def sprites(self) -> frozenset[Sprite]:
+        """Set of currently registered sprites."""
+        return frozenset(self._sprites)
+
+    def add(self, sprite: Sprite):
+        """Register an animated sprite and start its animation.
+
+        The sprite is taken off the global :mod:`pyglet.clock`.
+        """
+        pyglet.clock.unschedule(sprite._animate)
+        sprite._animation_processor = self
+        sprite._paused = False
+        sprite._frame_time = sprite._animation.frames[
+            sprite._frame_index].duration
+
+        self._sprites.add(sprite)
+
+    def remove(self, sprite: Sprite):
+        """Unregister a sprite, if registered.
+
+        The sprite is handed back to :mod:`pyglet.clock` in a paused
+        state, so that unpausing it schedules its animation again.
+        """
+        self._sprites.discard(sprite)
+        if sprite._animation_processor is self:
+            sprite._animation_processor = None
+            sprite._paused = True
+
+    def process(self, dt):
+        """Advance animations of all registered sprites."""
+        # Sprites may get deleted in on_animation_end handlers,
+        # iterate on a copy
+        for sprite in tuple(self._sprites):
+            frame_time = sprite._frame_time
+            if sprite._paused or frame_time is None:
+                continue
+
+            frame_time -= dt
+            if frame_time > 0:
+                sprite._frame_time = frame_time
+                continue
+
+            frame_index, frame_time = self._skip_frames(sprite, frame_time)
+            if sprite._vertex_list is None:
+                continue
+
+            sprite._frame_time = frame_time
+            if frame_index != sprite._frame_index:
+                sprite._frame_index = frame_index
+                sprite._set_texture(
+                    sprite._animation.frames[frame_index].image.get_texture())
+
+    @staticmethod
+    def _skip_frames(sprite: Sprite, frame_time: float
+                     ) -> tuple[int, Optional[float]]:
+        """Get the frame reached by a sprite whose frame time expired.
+
+        Skip as many frames as needed (at most an entire loop of the
+        animation). Return the new frame index and frame time
+        (``None`` if the animation ended).
+        """
+        frames = sprite._animation.frames
+        frame_index = sprite._frame_index
+        for _ in frames:
+            frame_index += 1
+            if frame_index >= len(frames):
+                frame_index = 0
+                sprite.dispatch_event('on_animation_end')
+                if sprite._vertex_list is None:
+                    break           # Deleted in event handler
+
+            duration = frames[frame_index].duration
+            if duration is None:
+                sprite.dispatch_event('on_animation_end')
+                return frame_index, None
+
+            frame_time += duration
+            if frame_time > 0:
+                break
+
+        return frame_index, frame_time
+
+
+class BufferedSprite(Sprite):
+    """Sprite whose transformation is stored in a :class:`TransformBuffer`.
+
+    Vertices of the sprite are static in its local space. Position,
+    rotation and scale are written in a single record of the given
+    ``transform_buffer`` (which defaults to a buffer shared by all
+    sprites, see :func:`get_default_transform_buffer`) and applied
+    by the shader. Changing them costs a few array writes, while the
+    whole buffer is uploaded once per frame.
+
+    A custom ``program`` shall declare the same attributes and
+    uniforms as :func:`get_transform_buffer_shader`. Texture arrays
+    are not supported.
+
+    Use :func:`buffered_sprite_sync_component` to synchronize it with
+    a :class:`desper.Transform2D`.
+    """
+    group_class = TransformBufferSpriteGroup
+
+    def __init__(self,
+                 img, x=0, y=0, z=0,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 batch=None,
+                 group=None,
+                 subpixel=False,
+                 program=None,
+                 transform_buffer: Optional[TransformBuffer] = None):
+        self._transform_buffer = (transform_buffer
+                                  or get_default_transform_buffer())
+        self._transform_index = self._transform_buffer.allocate()
+        self._transform_buffer.set_translation(self._transform_index,
+                                               x, y, z)
+
+        super().__init__(img, x, y, z, blend_src, blend_dest, batch, group,
+                         subpixel,
+                         program or get_transform_buffer_shader())
+
+    @property
+    def transform_buffer(self) -> TransformBuffer:
+        """Buffer storing the transformation of the sprite."""
+        return self._transform_buffer
+
+    def get_sprite_group(self):
+        return self.group_class(self._texture, self._blend_src,
+                                self._blend_dest, self._program,
+                                self._transform_buffer, self._user_group)
+
+    def _create_vertex_list(self):
+        self._vertex_list = self._program.vertex_list_indexed(
+            4, GeometryMode.TRIANGLES, (0, 1, 2, 0, 2, 3), self._batch,
+            self._group,
+            position=('f', self._get_vertices()),
+            colors=('Bn', self._rgba * 4),
+            tex_coords=('f', self._texture.tex_coords),
+            transform_index=('f', (self._transform_index,) * 4))
+
+    def delete(self):
+        """Force immediate removal of the sprite from video memory.
+
+        Also release the record in the transform buffer.
+        """
+        super().delete()
+        if self._transform_index is not None:
+            self._transform_buffer.release(self._transform_index)
+            self._transform_index = None
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, float, float]):
+        self.set_transform(position)
+
+    def set_transform(
+            self, position: Optional[tuple[float, float, float]] = None,
+            rotation: Optional[float] = None):
+        """Set position and/or rotation, writing the record directly.
+
+        A faster alternative to :meth:`update`, used for
+        synchronization (see :class:`BufferedSpriteSync`).
+        """
+        if position is not None:
+            self._x, self._y, self._z = position
+            self._transform_buffer.set_translation(self._transform_index,
+                                                   *position)
+
+        if rotation is not None:
+            self._rotation = rotation
+            self._transform_buffer.set_rotation(self._transform_index,
+                                                rotation)
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self.position = x, self._y, self._z
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self.position = self._x, y, self._z
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self.position = self._x, self._y, z
+
+    @property
+    def rotation(self) -> float:
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation: float):
+        self.set_transform(rotation=rotation)
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: float):
+        self.update(scale=scale)
+
+    @property
+    def scale_x(self) -> float:
+        return self._scale_x
+
+    @scale_x.setter
+    def scale_x(self, scale_x: float):
+        self.update(scale_x=scale_x)
+
+    @property
+    def scale_y(self) -> float:
+        return self._scale_y
+
+    @scale_y.setter
+    def scale_y(self, scale_y: float):
+        self.update(scale_y=scale_y)
+
+    def update(self, x=None, y=None, z=None, rotation=None, scale=None,
+               scale_x=None, scale_y=None):
+        """Simultaneously change the position, rotation or scale.
+
+        Same as :meth:`pyglet.sprite.Sprite.update`.
+        """
+        buffer = self._transform_buffer
+        index = self._transform_index
+
+        if x is not None or y is not None or z is not None:
+            if x is not None:
+                self._x = x
+            if y is not None:
+                self._y = y
+            if z is not None:
+                self._z = z
+            buffer.set_translation(index, self._x, self._y, self._z)
+
+        if rotation is not None:
+            self._rotation = rotation
+            buffer.set_rotation(index, rotation)
+
+        if scale is not None or scale_x is not None or scale_y is not None:
+            if scale is not None:
+                self._scale = scale
+            if scale_x is not None:
+                self._scale_x = scale_x
+            if scale_y is not None:
+                self._scale_y = scale_y
+            buffer.set_scale(index, self._scale * self._scale_x,
+                             self._scale * self._scale_y)
+
+
+class BufferedSpriteSync(SpriteSync):
+    """Synchronize :class:`desper.Transform2D` with a :class:`BufferedSprite`.
+
+    Same as :class:`SpriteSync`, but the sprite is resolved only once,
+    when added. Each transformation event then results in a direct
+    write into the sprite's :class:`TransformBuffer` record (see
+    :meth:`BufferedSprite.set_transform`).
+
+    See :class:`SpriteSync` for more info.
+    """
+    _sprite: Optional[BufferedSprite] = None
+
+    def __init__(self, component_type: type = BufferedSprite,
+                 pool: Optional[GraphicPool] = None):
+        super().__init__(component_type, pool)
+
+    def on_add(self, entity, world):
+        """Resolve the sprite and apply the current transformation."""
+        self._sprite = world.get_component(entity, self.component_type)
+        super().on_add(entity, world)
+
+    def on_remove(self, entity, world):
+        """Clear vertices and transform record."""
+        super().on_remove(entity, world)
+        self._sprite = None
+
+    def on_position_change(self, new_position: desper.math.Vec2):
+        """Event handler: update sprite position."""
+        self._sprite.set_transform((new_position[0], new_position[1], 0.))
+
+    def on_rotation_change(self, new_rotation: float):
+        """Event handler: update sprite rotation."""
+        self._sprite.set_transform(rotation=new_rotation)
+
+    def on_scale_change(self, new_scale: desper.math.Vec2):
+        """Event handler: update sprite scale."""
+        self._sprite.update(scale_x=new_scale[0], scale_y=new_scale[1])
+
+
+def buffered_sprite_sync_component(
+        pool: Optional[GraphicPool] = None) -> BufferedSpriteSync:
+    """Get a sync component for :class:`BufferedSprite`s.
+
+    See :class:`BufferedSpriteSync`.
+    """
+    return BufferedSpriteSync(BufferedSprite, pool)
+
+
+class TiledSprite:
+    """Composite sprite, rendering a :class:`pyglet_desper.TiledImage`.
+
+    Internally, a :class:`pyglet.sprite.Sprite` is built for each tile.
+    Since all tiles share the same origin (see
+    :class:`pyglet_desper.TiledImage`), transformations are applied
+    equally to all of them, making the composite behave like a single
+    sprite. The most common sprite properties are exposed (position,
+    rotation, scale, color, batch, group, etc.), so that tiled sprites
+    can be synchronized through :class:`SpriteSync` (specifying
+    :class:`TiledSprite` as ``component_type``) and initialized by
+    :func:`pyglet_desper.init_graphics_transformer`.
+
+    Tiles can be individually hidden, see :meth:`cull`.
+    """
+
+    def __init__(self,
+                 img, x=0, y=0, z=0,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 batch=None,
+                 group=None,
+                 subpixel=False,
+                 program=None):
+        self._image = img
+        self.tiles: list[pyglet.sprite.Sprite] = [
+            pyglet.sprite.Sprite(tile, x, y, z, blend_src, blend_dest, batch,
+                                 group, subpixel, program)
+            for _, _, tile in img.tiles]
+
+        self._x = x
+        self._y = y
+        self._z = z
+        self._rotation = 0.
+        self._scale = 1.
+        self._scale_x = 1.
+        self._scale_y = 1.
+        self._visible = True
+        self._batch = batch
+        self._group = group
+
+    @property
+    def image(self):
+        """The :class:`pyglet_desper.TiledImage` being rendered."""
+        return self._image
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, float, float]):
+        self._x, self._y, self._z = position
+        for tile in self.tiles:
+            tile.position = position
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self.position = x, self._y, self._z
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self.position = self._x, y, self._z
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self.position = self._x, self._y, z
+
+    @property
+    def rotation(self) -> float:
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation: float):
+        self.update(rotation=rotation)
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: float):
+        self.update(scale=scale)
+
+    @property
+    def scale_x(self) -> float:
+        return self._scale_x
+
+    @scale_x.setter
+    def scale_x(self, scale_x: float):
+        self.update(scale_x=scale_x)
+
+    @property
+    def scale_y(self) -> float:
+        return self._scale_y
+
+    @scale_y.setter
+    def scale_y(self, scale_y: float):
+        self.update(scale_y=scale_y)
+
+    def update(self, x=None, y=None, z=None, rotation=None, scale=None,
+               scale_x=None, scale_y=None):
+        """Simultaneously change the position, rotation or scale.
+
+        Same as :meth:`pyglet.sprite.Sprite.update`, applied to all
+        tiles.
+        """
+        if x is not None:
+            self._x = x
+        if y is not None:
+            self._y = y
+        if z is not None:
+            self._z = z
+        if rotation is not None:
+            self._rotation = rotation
+        if scale is not None:
+            self._scale = scale
+        if scale_x is not None:
+            self._scale_x = scale_x
+        if scale_y is not None:
+            self._scale_y = scale_y
+
+        for tile in self.tiles:
+            tile.update(x, y, z, rotation, scale, scale_x, scale_y)
+
+    @property
+    def width(self) -> float:
+        return self._image.width * abs(self._scale_x * self._scale)
+
+    @property
+    def height(self) -> float:
+        return self._image.height * abs(self._scale_y * self._scale)
+
+    @property
+    def color(self) -> tuple[int, int, int, int]:
+        return self.tiles[0].color
+
+    @color.setter
+    def color(self, rgba: tuple[int, int, int, int]):
+        for tile in self.tiles:
+            tile.color = rgba
+
+    @property
+    def opacity(self) -> int:
+        return self.tiles[0].opacity
+
+    @opacity.setter
+    def opacity(self, opacity: int):
+        for tile in self.tiles:
+            tile.opacity = opacity
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._visible = visible
+        for tile in self.tiles:
+            tile.visible = visible
+
+    @property
+    def batch(self) -> Optional[pyglet.graphics.Batch]:
+        return self._batch
+
+    @batch.setter
+    def batch(self, batch: Optional[pyglet.graphics.Batch]):
+        self._batch = batch
+        for tile in self.tiles:
+            tile.batch = batch
+
+    @property
+    def group(self) -> Optional[pyglet.graphics.Group]:
+        return self._group
+
+    @group.setter
+    def group(self, group: Optional[pyglet.graphics.Group]):
+        self._group = group
+        for tile in self.tiles:
+            tile.group = group
+
+    def cull(self, x: float, y: float, width: float, height: float):
+        """Hide tiles that are outside the given rectangle.
+
+        The rectangle is expressed in world coordinates (e.g. the area
+        currently framed by a :class:`Camera`). Tiles intersecting
+        it are shown, the others are hidden. Rotation is not taken into
+        account, hence culling is only accurate for non rotated
+        sprites.
+
+        Has no effect if the sprite is not :attr:`visible`.
+        """
+        if not self._visible:
+            return
+
+        scale_x = self._scale * self._scale_x
+        scale_y = self._scale * self._scale_y
+        for (x_offset, y_offset, texture), tile in zip(self._image.tiles,
+                                                       self.tiles):
+            tile_x1 = self._x - texture.anchor_x * scale_x
+            tile_y1 = self._y - texture.anchor_y * scale_y
+            tile_x2 = tile_x1 + texture.width * scale_x
+            tile_y2 = tile_y1 + texture.height * scale_y
+            tile_x1, tile_x2 = sorted((tile_x1, tile_x2))
+            tile_y1, tile_y2 = sorted((tile_y1, tile_y2))
+
+            visible = (tile_x2 >= x and tile_x1 <= x + width
+                       and tile_y2 >= y and tile_y1 <= y + height)
+            if tile.visible != visible:
+                tile.visible = visible
+
+    def delete(self):
+        """Force immediate removal of all tiles from video memory."""
+        for tile in self.tiles:
+            tile.delete()
+
+
 @desper.event_handler(ON_CAMERA_DRAW_EVENT_NAME)
 class Camera:
     """Render content of a :class:`pyglet.graphics.Batch`.
@@ -105,6 +772,28 @@ class Camera:
         # View transformation matrix
         self.view = desper.math.Mat4()
 
+    def get_bounds(self) -> tuple[float, float, float, float]:
+        """Get the area framed by the camera, in world coordinates.
+
+        Return the smallest rectangle ``(x, y, width, height)`` (on the
+        ``z = 0`` plane) containing the visible area, as obtained by
+        inverting :attr:`projection` and :attr:`view`. Useful for
+        culling (e.g. :meth:`Tilemap.cull`). Only meaningful for
+        orthogonal projections.
+        """
+        # Projection and view may be pyglet matrices as well
+        inverse_projection = ~desper.math.Mat4(self.projection)
+        inverse_view = ~desper.math.Mat4(self.view)
+        xs = []
+        ys = []
+        for x, y in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+            corner = inverse_view @ (inverse_projection
+                                     @ desper.math.Vec4(x, y, 0, 1))
+            xs.append(corner.x / corner.w)
+            ys.append(corner.y / corner.w)
+
+        return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
     def on_camera_draw(self):
         """Event handler: apply projection, view and viewport, render."""
         self.window.projection = self.projection
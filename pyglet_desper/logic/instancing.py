@@ -0,0 +1,359 @@
+"""Instanced rendering of large, homogeneous sprite populations.
+
+Each :class:`pyglet.sprite.Sprite` owns its own vertices, which are
+rewritten every time the sprite is transformed. For populations of
+sprites sharing the same texture (e.g. bullets, crowds, foliage) it is
+more convenient to render a single quad many times, reading position,
+rotation, scale, color and texture region from per-instance attribute
+arrays.
+
+A :class:`SpriteInstancer` owns the shared quad and the instance
+arrays, which are drawn with a single instanced draw call (as part of
+a :class:`pyglet.graphics.Batch`, or through
+:meth:`SpriteInstancer.draw`). :class:`InstancedSprite` components
+represent single instances and expose a sprite-like interface, so that
+they can be synchronized with :class:`desper.Transform2D` through
+:class:`SpriteSync` (see :func:`instanced_sprite_sync_component`).
+"""
+from typing import Optional
+
+import pyglet
+from pyglet.enums import BlendFactor, GeometryMode
+
+from .pool import GraphicPool
+from .sync import SpriteSync
+
+instanced_vertex_source = """#version 150 core
+    in vec2 corner;
+    in vec3 translate;
+    in float rotation;
+    in vec2 scale;
+    in vec4 colors;
+    in vec4 tex_region;
+    in vec4 bounds;
+
+    out vec4 vertex_colors;
+    out vec2 texture_coords;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        vec2 local = (corner * bounds.xy - bounds.zw) * scale;
+        float angle = -radians(rotation);
+        vec2 rotated = vec2(local.x * cos(angle) - local.y * sin(angle),
+                            local.x * sin(angle) + local.y * cos(angle));
+
+        gl_Position = window.projection * window.view
+            * vec4(rotated + translate.xy, translate.z, 1.0);
+
+        vertex_colors = colors;
+        texture_coords = mix(tex_region.xy, tex_region.zw, corner);
+    }
+"""
+
+instanced_fragment_source = """#version 150 core
+    in vec4 vertex_colors;
+    in vec2 texture_coords;
+    out vec4 final_colors;
+
+    uniform sampler2D sprite_texture;
+
+    void main()
+    {
+        final_colors = texture(sprite_texture, texture_coords)
+            * vertex_colors;
+    }
+"""
+
+INSTANCE_ATTRIBUTES = ('translate', 'rotation', 'scale', 'colors',
+                       'tex_region', 'bounds')
+"""Names of the per-instance attributes of the instanced shader."""
+
+
+def get_default_instanced_shader() -> pyglet.graphics.ShaderProgram:
+    """Create and return the default instanced sprite shader.
+
+    The program is cached by pyglet, so it is built only once per
+    context.
+    """
+    return pyglet.graphics.api.core.get_cached_shader(
+        'pyglet_desper_instanced_sprite',
+        (instanced_vertex_source, 'vertex'),
+        (instanced_fragment_source, 'fragment'))
+
+
+def _tex_region(texture) -> tuple[float, float, float, float]:
+    """Get ``(u0, v0, u1, v1)`` texture coordinates of an image."""
+    tex_coords = texture.tex_coords
+    return tex_coords[0], tex_coords[1], tex_coords[6], tex_coords[7]
+
+
+class SpriteInstancer:
+    """Render many instances of images from the same texture.
+
+    All images rendered through the instancer must belong to the same
+    texture (typically an atlas, e.g. :attr:`default_texture_bin`).
+    Instances are created through :meth:`create_instance`, but in most
+    cases :class:`InstancedSprite` components shall be used instead.
+
+    If a ``batch`` is given, all instances are rendered along with the
+    batch, in a single draw call. Otherwise, use :meth:`draw`. The
+    ``group`` is used as parent of the internal rendering group.
+    """
+
+    def __init__(self, texture,
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 program: Optional[pyglet.graphics.ShaderProgram] = None):
+        self.texture = texture
+        self.program = program or get_default_instanced_shader()
+        self.batch = batch
+        self._group = pyglet.sprite.SpriteGroup(texture, blend_src,
+                                                blend_dest, self.program,
+                                                group)
+
+        self._vertex_list = self.program.vertex_list_instanced_indexed(
+            4, mode=GeometryMode.TRIANGLES, indices=(0, 1, 2, 0, 2, 3),
+            instance_attributes=dict.fromkeys(INSTANCE_ATTRIBUTES, 1),
+            batch=batch, group=self._group,
+            corner=('f', (0., 0., 1., 0., 1., 1., 0., 1.)),
+            translate=('f', (0., 0., 0.)),
+            rotation=('f', (0.,)),
+            scale=('f', (1., 1.)),
+            colors=('Bn', (255, 255, 255, 255)),
+            tex_region=('f', (0., 0., 1., 1.)),
+            bounds=('f', (0., 0., 0., 0.)))
+
+    @property
+    def instance_count(self) -> int:
+        """Number of currently existing instances."""
+        return self._vertex_list.instance_count
+
+    def create_instance(self, image, x=0., y=0., z=0., rotation=0.,
+                        scale_x=1., scale_y=1.,
+                        color=(255, 255, 255, 255)):
+        """Create a new instance of the given image.
+
+        The image must belong to :attr:`texture`. A pyglet vertex
+        instance is returned, whose attributes (see
+        :attr:`INSTANCE_ATTRIBUTES`) can be directly assigned.
+        """
+        assert image.id == self.texture.id, (
+            f'{image} does not belong to the instancer texture '
+            f'{self.texture}')
+
+        return self._vertex_list.create_instance(
+            translate=(x, y, z),
+            rotation=(rotation,),
+            scale=(scale_x, scale_y),
+            colors=color,
+            tex_region=_tex_region(image),
+            bounds=(image.width, image.height,
+                    image.anchor_x, image.anchor_y))
+
+    def draw(self):
+        """Draw all instances, for instancers that are not batched."""
+        ctx = pyglet.graphics.api.core.current_context
+        self._group.set_state_recursive(ctx)
+        self._vertex_list.draw(GeometryMode.TRIANGLES)
+        self._group.unset_state_recursive(ctx)
+
+    def delete(self):
+        """Free all instances and vertices from video memory."""
+        self._vertex_list.delete()
+
+
+class InstancedSprite:
+    """Single instance of a :class:`SpriteInstancer`.
+
+    Sprite-like interface (position, rotation, scale, color, image,
+    etc.) over a single set of per-instance attributes. Each property
+    change is a direct write in the instance arrays.
+
+    Images can be freely swapped (e.g. to implement animations), as
+    long as they belong to the same texture as the instancer.
+
+    Use :func:`instanced_sprite_sync_component` to synchronize it with
+    a :class:`desper.Transform2D`.
+    """
+
+    def __init__(self, instancer: SpriteInstancer, img,
+                 x=0., y=0., z=0.):
+        self.instancer = instancer
+        self._image = img
+        self._x = x
+        self._y = y
+        self._z = z
+        self._rotation = 0.
+        self._scale = 1.
+        self._scale_x = 1.
+        self._scale_y = 1.
+        self._rgba = (255, 255, 255, 255)
+        self._visible = True
+
+        self._instance = instancer.create_instance(img, x, y, z)
+
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, img):
+        assert img.id == self.instancer.texture.id, (
+            f'{img} does not belong to the instancer texture '
+            f'{self.instancer.texture}')
+
+        self._image = img
+        self._instance.tex_region = _tex_region(img)
+        self._update_bounds()
+
+    def _update_bounds(self):
+        img = self._image
+        if self._visible:
+            self._instance.bounds = (img.width, img.height,
+                                     img.anchor_x, img.anchor_y)
+        else:
+            self._instance.bounds = (0., 0., 0., 0.)
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, float, float]):
+        self._x, self._y, self._z = position
+        self._instance.translate = position
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self.position = x, self._y, self._z
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self.position = self._x, y, self._z
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self.position = self._x, self._y, z
+
+    @property
+    def rotation(self) -> float:
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation: float):
+        self._rotation = rotation
+        self._instance.rotation = (rotation,)
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: float):
+        self.update(scale=scale)
+
+    @property
+    def scale_x(self) -> float:
+        return self._scale_x
+
+    @scale_x.setter
+    def scale_x(self, scale_x: float):
+        self.update(scale_x=scale_x)
+
+    @property
+    def scale_y(self) -> float:
+        return self._scale_y
+
+    @scale_y.setter
+    def scale_y(self, scale_y: float):
+        self.update(scale_y=scale_y)
+
+    def update(self, x=None, y=None, z=None, rotation=None, scale=None,
+               scale_x=None, scale_y=None):
+        """Simultaneously change the position, rotation or scale.
+
+        Same as :meth:`pyglet.sprite.Sprite.update`.
+        """
+        if x is not None or y is not None or z is not None:
+            if x is not None:
+                self._x = x
+            if y is not None:
+                self._y = y
+            if z is not None:
+                self._z = z
+            self._instance.translate = self._x, self._y, self._z
+
+        if rotation is not None:
+            self.rotation = rotation
+
+        if scale is not None or scale_x is not None or scale_y is not None:
+            if scale is not None:
+                self._scale = scale
+            if scale_x is not None:
+                self._scale_x = scale_x
+            if scale_y is not None:
+                self._scale_y = scale_y
+            self._instance.scale = (self._scale * self._scale_x,
+                                    self._scale * self._scale_y)
+
+    @property
+    def color(self) -> tuple[int, int, int, int]:
+        return self._rgba
+
+    @color.setter
+    def color(self, rgba: tuple[int, ...]):
+        r, g, b, *a = rgba
+        self._rgba = r, g, b, a[0] if a else 255
+        self._instance.colors = self._rgba
+
+    @property
+    def opacity(self) -> int:
+        return self._rgba[3]
+
+    @opacity.setter
+    def opacity(self, opacity: int):
+        self.color = (*self._rgba[:3], opacity)
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._visible = visible
+        self._update_bounds()
+
+    def delete(self):
+        """Remove the instance from its instancer."""
+        if self._instance is not None:
+            self._instance.delete()
+            self._instance = None
+
+
+def instanced_sprite_sync_component(
+        pool: Optional[GraphicPool] = None) -> SpriteSync:
+    """Get a sync component for :class:`InstancedSprite`s.
+
+    See :class:`SpriteSync`.
+    """
+    return SpriteSync(InstancedSprite, pool)
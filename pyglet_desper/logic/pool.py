@@ -0,0 +1,143 @@
+"""Recycle graphical components instead of rebuilding them.
+
+Creating a graphical component (e.g. a sprite) allocates its vertices
+in video memory, while deleting it frees them. Scenes where the same
+kind of graphics is continuously spawned and removed (e.g. bullets)
+benefit from keeping removed components aside, hidden, and reusing
+them for the next spawns. See :class:`GraphicPool`.
+"""
+import inspect
+from typing import Any, Optional
+
+import pyglet
+
+PARAMETER_ALIASES = {'img': 'image'}
+"""Map constructor parameters to the homonymous properties."""
+
+RESET_PROPERTIES = {'rotation': 0., 'scale': 1., 'scale_x': 1.,
+                    'scale_y': 1., 'color': (255, 255, 255, 255)}
+"""Properties restored when reusing a graphic, when existing.
+
+Only applied to graphical types that do not accept such properties
+in their constructor (e.g. ``rotation`` of a
+:class:`pyglet.sprite.Sprite`).
+"""
+
+
+def _is_settable(graphic_type: type, name: str) -> bool:
+    """Get whether the given attribute is a property with a setter."""
+    attribute = inspect.getattr_static(graphic_type, name, None)
+    return isinstance(attribute, property) and attribute.fset is not None
+
+
+class GraphicPool:
+    """Pool of graphical components of the given type.
+
+    Graphics are obtained through :meth:`acquire`, with the same
+    parameters accepted by the type constructor. When a graphic is
+    no longer needed, give it back through :meth:`release` (instead
+    of deleting it): the graphic is hidden but its vertices are
+    retained, ready to be reused by the next :meth:`acquire`.
+
+    Reused graphics are reinitialized by assigning the constructor
+    parameters to the homonymous properties (only if their value
+    differs). ``None`` values are ignored, as they usually stand for
+    automatic choices (e.g. the default ``program``). Moreover,
+    properties that cannot be given to the constructor (see
+    :attr:`RESET_PROPERTIES`) are restored to their defaults.
+    Parameters that have no property counterpart (e.g.
+    ``blend_src`` or ``subpixel`` for sprites) are only applied to new
+    graphics, hence a pool shall be used for graphics that are
+    homogeneous in such parameters.
+
+    Sync components (e.g. :class:`SpriteSync`) accept a pool: in such
+    case graphics are released to it when removed from the world, see
+    :class:`GraphicSync2D`.
+
+    If ``max_size`` is given, graphics released to a full pool are
+    deleted instead.
+    """
+
+    def __init__(self, graphic_type: type, max_size: Optional[int] = None):
+        self.graphic_type = graphic_type
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._free = []
+        self._signature = inspect.signature(graphic_type)
+        self._properties = {}
+        for name in self._signature.parameters:
+            property_name = PARAMETER_ALIASES.get(name, name)
+            if _is_settable(graphic_type, property_name):
+                self._properties[name] = property_name
+
+        self._reset_properties = {
+            name: value for name, value in RESET_PROPERTIES.items()
+            if name not in self._signature.parameters
+            and _is_settable(graphic_type, name)}
+
+    @property
+    def free(self) -> int:
+        """Number of graphics ready to be reused."""
+        return len(self._free)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of :meth:`acquire` calls that reused a graphic."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def acquire(self, *args, **kwargs) -> Any:
+        """Get a graphic, reusing a released one if possible.
+
+        Parameters are the same of the graphic type constructor.
+        """
+        if not self._free:
+            self.misses += 1
+            return self.graphic_type(*args, **kwargs)
+
+        self.hits += 1
+        graphic = self._free.pop()
+
+        arguments = self._signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        for name, value in arguments.arguments.items():
+            property_name = self._properties.get(name)
+            if (property_name is not None and value is not None
+                    and getattr(graphic, property_name) != value):
+                setattr(graphic, property_name, value)
+
+        for name, value in self._reset_properties.items():
+            if getattr(graphic, name) != value:
+                setattr(graphic, name, value)
+
+        graphic.visible = True
+        return graphic
+
+    def release(self, graphic):
+        """Give back a graphic to the pool, hiding it.
+
+        If the pool is full, the graphic is deleted instead.
+        """
+        if self.max_size is not None and len(self._free) >= self.max_size:
+            graphic.delete()
+            return
+
+        graphic.visible = False
+        if (isinstance(graphic, pyglet.sprite.Sprite)
+                and graphic._animation is not None):
+            graphic.paused = True
+
+        self._free.append(graphic)
+
+    def clear(self):
+        """Delete all the graphics ready to be reused."""
+        for graphic in self._free:
+            graphic.delete()
+        self._free.clear()
+
+    def reset_stats(self):
+        """Reset :attr:`hits` and :attr:`misses` counters."""
+        self.hits = 0
+        self.misses = 0
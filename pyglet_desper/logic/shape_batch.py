@@ -0,0 +1,744 @@
+"""Batched rendering of large populations of simple shapes.
+
+Each :mod:`pyglet.shapes` object owns its own vertex list, whose
+vertices are rewritten every time the shape is moved or rotated. Scenes
+drawing thousands of shapes (e.g. debug overlays, vector graphics) are
+better served by a :class:`ShapeBatch`, which stores circles,
+rectangles and lines as compact records in flat arrays (one per
+attribute), and renders each primitive type as a single instanced
+vertex list.
+
+Moving or rotating a batched shape (see :class:`BatchedCircle`,
+:class:`BatchedRectangle` and :class:`BatchedLine`) consists in a
+couple of writes in said arrays. Changed arrays are uploaded in bulk,
+at most once per frame, when the batch is rendered. Batched shapes
+expose a shape-like interface, so that they can be synchronized with
+:class:`desper.Transform2D` through :class:`BatchedShapeSync` (a
+:class:`PositionRotationSync2D` writing directly into the records, see
+:func:`batched_circle_sync_component` and similar), and support
+``batch`` and ``group`` properties, so that they are initialized by
+:func:`pyglet_desper.init_graphics_transformer`.
+"""
+import array
+import math
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+import desper
+import pyglet
+from pyglet.enums import BlendFactor, GeometryMode
+from pyglet.graphics.state import State
+
+from .pool import GraphicPool
+from .sync import PositionRotationSync2D
+
+shape_batch_vertex_source = """#version 150 core
+    in vec2 corner;
+    in vec3 translate;
+    in float rotation;
+    in vec2 size;
+    in vec2 anchor;
+    in vec4 colors;
+
+    out vec4 vertex_colors;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        vec2 local = corner * size - anchor;
+        float angle = -radians(rotation);
+        vec2 rotated = vec2(local.x * cos(angle) - local.y * sin(angle),
+                            local.x * sin(angle) + local.y * cos(angle));
+
+        gl_Position = window.projection * window.view
+            * vec4(rotated + translate.xy, translate.z, 1.0);
+
+        vertex_colors = colors;
+    }
+"""
+
+shape_batch_fragment_source = """#version 150 core
+    in vec4 vertex_colors;
+    out vec4 final_colors;
+
+    void main()
+    {
+        final_colors = vertex_colors;
+    }
+"""
+
+SHAPE_ATTRIBUTES = {'translate': ('f', 3), 'rotation': ('f', 1),
+                    'size': ('f', 2), 'anchor': ('f', 2),
+                    'colors': ('Bn', 4)}
+"""Per-shape attributes of the shape batch shader.
+
+Map attribute names to their format and number of components.
+"""
+
+CIRCLE_SEGMENTS = 32
+"""Default number of segments used to approximate circles."""
+
+
+def get_default_shape_batch_shader() -> pyglet.graphics.ShaderProgram:
+    """Create and return the default shape batch shader.
+
+    The program is cached by pyglet, so it is built only once per
+    context.
+    """
+    return pyglet.graphics.api.core.get_cached_shader(
+        'pyglet_desper_shape_batch',
+        (shape_batch_vertex_source, 'vertex'),
+        (shape_batch_fragment_source, 'fragment'))
+
+
+def _circle_mesh(segments: int) -> tuple[tuple[float, ...], tuple[int, ...]]:
+    """Get corners and indices of a unit circle, as a triangle fan."""
+    corners = [0., 0.]
+    indices = []
+    for i in range(segments):
+        angle = math.tau * i / segments
+        corners += math.cos(angle), math.sin(angle)
+        indices += 0, i + 1, (i + 1) % segments + 1
+    return tuple(corners), tuple(indices)
+
+
+_QUAD_INDICES = (0, 1, 2, 0, 2, 3)
+
+
+def _get_meshes(circle_segments: int) -> dict:
+    """Get corners and indices of each primitive type.
+
+    Shapes are obtained by scaling the corners by their ``size`` and
+    subtracting their ``anchor``.
+    """
+    return {
+        'circle': _circle_mesh(circle_segments),
+        'rectangle': ((0., 0., 1., 0., 1., 1., 0., 1.), _QUAD_INDICES),
+        'line': ((0., -.5, 1., -.5, 1., .5, 0., .5), _QUAD_INDICES)}
+
+
+class _PrimitiveList:
+    """Records of all the shapes of a primitive type.
+
+    Records are kept compact, in the same order of the instances of
+    the underlying vertex list (removing a record moves the last one in
+    its place, as done by pyglet).
+    """
+
+    def __init__(self, vertex_list):
+        self.vertex_list = vertex_list
+        self.stream = vertex_list.instance_bucket.stream
+        self.arrays = {name: array.array('B' if fmt == 'Bn' else fmt)
+                       for name, (fmt, _) in SHAPE_ATTRIBUTES.items()}
+        self.dirty = set()
+
+    @property
+    def count(self) -> int:
+        return self.vertex_list.instance_count
+
+    def add(self):
+        """Allocate a new record, return its instance."""
+        for name, (_, size) in SHAPE_ATTRIBUTES.items():
+            self.arrays[name].extend((0,) * size)
+        self.dirty.update(SHAPE_ATTRIBUTES)
+        return self.vertex_list.create_instance()
+
+    def owns(self, instance) -> bool:
+        """Whether the given instance belongs to this list."""
+        bucket = self.vertex_list.instance_bucket
+        return bucket.get_instance_index(instance) is not None
+
+    def remove(self, instance):
+        """Remove the record of the given instance."""
+        slot = instance.slot
+        last = self.count - 1
+        instance.delete()
+
+        for name, (_, size) in SHAPE_ATTRIBUTES.items():
+            values = self.arrays[name]
+            if slot != last:
+                values[slot * size:(slot + 1) * size] = \
+                    values[last * size:(last + 1) * size]
+            del values[last * size:]
+        self.dirty.update(SHAPE_ATTRIBUTES)
+
+    def write(self, slot: int, name: str, values: tuple):
+        records = self.arrays[name]
+        base = slot * len(values)
+        for offset, value in enumerate(values):
+            records[base + offset] = value
+        self.dirty.add(name)
+
+    def flush(self):
+        """Upload the changed arrays, one call each."""
+        count = self.count
+        for name in self.dirty:
+            self.stream.set_attribute_region(name, 0, count,
+                                             self.arrays[name])
+        self.dirty.clear()
+
+
+@dataclass(frozen=True)
+class ShapeBatchState(State):
+    """Upload pending changes of a :class:`ShapeBatch` for rendering."""
+    shape_batch: 'ShapeBatch'
+
+    sets_state: bool = True
+
+    def set_state(self, ctx):
+        self.shape_batch.flush()
+
+
+class ShapeBatch:
+    """Render many circles, rectangles and lines in few draw calls.
+
+    Shapes are stored as compact records, and each primitive type is
+    rendered as a single instanced vertex list, built on first use.
+    In most cases, :class:`BatchedShape` subclasses shall be used
+    instead of accessing records directly, and batches shall be
+    retrieved through :func:`get_shape_batch`.
+
+    If a ``batch`` is given, all shapes are rendered along with the
+    batch. Otherwise, use :meth:`draw`. The ``group`` is used as parent
+    of the internal rendering group.
+    """
+
+    def __init__(self, batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 program: Optional[pyglet.graphics.ShaderProgram] = None,
+                 circle_segments: int = CIRCLE_SEGMENTS):
+        self.batch = batch
+        self.program = program or get_default_shape_batch_shader()
+        self.circle_segments = circle_segments
+
+        self._group = pyglet.graphics.Group(parent=group)
+        self._group.set_shader_program(self.program)
+        self._group.set_blend(blend_src, blend_dest)
+        self._group.add_state(ShapeBatchState(self))
+
+        self._meshes = _get_meshes(circle_segments)
+        self._primitives: dict[str, _PrimitiveList] = {}
+        # Drawing single instanced vertex lists is not reliable in
+        # pyglet, unbatched shapes are collected in a private batch
+        self._draw_batch = batch or pyglet.graphics.Batch()
+
+    def get_count(self, kind: str) -> int:
+        """Number of shapes of a primitive type.
+
+        ``kind`` is one of ``'circle'``, ``'rectangle'`` and
+        ``'line'``.
+        """
+        primitives = self._primitives.get(kind)
+        return 0 if primitives is None else primitives.count
+
+    def _get_primitives(self, kind: str) -> _PrimitiveList:
+        primitives = self._primitives.get(kind)
+        if primitives is None:
+            corners, indices = self._meshes[kind]
+            vertex_list = self.program.vertex_list_instanced_indexed(
+                len(corners) // 2, mode=GeometryMode.TRIANGLES,
+                indices=indices,
+                instance_attributes=dict.fromkeys(SHAPE_ATTRIBUTES, 1),
+                batch=self._draw_batch, group=self._group,
+                corner=('f', corners),
+                **{name: (fmt, (0,) * size)
+                   for name, (fmt, size) in SHAPE_ATTRIBUTES.items()})
+            primitives = self._primitives[kind] = _PrimitiveList(vertex_list)
+
+        return primitives
+
+    def add(self, kind: str):
+        """Allocate a record for a new shape, return its instance.
+
+        All attributes of the record are zeroed. Write them through
+        :meth:`write`.
+        """
+        return self._get_primitives(kind).add()
+
+    def remove(self, kind: str, instance):
+        """Remove the record of a shape.
+
+        Records already freed by :meth:`delete` are ignored.
+        """
+        primitives = self._primitives.get(kind)
+        if primitives is not None and primitives.owns(instance):
+            primitives.remove(instance)
+
+    def write(self, kind: str, instance, name: str, values: tuple):
+        """Write an attribute of a shape record.
+
+        ``name`` is one of :attr:`SHAPE_ATTRIBUTES`. The change is
+        uploaded at the next :meth:`flush`.
+        """
+        self._primitives[kind].write(instance.slot, name, values)
+
+    def get_record(self, kind: str, instance, name: str) -> tuple:
+        """Get the values of an attribute of a shape record."""
+        size = SHAPE_ATTRIBUTES[name][1]
+        slot = instance.slot
+        return tuple(
+            self._primitives[kind].arrays[name][slot * size:
+                                                (slot + 1) * size])
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes yet to be uploaded."""
+        return any(primitives.dirty
+                   for primitives in self._primitives.values())
+
+    def flush(self):
+        """Upload pending changes to the vertex lists.
+
+        Usually, there is no need to call this directly, as it is done
+        when rendering.
+        """
+        for primitives in self._primitives.values():
+            if primitives.dirty:
+                primitives.flush()
+
+    def draw(self):
+        """Draw all shapes, for shape batches that are not batched."""
+        self._draw_batch.draw()
+
+    def delete(self):
+        """Free all shapes and vertices from video memory."""
+        for primitives in self._primitives.values():
+            primitives.vertex_list.delete()
+        self._primitives.clear()
+
+
+_shape_batches: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def get_shape_batch(batch: Optional[pyglet.graphics.Batch] = None,
+                    group: Optional[pyglet.graphics.Group] = None
+                    ) -> ShapeBatch:
+    """Get the shape batch shared by shapes with the given parameters.
+
+    Shape batches are interned based on ``(batch, group)``, and kept
+    alive as long as some shape uses them.
+    """
+    key = batch, group
+    shape_batch = _shape_batches.get(key)
+    if shape_batch is None:
+        shape_batch = _shape_batches[key] = ShapeBatch(batch, group)
+    return shape_batch
+
+
+class BatchedShape:
+    """Base class for shapes rendered by a :class:`ShapeBatch`.
+
+    Shape-like interface (position, rotation, color, visibility,
+    batch, group) over a single shape record. Each property change is
+    a direct write in the record arrays. Subclasses define the
+    primitive type (:attr:`kind`) and its extent (see
+    :meth:`_get_size` and :meth:`_get_anchor`).
+
+    Shapes with the same ``batch`` and ``group`` share the same shape
+    batch (see :func:`get_shape_batch`). Changing any of them moves the
+    shape to the appropriate shape batch.
+    """
+    kind: str = ''
+    _instance = None
+
+    def __init__(self, x=0., y=0., z=0., color=(255, 255, 255, 255),
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None):
+        self._x = x
+        self._y = y
+        self._z = z
+        self._rotation = 0.
+        r, g, b, *a = color
+        self._rgba = r, g, b, a[0] if a else 255
+        self._visible = True
+        self._batch = batch
+        self._group = group
+
+        self.shape_batch: Optional[ShapeBatch] = None
+        self._primitives = None
+        self._attach(get_shape_batch(batch, group))
+
+    def __del__(self):
+        # Same as pyglet shapes, free the record once unreferenced
+        if self._instance is not None:
+            self._detach()
+
+    def _attach(self, shape_batch: ShapeBatch):
+        """Allocate and fill a record in the given shape batch."""
+        self.shape_batch = shape_batch
+        self._instance = shape_batch.add(self.kind)
+        self._primitives = shape_batch._primitives[self.kind]
+        self._write('translate', (self._x, self._y, self._z))
+        self._write('rotation', (self._get_rotation(),))
+        self._write('anchor', self._get_anchor())
+        self._write('colors', self._rgba)
+        self._update_size()
+
+    def _detach(self):
+        if self._instance is not None:
+            self.shape_batch.remove(self.kind, self._instance)
+            self._instance = None
+
+    def _write(self, name: str, values: tuple):
+        self._primitives.write(self._instance.slot, name, values)
+
+    def _set_translate(self, x: float, y: float):
+        """Move the shape on the plane, leaving ``z`` untouched."""
+        self._x = x
+        self._y = y
+        self._primitives.write(self._instance.slot, 'translate',
+                               (x, y, self._z))
+
+    def _set_rotation(self, rotation: float):
+        self._rotation = rotation
+        self._primitives.write(self._instance.slot, 'rotation',
+                               (self._get_rotation(),))
+
+    def _get_size(self) -> tuple[float, float]:
+        """Get the scale applied to the primitive mesh."""
+        raise NotImplementedError
+
+    def _get_anchor(self) -> tuple[float, float]:
+        """Get the offset of the mesh (scaled) from the position."""
+        return 0., 0.
+
+    def _get_rotation(self) -> float:
+        """Get the rotation applied to the primitive mesh."""
+        return self._rotation
+
+    def _update_size(self):
+        if self._visible:
+            self._write('size', self._get_size())
+        else:
+            self._write('size', (0., 0.))
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, ...]):
+        """Set ``(x, y)`` or ``(x, y, z)``.
+
+        If ``z`` is omitted, it is left untouched.
+        """
+        x, y, *z = position
+        if z:
+            self._z = z[0]
+        self._set_translate(x, y)
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self.position = x, self._y, self._z
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self.position = self._x, y, self._z
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self.position = self._x, self._y, z
+
+    @property
+    def rotation(self) -> float:
+        """Clockwise rotation, in degrees, around the position."""
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation: float):
+        self._set_rotation(rotation)
+
+    @property
+    def color(self) -> tuple[int, int, int, int]:
+        return self._rgba
+
+    @color.setter
+    def color(self, rgba: tuple[int, ...]):
+        r, g, b, *a = rgba
+        self._rgba = r, g, b, a[0] if a else 255
+        self._write('colors', self._rgba)
+
+    @property
+    def opacity(self) -> int:
+        return self._rgba[3]
+
+    @opacity.setter
+    def opacity(self, opacity: int):
+        self.color = (*self._rgba[:3], opacity)
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._visible = visible
+        self._update_size()
+
+    @property
+    def batch(self) -> Optional[pyglet.graphics.Batch]:
+        return self._batch
+
+    @batch.setter
+    def batch(self, batch: Optional[pyglet.graphics.Batch]):
+        self.migrate(batch, self._group)
+
+    @property
+    def group(self) -> Optional[pyglet.graphics.Group]:
+        return self._group
+
+    @group.setter
+    def group(self, group: Optional[pyglet.graphics.Group]):
+        self.migrate(self._batch, group)
+
+    def migrate(self, batch: Optional[pyglet.graphics.Batch],
+                group: Optional[pyglet.graphics.Group]):
+        """Change batch and group at once.
+
+        The shape is moved to the appropriate shape batch only once.
+        """
+        if batch is self._batch and group == self._group:
+            return
+
+        self._batch = batch
+        self._group = group
+        if self._instance is not None:
+            self._detach()
+            self._attach(get_shape_batch(batch, group))
+
+    def delete(self):
+        """Remove the shape from its shape batch."""
+        self._detach()
+
+
+class BatchedCircle(BatchedShape):
+    """Circle rendered by a :class:`ShapeBatch`.
+
+    The number of segments is determined by the shape batch.
+    """
+    kind = 'circle'
+
+    def __init__(self, x=0., y=0., radius=1., color=(255, 255, 255, 255),
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None):
+        self._radius = radius
+        super().__init__(x, y, 0., color, batch, group)
+
+    def _get_size(self) -> tuple[float, float]:
+        return self._radius, self._radius
+
+    @property
+    def radius(self) -> float:
+        return self._radius
+
+    @radius.setter
+    def radius(self, radius: float):
+        self._radius = radius
+        self._update_size()
+
+
+class BatchedRectangle(BatchedShape):
+    """Rectangle rendered by a :class:`ShapeBatch`.
+
+    The position is the one of the anchor point, relative to the
+    bottom left corner (see :attr:`anchor_position`), around which the
+    rectangle rotates.
+    """
+    kind = 'rectangle'
+
+    def __init__(self, x=0., y=0., width=1., height=1.,
+                 color=(255, 255, 255, 255),
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None):
+        self._width = width
+        self._height = height
+        self._anchor_x = 0.
+        self._anchor_y = 0.
+        super().__init__(x, y, 0., color, batch, group)
+
+    def _get_size(self) -> tuple[float, float]:
+        return self._width, self._height
+
+    def _get_anchor(self) -> tuple[float, float]:
+        return self._anchor_x, self._anchor_y
+
+    @property
+    def width(self) -> float:
+        return self._width
+
+    @width.setter
+    def width(self, width: float):
+        self._width = width
+        self._update_size()
+
+    @property
+    def height(self) -> float:
+        return self._height
+
+    @height.setter
+    def height(self, height: float):
+        self._height = height
+        self._update_size()
+
+    @property
+    def anchor_position(self) -> tuple[float, float]:
+        return self._anchor_x, self._anchor_y
+
+    @anchor_position.setter
+    def anchor_position(self, anchor_position: tuple[float, float]):
+        self._anchor_x, self._anchor_y = anchor_position
+        self._write('anchor', self._get_anchor())
+
+    @property
+    def anchor_x(self) -> float:
+        return self._anchor_x
+
+    @anchor_x.setter
+    def anchor_x(self, anchor_x: float):
+        self.anchor_position = anchor_x, self._anchor_y
+
+    @property
+    def anchor_y(self) -> float:
+        return self._anchor_y
+
+    @anchor_y.setter
+    def anchor_y(self, anchor_y: float):
+        self.anchor_position = self._anchor_x, anchor_y
+
+
+class BatchedLine(BatchedShape):
+    """Line segment rendered by a :class:`ShapeBatch`.
+
+    The segment goes from the position (``x``, ``y``) to ``x2``,
+    ``y2``. Moving the line (i.e. setting its position) translates
+    both ends, while rotation happens around the position.
+    """
+    kind = 'line'
+
+    def __init__(self, x=0., y=0., x2=1., y2=1., thickness=1.,
+                 color=(255, 255, 255, 255),
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None):
+        self._delta_x = x2 - x
+        self._delta_y = y2 - y
+        self._thickness = thickness
+        super().__init__(x, y, 0., color, batch, group)
+
+    def _get_size(self) -> tuple[float, float]:
+        return math.hypot(self._delta_x, self._delta_y), self._thickness
+
+    def _get_rotation(self) -> float:
+        return self._rotation - math.degrees(
+            math.atan2(self._delta_y, self._delta_x))
+
+    def _set_end(self, x2: float, y2: float):
+        self._delta_x = x2 - self._x
+        self._delta_y = y2 - self._y
+        self._write('rotation', (self._get_rotation(),))
+        self._update_size()
+
+    @property
+    def x2(self) -> float:
+        return self._x + self._delta_x
+
+    @x2.setter
+    def x2(self, x2: float):
+        self._set_end(x2, self.y2)
+
+    @property
+    def y2(self) -> float:
+        return self._y + self._delta_y
+
+    @y2.setter
+    def y2(self, y2: float):
+        self._set_end(self.x2, y2)
+
+    @property
+    def thickness(self) -> float:
+        return self._thickness
+
+    @thickness.setter
+    def thickness(self, thickness: float):
+        self._thickness = thickness
+        self._update_size()
+
+
+class BatchedShapeSync(PositionRotationSync2D):
+    """Synchronize :class:`desper.Transform2D` with a :class:`BatchedShape`.
+
+    Same as :class:`PositionRotationSync2D`, but the shape is resolved
+    only once, when added. Each transformation event then results in a
+    direct write into the shape's record.
+
+    See :class:`PositionRotationSync2D` for more info.
+    """
+    _shape: Optional[BatchedShape] = None
+
+    def on_add(self, entity, world):
+        """Resolve the shape and apply the current transformation."""
+        self._shape = world.get_component(entity, self.component_type)
+        super().on_add(entity, world)
+
+    def on_remove(self, entity, world):
+        """Delete the shape, or release it to :attr:`pool`.
+
+        See :meth:`GraphicSync2D.on_remove`. The shape is then no
+        longer referenced by the sync component.
+        """
+        super().on_remove(entity, world)
+        self._shape = None
+
+    def on_position_change(self, new_position: desper.math.Vec2):
+        """Event handler: update shape position."""
+        self._shape._set_translate(*new_position)
+
+    def on_rotation_change(self, new_rotation: float):
+        """Event handler: update shape rotation."""
+        self._shape._set_rotation(new_rotation)
+
+
+def batched_circle_sync_component(
+        pool: Optional[GraphicPool] = None) -> BatchedShapeSync:
+    """Get a sync component for :class:`BatchedCircle`s.
+
+    See :class:`BatchedShapeSync`.
+    """
+    return BatchedShapeSync(BatchedCircle, pool)
+
+
+def batched_rectangle_sync_component(
+        pool: Optional[GraphicPool] = None) -> BatchedShapeSync:
+    """Get a sync component for :class:`BatchedRectangle`s.
+
+    See :class:`BatchedShapeSync`.
+    """
+    return BatchedShapeSync(BatchedRectangle, pool)
+
+
+def batched_line_sync_component(
+        pool: Optional[GraphicPool] = None) -> BatchedShapeSync:
+    """Get a sync component for :class:`BatchedLine`s.
+
+    See :class:`BatchedShapeSync`.
+    """
+    return BatchedShapeSync(BatchedLine, pool)
@@ -11,9 +11,13 @@ To prevent this, a connection (or synchronization) between pyglet
 classes and :class:`desper.Transform2D` is proposed (as pyglet
 abstractions are mostly 2D, 3D support will be discussed in the future).
 """
+from typing import Optional
+
 import desper
 import pyglet
 
+from .pool import GraphicPool
+
 
 @desper.event_handler(desper.ON_REMOVE_EVENT_NAME)
 class GraphicSync2D(desper.Controller):
@@ -52,11 +56,17 @@ class GraphicSync2D(desper.Controller):
     (e.g. :meth:`pyglet.Sprite.delete`), which is fundamental to
     correctly delete vertices of graphical components when removed in
     real time.
+
+    If a :class:`GraphicPool` is given, the graphical component is
+    instead released to it on removal, so that it can be reused
+    later (see :meth:`GraphicPool.acquire`).
     """
     deleted = False
 
-    def __init__(self, component_type: type):
+    def __init__(self, component_type: type,
+                 pool: Optional[GraphicPool] = None):
         self.component_type = component_type
+        self.pool = pool
 
     def on_add(self, entity, world: desper.World):
         """Subscribe to :class:`desper.Transform2D` for events."""
@@ -79,10 +89,14 @@ class GraphicSync2D(desper.Controller):
             self.on_scale_change(transform.scale)
 
     def on_remove(self, entity, world: desper.World):
-        """Clear vertices from memory."""
+        """Clear vertices from memory, or release to :attr:`pool`."""
         if not self.deleted:
             self.deleted = True
-            self.get_component(self.component_type).delete()
+            graphic = self.get_component(self.component_type)
+            if self.pool is not None:
+                self.pool.release(graphic)
+            else:
+                graphic.delete()
 
     def on_position_change(self, new_position: desper.math.Vec2):
         """Event handler: update graphical component position."""
@@ -127,8 +141,9 @@ class SpriteSync(GraphicSync2D):
     See :class:`GraphicSync2D` for more info.
     """
 
-    def __init__(self, component_type: type = pyglet.sprite.Sprite):
-        super().__init__(component_type)
+    def __init__(self, component_type: type = pyglet.sprite.Sprite,
+                 pool: Optional[GraphicPool] = None):
+        super().__init__(component_type, pool)
 
     def on_add(self, entity, world):
         """Custom handler for better performance."""
@@ -189,105 +204,118 @@ class PositionRotationSync2D(GraphicSync2D):
     """
 
 
-def arc_sync_component() -> PositionRotationSync2D:
+def arc_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Arc`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Arc)
+    return PositionRotationSync2D(pyglet.shapes.Arc, pool)
 
 
-def circle_sync_component() -> PositionSync2D:
+def circle_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionSync2D:
     """Get a sync component for :class:`pyglet.shapes.Circle`s.
 
     See :class:`PositionSync2D`.
     """
-    return PositionSync2D(pyglet.shapes.Circle)
+    return PositionSync2D(pyglet.shapes.Circle, pool)
 
 
-def ellipse_sync_component() -> PositionRotationSync2D:
+def ellipse_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Ellipse`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Ellipse)
+    return PositionRotationSync2D(pyglet.shapes.Ellipse, pool)
 
 
-def sector_sync_component() -> PositionRotationSync2D:
+def sector_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Sector`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Sector)
+    return PositionRotationSync2D(pyglet.shapes.Sector, pool)
 
 
-def line_sync_component() -> PositionSync2D:
+def line_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionSync2D:
     """Get a sync component for :class:`pyglet.shapes.Line`s.
 
     See :class:`PositionSync2D`.
     """
-    return PositionSync2D(pyglet.shapes.Line)
+    return PositionSync2D(pyglet.shapes.Line, pool)
 
 
-def rectangle_sync_component() -> PositionRotationSync2D:
+def rectangle_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Rectangle`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Rectangle)
+    return PositionRotationSync2D(pyglet.shapes.Rectangle, pool)
 
 
-def borderedrectangle_sync_component() -> PositionRotationSync2D:
+def borderedrectangle_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.BorderedRectangle`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.BorderedRectangle)
+    return PositionRotationSync2D(pyglet.shapes.BorderedRectangle, pool)
 
 
-def triangle_sync_component() -> PositionSync2D:
+def triangle_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionSync2D:
     """Get a sync component for :class:`pyglet.shapes.Triangle`s.
 
     See :class:`PositionSync2D`.
     """
-    return PositionSync2D(pyglet.shapes.Triangle)
+    return PositionSync2D(pyglet.shapes.Triangle, pool)
 
 
-def star_sync_component() -> PositionRotationSync2D:
+def star_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Star`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Star)
+    return PositionRotationSync2D(pyglet.shapes.Star, pool)
 
 
-def polygon_sync_component() -> PositionRotationSync2D:
+def polygon_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.shapes.Polygon`s.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.shapes.Polygon)
+    return PositionRotationSync2D(pyglet.shapes.Polygon, pool)
 
 
-def htmllabel_sync_component() -> PositionRotationSync2D:
+def htmllabel_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.text.HTMLLabel`.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.text.HTMLLabel)
+    return PositionRotationSync2D(pyglet.text.HTMLLabel, pool)
 
 
-def documentlabel_sync_component() -> PositionRotationSync2D:
+def documentlabel_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.text.DocumentLabel`.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.text.DocumentLabel)
+    return PositionRotationSync2D(pyglet.text.DocumentLabel, pool)
 
 
-def label_sync_component() -> PositionRotationSync2D:
+def label_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionRotationSync2D:
     """Get a sync component for :class:`pyglet.text.Label`.
 
     See :class:`PositionRotationSync2D`.
     """
-    return PositionRotationSync2D(pyglet.text.Label)
+    return PositionRotationSync2D(pyglet.text.Label, pool)
@@ -0,0 +1,430 @@
+"""Chunked rendering of tile based maps.
+
+Building a tile background from individual sprites means a vertex
+list, a sync component and event handlers for each tile: tens of
+thousands of them for regular sized maps. A :class:`Tilemap` renders
+a whole grid of tile indices instead, dividing it in square chunks.
+Each chunk is a single static vertex list, rewritten only partially
+when tiles are changed (see :meth:`Tilemap.set_tile`).
+
+Chunks can be individually hidden (see :meth:`Tilemap.cull`), so that
+only the ones framed by a :class:`Camera` are drawn. A
+:class:`TilemapCullProcessor` does so automatically for all tilemaps
+rendered by the cameras of a world.
+"""
+from typing import Optional, Sequence
+
+import desper
+import pyglet
+from pyglet.enums import BlendFactor, GeometryMode
+
+from .pool import GraphicPool
+from .sync import PositionSync2D
+
+EMPTY_TILE = -1
+"""Tile index of empty cells in a :class:`Tilemap`.
+
+Any negative index is treated as empty.
+"""
+
+DEFAULT_CHUNK_SIZE = 16
+"""Default size (in tiles) of the side of tilemap chunks."""
+
+_QUAD_INDICES = (0, 1, 2, 0, 2, 3)
+
+
+def _get_tiles(tileset) -> list:
+    """Get the list of tile textures from an image, animation or list."""
+    if isinstance(tileset, pyglet.image.Animation):
+        return [frame.image.get_texture() for frame in tileset.frames]
+    if hasattr(tileset, 'get_texture'):
+        return [tileset.get_texture()]
+    return [tile.get_texture() for tile in tileset]
+
+
+class _ChunkGroup(pyglet.sprite.SpriteGroup):
+    """Sprite group of a single chunk.
+
+    Chunk groups compare by identity, so that the batch keeps them
+    separated and they can be hidden independently.
+    """
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+class _Chunk:
+    """Vertex list and group of a rectangular portion of a tilemap."""
+    __slots__ = ('column', 'row', 'columns', 'rows', 'vertex_list',
+                 'group')
+
+    def __init__(self, column: int, row: int, columns: int, rows: int,
+                 vertex_list, group: _ChunkGroup):
+        self.column = column
+        self.row = row
+        self.columns = columns
+        self.rows = rows
+        self.vertex_list = vertex_list
+        self.group = group
+
+
+@desper.event_handler(desper.ON_REMOVE_EVENT_NAME)
+class Tilemap:
+    """Render a grid of tiles, divided in chunks.
+
+    ``tileset`` is a sequence of images, all belonging to the same
+    texture (e.g. an atlas), or a :class:`pyglet.image.Animation`,
+    whose frames are used as tiles (as obtained by loading a
+    spritesheet through :class:`pyglet_desper.RichImageFileHandle`, see
+    :func:`pyglet_desper.parse_spritesheet`).
+
+    ``tiles`` is a sequence of rows of tile indices (i.e. indices in
+    the ``tileset``). Rows are listed from top to bottom, so that the
+    grid reads like the rendered map. Negative indices (see
+    :attr:`EMPTY_TILE`) leave cells empty. Tiles are placed in cells of
+    ``tile_width`` by ``tile_height`` pixels (defaulting to the size of
+    the first tile), starting from the bottom-left corner of the map,
+    which is placed at :attr:`position`. Tile anchors are ignored.
+
+    The map is divided in square chunks of ``chunk_size`` tiles per
+    side, each one rendered as a single vertex list. Bigger chunks
+    mean fewer draw calls, smaller ones a finer culling (see
+    :meth:`cull`).
+
+    A tilemap exposes sprite-like ``position``, ``visible``, ``batch``
+    and ``group`` properties, so that it can be synchronized with
+    :class:`desper.Transform2D` through :class:`PositionSync2D` (see
+    :func:`tilemap_sync_component`) and initialized by
+    :func:`pyglet_desper.init_graphics_transformer`.
+
+    Chunks are freed when the tilemap is removed from its world (see
+    :meth:`delete`). A deleted tilemap builds them again once made
+    :attr:`visible` (e.g. when reused by a :class:`GraphicPool`).
+    """
+
+    def __init__(self, tileset, tiles: Sequence[Sequence[int]],
+                 x=0., y=0., z=0.,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 tile_width: Optional[int] = None,
+                 tile_height: Optional[int] = None,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None,
+                 program: Optional[pyglet.graphics.ShaderProgram] = None):
+        self._tileset = _get_tiles(tileset)
+        self._texture = self._tileset[0]
+        assert all(tile.id == self._texture.id for tile in self._tileset), (
+            'All tiles of a tilemap must belong to the same texture')
+
+        self.tile_width = tile_width or self._texture.width
+        self.tile_height = tile_height or self._texture.height
+        self.chunk_size = chunk_size
+
+        self.rows = len(tiles)
+        self.columns = max(map(len, tiles), default=0)
+        self._tiles: list[list[int]] = [
+            list(row) + [EMPTY_TILE] * (self.columns - len(row))
+            for row in tiles]
+
+        self._x = x
+        self._y = y
+        self._z = z
+        self._visible = True
+        self._blend_src = blend_src
+        self._blend_dest = blend_dest
+        self._batch = batch
+        self._group = group
+        self.program = program or pyglet.sprite.get_default_shader()
+
+        self._chunks: dict[tuple[int, int], _Chunk] = {}
+        self._create_chunks()
+
+    @property
+    def tileset(self) -> list:
+        """Tile textures, indexed by tile indices."""
+        return list(self._tileset)
+
+    @property
+    def width(self) -> int:
+        """Width of the whole map, in pixels."""
+        return self.columns * self.tile_width
+
+    @property
+    def height(self) -> int:
+        """Height of the whole map, in pixels."""
+        return self.rows * self.tile_height
+
+    @property
+    def chunk_count(self) -> int:
+        """Number of chunks the map is divided in."""
+        return len(self._chunks)
+
+    @property
+    def visible_chunk_count(self) -> int:
+        """Number of chunks currently rendered, see :meth:`cull`."""
+        if not self._visible:
+            return 0
+        return sum(chunk.group.visible for chunk in self._chunks.values())
+
+    def _create_chunks(self):
+        size = self.chunk_size
+        for row in range(0, self.rows, size):
+            for column in range(0, self.columns, size):
+                self._chunks[column // size, row // size] = self._create_chunk(
+                    column, row, min(size, self.columns - column),
+                    min(size, self.rows - row))
+
+    def _create_chunk(self, column: int, row: int, columns: int,
+                      rows: int) -> _Chunk:
+        """Build the vertex list of a chunk, starting at a given cell."""
+        count = columns * rows
+        vertices = count * 4
+        indices = [slot * 4 + index for slot in range(count)
+                   for index in _QUAD_INDICES]
+
+        positions = []
+        tex_coords = []
+        for chunk_row in range(row, row + rows):
+            for chunk_column in range(column, column + columns):
+                position, tile_tex_coords = self._get_tile_vertices(
+                    chunk_column, chunk_row)
+                positions.extend(position)
+                tex_coords.extend(tile_tex_coords)
+
+        group = _ChunkGroup(self._texture, self._blend_src,
+                            self._blend_dest, self.program, self._group)
+        group.visible = self._visible
+        vertex_list = self.program.vertex_list_indexed(
+            vertices, GeometryMode.TRIANGLES, indices, self._batch, group,
+            position=('f', positions),
+            colors=('Bn', (255,) * vertices * 4),
+            translate=('f', (self._x, self._y, self._z) * vertices),
+            scale=('f', (1.,) * vertices * 2),
+            rotation=('f', (0.,) * vertices),
+            tex_coords=('f', tex_coords))
+        return _Chunk(column, row, columns, rows, vertex_list, group)
+
+    def _get_tile_vertices(self, column: int, row: int
+                           ) -> tuple[tuple[float, ...], tuple[float, ...]]:
+        """Get vertex positions and texture coordinates of a cell.
+
+        Positions are relative to the bottom-left corner of the map.
+        Empty cells are collapsed.
+        """
+        index = self._tiles[row][column]
+        if index < 0:
+            return (0.,) * 12, (0.,) * 12
+
+        tile = self._tileset[index]
+        x1 = column * self.tile_width
+        y1 = (self.rows - 1 - row) * self.tile_height
+        x2 = x1 + tile.width
+        y2 = y1 + tile.height
+        return ((x1, y1, 0., x2, y1, 0., x2, y2, 0., x1, y2, 0.),
+                tile.tex_coords)
+
+    def get_tile(self, column: int, row: int) -> int:
+        """Get the tile index of a cell."""
+        return self._tiles[row][column]
+
+    def set_tile(self, column: int, row: int, index: int):
+        """Change the tile index of a cell.
+
+        Only the vertices of the given cell are rewritten.
+        """
+        if self._tiles[row][column] == index:
+            return
+        self._tiles[row][column] = index
+
+        chunk = self._chunks[column // self.chunk_size,
+                             row // self.chunk_size]
+        slot = ((row - chunk.row) * chunk.columns + column - chunk.column)
+        position, tex_coords = self._get_tile_vertices(column, row)
+        chunk.vertex_list.position[slot * 12:slot * 12 + 12] = position
+        chunk.vertex_list.tex_coords[slot * 12:slot * 12 + 12] = tex_coords
+
+    def get_tiles(self) -> list[list[int]]:
+        """Get a copy of the grid of tile indices, rows from the top."""
+        return [list(row) for row in self._tiles]
+
+    def get_cell(self, x: float, y: float) -> Optional[tuple[int, int]]:
+        """Get ``(column, row)`` of the cell at world coordinates.
+
+        Return ``None`` if the coordinates are outside the map.
+        """
+        column = int((x - self._x) // self.tile_width)
+        row = self.rows - 1 - int((y - self._y) // self.tile_height)
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return column, row
+        return None
+
+    def cull(self, x: float, y: float, width: float, height: float):
+        """Hide chunks that are outside the given rectangle.
+
+        The rectangle is expressed in world coordinates (e.g. the area
+        currently framed by a :class:`Camera`, see
+        :meth:`Camera.get_bounds`). Chunks overlapping it are shown,
+        the others (including the ones just touching its edges) are
+        hidden.
+
+        Has no effect if the map is not :attr:`visible`.
+        """
+        if not self._visible:
+            return
+
+        chunk_width = self.chunk_size * self.tile_width
+        chunk_height = self.chunk_size * self.tile_height
+        for chunk in self._chunks.values():
+            chunk_x1 = self._x + chunk.column * self.tile_width
+            chunk_y2 = (self._y
+                        + (self.rows - chunk.row) * self.tile_height)
+            visible = (chunk_x1 + chunk_width > x
+                       and chunk_x1 < x + width
+                       and chunk_y2 > y
+                       and chunk_y2 - chunk_height < y + height)
+            if chunk.group.visible != visible:
+                chunk.group.visible = visible
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, ...]):
+        """Set ``(x, y)`` or ``(x, y, z)``.
+
+        If ``z`` is omitted, it is left untouched.
+        """
+        self._x, self._y, *z = position
+        if z:
+            self._z = z[0]
+
+        translation = self._x, self._y, self._z
+        for chunk in self._chunks.values():
+            chunk.vertex_list.translate[:] = (
+                translation * (chunk.columns * chunk.rows * 4))
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self.position = x, self._y, self._z
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self.position = self._x, y, self._z
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self.position = self._x, self._y, z
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._visible = visible
+        if visible and not self._chunks:
+            self._create_chunks()
+        for chunk in self._chunks.values():
+            chunk.group.visible = visible
+
+    @property
+    def batch(self) -> Optional[pyglet.graphics.Batch]:
+        return self._batch
+
+    @batch.setter
+    def batch(self, batch: Optional[pyglet.graphics.Batch]):
+        self.migrate(batch, self._group)
+
+    @property
+    def group(self) -> Optional[pyglet.graphics.Group]:
+        return self._group
+
+    @group.setter
+    def group(self, group: Optional[pyglet.graphics.Group]):
+        self.migrate(self._batch, group)
+
+    def migrate(self, batch: Optional[pyglet.graphics.Batch],
+                group: Optional[pyglet.graphics.Group]):
+        """Change batch and group at once, rebuilding chunks once."""
+        if self._batch is batch and self._group == group:
+            return
+
+        self.delete()
+        self._batch = batch
+        self._group = group
+        self._create_chunks()
+
+    def draw(self):
+        """Draw visible chunks, for tilemaps that are not batched."""
+        if not self._visible:
+            return
+
+        ctx = pyglet.graphics.api.core.current_context
+        for chunk in self._chunks.values():
+            if chunk.group.visible:
+                chunk.group.set_state_recursive(ctx)
+                chunk.vertex_list.draw(GeometryMode.TRIANGLES)
+                chunk.group.unset_state_recursive(ctx)
+
+    def delete(self):
+        """Free all chunks from video memory."""
+        for chunk in self._chunks.values():
+            chunk.vertex_list.delete()
+        self._chunks.clear()
+
+    def on_remove(self, entity, world: desper.World):
+        """Free chunks when removed from the world."""
+        self.delete()
+
+
+class TilemapCullProcessor(desper.Processor):
+    """Cull all :class:`Tilemap`s to the area framed by cameras.
+
+    Each tilemap is culled (see :meth:`Tilemap.cull`) to the area
+    framed by the :class:`Camera`s rendering its batch (see
+    :meth:`Camera.get_bounds`). Tilemaps not rendered by any camera
+    are left untouched.
+
+    Add it with a priority higher than the processors moving cameras,
+    so that culling reflects the frame about to be rendered.
+    """
+
+    def process(self, dt):
+        """Cull tilemaps based on current camera bounds."""
+        # Imported here, as this module is part of logic
+        from pyglet_desper.logic import Camera
+
+        cameras = [camera for _, camera in self.world.get(Camera)]
+        for _, tilemap in self.world.get(Tilemap):
+            bounds = [camera.get_bounds() for camera in cameras
+                      if camera.batch is tilemap.batch]
+            if not bounds:
+                continue
+
+            x1 = min(x for x, _, _, _ in bounds)
+            y1 = min(y for _, y, _, _ in bounds)
+            x2 = max(x + width for x, _, width, _ in bounds)
+            y2 = max(y + height for _, y, _, height in bounds)
+            tilemap.cull(x1, y1, x2 - x1, y2 - y1)
+
+
+def tilemap_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionSync2D:
+    """Get a sync component for :class:`Tilemap`s.
+
+    See :class:`PositionSync2D`.
+    """
+    return PositionSync2D(Tilemap, pool)
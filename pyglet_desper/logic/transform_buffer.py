@@ -0,0 +1,257 @@
+"""Sprite transformations stored on the GPU, in a buffer texture.
+
+Default pyglet sprites store their translation, rotation and scale
+as vertex attributes, repeated on each of their four vertices. A
+:class:`TransformBuffer` stores instead one compact record per sprite
+in a single array, which is uploaded to the GPU (as a buffer texture)
+at most once per frame, when rendering. The dedicated shader (see
+:func:`get_transform_buffer_shader`) fetches the record of each vertex
+and applies the transformation, while vertices never leave the local
+space of the sprite.
+
+As a result, transforming a sprite consists in a couple of writes in
+the array. See :class:`BufferedSprite`.
+"""
+import ctypes
+from dataclasses import dataclass
+
+import pyglet
+from pyglet.graphics.api.gl import gl
+from pyglet.graphics.state import State
+
+transform_buffer_vertex_source = """#version 150 core
+    in vec3 position;
+    in vec4 colors;
+    in vec3 tex_coords;
+    in float transform_index;
+
+    out vec4 vertex_colors;
+    out vec3 texture_coords;
+
+    uniform samplerBuffer transforms;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        int record = int(transform_index) * 2;
+        // x, y, z, rotation
+        vec4 translate_rotation = texelFetch(transforms, record);
+        // scale_x, scale_y, unused, unused
+        vec4 scale = texelFetch(transforms, record + 1);
+
+        vec2 local = position.xy * scale.xy;
+        float angle = -radians(translate_rotation.w);
+        vec2 rotated = vec2(local.x * cos(angle) - local.y * sin(angle),
+                            local.x * sin(angle) + local.y * cos(angle));
+
+        gl_Position = window.projection * window.view
+            * vec4(rotated + translate_rotation.xy,
+                   translate_rotation.z + position.z, 1.0);
+
+        vertex_colors = colors;
+        texture_coords = tex_coords;
+    }
+"""
+
+transform_buffer_fragment_source = """#version 150 core
+    in vec4 vertex_colors;
+    in vec3 texture_coords;
+    out vec4 final_colors;
+
+    uniform sampler2D sprite_texture;
+
+    void main()
+    {
+        final_colors = texture(sprite_texture, texture_coords.xy)
+            * vertex_colors;
+    }
+"""
+
+RECORD_SIZE = 8
+"""Number of floats in a single transform record."""
+
+
+def get_transform_buffer_shader() -> pyglet.graphics.ShaderProgram:
+    """Create and return the transform buffer sprite shader.
+
+    The program is cached by pyglet, so it is built only once per
+    context.
+    """
+    return pyglet.graphics.api.core.get_cached_shader(
+        'pyglet_desper_transform_buffer_sprite',
+        (transform_buffer_vertex_source, 'vertex'),
+        (transform_buffer_fragment_source, 'fragment'))
+
+
+class TransformBuffer:
+    """Array of 2D transform records, mirrored on the GPU.
+
+    Each record is identified by an index (see :meth:`allocate`) and
+    contains position (x, y, z), rotation and scale (x and y) of
+    a single sprite. The array grows as needed, starting from the given
+    ``capacity`` (in records).
+
+    Changes are accumulated on the CPU and uploaded in bulk the first
+    time the buffer is bound during a frame (see :meth:`bind`).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.data = (ctypes.c_float * (capacity * RECORD_SIZE))()
+        self.dirty = True
+
+        self._size = 0
+        self._free_indices = []
+        self._gl_capacity = 0
+        self._buffer_id = None
+        self._texture_id = None
+
+    @property
+    def size(self) -> int:
+        """Number of records in use."""
+        return self._size - len(self._free_indices)
+
+    def allocate(self) -> int:
+        """Get the index of a new record.
+
+        The record is initialized to the identity transformation.
+        """
+        if self._free_indices:
+            index = self._free_indices.pop()
+        else:
+            if self._size == self.capacity:
+                self._grow()
+            index = self._size
+            self._size += 1
+
+        base = index * RECORD_SIZE
+        self.data[base:base + RECORD_SIZE] = (0., 0., 0., 0.,
+                                              1., 1., 0., 0.)
+        self.dirty = True
+        return index
+
+    def release(self, index: int):
+        """Mark the record at the given index as reusable."""
+        self._free_indices.append(index)
+
+    def _grow(self):
+        """Double the capacity of the array."""
+        new_data = (ctypes.c_float * (self.capacity * 2 * RECORD_SIZE))()
+        ctypes.memmove(new_data, self.data, ctypes.sizeof(self.data))
+        self.data = new_data
+        self.capacity *= 2
+
+    def set_translation(self, index: int, x: float, y: float, z: float):
+        """Set the position of a record."""
+        base = index * RECORD_SIZE
+        self.data[base:base + 3] = x, y, z
+        self.dirty = True
+
+    def set_rotation(self, index: int, rotation: float):
+        """Set the (clockwise, in degrees) rotation of a record."""
+        self.data[index * RECORD_SIZE + 3] = rotation
+        self.dirty = True
+
+    def set_scale(self, index: int, scale_x: float, scale_y: float):
+        """Set the scale of a record."""
+        base = index * RECORD_SIZE + 4
+        self.data[base:base + 2] = scale_x, scale_y
+        self.dirty = True
+
+    def get_record(self, index: int) -> tuple[float, ...]:
+        """Get ``(x, y, z, rotation, scale_x, scale_y)`` of a record."""
+        base = index * RECORD_SIZE
+        return tuple(self.data[base:base + 6])
+
+    def upload(self):
+        """Upload the records to the GPU.
+
+        Requires a current context. Usually, there is no need to call
+        this directly, as it is done by :meth:`bind`.
+        """
+        if self._buffer_id is None:
+            buffer_id = gl.GLuint()
+            gl.glGenBuffers(1, buffer_id)
+            self._buffer_id = buffer_id.value
+
+            texture_id = gl.GLuint()
+            gl.glGenTextures(1, texture_id)
+            self._texture_id = texture_id.value
+
+        gl.glBindBuffer(gl.GL_TEXTURE_BUFFER, self._buffer_id)
+        if self._gl_capacity != self.capacity:
+            gl.glBufferData(gl.GL_TEXTURE_BUFFER, ctypes.sizeof(self.data),
+                            self.data, gl.GL_DYNAMIC_DRAW)
+            self._gl_capacity = self.capacity
+        else:
+            gl.glBufferSubData(
+                gl.GL_TEXTURE_BUFFER, 0,
+                self._size * RECORD_SIZE * ctypes.sizeof(ctypes.c_float),
+                self.data)
+        gl.glBindBuffer(gl.GL_TEXTURE_BUFFER, 0)
+
+        self.dirty = False
+
+    def bind(self, texture_unit: int):
+        """Bind the buffer texture to the given texture unit.
+
+        Pending changes are uploaded first.
+        """
+        if self.dirty:
+            self.upload()
+
+        gl.glActiveTexture(gl.GL_TEXTURE0 + texture_unit)
+        gl.glBindTexture(gl.GL_TEXTURE_BUFFER, self._texture_id)
+        gl.glTexBuffer(gl.GL_TEXTURE_BUFFER, gl.GL_RGBA32F, self._buffer_id)
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+
+    def delete(self):
+        """Free the GPU resources of the buffer."""
+        if self._buffer_id is not None:
+            gl.glDeleteBuffers(1, gl.GLuint(self._buffer_id))
+            gl.glDeleteTextures(1, gl.GLuint(self._texture_id))
+            self._buffer_id = None
+            self._texture_id = None
+            self._gl_capacity = 0
+            self.dirty = True
+
+
+_default_transform_buffer = None
+
+
+def get_default_transform_buffer() -> TransformBuffer:
+    """Get the transform buffer shared by default by all sprites."""
+    global _default_transform_buffer
+
+    if _default_transform_buffer is None:
+        _default_transform_buffer = TransformBuffer()
+    return _default_transform_buffer
+
+
+@dataclass(frozen=True)
+class TransformBufferState(State):
+    """Bind a :class:`TransformBuffer` for rendering."""
+    transform_buffer: TransformBuffer
+    program: pyglet.graphics.ShaderProgram
+    texture_unit: int = 1
+
+    sets_state: bool = True
+
+    def set_state(self, ctx):
+        self.transform_buffer.bind(self.texture_unit)
+        self.program['transforms'] = self.texture_unit
+
+
+class TransformBufferSpriteGroup(pyglet.sprite.SpriteGroup):
+    """Sprite rendering group, binding a :class:`TransformBuffer`."""
+
+    def __init__(self, texture, blend_src, blend_dest, program,
+                 transform_buffer: TransformBuffer, parent=None):
+        super().__init__(texture, blend_src, blend_dest, program, parent)
+        self.transform_buffer = transform_buffer
+        self.add_state(TransformBufferState(transform_buffer, program))
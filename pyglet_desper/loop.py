@@ -1,9 +1,236 @@
-from typing import Optional
+from typing import Callable, Mapping, Optional, Sequence
+import collections
+import contextlib
 import functools
 
 import desper
 import pyglet
 
+from pyglet_desper.resource_usage import ResourceUsage, ResourceManifest
+
+EventCoalescer = Callable[[tuple, tuple], Optional[tuple]]
+"""Merge the arguments of two events of the same type.
+
+Given the arguments of a pending event and the ones of a newer
+event, return the arguments of the merged event, or ``None`` if the
+two cannot be merged (in which case the pending one is delivered
+first).
+"""
+
+
+def keep_latest(pending: tuple, current: tuple) -> tuple:
+    """Event coalescer: only keep the latest event.
+
+    See :class:`Loop`.
+    """
+    return current
+
+
+def accumulate_deltas(delta_indices: Sequence[int],
+                      match_indices: Sequence[int] = ()) -> EventCoalescer:
+    """Build an event coalescer summing the given arguments.
+
+    Arguments at ``delta_indices`` (e.g. ``dx`` and ``dy`` of
+    ``on_mouse_motion``) are summed, while the others are taken from
+    the latest event. Events are merged only if the arguments at
+    ``match_indices`` (e.g. ``buttons`` and ``modifiers`` of
+    ``on_mouse_drag``) are equal.
+
+    See :class:`Loop`.
+    """
+    def coalesce(pending: tuple, current: tuple) -> Optional[tuple]:
+        for index in match_indices:
+            if pending[index] != current[index]:
+                return None
+
+        merged = list(current)
+        for index in delta_indices:
+            merged[index] += pending[index]
+        return tuple(merged)
+
+    return coalesce
+
+
+DEFAULT_COALESCED_EVENTS: Mapping[str, EventCoalescer] = {
+    'on_mouse_motion': accumulate_deltas((2, 3)),
+    'on_mouse_drag': accumulate_deltas((2, 3), (4, 5)),
+    'on_mouse_scroll': accumulate_deltas((2, 3)),
+    'on_resize': keep_latest,
+    'on_move': keep_latest
+}
+"""Coalescers for high rate window events, see :class:`Loop`."""
+
+
+class InputState:
+    """Snapshot of keyboard and mouse state of a window.
+
+    Maintained by a :class:`Loop` (see :meth:`Loop.connect_input_state`),
+    which updates it once per iteration, right before processing the
+    current world. Entities can then poll it (e.g. "is key X held")
+    instead of listening to window events and keeping track of the
+    state on their own. The input state is added as a component to
+    the current world, see :func:`get_input_state`.
+
+    Within a frame, the state does not change: events received in the
+    meantime are recorded and only applied by :meth:`update`. Keys
+    pressed and released within the same frame appear in both
+    :attr:`pressed_keys` and :attr:`released_keys`, but not in
+    :attr:`held_keys`. Mouse buttons are stored as bitmasks of
+    :mod:`pyglet.window.mouse` constants.
+    """
+
+    def __init__(self, window: Optional[pyglet.window.Window] = None):
+        self.window = window
+
+        self.held_keys: frozenset[int] = frozenset()
+        self.pressed_keys: frozenset[int] = frozenset()
+        self.released_keys: frozenset[int] = frozenset()
+        self.modifiers = 0
+
+        self.mouse_x = 0
+        self.mouse_y = 0
+        self.mouse_dx = 0
+        self.mouse_dy = 0
+        self.scroll_x = 0.
+        self.scroll_y = 0.
+        self.held_buttons = 0
+        self.pressed_buttons = 0
+        self.released_buttons = 0
+
+        # Recorded, not yet applied state
+        self._held_keys: set[int] = set()
+        self._pressed_keys: set[int] = set()
+        self._released_keys: set[int] = set()
+        self._modifiers = 0
+        self._mouse_x = self._mouse_y = 0
+        self._mouse_dx = self._mouse_dy = 0
+        self._scroll_x = self._scroll_y = 0.
+        self._held_buttons = 0
+        self._pressed_buttons = 0
+        self._released_buttons = 0
+        self._dirty = False
+
+    def is_held(self, symbol: int) -> bool:
+        """Get whether the given key is held."""
+        return symbol in self.held_keys
+
+    def was_pressed(self, symbol: int) -> bool:
+        """Get whether the given key was pressed since last frame."""
+        return symbol in self.pressed_keys
+
+    def was_released(self, symbol: int) -> bool:
+        """Get whether the given key was released since last frame."""
+        return symbol in self.released_keys
+
+    def is_button_held(self, button: int) -> bool:
+        """Get whether the given mouse button(s) are held."""
+        return self.held_buttons & button == button
+
+    def update(self):
+        """Apply the events received since the last update."""
+        if not self._dirty:
+            # Per frame state is reset anyway, if needed
+            if self.pressed_keys or self.released_keys:
+                self.pressed_keys = self.released_keys = frozenset()
+            if self.mouse_dx or self.mouse_dy:
+                self.mouse_dx = self.mouse_dy = 0
+            if self.scroll_x or self.scroll_y:
+                self.scroll_x = self.scroll_y = 0.
+            self.pressed_buttons = self.released_buttons = 0
+            return
+
+        self.held_keys = frozenset(self._held_keys)
+        self.pressed_keys = frozenset(self._pressed_keys)
+        self.released_keys = frozenset(self._released_keys)
+        self.modifiers = self._modifiers
+        self.mouse_x = self._mouse_x
+        self.mouse_y = self._mouse_y
+        self.mouse_dx = self._mouse_dx
+        self.mouse_dy = self._mouse_dy
+        self.scroll_x = self._scroll_x
+        self.scroll_y = self._scroll_y
+        self.held_buttons = self._held_buttons
+        self.pressed_buttons = self._pressed_buttons
+        self.released_buttons = self._released_buttons
+
+        self._pressed_keys.clear()
+        self._released_keys.clear()
+        self._mouse_dx = self._mouse_dy = 0
+        self._scroll_x = self._scroll_y = 0.
+        self._pressed_buttons = self._released_buttons = 0
+        self._dirty = False
+
+    # Window event handlers, events are never consumed
+    def on_key_press(self, symbol: int, modifiers: int):
+        self._held_keys.add(symbol)
+        self._pressed_keys.add(symbol)
+        self._modifiers = modifiers
+        self._dirty = True
+
+    def on_key_release(self, symbol: int, modifiers: int):
+        self._held_keys.discard(symbol)
+        self._released_keys.add(symbol)
+        self._modifiers = modifiers
+        self._dirty = True
+
+    def on_mouse_motion(self, x: int, y: int, dx: int, dy: int):
+        self._mouse_x = x
+        self._mouse_y = y
+        self._mouse_dx += dx
+        self._mouse_dy += dy
+        self._dirty = True
+
+    def on_mouse_drag(self, x: int, y: int, dx: int, dy: int, buttons: int,
+                      modifiers: int):
+        self.on_mouse_motion(x, y, dx, dy)
+
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
+        self._mouse_x = x
+        self._mouse_y = y
+        self._held_buttons |= button
+        self._pressed_buttons |= button
+        self._modifiers = modifiers
+        self._dirty = True
+
+    def on_mouse_release(self, x: int, y: int, button: int, modifiers: int):
+        self._mouse_x = x
+        self._mouse_y = y
+        self._held_buttons &= ~button
+        self._released_buttons |= button
+        self._modifiers = modifiers
+        self._dirty = True
+
+    def on_mouse_scroll(self, x: int, y: int, scroll_x: float,
+                        scroll_y: float):
+        self._scroll_x += scroll_x
+        self._scroll_y += scroll_y
+        self._dirty = True
+
+    def on_deactivate(self):
+        """Release everything, release events won't be received."""
+        self._released_keys |= self._held_keys
+        self._held_keys.clear()
+        self._released_buttons |= self._held_buttons
+        self._held_buttons = 0
+        self._dirty = True
+
+
+def get_input_state(world: Optional[desper.World] = None,
+                    window: Optional[pyglet.window.Window] = None
+                    ) -> Optional[InputState]:
+    """Retrieve the :class:`InputState` of a window from a world.
+
+    If ``window`` is omitted, the first found input state is
+    returned. If omitted, ``world`` defaults to
+    :attr:`desper.default_loop.current_world`. Return ``None`` if no
+    input state is found, see :meth:`Loop.connect_input_state`.
+    """
+    world = world or desper.default_loop.current_world
+    for _, input_state in world.get(InputState):
+        if window is None or input_state.window is window:
+            return input_state
+    return None
+
 
 class Loop(desper.Loop[desper.World]):
     """Pyglet specific Loop implementation.
@@ -11,16 +238,111 @@ class Loop(desper.Loop[desper.World]):
     If set, ``interval`` is passed to
     :func:`pyglet.clock.schedule_interval` to define an upper bound
     to the framerate. Common values are ``1 / 60``, ``1 / 75``, etc.
+
+    Window events connected through :meth:`connect_window_events`
+    are dispatched to the current world as soon as they are received.
+    High rate events (e.g. ``on_mouse_motion`` from high polling rate
+    mice) can instead be coalesced and dispatched once per
+    :meth:`iteration`, by specifying ``coalesced_events``: a mapping
+    from event names to functions that merge two subsequent events
+    (see :attr:`EventCoalescer`, :func:`keep_latest`,
+    :func:`accumulate_deltas` and :attr:`DEFAULT_COALESCED_EVENTS`).
+    Pending coalesced events are delivered before any other connected
+    event, so that ordering is preserved as much as possible. Events
+    are coalesced regardless of the window they come from.
+
+    Received and dispatched events are counted in
+    :attr:`raw_event_counts` and :attr:`delivered_event_counts`.
+
+    Keyboard and mouse state of windows can also be tracked through
+    :meth:`connect_input_state`, see :class:`InputState`.
+
+    If a :class:`ResourceUsage` is given, it is attached and the
+    resources used by each world are tracked (both while loading it
+    and while it is current). When switching with ``clear_current``,
+    the next world is loaded before the current one is released, so
+    that the resources they share are not freed. Restarting the
+    current world (i.e. switching to the current handle with
+    ``clear_current``) reloads it, freeing only the resources that
+    are no longer used. The usage stays attached until
+    :attr:`resource_usage` is replaced (e.g. set to ``None``), which
+    shall be done before discarding the loop.
+
+    If a :class:`ResourceManifest` is given, the resources it lists
+    for a world are preloaded when switching to it. Attach the
+    manifest to record it during play sessions (see
+    :meth:`ResourceManifest.attach`).
     """
 
-    def __init__(self, interval: Optional[float] = None):
+    def __init__(self, interval: Optional[float] = None,
+                 coalesced_events: Optional[Mapping[str, EventCoalescer]]
+                 = None,
+                 resource_usage: Optional[ResourceUsage] = None,
+                 resource_manifest: Optional[ResourceManifest] = None):
         super().__init__()
         self.interval: Optional[float] = interval
+        self.coalesced_events: dict[str, EventCoalescer] = dict(
+            coalesced_events or {})
+
+        self.raw_event_counts: collections.Counter[str] = \
+            collections.Counter()
+        self.delivered_event_counts: collections.Counter[str] = \
+            collections.Counter()
+        self._pending_events: dict[str, tuple] = {}
+        self._input_states: dict[pyglet.window.Window, InputState] = {}
+
+        self._resource_usage: Optional[ResourceUsage] = None
+        self.resource_usage = resource_usage
+        self.resource_manifest: Optional[ResourceManifest] = \
+            resource_manifest
+
+    @property
+    def resource_usage(self) -> Optional[ResourceUsage]:
+        """Resource usage tracking worlds, if any.
+
+        The given usage is attached, while the replaced one is
+        detached.
+        """
+        return self._resource_usage
+
+    @resource_usage.setter
+    def resource_usage(self, resource_usage: Optional[ResourceUsage]):
+        if self._resource_usage is not None:
+            self._resource_usage.detach()
+        self._resource_usage = resource_usage
+        if resource_usage is not None:
+            resource_usage.attach()
 
     def iteration(self, dt: float):
-        """Single loop iteration."""
+        """Single loop iteration.
+
+        Pending coalesced events are dispatched and input states are
+        updated before processing the current world.
+        """
+        if self._pending_events:
+            self.flush_events()
+        for input_state in self._input_states.values():
+            input_state.update()
         self._current_world.process(dt)
 
+    def flush_events(self):
+        """Dispatch pending coalesced events to the current world."""
+        pending_events = self._pending_events
+        self._pending_events = {}
+        for event_name, args in pending_events.items():
+            self._deliver(event_name, args)
+
+    def reset_event_counts(self):
+        """Reset raw and delivered event counters."""
+        self.raw_event_counts.clear()
+        self.delivered_event_counts.clear()
+
+    def _deliver(self, event_name: str, args: tuple,
+                 kwargs: Optional[dict] = None):
+        if self.current_world is not None:
+            self.delivered_event_counts[event_name] += 1
+            self.current_world.dispatch(event_name, *args, **(kwargs or {}))
+
     def loop(self):
         """Execute main loop.
 
@@ -77,7 +399,10 @@ class Loop(desper.Loop[desper.World]):
 
         See :meth:`Loop._switch` for the basic behaviour.
         """
-        super().switch(world_handle, clear_current, clear_next)
+        if self.resource_usage is None and self.resource_manifest is None:
+            super().switch(world_handle, clear_current, clear_next)
+        else:
+            self._switch_tracked(world_handle, clear_current, clear_next)
 
         pyglet.clock.unschedule(self.iteration)
         if self.interval is None:
@@ -85,7 +410,49 @@ class Loop(desper.Loop[desper.World]):
         else:
             pyglet.clock.schedule_interval(self.iteration, self.interval)
 
-        world_handle().dispatch_enabled = True
+        world = world_handle()
+        world.dispatch_enabled = True
+        for input_state in self._input_states.values():
+            self._add_input_state(world, input_state)
+
+    def _switch_tracked(self, world_handle: desper.Handle[desper.World],
+                        clear_current: bool, clear_next: bool):
+        """Switch world, tracking, preloading and releasing resources."""
+        resource_usage = self.resource_usage
+        resource_manifest = self.resource_manifest
+        previous_handle = self._current_world_handle
+
+        # Restarting the current world: clear it before loading it
+        # again, recording its resources anew
+        restart = clear_current and previous_handle is world_handle
+        unused = []
+        if restart:
+            world_handle.clear()
+            if resource_usage is not None:
+                unused = resource_usage.release(world_handle, free=False)
+
+        if resource_manifest is not None:
+            resource_manifest.current = world_handle
+
+        with contextlib.ExitStack() as stack:
+            if resource_usage is not None:
+                stack.enter_context(resource_usage.recording(world_handle))
+            if resource_manifest is not None:
+                resource_manifest.preload(world_handle)
+
+            super().switch(world_handle, False, clear_next)
+
+        if resource_usage is not None:
+            resource_usage.current = world_handle
+            # Free what the restarted world does not use anymore
+            resource_usage.free([handle for handle in unused
+                                 if not resource_usage.get_count(handle)])
+
+        if (clear_current and previous_handle is not None
+                and not restart):
+            previous_handle.clear()
+            if resource_usage is not None:
+                resource_usage.release(previous_handle)
 
     @functools.cache
     def _generate_window_handler(self, event_name: str):
@@ -96,9 +463,24 @@ class Loop(desper.Loop[desper.World]):
         """
 
         def dispatch(*args, **kwargs):
-            if self.current_world is not None:
-                self.current_world.dispatch(event_name, *args, **kwargs)
+            self.raw_event_counts[event_name] += 1
+
+            coalesce = self.coalesced_events.get(event_name)
+            if coalesce is None or kwargs:
+                if self._pending_events:
+                    self.flush_events()
+                self._deliver(event_name, args, kwargs)
+                return True
 
+            pending = self._pending_events.get(event_name)
+            if pending is not None:
+                merged = coalesce(pending, args)
+                if merged is None:
+                    self.flush_events()
+                else:
+                    args = merged
+
+            self._pending_events[event_name] = args
             return True
 
         return dispatch
@@ -112,11 +494,23 @@ class Loop(desper.Loop[desper.World]):
         dispatched by :attr:`current_world`. In this way, desper event
         handlers (:func:`event_handler`) can nimbly receive pyglet
         events.
+
+        Events listed in :attr:`coalesced_events` are buffered and
+        dispatched once per :meth:`iteration`, see :class:`Loop`.
         """
         handlers = [self._generate_window_handler(event)
                     for event in event_names]
 
-        window.set_handlers(**dict(zip(event_names, handlers)))
+        input_state = self._input_states.get(window)
+        if input_state is None:
+            window.set_handlers(**dict(zip(event_names, handlers)))
+            return
+
+        # Keep input state on top of the stack, as handlers connected
+        # here consume events
+        window.remove_handlers(input_state)
+        window.push_handlers(**dict(zip(event_names, handlers)))
+        window.push_handlers(input_state)
 
     def disconnect_window_events(self, window: pyglet.window.Window,
                                  *event_names: str):
@@ -130,3 +524,44 @@ class Loop(desper.Loop[desper.World]):
                     for event in event_names]
 
         window.remove_handlers(**dict(zip(event_names, handlers)))
+
+    def connect_input_state(self, window: pyglet.window.Window
+                            ) -> InputState:
+        """Track keyboard and mouse state of the given window.
+
+        The returned :class:`InputState` is updated once per
+        :meth:`iteration` and added as a component to the current
+        world (and to any world switched to, see
+        :func:`get_input_state`). Connecting the same window again
+        returns the same input state.
+        """
+        input_state = self._input_states.get(window)
+        if input_state is not None:
+            return input_state
+
+        input_state = self._input_states[window] = InputState(window)
+        window.push_handlers(input_state)
+        if self.current_world is not None:
+            self._add_input_state(self.current_world, input_state)
+        return input_state
+
+    def disconnect_input_state(self, window: pyglet.window.Window):
+        """Stop tracking keyboard and mouse state of the given window.
+
+        The input state is removed from the current world.
+        """
+        input_state = self._input_states.pop(window, None)
+        if input_state is None:
+            return
+
+        window.remove_handlers(input_state)
+        if self.current_world is not None:
+            for entity, component in self.current_world.get(InputState):
+                if component is input_state:
+                    self.current_world.delete_entity(entity)
+
+    @staticmethod
+    def _add_input_state(world: desper.World, input_state: InputState):
+        if all(component is not input_state
+               for _, component in world.get(InputState)):
+            world.create_entity(input_state)
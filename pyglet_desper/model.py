@@ -3,8 +3,10 @@
 In particular, a set of specialized :class:`desper.Handle`s are
 provided.
 """
+import concurrent.futures
 import json
 import os.path as pt
+import weakref
 from typing import Union, Optional, Callable
 
 import desper
@@ -16,7 +18,16 @@ from pyglet.media.codecs import MediaDecoder
 from pyglet.image.codecs import ImageDecoder
 from pyglet.graphics.atlas import TextureBin
 
-from pyglet_desper.logic import CameraProcessor, Camera
+from pyglet_desper.logic import (CameraProcessor, Camera, TiledSprite,
+                                 AnimationProcessor, BatchedShape, Tilemap)
+from pyglet_desper.audio import (AudioCache, default_audio_cache,
+                                 PrebufferedSource, StreamingFilePool)
+from pyglet_desper.resource_usage import TrackedHandle
+from pyglet_desper.binary_world import (BinaryWorldFromFileTransformer,
+                                        is_binary_world_file)
+from pyglet_desper.world_cache import (WorldCache,
+                                       CachedWorldFromFileTransformer,
+                                       DEFAULT_DICT_TRANSFORMERS)
 
 
 default_texture_bin = None
@@ -43,10 +54,23 @@ Map absolute filenames to pyglet images. Mainly populated by
 times.
 """
 
+_group_cache: weakref.WeakValueDictionary[
+    tuple[Callable[..., Group], int], Group] = weakref.WeakValueDictionary()
+"""Cache for internal use.
+
+Map pairs ``(group_factory, order)`` to pyglet groups. Populated by
+:meth:`WantsGroupBatch.get_group` so that equivalent groups are
+shared by all graphical components. Groups are only kept as long as
+they are in use.
+"""
+
 GRAPHIC_BASE_CLASSES = (pyglet.sprite.Sprite,
-                        pyglet.text.layout.TextLayout)
+                        pyglet.text.layout.TextLayout,
+                        TiledSprite,
+                        BatchedShape,
+                        Tilemap)
 # pyglet.shapes.ShapeBase is currently excluded as it does not support
-# batch and group
+# batch and group (use batched shapes instead)
 
 # Default populator
 MEDIA_DIRECTORY = 'media'
@@ -65,6 +89,94 @@ def _get_default_texture_bin() -> TextureBin:
     return default_texture_bin
 
 
+class TiledImage:
+    """Composite image, made of smaller tiles.
+
+    Produced by :func:`split_image` (and hence by
+    :class:`ImageFileHandle` when ``split_oversized`` is enabled) for
+    images that exceed the size of a texture atlas. Each tile is a
+    regular texture region, typically packed into an atlas, so that
+    large images can still be batched with the rest of the scene.
+
+    :attr:`tiles` is a list of triplets in the form
+    ``(x_offset, y_offset, texture)``, where offsets are relative to the
+    bottom-left corner of the original image.
+
+    A tiled image can be rendered through
+    :class:`pyglet_desper.TiledSprite`.
+    """
+
+    def __init__(self, width: int, height: int,
+                 tiles: list[tuple[int, int, Texture]]):
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+
+        self._anchor_x = 0
+        self._anchor_y = 0
+        self._update_anchors()
+
+    def _update_anchors(self):
+        """Shift anchors of the tiles based on the global anchor.
+
+        In this way, all tiles share the same origin point and can be
+        translated, rotated and scaled as a single image.
+        """
+        for x_offset, y_offset, tile in self.tiles:
+            tile.anchor_x = self._anchor_x - x_offset
+            tile.anchor_y = self._anchor_y - y_offset
+
+    @property
+    def anchor_x(self) -> int:
+        return self._anchor_x
+
+    @anchor_x.setter
+    def anchor_x(self, value: int):
+        self._anchor_x = value
+        self._update_anchors()
+
+    @property
+    def anchor_y(self) -> int:
+        return self._anchor_y
+
+    @anchor_y.setter
+    def anchor_y(self, value: int):
+        self._anchor_y = value
+        self._update_anchors()
+
+
+def split_image(image: pyglet.image.ImageData, tile_width: int,
+                tile_height: int, texture_bin: Optional[TextureBin] = None,
+                border: int = 1) -> TiledImage:
+    """Split an image in tiles of the given maximum size.
+
+    Tiles are added to ``texture_bin``, defaulting to
+    :attr:`default_texture_bin`. ``tile_width`` and ``tile_height``
+    shall take into account the given ``border``, which is applied on
+    each side of each tile (i.e. each tile will take
+    ``tile_width + 2 * border`` pixels in the atlas).
+
+    The anchor of the input image is preserved.
+    """
+    if texture_bin is None:
+        texture_bin = _get_default_texture_bin()
+
+    tiles = []
+    for y_offset in range(0, image.height, tile_height):
+        for x_offset in range(0, image.width, tile_width):
+            region = image.get_region(
+                x_offset, y_offset,
+                min(tile_width, image.width - x_offset),
+                min(tile_height, image.height - y_offset))
+            tiles.append((x_offset, y_offset,
+                          texture_bin.add(region, border)))
+
+    tiled_image = TiledImage(image.width, image.height, tiles)
+    tiled_image.anchor_x = image.anchor_x
+    tiled_image.anchor_y = image.anchor_y
+    return tiled_image
+
+
 def clear_image_cache():
     """Clear module level image cache.
 
@@ -75,7 +187,35 @@ def clear_image_cache():
     _image_cache.clear()
 
 
-class MediaFileHandle(desper.Handle[pyglet.media.Source]):
+def get_image_filenames(handle: desper.Handle) -> set[str]:
+    """Get the files whose images may be cached by a handle.
+
+    That is, the absolute filenames used as keys in the module level
+    image cache by :class:`ImageFileHandle` and
+    :class:`RichImageFileHandle` (including spritesheet images, once
+    loaded). Other handles cache no image.
+    """
+    if isinstance(handle, ImageFileHandle):
+        return {pt.abspath(handle.filename)}
+
+    if isinstance(handle, RichImageFileHandle):
+        filenames = {pt.abspath(handle.filename)}
+        if handle._sheet_filename is not None:
+            filenames.add(pt.abspath(handle._sheet_filename))
+        return filenames
+
+    return set()
+
+
+def clear_group_cache():
+    """Clear module level group cache.
+
+    See :meth:`WantsGroupBatch.get_group`.
+    """
+    _group_cache.clear()
+
+
+class MediaFileHandle(TrackedHandle[pyglet.media.Source]):
     """Specialized handle for pyglet's :class:`pyglet.media.Source`.
 
     Given a filename (path string), the :meth:`load` implementation
@@ -90,21 +230,63 @@ class MediaFileHandle(desper.Handle[pyglet.media.Source]):
     :func:`pyglet.media.codecs.get_decoders`.
     If not specified, the first available codec that supports the given
     file format will be used.
+
+    Non streamed sources are retrieved from an :class:`AudioCache`
+    (:attr:`default_audio_cache` if ``audio_cache`` is not specified),
+    meaning that the same file is decoded only once and the resulting
+    source is shared by all the handles loading it. Use
+    :meth:`preload` to decode it in background in advance.
+
+    Streamed sources can be prebuffered by specifying ``prebuffer``
+    (in seconds): a :class:`PrebufferedSource` is then loaded, whose
+    open files are bounded by ``file_pool``
+    (:attr:`default_streaming_file_pool` if not specified).
     """
 
     def __init__(self, filename: str, streaming=False,
-                 decoder: MediaDecoder = None):
+                 decoder: MediaDecoder = None,
+                 audio_cache: Optional[AudioCache] = None,
+                 prebuffer: Optional[float] = None,
+                 file_pool: Optional[StreamingFilePool] = None):
         self.filename = filename
         self.streaming = streaming
         self.decoder = decoder
+        self.audio_cache = audio_cache
+        self.prebuffer = prebuffer
+        self.file_pool = file_pool
+
+    def _get_audio_cache(self) -> AudioCache:
+        if self.audio_cache is None:
+            return default_audio_cache
+        return self.audio_cache
 
     def load(self) -> pyglet.media.Source:
         """Load file with given parameters."""
-        return pyglet.media.load_audio(self.filename, streaming=self.streaming,
-                                       decoder=self.decoder)
+        if self.streaming and self.prebuffer is not None:
+            return PrebufferedSource(self.filename, self.decoder,
+                                     self.prebuffer, self.file_pool)
+
+        if self.streaming:
+            return pyglet.media.load_audio(self.filename, streaming=True,
+                                           decoder=self.decoder)
+
+        return self._get_audio_cache().get(self.filename, self.decoder)
+
+    def preload(self) -> Optional[concurrent.futures.Future]:
+        """Decode the source in background, see :meth:`AudioCache.preload`.
+
+        Following loads will wait for the decoding to end (or find the
+        source already decoded) instead of decoding it again. Streamed
+        sources are opened on load, hence ``None`` is returned for
+        them.
+        """
+        if self.streaming:
+            return None
+
+        return self._get_audio_cache().preload(self.filename, self.decoder)
 
 
-class ImageFileHandle(desper.Handle[Texture]):
+class ImageFileHandle(TrackedHandle[Texture]):
     """Specialized handle for :class:`pyglet.image.AbstractImage`.
 
     Given a filename (path string), the :meth:`load` implementation
@@ -120,6 +302,13 @@ class ImageFileHandle(desper.Handle[Texture]):
     is found in the local cache, as the cached value will be
     directly returned independently from the given parameters.
 
+    Images that do not fit into an atlas are loaded as standalone
+    textures. If ``split_oversized`` is set, such images are instead
+    split into atlas sized tiles and returned as a
+    :class:`TiledImage` (see :func:`split_image`), which can be
+    rendered through :class:`pyglet_desper.TiledSprite`. Splitting has
+    no effect if ``atlas`` is disabled.
+
     A decoder can be specified. Available
     decoders can be inspected through
     :func:`pyglet.image.codecs.get_decoders`.
@@ -130,20 +319,36 @@ class ImageFileHandle(desper.Handle[Texture]):
     def __init__(self, filename: str,
                  atlas=True, border: int = 1,
                  texture_bin: TextureBin | None = None,
-                 decoder: ImageDecoder = None):
+                 decoder: ImageDecoder = None,
+                 split_oversized=False):
         self.filename = filename
         self.atlas = atlas
         self.border = border
         self.texture_bin = texture_bin
         self.decoder = decoder
+        self.split_oversized = split_oversized
 
-    def load(self) -> Texture:
+    def load(self) -> Union[Texture, TiledImage]:
         """Load file with given parameters."""
         abs_filename = pt.abspath(self.filename)
         if abs_filename in _image_cache:
             return _image_cache[abs_filename]
 
-        image = pyglet.image.load(abs_filename, decoder=self.decoder)
+        return self._upload(
+            abs_filename,
+            pyglet.image.load(abs_filename, decoder=self.decoder))
+
+    def _upload(self, abs_filename: str,
+                image: pyglet.image.ImageData
+                ) -> Union[Texture, TiledImage]:
+        """Upload a decoded image as texture and cache it.
+
+        If an image for the same file has been cached in the meantime
+        (e.g. by a concurrent asynchronous load), the cached one is
+        returned instead.
+        """
+        if abs_filename in _image_cache:
+            return _image_cache[abs_filename]
 
         if self.texture_bin is None:
             self.texture_bin = _get_default_texture_bin()
@@ -153,6 +358,12 @@ class ImageFileHandle(desper.Handle[Texture]):
             and image.height + self.border
                 <= self.texture_bin.texture_height):
             image = self.texture_bin.add(image, 1)
+        elif self.atlas and self.split_oversized:
+            image = split_image(
+                image,
+                self.texture_bin.texture_width - 2 * self.border,
+                self.texture_bin.texture_height - 2 * self.border,
+                self.texture_bin, self.border)
 
         _image_cache[abs_filename] = image
         return image
@@ -284,13 +495,17 @@ def load_spritesheet(filename: str) -> Union[Texture, Animation]:
     with open(filename) as file:
         metadata = json.load(file)
 
-    meta = metadata.get('meta', {})
-    image_filename = pt.join(pt.dirname(filename), meta['image'])
+    return parse_spritesheet(
+        ImageFileHandle(_get_sheet_filename(filename, metadata)).load(),
+        metadata)
 
-    return parse_spritesheet(ImageFileHandle(image_filename).load(), metadata)
 
+def _get_sheet_filename(filename: str, metadata: dict) -> str:
+    """Get the image referenced by a spritesheet metadata file."""
+    return pt.join(pt.dirname(filename), metadata.get('meta', {})['image'])
 
-class RichImageFileHandle(desper.Handle[Union[Animation, Texture]]):
+
+class RichImageFileHandle(TrackedHandle[Union[Animation, Texture]]):
     """Specialized handle for image and animation formats.
 
     Given a filename (path string), the :meth:`load` implementation
@@ -302,10 +517,15 @@ class RichImageFileHandle(desper.Handle[Union[Animation, Texture]]):
         see :class:`pyglet.image.codecs.get_animation_decoders`)
     - As a :class:`pyglet.image.AbstractImage` (same behaviour of
         :class:`ImageFileHandle`).
+
+    ``split_oversized`` is forwarded to :class:`ImageFileHandle` when
+    loading standard images.
     """
+    _sheet_filename: Optional[str] = None
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, split_oversized=False):
         self.filename = filename
+        self.split_oversized = split_oversized
 
     def load(self) -> Union[Animation, Texture]:
         """Load designated file.
@@ -319,9 +539,15 @@ class RichImageFileHandle(desper.Handle[Union[Animation, Texture]]):
         """
         # Try decoding it as json metadata
         try:
-            return load_spritesheet(self.filename)
+            with open(self.filename) as file:
+                metadata = json.load(file)
         except (json.JSONDecodeError, UnicodeDecodeError):
             pass
+        else:
+            self._sheet_filename = _get_sheet_filename(self.filename,
+                                                       metadata)
+            return parse_spritesheet(
+                ImageFileHandle(self._sheet_filename).load(), metadata)
 
         # Try decoding it as animation
         try:
@@ -334,10 +560,11 @@ class RichImageFileHandle(desper.Handle[Union[Animation, Texture]]):
             pass
 
         # Otherwise, it is likely an image
-        return ImageFileHandle(self.filename).load()
+        return ImageFileHandle(
+            self.filename, split_oversized=self.split_oversized).load()
 
 
-class FontFileHandle(desper.Handle[None]):
+class FontFileHandle(TrackedHandle[None]):
     """Specialized handle for font loading.
 
     This is a thin wrapper over font files. No resource is
@@ -362,6 +589,7 @@ def default_processors_transformer(world_handle: desper.WorldHandle,
     Populate ``world`` with default pyglet based processors, i.e.:
 
     - :class:`pyglet-desper.CameraProcessor`
+    - :class:`pyglet-desper.AnimationProcessor`
 
     Note that despite the similarity, this does not substitute
     desper's :func:`desper.default_processors_transformer`, as it
@@ -369,6 +597,7 @@ def default_processors_transformer(world_handle: desper.WorldHandle,
     both desper's original transformer and this one shall be used.
     """
     world.add_processor(CameraProcessor())
+    world.add_processor(AnimationProcessor())
 
 
 def retrieve_batch(world: Optional[desper.World] = None
@@ -433,6 +662,22 @@ class WantsGroupBatch:
     def build_group(self) -> Group:
         return self.group_factory(self.order)
 
+    def get_group(self) -> Group:
+        """Retrieve a shared group for this component.
+
+        Groups are built through :meth:`build_group` and interned based
+        on ``(group_factory, order)``, meaning that components with the
+        same parameters will receive the very same group instance.
+        Use :meth:`build_group` to get a fresh group instead.
+        """
+        key = self.group_factory, self.order
+        group = _group_cache.get(key)
+        if group is None:
+            group = self.build_group()
+            _group_cache[key] = group
+
+        return group
+
 
 def init_graphics_transformer(world_handle: desper.WorldHandle,
                               world: desper.World):
@@ -449,39 +694,61 @@ def init_graphics_transformer(world_handle: desper.WorldHandle,
     the user and included in a camera if desired. This also means that
     all found graphical components will be assigned to the same batch
     (usually the best option anyway).
-    The :class:`WantsGroupBatch` class is also used to build a
-    :class:`pyglet.graphics.Group`. Note that this approach is mainly
-    there in order to correctly initialize graphics in worlds loaded
-    from files. Standard approach would be creating pyglet components
-    directly, assigning the desired group and batch (eventually
-    retrieving it with :func:`retrieve_batch`).
-
-    Graphical components are discovered by querying the following
-    class hierarchies:
+    The :class:`WantsGroupBatch` class is also used to retrieve a
+    :class:`pyglet.graphics.Group` (see
+    :meth:`WantsGroupBatch.get_group`, groups are shared among
+    components with equivalent parameters). The batch is retrieved
+    only once and everything is resolved in a single pass over the
+    entities having a :class:`WantsGroupBatch`.
+    Note that this approach is mainly there in order to correctly
+    initialize graphics in worlds loaded from files. Standard approach
+    would be creating pyglet components directly, assigning the
+    desired group and batch (eventually retrieving it with
+    :func:`retrieve_batch`).
+
+    Graphical components are recognized as instances of the following
+    class hierarchies (see :attr:`GRAPHIC_BASE_CLASSES`):
 
     - :class:`pyglet.text.layout.TextLayout`, base class for all text
         related classes
     - :class:`pyglet.sprite.Sprite`, base class for all sprites
+    - :class:`pyglet_desper.TiledSprite`, for images split in tiles
+    - :class:`pyglet_desper.BatchedShape`, base class for shapes
+        rendered through a :class:`pyglet_desper.ShapeBatch`
+    - :class:`pyglet_desper.Tilemap`, for chunked tile maps
 
-    Shapes are not evaluated (shall be manually managed by the user)
-    since pyglet shapes do not currently support properties
+    Plain pyglet shapes are not evaluated (shall be manually managed by
+    the user) since they do not currently support properties
     ``group`` and ``batch``.
     """
-    for graphics_type in GRAPHIC_BASE_CLASSES:
-        for entity, graphics in world.get(graphics_type):
-            # If WantsGroupBatch is found, it means that the
-            # associated pyglet component needs a batch and a group
-            wants = world.get_component(entity, WantsGroupBatch)
-            if wants is not None:
-                graphics.group = wants.build_group()
-                graphics.batch = retrieve_batch(world)
-
-    # Cleanup unneeded components
-    for entity, _ in world.get(WantsGroupBatch):
+    # Batch is lazily retrieved once, only if needed
+    batch = None
+
+    # Only entities that have a WantsGroupBatch are of interest, it
+    # means that their pyglet components need a batch and a group
+    for entity, wants in world.get(WantsGroupBatch):
+        for component in world.get_components(entity):
+            if not isinstance(component, GRAPHIC_BASE_CLASSES):
+                continue
+
+            if batch is None:
+                batch = retrieve_batch(world)
+
+            if isinstance(component, (BatchedShape, Tilemap)):
+                component.migrate(batch, wants.get_group())
+            else:
+                # Group first: unbatched components rebuild their
+                # vertices only once, when the batch is set
+                component.group = wants.get_group()
+                component.batch = batch
+
+        # Cleanup unneeded component
         world.remove_component(entity, WantsGroupBatch)
 
 
-def world_from_file_handle(filename: str) -> desper.WorldFromFileHandle:
+def world_from_file_handle(filename: str,
+                           cache: Optional[WorldCache] = None
+                           ) -> desper.WorldFromFileHandle:
     """Construct a world handle for pyglet based worlds.
 
 
@@ -492,15 +759,71 @@ def world_from_file_handle(filename: str) -> desper.WorldFromFileHandle:
         :class:`desper.Processor`s
     - :func:`init_graphics_transformer`, for the correct initialization
         of pyglet components instantiated from file
+
+    If the given file is a binary world file (see
+    :mod:`pyglet_desper.binary_world`), the JSON transformer is
+    replaced by a :class:`BinaryWorldFromFileTransformer`.
+
+    If a :class:`WorldCache` is given, the JSON transformer is
+    instead replaced by a :class:`CachedWorldFromFileTransformer`, so
+    that decoded data is reused by following loads of the same file
+    (for both formats).
     """
     handle = desper.WorldFromFileHandle(filename)
+    functions = handle.transform_functions
+    for i, function in enumerate(functions):
+        if not isinstance(function, desper.WorldFromFileTransformer):
+            continue
+
+        if (cache is not None and list(function.dict_transformers)
+                == list(DEFAULT_DICT_TRANSFORMERS)):
+            functions[i] = CachedWorldFromFileTransformer(
+                cache, function.dict_transformers)
+        elif is_binary_world_file(filename):
+            functions[i] = BinaryWorldFromFileTransformer()
+
     handle.transform_functions.appendleft(default_processors_transformer)
     handle.transform_functions.append(init_graphics_transformer)
 
     return handle
 
 
-resource_populator = desper.DirectoryResourcePopulator()
+def preload_media(resource_map: desper.ResourceMap
+                  ) -> list[concurrent.futures.Future]:
+    """Decode in background all the media found in a resource map.
+
+    :meth:`MediaFileHandle.preload` is called on all the
+    non streamed :class:`MediaFileHandle` instances of the given map
+    and of its submaps, recursively. Return the futures of all the
+    started loads.
+
+    Handles that are already cached are skipped.
+    """
+    futures = []
+    maps = [resource_map]
+    while maps:
+        current_map = maps.pop()
+        maps.extend(current_map.maps.values())
+        for handle in current_map.handles.values():
+            if (isinstance(handle, MediaFileHandle) and not handle.cached
+                    and not handle.streaming):
+                futures.append(handle.preload())
+
+    return futures
+
+
+def _build_resource_populator() -> desper.DirectoryResourcePopulator:
+    populator = desper.DirectoryResourcePopulator()
+    populator.add_rule(MEDIA_DIRECTORY, MediaFileHandle)
+    populator.add_rule(MEDIA_STREAMING_DIRECTORY, MediaFileHandle,
+                       streaming=True)
+    populator.add_rule(FONT_DIRECTORY, FontFileHandle)
+    populator.add_rule(IMAGE_DIRECTORY, RichImageFileHandle)
+    populator.add_rule(WORLD_DIRECTORY, world_from_file_handle)
+    return populator
+
+
+resource_populator: desper.DirectoryResourcePopulator
 """Default directory resource populator.
 
 Enables populating a :class:`desper.ResourceMap` from a directory
@@ -519,10 +842,22 @@ The used :class:`Handle` factories are:
 - :class:`FontFileHandle` for font resources
 - :class:`RichImageFileHandle` for image and animation resources
 - :class:`world_from_file_handle` for world resources
+
+Streamed media are not prebuffered. To prebuffer them, populate the
+``media/streaming`` directory through a custom rule, e.g.::
+
+    populator = desper.DirectoryResourcePopulator()
+    populator.add_rule(MEDIA_STREAMING_DIRECTORY, MediaFileHandle,
+                       streaming=True, prebuffer=DEFAULT_PREBUFFER_SECONDS)
+
+Built on first access.
 """
-resource_populator.add_rule(MEDIA_DIRECTORY, MediaFileHandle)
-resource_populator.add_rule(MEDIA_STREAMING_DIRECTORY, MediaFileHandle,
-                            streaming=True)
-resource_populator.add_rule(FONT_DIRECTORY, FontFileHandle)
-resource_populator.add_rule(IMAGE_DIRECTORY, RichImageFileHandle)
-resource_populator.add_rule(WORLD_DIRECTORY, world_from_file_handle)
+
+
+def __getattr__(name: str):
+    if name == 'resource_populator':
+        global resource_populator
+        resource_populator = _build_resource_populator()
+        return resource_populator
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
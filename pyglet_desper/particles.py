@@ -0,0 +1,449 @@
+"""Vectorized particle systems.
+
+Emulating particles through sprites (e.g. :class:`Sprite` and
+:class:`SpriteSync` for each particle) costs a Python object, a
+vertex list and event handlers for each one of them. A
+:class:`ParticleEmitter` instead keeps the state of all its particles
+(position, velocity, age, lifetime, color, frame) in NumPy arrays,
+updates them in a single vectorized step (see
+:meth:`ParticleEmitter.update`) and renders them from a single vertex
+list, usually part of a :class:`Camera`'s batch.
+
+Emitters are updated once per world processing (i.e. once per
+:meth:`Loop.iteration`) by a :class:`ParticleProcessor`. They expose a
+``position`` so that they can be synchronized with
+:class:`desper.Transform2D` through :class:`PositionSync2D` (see
+:func:`particle_emitter_sync_component`).
+
+This module requires NumPy, which is an optional dependency
+(``pip install pyglet-desper[particles]``).
+"""
+import math
+from typing import Optional, Union
+
+import desper
+import numpy as np
+import pyglet
+from pyglet.enums import BlendFactor, GeometryMode
+
+from pyglet_desper.logic import GraphicPool, PositionSync2D
+from pyglet_desper.model import retrieve_batch
+
+_QUAD_INDICES = np.array((0, 1, 2, 0, 2, 3))
+
+
+def _get_frames(image) -> list:
+    """Get the list of frames from an image, animation or sequence."""
+    if isinstance(image, pyglet.image.Animation):
+        return [frame.image.get_texture() for frame in image.frames]
+    if hasattr(image, 'get_texture'):
+        return [image.get_texture()]
+    return [frame.get_texture() for frame in image]
+
+
+def _as_range(value: Union[float, tuple[float, float]]
+              ) -> tuple[float, float]:
+    """Get a ``(min, max)`` pair from a number or a pair."""
+    if isinstance(value, (int, float)):
+        return value, value
+    return tuple(value)
+
+
+def _as_rgba(color: tuple[int, ...]) -> tuple[int, int, int, int]:
+    r, g, b, *a = color
+    return r, g, b, a[0] if a else 255
+
+
+@desper.event_handler('on_add', desper.ON_REMOVE_EVENT_NAME)
+class ParticleEmitter:
+    """Emit, simulate and render particles in bulk.
+
+    Particles are spawned at the emitter :attr:`position`, at the given
+    ``rate`` (particles per second, see also :meth:`emit`), with a
+    random lifetime and speed (in the given ``(min, max)`` ranges, or
+    fixed if single numbers are given), moving towards ``direction``
+    (counterclockwise, in degrees) plus a random deviation within
+    ``spread`` degrees. ``gravity`` is a constant acceleration applied
+    to all particles. Once spawned, particles move independently from
+    the emitter.
+
+    At most ``capacity`` particles are alive at once, further spawns
+    are dropped. Colors are interpolated from ``color_start`` to
+    ``color_end`` during the life of each particle.
+
+    ``image`` is an image, a :class:`pyglet.image.Animation` or a
+    sequence of images, all belonging to the same texture (e.g. an
+    atlas, or a spritesheet loaded through
+    :func:`pyglet_desper.parse_spritesheet`). Frames are evenly
+    distributed over the life of each particle.
+
+    If no ``batch`` is given, one is retrieved when the emitter is
+    added to a world (see :func:`retrieve_batch`), so that particles
+    are rendered by the world's camera. Otherwise, use :meth:`draw`.
+
+    Vertices are freed when the emitter is removed from its world (see
+    :meth:`delete`). A deleted emitter builds them again once made
+    :attr:`visible` (e.g. when reused by a :class:`GraphicPool`).
+    """
+
+    def __init__(self, image, x=0., y=0., z=0., capacity: int = 1000,
+                 rate: float = 100.,
+                 lifetime: Union[float, tuple[float, float]] = 1.,
+                 speed: Union[float, tuple[float, float]] = 100.,
+                 direction: float = 90., spread: float = 360.,
+                 gravity: tuple[float, float] = (0., 0.),
+                 color_start: tuple[int, ...] = (255, 255, 255, 255),
+                 color_end: Optional[tuple[int, ...]] = None,
+                 blend_src=BlendFactor.SRC_ALPHA,
+                 blend_dest=BlendFactor.ONE_MINUS_SRC_ALPHA,
+                 batch: Optional[pyglet.graphics.Batch] = None,
+                 group: Optional[pyglet.graphics.Group] = None,
+                 program: Optional[pyglet.graphics.ShaderProgram] = None,
+                 seed: Optional[int] = None):
+        self._x = x
+        self._y = y
+        self._z = z
+        self.capacity = capacity
+        self.rate = rate
+        self.lifetime = _as_range(lifetime)
+        self.speed = _as_range(speed)
+        self.direction = direction
+        self.spread = spread
+        self.gravity = gravity
+        self.color_start = _as_rgba(color_start)
+        self.color_end = _as_rgba(color_end or color_start)
+        self.emitting = True
+        self._visible = True
+
+        self._frames = _get_frames(image)
+        texture = self._frames[0]
+        assert all(frame.id == texture.id for frame in self._frames), (
+            'All frames of a particle emitter must belong to the same '
+            'texture')
+
+        # Per frame vertices and texture coordinates
+        self._frame_vertices = np.array([
+            (-frame.anchor_x, -frame.anchor_y, 0.,
+             frame.width - frame.anchor_x, -frame.anchor_y, 0.,
+             frame.width - frame.anchor_x, frame.height - frame.anchor_y, 0.,
+             -frame.anchor_x, frame.height - frame.anchor_y, 0.)
+            for frame in self._frames], dtype=np.float32).reshape(-1, 4, 3)
+        self._frame_tex_coords = np.array(
+            [frame.tex_coords for frame in self._frames],
+            dtype=np.float32).reshape(-1, 4, 3)
+
+        # Particle state
+        self._rng = np.random.default_rng(seed)
+        self._count = 0
+        self._drawn_count = 0
+        self._emit_accumulator = 0.
+        self._positions = np.zeros((capacity, 2), dtype=np.float32)
+        self._velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self._ages = np.zeros(capacity, dtype=np.float32)
+        self._lifetimes = np.ones(capacity, dtype=np.float32)
+
+        self.program = program or pyglet.sprite.get_default_shader()
+        self._blend_src = blend_src
+        self._blend_dest = blend_dest
+        self._batch = batch
+        self._user_group = group
+        self._group = pyglet.sprite.SpriteGroup(
+            texture, blend_src, blend_dest, self.program, group)
+        self._vertex_list = None
+        self._create_vertex_list()
+
+    def _create_vertex_list(self):
+        vertices = self.capacity * 4
+        indices = (np.arange(self.capacity)[:, None] * 4
+                   + _QUAD_INDICES).ravel().tolist()
+        self._vertex_list = self.program.vertex_list_indexed(
+            vertices, GeometryMode.TRIANGLES, indices, self._batch,
+            self._group,
+            position=('f', (0.,) * vertices * 3),
+            colors=('Bn', (0,) * vertices * 4),
+            translate=('f', (0.,) * vertices * 3),
+            scale=('f', (1.,) * vertices * 2),
+            rotation=('f', (0.,) * vertices),
+            tex_coords=('f', (0.,) * vertices * 3))
+        self._drawn_count = 0
+        self._write_vertices()
+
+    @property
+    def count(self) -> int:
+        """Number of particles currently alive."""
+        return self._count
+
+    @property
+    def frames(self) -> list:
+        """Frames rendered during the life of each particle."""
+        return list(self._frames)
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Positions of alive particles, as a read-only array."""
+        view = self._positions[:self._count]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Velocities of alive particles, as a read-only array."""
+        view = self._velocities[:self._count]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def ages(self) -> np.ndarray:
+        """Time (in seconds) since each alive particle spawned."""
+        view = self._ages[:self._count]
+        view.flags.writeable = False
+        return view
+
+    def get_colors(self) -> np.ndarray:
+        """Get the current ``(r, g, b, a)`` of alive particles."""
+        progress = self._ages[:self._count] / self._lifetimes[:self._count]
+        start = np.array(self.color_start, dtype=np.float32)
+        end = np.array(self.color_end, dtype=np.float32)
+        return (start + (end - start) * progress[:, None]).astype(np.uint8)
+
+    def get_frame_indices(self) -> np.ndarray:
+        """Get the index of the current frame of alive particles."""
+        progress = self._ages[:self._count] / self._lifetimes[:self._count]
+        return np.minimum((progress * len(self._frames)).astype(np.intp),
+                          len(self._frames) - 1)
+
+    @property
+    def position(self) -> tuple[float, float, float]:
+        return self._x, self._y, self._z
+
+    @position.setter
+    def position(self, position: tuple[float, ...]):
+        """Set ``(x, y)`` or ``(x, y, z)``.
+
+        If ``z`` is omitted, it is left untouched.
+        """
+        self._x, self._y, *z = position
+        if z:
+            self._z = z[0]
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, x: float):
+        self._x = x
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, y: float):
+        self._y = y
+
+    @property
+    def z(self) -> float:
+        return self._z
+
+    @z.setter
+    def z(self, z: float):
+        self._z = z
+
+    @property
+    def visible(self) -> bool:
+        """Whether particles are rendered.
+
+        Hidden emitters keep simulating their particles.
+        """
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._visible = visible
+        if self._vertex_list is None:
+            if visible:
+                self._create_vertex_list()
+            return
+        self._write_vertices()
+
+    @property
+    def batch(self) -> Optional[pyglet.graphics.Batch]:
+        return self._batch
+
+    @batch.setter
+    def batch(self, batch: Optional[pyglet.graphics.Batch]):
+        if self._batch is batch:
+            return
+
+        self._batch = batch
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._create_vertex_list()
+
+    @property
+    def group(self) -> Optional[pyglet.graphics.Group]:
+        return self._user_group
+
+    @group.setter
+    def group(self, group: Optional[pyglet.graphics.Group]):
+        if self._user_group == group:
+            return
+
+        self._user_group = group
+        self._group = pyglet.sprite.SpriteGroup(
+            self._frames[0], self._blend_src, self._blend_dest,
+            self.program, group)
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._create_vertex_list()
+
+    def emit(self, count: int):
+        """Spawn the given number of particles immediately.
+
+        Spawns exceeding :attr:`capacity` are dropped.
+        """
+        start = self._count
+        count = min(count, self.capacity - start)
+        if count <= 0:
+            return
+        end = start + count
+        rng = self._rng
+
+        angles = np.radians(self.direction + rng.uniform(
+            -self.spread / 2, self.spread / 2, count))
+        speeds = rng.uniform(*self.speed, count)
+
+        self._positions[start:end] = self._x, self._y
+        self._velocities[start:end, 0] = np.cos(angles) * speeds
+        self._velocities[start:end, 1] = np.sin(angles) * speeds
+        self._ages[start:end] = 0.
+        self._lifetimes[start:end] = rng.uniform(*self.lifetime, count)
+        self._count = end
+
+    def clear(self):
+        """Remove all particles."""
+        self._count = 0
+        self._emit_accumulator = 0.
+        self._write_vertices()
+
+    def update(self, dt: float):
+        """Advance the simulation of all particles by ``dt`` seconds.
+
+        Particles that exceed their lifetime are removed, the others
+        are moved, then new particles are spawned (if :attr:`emitting`)
+        and vertices are rewritten. Each of these is a single
+        vectorized operation on all particles.
+        """
+        count = self._count
+        if count:
+            ages = self._ages[:count]
+            ages += dt
+            alive = ages < self._lifetimes[:count]
+            if not alive.all():
+                # Compact alive particles at the beginning of arrays
+                indices = np.flatnonzero(alive)
+                count = len(indices)
+                for values in (self._positions, self._velocities,
+                               self._ages, self._lifetimes):
+                    values[:count] = values[indices]
+                self._count = count
+
+            velocities = self._velocities[:count]
+            velocities += np.multiply(self.gravity, dt, dtype=np.float32)
+            self._positions[:count] += velocities * dt
+
+        if self.emitting and self.rate > 0:
+            self._emit_accumulator += self.rate * dt
+            spawns = math.floor(self._emit_accumulator)
+            self._emit_accumulator -= spawns
+            self.emit(spawns)
+
+        self._write_vertices()
+
+    def _write_vertices(self):
+        """Write vertex data of alive particles.
+
+        Vertices of particles that died since the last writing (or of
+        all particles, if not :attr:`visible`) are collapsed.
+        """
+        vertex_list = self._vertex_list
+        if vertex_list is None:
+            return
+
+        count = self._count if self._visible else 0
+        capacity = self.capacity
+
+        vertices = np.ctypeslib.as_array(vertex_list.position).reshape(
+            capacity, 4, 3)
+        if self._drawn_count > count:
+            vertices[count:self._drawn_count] = 0.
+        self._drawn_count = count
+        if not count:
+            return
+
+        frame_indices = self.get_frame_indices()
+        vertices[:count] = self._frame_vertices[frame_indices]
+
+        np.ctypeslib.as_array(vertex_list.tex_coords).reshape(
+            capacity, 4, 3)[:count] = self._frame_tex_coords[frame_indices]
+
+        translations = np.ctypeslib.as_array(vertex_list.translate).reshape(
+            capacity, 4, 3)
+        translations[:count, :, :2] = self._positions[:count, None]
+        translations[:count, :, 2] = self._z
+
+        np.ctypeslib.as_array(vertex_list.colors).reshape(
+            capacity, 4, 4)[:count] = self.get_colors()[:, None]
+
+    def draw(self):
+        """Draw all particles, for emitters that are not batched."""
+        if self._vertex_list is None:
+            return
+
+        ctx = pyglet.graphics.api.core.current_context
+        self._group.set_state_recursive(ctx)
+        self._vertex_list.draw(GeometryMode.TRIANGLES)
+        self._group.unset_state_recursive(ctx)
+
+    def delete(self):
+        """Free all vertices from video memory.
+
+        Alive particles are removed as well.
+        """
+        self._count = 0
+        self._emit_accumulator = 0.
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._vertex_list = None
+
+    def on_add(self, entity, world: desper.World):
+        """Join the world's batch, if no batch was given."""
+        if self._batch is None:
+            self.batch = retrieve_batch(world)
+
+    def on_remove(self, entity, world: desper.World):
+        """Free vertices when removed from the world."""
+        self.delete()
+
+
+class ParticleProcessor(desper.Processor):
+    """Update all :class:`ParticleEmitter`s of the world.
+
+    Each emitter is updated in a single vectorized step (see
+    :meth:`ParticleEmitter.update`) once per :meth:`process`.
+    """
+
+    def process(self, dt):
+        """Update all particle emitters."""
+        for _, emitter in self.world.get(ParticleEmitter):
+            emitter.update(dt)
+
+
+def particle_emitter_sync_component(
+        pool: Optional[GraphicPool] = None) -> PositionSync2D:
+    """Get a sync component for :class:`ParticleEmitter`s.
+
+    See :class:`PositionSync2D`.
+    """
+    return PositionSync2D(ParticleEmitter, pool)
@@ -0,0 +1,318 @@
+"""Track the resources used by worlds, to free them selectively.
+
+Clearing a world handle (e.g. through :meth:`Loop.switch` with
+``clear_current``) does not free the resources its world pulled:
+images are still retained by the module level image cache (see
+:func:`clear_image_cache`), while clearing it entirely forces the
+next world to reload the resources it shares with the previous one.
+
+A :class:`ResourceUsage` keeps track of the handles each world used,
+with reference counting across worlds. Releasing a world frees exactly
+the resources no longer used by any other tracked world. Enable it
+through the ``resource_usage`` parameter of :class:`Loop`.
+
+Similarly, a :class:`ResourceManifest` records the resources used by
+each world during play sessions, so that they can be saved to file and
+preloaded in following sessions, avoiding hitches when they are first
+needed.
+
+Only handles subclassing :class:`TrackedHandle` are tracked, which is
+the case for all the handles provided by this package.
+"""
+import collections
+import contextlib
+import json
+from typing import Optional, TypeVar
+
+import desper
+
+_T = TypeVar('_T')
+
+_attached_usages: list = []
+
+
+class TrackedHandle(desper.Handle[_T]):
+    """Handle whose calls are recorded by attached resource usages.
+
+    See :meth:`ResourceUsage.attach` and :meth:`ResourceManifest.attach`.
+    Calls are recorded whether the resource is already cached or not.
+    """
+
+    def __call__(self) -> _T:
+        """Cache and return the wrapped resource."""
+        for usage in _attached_usages:
+            usage.record(self)
+
+        return super().__call__()
+
+
+class ResourceUsage:
+    """Reference count handles across worlds.
+
+    Handles are associated to world handles through :meth:`use`, or
+    automatically when called (see :class:`TrackedHandle`) while the
+    usage is attached (:meth:`attach`) and a world is being tracked
+    (:attr:`current`, or :meth:`recording`).
+
+    :meth:`release` drops the handles of a world, freeing the ones that
+    are not used by any other world (see :meth:`free`).
+    """
+
+    def __init__(self):
+        self.current: Optional[desper.Handle[desper.World]] = None
+        self.freed = 0
+        self._world_handles: dict[desper.Handle[desper.World],
+                                  set[desper.Handle]] = {}
+        self._counts: collections.Counter[desper.Handle] = \
+            collections.Counter()
+
+    def attach(self):
+        """Start recording calls of tracked handles."""
+        if self not in _attached_usages:
+            _attached_usages.append(self)
+
+    def detach(self):
+        """Stop recording calls of tracked handles."""
+        if self in _attached_usages:
+            _attached_usages.remove(self)
+
+    @property
+    def world_handles(self) -> tuple[desper.Handle[desper.World], ...]:
+        """World handles currently tracked."""
+        return tuple(self._world_handles)
+
+    def get_handles(self, world_handle: desper.Handle[desper.World]
+                    ) -> frozenset[desper.Handle]:
+        """Get the handles used by a world."""
+        return frozenset(self._world_handles.get(world_handle, ()))
+
+    def get_count(self, handle: desper.Handle) -> int:
+        """Get the number of worlds using a handle."""
+        return self._counts[handle]
+
+    def use(self, world_handle: desper.Handle[desper.World],
+            *handles: desper.Handle):
+        """Mark handles as used by a world."""
+        world_handles = self._world_handles.setdefault(world_handle, set())
+        for handle in handles:
+            if handle not in world_handles:
+                world_handles.add(handle)
+                self._counts[handle] += 1
+
+    def record(self, handle: desper.Handle):
+        """Mark a handle as used by :attr:`current`, if any."""
+        if self.current is not None:
+            self.use(self.current, handle)
+
+    @contextlib.contextmanager
+    def recording(self, world_handle: desper.Handle[desper.World]):
+        """Attribute handle calls to the given world in a context.
+
+        Typically, used while loading the world.
+        """
+        previous = self.current
+        self.current = world_handle
+        try:
+            yield
+        finally:
+            self.current = previous
+
+    def release(self, world_handle: desper.Handle[desper.World],
+                free: bool = True) -> list[desper.Handle]:
+        """Stop tracking a world, freeing resources only it used.
+
+        Return the list of handles that are not used anymore. If
+        ``free`` is ``False``, they are not freed (see :meth:`free`).
+        """
+        unused = []
+        for handle in self._world_handles.pop(world_handle, ()):
+            self._counts[handle] -= 1
+            if self._counts[handle] <= 0:
+                del self._counts[handle]
+                unused.append(handle)
+
+        if free:
+            self.free(unused)
+        return unused
+
+    def free(self, handles: list[desper.Handle]):
+        """Free the given handles.
+
+        Handles are cleared. Images cached by them are removed from the
+        module level image cache, unless they are used by a handle
+        still in use (see :func:`get_image_filenames`).
+
+        Images packed in texture bins are not removed from their
+        atlases, which pyglet does not support: their memory is
+        reclaimed only once whole atlases are discarded.
+        """
+        # Imported here, as model depends on this module
+        from pyglet_desper.model import _image_cache, get_image_filenames
+
+        if not handles:
+            return
+
+        used_filenames = set()
+        for handle in self._counts:
+            used_filenames.update(get_image_filenames(handle))
+
+        for handle in handles:
+            for filename in get_image_filenames(handle):
+                if filename not in used_filenames:
+                    _image_cache.pop(filename, None)
+            handle.clear()
+
+        self.freed += len(handles)
+
+
+def get_handle_key(handle: desper.Handle) -> Optional[str]:
+    """Get the full key of a handle in its resource map.
+
+    That is, the key to be used on the root :class:`desper.ResourceMap`
+    to retrieve the handle (e.g. ``'image/enemies/bat'``). If the handle
+    is not part of a resource map, ``None`` is returned.
+    """
+    keys = []
+    node = handle
+    while node.parent is not None:
+        keys.append(node.key)
+        node = node.parent
+
+    if not keys or not isinstance(node, desper.ResourceMap):
+        return None
+    return node.split_char.join(reversed(keys))
+
+
+def _get_root_map(handle: desper.Handle) -> Optional[desper.ResourceMap]:
+    """Get the root :class:`desper.ResourceMap` of a handle, if any."""
+    root_map = handle
+    while root_map.parent is not None:
+        root_map = root_map.parent
+
+    if isinstance(root_map, desper.ResourceMap):
+        return root_map
+    return None
+
+
+RESOURCE_MANIFEST_VERSION = 1
+"""Version of the files written by :meth:`ResourceManifest.save`."""
+
+
+class ResourceManifest:
+    """Resources used by each world, identified by their keys.
+
+    A manifest maps the keys of world handles to the keys of the
+    resources they use (see :func:`get_handle_key`), so that it can be
+    saved to file (:meth:`save`) and loaded back (:meth:`load`) in
+    following sessions. Only handles and worlds belonging to a
+    :class:`desper.ResourceMap` can be part of a manifest.
+
+    A manifest is recorded by attaching it (see :meth:`attach`): calls
+    of tracked handles (see :class:`TrackedHandle`) are then recorded
+    for the world in :attr:`current`. Recorded resources are
+    accumulated, never removed, so that a whole play session can be
+    captured.
+
+    Once recorded, :meth:`preload` and :meth:`iter_preload` load all
+    the resources of a world in advance, e.g. before switching to it or
+    during a loading screen. Give the manifest to :class:`Loop` to
+    record or preload it automatically at each switch.
+    """
+
+    def __init__(self, worlds: Optional[dict[str, set[str]]] = None):
+        self.worlds: dict[str, set[str]] = {
+            world_key: set(keys) for world_key, keys in (worlds or {}).items()}
+        self.current: Optional[desper.Handle[desper.World]] = None
+
+    def attach(self):
+        """Start recording calls of tracked handles."""
+        if self not in _attached_usages:
+            _attached_usages.append(self)
+
+    def detach(self):
+        """Stop recording calls of tracked handles."""
+        if self in _attached_usages:
+            _attached_usages.remove(self)
+
+    @property
+    def recording(self) -> bool:
+        """Whether the manifest is attached."""
+        return self in _attached_usages
+
+    def record(self, handle: desper.Handle):
+        """Add a handle to the resources of :attr:`current`, if any."""
+        if self.current is None:
+            return
+
+        world_key = get_handle_key(self.current)
+        key = get_handle_key(handle)
+        if world_key is not None and key is not None:
+            self.worlds.setdefault(world_key, set()).add(key)
+
+    def get_keys(self, world_handle: desper.Handle[desper.World]
+                 ) -> list[str]:
+        """Get the sorted keys of the resources used by a world."""
+        return sorted(self.worlds.get(get_handle_key(world_handle), ()))
+
+    def get_handles(self, world_handle: desper.Handle[desper.World]
+                    ) -> list[desper.Handle]:
+        """Get the handles of the resources used by a world.
+
+        Handles are retrieved from the resource map of the world
+        handle. Keys that are not found (e.g. removed resources) are
+        skipped.
+        """
+        root_map = _get_root_map(world_handle)
+        if root_map is None:
+            return []
+
+        handles = []
+        for key in self.get_keys(world_handle):
+            handle = root_map.get(key)
+            if isinstance(handle, desper.Handle):
+                handles.append(handle)
+        return handles
+
+    def iter_preload(self, world_handle: desper.Handle[desper.World]):
+        """Load the resources of a world, one at a time.
+
+        After each resource is loaded, a pair ``(loaded, total)`` is
+        yielded, so that loading can be spread across frames (e.g. by
+        a loading screen) and its progress reported.
+        """
+        handles = [handle for handle in self.get_handles(world_handle)
+                   if not handle.cached]
+        for index, handle in enumerate(handles):
+            handle()
+            yield index + 1, len(handles)
+
+    def preload(self, world_handle: desper.Handle[desper.World]) -> int:
+        """Load the resources of a world, return how many were loaded."""
+        loaded = 0
+        for loaded, _ in self.iter_preload(world_handle):
+            pass
+        return loaded
+
+    @classmethod
+    def load(cls, filename: str) -> 'ResourceManifest':
+        """Load a manifest from file, see :meth:`save`.
+
+        A missing file results in an empty manifest.
+        """
+        try:
+            with open(filename) as fin:
+                manifest_dict = json.load(fin)
+        except FileNotFoundError:
+            return cls()
+
+        if manifest_dict.get('version') != RESOURCE_MANIFEST_VERSION:
+            raise ValueError(f'Unsupported manifest version in {filename}')
+        return cls(manifest_dict.get('worlds', {}))
+
+    def save(self, filename: str):
+        """Save the manifest to file, as JSON."""
+        with open(filename, 'w') as fout:
+            json.dump({'version': RESOURCE_MANIFEST_VERSION,
+                       'worlds': {world_key: sorted(keys) for world_key, keys
+                                  in sorted(self.worlds.items())}},
+                      fout, indent=1)
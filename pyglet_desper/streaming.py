@@ -0,0 +1,401 @@
+"""Stream large levels in spatial chunks.
+
+Levels too large to be kept entirely in a single :class:`desper.World`
+can be split in square chunks (see :func:`split_world_file`), each
+stored on disk as a binary world file (see
+:mod:`pyglet_desper.binary_world`). A
+:class:`ChunkStreamingProcessor` then keeps in the world only the
+chunks around the camera: chunk files are decoded on background
+threads, while entities (and their graphics, through sync components
+like :class:`SpriteSync`) are created and deleted on the main thread,
+as the camera moves.
+
+A chunk directory has the following structure::
+
+    chunks
+    ├── index.json              chunk size and list of chunks
+    ├── base.pdwb               processors and non spatial entities
+    ├── chunk_0_0.pdwb
+    ├── chunk_0_1.pdwb
+    └── ...
+
+The base world is meant to be loaded as usual (e.g. through
+:func:`world_from_file_handle`), while chunk files are only meant to
+be streamed.
+"""
+import concurrent.futures
+import json
+import math
+import os
+import os.path as pt
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+import desper
+
+from pyglet_desper.logic import Camera, CameraTransform2D
+from pyglet_desper.binary_world import (DEFAULT_BLOCK_SIZE, WorldSnapshot,
+                                        is_binary_world_file,
+                                        read_binary_world,
+                                        read_world_snapshot,
+                                        write_binary_world)
+from pyglet_desper.world_cache import WorldCache
+from pyglet_desper.model import init_graphics_transformer
+
+CHUNK_INDEX_FILENAME = 'index.json'
+"""Name of the index file in chunk directories."""
+
+BASE_WORLD_FILENAME = 'base.pdwb'
+"""Name of the base world file in chunk directories."""
+
+Chunk = tuple[int, int]
+
+
+def get_chunk_filename(directory: str, chunk: Chunk) -> str:
+    """Get the filename of the given chunk."""
+    return pt.join(directory, f'chunk_{chunk[0]}_{chunk[1]}.pdwb')
+
+
+def get_chunk(position: tuple[float, float], chunk_size: float) -> Chunk:
+    """Get coordinates of the chunk containing the given position."""
+    return (math.floor(position[0] / chunk_size),
+            math.floor(position[1] / chunk_size))
+
+
+def transform_position(entity_dict: dict) -> Optional[tuple[float, float]]:
+    """Get the position of an entity dictionary.
+
+    The position is retrieved from the :class:`desper.Transform2D`
+    component. Return ``None`` if the entity has none.
+    """
+    for component_dict in entity_dict.get('components', ()):
+        if desper.object_from_string(
+                component_dict['type']) is not desper.Transform2D:
+            continue
+
+        args = component_dict.get('args', ())
+        if args:
+            return tuple(args[0])
+        return tuple(component_dict.get('kwargs', {}).get('position',
+                                                          (0., 0.)))
+
+    return None
+
+
+def split_world_file(source: str, directory: str, chunk_size: float,
+                     position_function: Callable[[dict], Optional[tuple]]
+                     = transform_position,
+                     block_size: int = DEFAULT_BLOCK_SIZE) -> list[Chunk]:
+    """Split a world file in spatial chunks.
+
+    The source can be a JSON or binary world file. Each entity is
+    assigned to the chunk containing its position, as given by
+    ``position_function`` (by default, from its
+    :class:`desper.Transform2D`). Processors and entities without
+    position are stored in the base world file. Chunks are squares of
+    size ``chunk_size``.
+
+    Resulting files are written in ``directory`` (see the module
+    documentation). Return the list of generated chunks.
+    """
+    if is_binary_world_file(source):
+        world_dict = read_binary_world(source)
+    else:
+        with open(source) as fin:
+            world_dict = json.load(fin)
+
+    base_dict = {'processors': world_dict.get('processors', []),
+                 'entities': []}
+    chunk_dicts: dict[Chunk, dict] = {}
+    for entity_dict in world_dict.get('entities', []):
+        position = position_function(entity_dict)
+        if position is None:
+            base_dict['entities'].append(entity_dict)
+            continue
+
+        chunk = get_chunk(position, chunk_size)
+        chunk_dicts.setdefault(chunk, {'entities': []})['entities'].append(
+            entity_dict)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(pt.join(directory, BASE_WORLD_FILENAME), 'wb') as fout:
+        write_binary_world(base_dict, fout, block_size)
+
+    for chunk, chunk_dict in chunk_dicts.items():
+        with open(get_chunk_filename(directory, chunk), 'wb') as fout:
+            write_binary_world(chunk_dict, fout, block_size)
+
+    chunks = sorted(chunk_dicts)
+    with open(pt.join(directory, CHUNK_INDEX_FILENAME), 'w') as fout:
+        json.dump({'chunk_size': chunk_size,
+                   'chunks': [list(chunk) for chunk in chunks]}, fout)
+
+    return chunks
+
+
+class ChunkStreamingProcessor(desper.Processor):
+    """Load and unload chunks of a level around the camera.
+
+    Chunks are read from the given directory (see
+    :func:`split_world_file`). At each frame, chunks within
+    ``load_radius`` (in chunks, along both axes) from the chunk
+    containing the focus point (see :meth:`get_focus`) are requested
+    and decoded on background threads (at most ``max_workers``).
+    Decoded chunks are then instantiated in the world, nearest first.
+    Instantiation (mainly graphics creation) can only happen on the
+    main thread: to limit hitches, it is spread over multiple frames,
+    stopping each frame after ``frame_budget`` seconds.
+
+    Loaded chunks farther than ``unload_radius`` are unloaded, i.e.
+    their entities are deleted, at most ``max_deletions_per_frame``
+    per frame (deleting graphics is expensive too). A chunk is not
+    loaded again until its deletion is complete. ``unload_radius``
+    shall be greater or
+    equal than ``load_radius`` (by default ``load_radius + 1``), the
+    difference acting as hysteresis, so that chunks are not
+    continuously loaded and unloaded when the camera moves across a
+    chunk border.
+
+    After instantiating entities, all functions in
+    :attr:`transform_functions` are called, with the same signature of
+    world handle transformers (``resource_handle`` is passed as
+    handle). By default, :func:`init_graphics_transformer` finalizes
+    graphics.
+
+    Entities belong to the chunk they are loaded from, regardless of
+    their current position. Entities created in other ways are never
+    unloaded.
+
+    ``resource_handle`` is used to resolve ``$res{...}`` and
+    ``$handle{...}`` strings in chunk files: it shall be a
+    :class:`desper.Handle` in a :class:`desper.ResourceMap` (or the
+    map itself). If a :class:`WorldCache` is given, decoded chunks are
+    kept there, speeding up chunks that are loaded again.
+    """
+
+    def __init__(self, directory: str, load_radius: int = 1,
+                 unload_radius: Optional[int] = None,
+                 resource_handle: Optional[desper.Handle] = None,
+                 max_workers: int = 2, frame_budget: float = 0.004,
+                 max_deletions_per_frame: int = 256,
+                 cache: Optional[WorldCache] = None):
+        if unload_radius is None:
+            unload_radius = load_radius + 1
+        assert unload_radius >= load_radius, (
+            'Unload radius must be greater or equal than load radius')
+
+        self.directory = directory
+        self.load_radius = load_radius
+        self.unload_radius = unload_radius
+        self.resource_handle = resource_handle
+        self.frame_budget = frame_budget
+        self.max_deletions_per_frame = max_deletions_per_frame
+        self.cache = cache
+        self.transform_functions: list[Callable] = [
+            init_graphics_transformer]
+
+        with open(pt.join(directory, CHUNK_INDEX_FILENAME)) as fin:
+            index = json.load(fin)
+        self.chunk_size: float = index['chunk_size']
+        self.chunks: set[Chunk] = set(map(tuple, index['chunks']))
+
+        # Entities of chunks in the world, even partially
+        self._loaded: dict[Chunk, list] = {}
+        # Chunks being decoded
+        self._pending: dict[Chunk, concurrent.futures.Future] = {}
+        # Chunks being instantiated, see WorldSnapshot.iter_populate
+        self._populating: dict[Chunk, Iterator] = {}
+        # Entities of unloaded chunks, waiting to be deleted
+        self._unloading: dict[Chunk, list] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix='chunk-streaming')
+
+    @property
+    def loaded_chunks(self) -> set[Chunk]:
+        """Chunks completely instantiated in the world."""
+        return set(self._loaded) - set(self._populating)
+
+    @property
+    def pending_chunks(self) -> set[Chunk]:
+        """Chunks requested but not yet completely in the world."""
+        return set(self._pending) | set(self._populating)
+
+    def get_chunk_entities(self, chunk: Chunk) -> list:
+        """Get IDs of the entities loaded from the given chunk."""
+        return self._loaded.get(chunk, [])
+
+    def get_focus(self) -> Optional[tuple[float, float]]:
+        """Get the point around which chunks are loaded.
+
+        By default, it is the center of the view of the first camera
+        driven by a :class:`CameraTransform2D` (rotation is ignored).
+        Return ``None`` if no such camera is found, in which case
+        chunks are neither loaded nor unloaded.
+        """
+        for entity, _ in self.world.get(CameraTransform2D):
+            transform = self.world.get_component(entity, desper.Transform2D)
+            camera = self.world.get_component(entity, Camera)
+            if transform is None or camera is None:
+                continue
+
+            _, _, width, height = camera.viewport
+            scale_x, scale_y = transform.scale
+            return (transform.position[0] + width / 2 / scale_x,
+                    transform.position[1] + height / 2 / scale_y)
+
+        return None
+
+    def _distance(self, chunk: Chunk, center: Chunk) -> int:
+        return max(abs(chunk[0] - center[0]), abs(chunk[1] - center[1]))
+
+    def _read_chunk(self, chunk: Chunk) -> WorldSnapshot:
+        """Decode a chunk, executed on background threads."""
+        filename = get_chunk_filename(self.directory, chunk)
+        if self.cache is not None:
+            return self.cache.get_snapshot(filename)
+        return read_world_snapshot(filename)
+
+    def _apply_transform_functions(self):
+        for function in self.transform_functions:
+            function(self.resource_handle, self.world)
+
+    def request_chunks(self, chunks: Iterable[Chunk]):
+        """Start decoding the given chunks, in order.
+
+        Chunks that are already loaded, pending, being unloaded or not
+        existing are ignored.
+        """
+        for chunk in chunks:
+            if (chunk in self.chunks and chunk not in self._loaded
+                    and chunk not in self._pending
+                    and chunk not in self._unloading):
+                self._pending[chunk] = self._executor.submit(
+                    self._read_chunk, chunk)
+
+    def _start_decoded(self):
+        """Start instantiating chunks that finished decoding."""
+        for chunk, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[chunk]
+                self._loaded[chunk] = []
+                self._populating[chunk] = future.result().iter_populate(
+                    self.resource_handle, self.world)
+
+    def instantiate(self, deadline: float = math.inf):
+        """Instantiate decoded chunks until the given deadline.
+
+        The deadline is compared with :func:`time.perf_counter`.
+        At least one entity is instantiated, if any is waiting.
+        """
+        self._start_decoded()
+
+        instantiated = False
+        for chunk, entities in list(self._populating.items()):
+            chunk_entities = self._loaded[chunk]
+            for entity in entities:
+                chunk_entities.append(entity)
+                instantiated = True
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                del self._populating[chunk]
+                continue
+            break
+
+        if instantiated:
+            self._apply_transform_functions()
+
+    def unload_chunk(self, chunk: Chunk):
+        """Unload the given chunk, or stop its loading.
+
+        Entities are queued for deletion, see :meth:`delete_unloaded`.
+        """
+        future = self._pending.pop(chunk, None)
+        if future is not None:
+            future.cancel()
+        self._populating.pop(chunk, None)
+
+        entities = self._loaded.pop(chunk, None)
+        if entities:
+            self._unloading.setdefault(chunk, []).extend(entities)
+
+    def delete_unloaded(self, limit: float = math.inf):
+        """Delete at most ``limit`` entities of unloaded chunks."""
+        deleted = 0
+        for chunk, entities in list(self._unloading.items()):
+            while entities and deleted < limit:
+                entity = entities.pop()
+                if self.world.entity_exists(entity):
+                    self.world.delete_entity(entity)
+                deleted += 1
+
+            if entities:
+                break
+            del self._unloading[chunk]
+
+    def load_chunk(self, chunk: Chunk):
+        """Load the given chunk immediately, on the calling thread.
+
+        Nothing happens if the chunk is already loaded or being
+        unloaded.
+        """
+        if chunk in self._loaded or chunk in self._unloading:
+            return
+
+        future = self._pending.pop(chunk, None)
+        if future is not None:
+            future.cancel()
+
+        self._loaded[chunk] = self._read_chunk(chunk).populate(
+            self.resource_handle, self.world)
+        self._apply_transform_functions()
+
+    def flush(self):
+        """Complete all pending loads and unloads.
+
+        Wait for pending chunks and instantiate them, delete all
+        entities of unloaded chunks. Useful to avoid chunks popping
+        in, e.g. when a level starts.
+        """
+        concurrent.futures.wait(self._pending.values())
+        self.instantiate()
+        self.delete_unloaded()
+
+    def update(self, focus: tuple[float, float]):
+        """Load and unload chunks based on the given focus point."""
+        deadline = time.perf_counter() + self.frame_budget
+        center = get_chunk(focus, self.chunk_size)
+
+        for chunk in [*self._loaded, *self._pending]:
+            if self._distance(chunk, center) > self.unload_radius:
+                self.unload_chunk(chunk)
+        self.delete_unloaded(self.max_deletions_per_frame)
+
+        # Nearest chunks first
+        radius = self.load_radius
+        self.request_chunks(sorted(
+            ((center[0] + dx, center[1] + dy)
+             for dx in range(-radius, radius + 1)
+             for dy in range(-radius, radius + 1)),
+            key=lambda chunk: self._distance(chunk, center)))
+
+        self.instantiate(deadline)
+
+    def process(self, dt):
+        """Update chunks around the focus point."""
+        focus = self.get_focus()
+        if focus is not None:
+            self.update(focus)
+
+    def shutdown(self):
+        """Stop background threads, discarding pending chunks.
+
+        Loaded chunks are left in the world, partially instantiated
+        ones included, while unloaded ones are completely deleted.
+        """
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._populating.clear()
+        self.delete_unloaded()
+        self._executor.shutdown(wait=False)
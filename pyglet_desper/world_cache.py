@@ -0,0 +1,196 @@
+"""Cache decoded world files between loads.
+
+World files are decoded (JSON parsing and type resolution) every time
+a world is loaded, which happens at each launch and, during a game,
+every time a world handle is cleared and reused (e.g. when switching
+back to a world through :meth:`desper.Loop.switch` with
+``clear_current`` or ``clear_next``).
+
+A :class:`WorldCache` keeps decoded worlds (see
+:class:`WorldSnapshot`) in memory and, optionally, on disk in the
+binary world format (see :mod:`pyglet_desper.binary_world`), so
+that following loads of an unchanged file skip decoding entirely.
+Enable it through :func:`world_from_file_handle`.
+"""
+import hashlib
+import json
+import os
+import os.path as pt
+import struct
+import tempfile
+from typing import Callable, Optional, Sequence
+
+import desper
+
+from pyglet_desper.binary_world import (BINARY_WORLD_VERSION,
+                                        WorldSnapshot, is_binary_world_file,
+                                        read_world_snapshot,
+                                        world_snapshot_from_dict,
+                                        write_binary_world)
+
+CACHE_FILE_EXTENSION = '.pdwb'
+"""Extension of world files cached on disk."""
+
+DEFAULT_DICT_TRANSFORMERS = (desper.type_dict_transformer,
+                             desper.object_dict_transformer,
+                             desper.resource_dict_transformer)
+"""Dict transformers whose behaviour is reproduced by snapshots.
+
+See :class:`WorldSnapshot`.
+"""
+
+
+def _function_name(function: Callable) -> str:
+    """Get a stable, qualified name for the given function."""
+    return (f'{getattr(function, "__module__", "")}.'
+            f'{getattr(function, "__qualname__", type(function).__name__)}')
+
+
+def _hash(value) -> str:
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+
+class WorldCache:
+    """Cache of decoded world files.
+
+    Decoded worlds are stored in memory, keyed by absolute path,
+    modification time, size and the list of transformers used to
+    decode them: when any of them changes the file is decoded again.
+    Only the last version of each file is retained.
+
+    If ``directory`` is given, JSON world files are also stored there
+    in binary format (see :func:`write_binary_world`), so that the
+    cache survives across runs. Binary world files are only cached in
+    memory, as they are already fast to decode.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._snapshots: dict[str, tuple[tuple, WorldSnapshot]] = {}
+
+    def get_key(self, filename: str,
+                transformers: Sequence[Callable] = ()) -> tuple:
+        """Get the key identifying the current version of a file."""
+        stat = os.stat(filename)
+        return (pt.abspath(filename), stat.st_mtime_ns, stat.st_size,
+                tuple(map(_function_name, transformers)),
+                BINARY_WORLD_VERSION)
+
+    def get_cache_filename(self, key: tuple) -> str:
+        """Get the on disk cache filename for the given key.
+
+        :attr:`directory` must be set.
+        """
+        return pt.join(self.directory,
+                       f'{_hash(key[0])}-{_hash(key)}{CACHE_FILE_EXTENSION}')
+
+    def get_snapshot(self, filename: str,
+                     transformers: Sequence[Callable] = ()
+                     ) -> WorldSnapshot:
+        """Get the decoded version of a world file.
+
+        Decode it and store it in cache if necessary.
+        """
+        key = self.get_key(filename, transformers)
+        path = key[0]
+
+        cached = self._snapshots.get(path)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+
+        snapshot = None
+        if self.directory is not None:
+            snapshot = self._load_from_disk(key)
+
+        if snapshot is None:
+            self.misses += 1
+            snapshot = self._decode(filename, key)
+        else:
+            self.hits += 1
+
+        self._snapshots[path] = key, snapshot
+        return snapshot
+
+    def _load_from_disk(self, key: tuple) -> Optional[WorldSnapshot]:
+        cache_filename = self.get_cache_filename(key)
+        if not pt.exists(cache_filename):
+            return None
+
+        try:
+            return read_world_snapshot(cache_filename)
+        except (ValueError, struct.error, IndexError, UnicodeDecodeError):
+            # Corrupted cache file, decode source again
+            return None
+
+    def _decode(self, filename: str, key: tuple) -> WorldSnapshot:
+        if is_binary_world_file(filename):
+            return read_world_snapshot(filename)
+
+        with open(filename) as fin:
+            world_dict = json.load(fin)
+
+        if self.directory is not None:
+            self._store_on_disk(world_dict, key)
+
+        return world_snapshot_from_dict(world_dict)
+
+    def _store_on_disk(self, world_dict: dict, key: tuple):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Remove outdated versions of the same file
+        prefix = f'{_hash(key[0])}-'
+        for cache_filename in os.listdir(self.directory):
+            if (cache_filename.startswith(prefix)
+                    and cache_filename.endswith(CACHE_FILE_EXTENSION)):
+                os.remove(pt.join(self.directory, cache_filename))
+
+        # Write to a temporary file first, so that concurrent
+        # processes never read partial files
+        fd, tmp_filename = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                write_binary_world(world_dict, fout)
+            os.replace(tmp_filename, self.get_cache_filename(key))
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+
+    def clear(self, disk: bool = False):
+        """Clear cached worlds from memory.
+
+        If ``disk`` is ``True``, also remove cache files from
+        :attr:`directory`.
+        """
+        self._snapshots.clear()
+
+        if disk and self.directory is not None and pt.isdir(self.directory):
+            for cache_filename in os.listdir(self.directory):
+                if cache_filename.endswith(CACHE_FILE_EXTENSION):
+                    os.remove(pt.join(self.directory, cache_filename))
+
+
+class CachedWorldFromFileTransformer:
+    """Populate a :class:`desper.World` from a cached world file.
+
+    Replacement for :class:`desper.WorldFromFileTransformer`, to be
+    used as transformer function in :class:`desper.WorldFromFileHandle`
+    (see :func:`world_from_file_handle`). Worlds are decoded through
+    the given :class:`WorldCache`. Only
+    :attr:`DEFAULT_DICT_TRANSFORMERS` are supported, their list is
+    only used as part of the cache key.
+    """
+
+    def __init__(self, cache: WorldCache,
+                 dict_transformers: Sequence[Callable]
+                 = DEFAULT_DICT_TRANSFORMERS):
+        self.cache = cache
+        self.dict_transformers = dict_transformers
+
+    def __call__(self, world_handle: desper.WorldFromFileHandle,
+                 world: desper.World):
+        self.cache.get_snapshot(
+            world_handle.filename,
+            self.dict_transformers).populate(world_handle, world)
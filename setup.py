@@ -15,6 +15,7 @@ setup(name='pyglet-desper',
       description='Extension package for desper and pyglet '
                   'interoperation',
       install_requires=REQUIREMENTS,
+      extras_require={'particles': ['numpy']},
       long_description=README,
       long_description_content_type='text/markdown',
       url='https://github.com/Ball-Man/pyglet-desper',
@@ -0,0 +1,113 @@
+"""Fixtures shared by all test modules."""
+from context import pyglet_desper as pdesper
+
+import json
+
+import desper
+import pyglet
+
+import pytest
+
+from helpers import get_filename
+
+
+@pytest.fixture(scope='session')
+def window():
+    win = pyglet.window.Window()
+    yield win
+    win.close()
+
+
+@pytest.fixture
+def world():
+    return desper.World()
+
+
+@pytest.fixture
+def default_loop():
+    desper.default_loop = desper.SimpleLoop()
+    return desper.default_loop
+
+
+@pytest.fixture
+def world_dict():
+    entities = [
+        {'id': f'entity{i}',
+         'components': [
+             {'type': 'desper.Transform2D',
+              'args': [[i * 1.5, i]], 'kwargs': {'rotation': 0.}},
+             {'type': 'helpers.WorldComponent',
+              'args': [i, float(i), f'name{i % 3}', '${math.pi}'],
+              'kwargs': {'flag': i % 2 == 0, 'constant': 'same',
+                         'nested': {'key': [i, None]}}}]}
+        for i in range(10)]
+    entities.append({'components': [
+        {'type': 'helpers.WorldComponent', 'args': [], 'kwargs': {}}]})
+    entities.append({'components': [
+        {'type': 'helpers.WorldComponent',
+         'args': ['$res{media.yayuh}', '$handle{media.yayuh}'],
+         'kwargs': {}}]})
+
+    return {'processors': [{'type': 'desper.OnUpdateProcessor'}],
+            'entities': entities}
+
+
+@pytest.fixture
+def binary_world_filename(world_dict, tmp_path):
+    json_filename = tmp_path / 'world.json'
+    json_filename.write_text(json.dumps(world_dict))
+    binary_filename = tmp_path / 'world.bin'
+
+    pdesper.convert_world_file(str(json_filename), str(binary_filename),
+                               block_size=4)
+    return str(binary_filename)
+
+
+@pytest.fixture
+def json_world_filename(world_dict, tmp_path):
+    filename = tmp_path / 'world.json'
+    filename.write_text(json.dumps(world_dict))
+    return str(filename)
+
+
+@pytest.fixture
+def wav_filename():
+    return get_filename('files', 'fake_project', 'media', 'yayuh.wav')
+
+
+@pytest.fixture
+def png_filename():
+    return get_filename('files', 'fake_project', 'image', 'logo.png')
+
+
+@pytest.fixture
+def png_image(png_filename):
+    return pyglet.image.load(png_filename)
+
+
+@pytest.fixture
+def animation_meta_filename():
+    return get_filename('files', 'fake_project', 'image',
+                        'animation1.json')
+
+
+@pytest.fixture
+def texture_bin():
+    return pyglet.graphics.TextureBin()
+
+
+@pytest.fixture
+def clear_cache():
+    yield
+    pdesper.clear_image_cache()
+
+
+@pytest.fixture
+def font_filename():
+    return get_filename('files', 'fake_project', 'font', 'SillySet.ttf')
+
+
+@pytest.fixture
+def animation_sheet_filename():
+    return get_filename('files', 'fake_project', 'image',
+                        'animation1.png')
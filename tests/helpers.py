@@ -1,9 +1,6 @@
 import os.path as pt
 
 import desper
-import pyglet
-
-import pytest
 
 
 def get_filename(*path: str) -> str:
@@ -14,24 +11,6 @@ def get_filename(*path: str) -> str:
     return pt.join(pt.dirname(__file__), *path)
 
 
-@pytest.fixture(scope='session')
-def window():
-    win = pyglet.window.Window()
-    yield win
-    win.close()
-
-
-@pytest.fixture
-def world():
-    return desper.World()
-
-
-@pytest.fixture
-def default_loop():
-    desper.default_loop = desper.SimpleLoop()
-    return desper.default_loop
-
-
 @desper.event_handler('on_update')
 class OnUpdateComponent:
     frames = 0
@@ -67,6 +46,22 @@ class OnKeyPressComponent:
         self.args_tuple = args
 
 
+@desper.event_handler('on_mouse_motion', 'on_mouse_drag', 'on_key_press')
+class OnMouseComponent:
+
+    def __init__(self):
+        self.events = []
+
+    def on_mouse_motion(self, *args):
+        self.events.append(('on_mouse_motion', args))
+
+    def on_mouse_drag(self, *args):
+        self.events.append(('on_mouse_drag', args))
+
+    def on_key_press(self, *args):
+        self.events.append(('on_key_press', args))
+
+
 class Transformable:
     position = None
     rotation = None
@@ -90,3 +85,10 @@ class Transformable:
 
     def delete(self):
         self.deleted += 1
+
+
+class WorldComponent:
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
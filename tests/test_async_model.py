@@ -0,0 +1,111 @@
+from context import pyglet_desper as pdesper
+
+import asyncio
+import concurrent.futures
+import os.path as pt
+import json
+
+import desper
+import pyglet
+
+from helpers import *       # NOQA
+
+
+class TestAsyncHandles:
+
+    def test_image(self, png_filename, texture_bin, clear_cache, window):
+        pdesper.clear_image_cache()
+        handle = pdesper.AsyncImageFileHandle(png_filename,
+                                              texture_bin=texture_bin)
+
+        async def load():
+            return await asyncio.gather(handle.call_async(),
+                                        handle.call_async())
+
+        image1, image2 = asyncio.run(load())
+
+        assert image1 is image2 is handle()
+        assert handle.cached
+        assert image1 is pdesper.ImageFileHandle(png_filename).load()
+        assert pt.abspath(png_filename) in pdesper.model._image_cache
+        assert texture_bin.atlases
+
+    def test_rich_image(self, png_filename, animation_meta_filename,
+                        clear_cache, window, monkeypatch):
+        # Atlases shall belong to the current context
+        window.switch_to()
+        monkeypatch.setattr(pdesper.model, 'default_texture_bin', None)
+        pdesper.clear_image_cache()
+
+        async def load():
+            return await asyncio.gather(
+                pdesper.AsyncRichImageFileHandle(png_filename).call_async(),
+                pdesper.AsyncRichImageFileHandle(
+                    animation_meta_filename).call_async())
+
+        image, animation = asyncio.run(load())
+
+        assert isinstance(image, pyglet.graphics.texture.Texture)
+        assert isinstance(animation, pyglet.image.Animation)
+
+    def test_media(self, wav_filename):
+        handle = pdesper.AsyncMediaFileHandle(wav_filename)
+
+        source = asyncio.run(pdesper.load_handle_async(handle))
+
+        assert isinstance(source, pyglet.media.StaticSource)
+        assert handle() is source
+
+    def test_font(self, font_filename):
+        handle = pdesper.AsyncFontFileHandle(font_filename)
+
+        asyncio.run(handle.call_async())
+
+        assert handle.cached
+        assert pyglet.font.have_font('SillySet')
+
+    def test_executor(self, wav_filename):
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        pdesper.async_model.default_executor = executor
+        try:
+            handle = pdesper.AsyncMediaFileHandle(wav_filename)
+            assert asyncio.run(handle.call_async()) is handle()
+        finally:
+            pdesper.async_model.default_executor = None
+            executor.shutdown()
+
+    def test_load_handle_async(self):
+        handle = desper.WorldHandle()
+
+        assert asyncio.run(pdesper.load_handle_async(handle)) is handle()
+
+
+def test_get_resource_keys(world_dict, binary_world_filename, tmp_path):
+    json_filename = tmp_path / 'world.json'
+    json_filename.write_text(json.dumps(world_dict))
+
+    assert pdesper.get_resource_keys(str(json_filename)) == {'media.yayuh'}
+    assert pdesper.get_resource_keys(binary_world_filename) == {'media.yayuh'}
+
+
+def test_load_world_async(binary_world_filename, window):
+    resource_map = desper.ResourceMap()
+    pdesper.async_resource_populator(
+        resource_map, get_filename('files', 'fake_project'),
+        trim_extensions=True)
+    handle = pdesper.world_from_file_handle(binary_world_filename)
+    resource_map['world'] = handle
+    sound_handle = resource_map.get('media/yayuh')
+
+    assert isinstance(sound_handle, pdesper.AsyncMediaFileHandle)
+    # Streamed media are not prebuffered by default
+    assert resource_map.get('media/streaming/yayuh').prebuffer is None
+    assert isinstance(resource_map.get('image/logo'),
+                      pdesper.AsyncRichImageFileHandle)
+
+    world = asyncio.run(pdesper.load_world_async(handle))
+
+    assert sound_handle.cached
+    assert world is handle()
+    assert world.get_component(2, WorldComponent).args == (
+        sound_handle(), sound_handle)
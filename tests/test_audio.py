@@ -0,0 +1,364 @@
+from context import pyglet_desper as pdesper
+
+import concurrent.futures
+
+import desper
+import pytest
+import pyglet
+
+from helpers import *       # NOQA
+
+
+@pytest.fixture
+def streaming_wav_filename():
+    return get_filename('files', 'fake_project', 'media', 'streaming',
+                        'yayuh.wav')
+
+
+class TestAudioCache:
+
+    def test_get(self, wav_filename):
+        audio_cache = pdesper.AudioCache()
+        source = audio_cache.get(wav_filename)
+
+        assert isinstance(source, pyglet.media.StaticSource)
+        assert audio_cache.get(wav_filename) is source
+        assert audio_cache.size == pdesper.get_source_size(source) > 0
+        assert (audio_cache.hits, audio_cache.misses) == (1, 1)
+
+        with pytest.raises(FileNotFoundError):
+            audio_cache.get('missing.wav')
+
+        audio_cache.clear()
+        assert not audio_cache.size
+        assert audio_cache.get(wav_filename) is not source
+
+    def test_budget(self, wav_filename, streaming_wav_filename):
+        size = pdesper.get_source_size(pdesper.AudioCache().get(wav_filename))
+        audio_cache = pdesper.AudioCache(int(size * 1.5))
+
+        audio_cache.get(wav_filename)
+        audio_cache.get(streaming_wav_filename)
+
+        assert audio_cache.evictions == 1
+        assert audio_cache.size == size
+        assert not audio_cache.is_cached(wav_filename)
+        assert audio_cache.is_cached(streaming_wav_filename)
+
+        audio_cache.trim()
+        assert not len(audio_cache)
+        assert not audio_cache.size
+
+        # Oversized sources are not cached
+        audio_cache.max_bytes = size - 1
+        audio_cache.get(wav_filename)
+        assert not len(audio_cache)
+
+    def test_lru(self, wav_filename, streaming_wav_filename):
+        size = pdesper.get_source_size(pdesper.AudioCache().get(wav_filename))
+        audio_cache = pdesper.AudioCache(size * 2)
+
+        source = audio_cache.get(wav_filename)
+        audio_cache.get(streaming_wav_filename)
+        audio_cache.get(wav_filename)
+        audio_cache.trim(size)
+
+        assert audio_cache.get(wav_filename) is source
+        assert not audio_cache.is_cached(streaming_wav_filename)
+
+    def test_preload(self, wav_filename):
+        audio_cache = pdesper.AudioCache()
+
+        future = audio_cache.preload(wav_filename)
+        source = future.result()
+        assert audio_cache.get(wav_filename) is source
+        assert audio_cache.preload(wav_filename).result() is source
+        assert audio_cache.misses == 1
+
+        with pytest.raises(FileNotFoundError):
+            audio_cache.preload('missing.wav').result()
+
+        audio_cache.shutdown()
+
+
+def read_all(source, num_bytes=4096):
+    chunks = []
+    while (audio_data := source.get_audio_data(num_bytes)) is not None:
+        chunks.append(bytes(audio_data.data[:audio_data.length]))
+    return b''.join(chunks)
+
+
+class TestPrebufferedSource:
+
+    def test_prebuffer(self, wav_filename):
+        expected = read_all(pyglet.media.load_audio(wav_filename,
+                                                    streaming=True))
+        source = pdesper.PrebufferedSource(
+            wav_filename, prebuffer=0.1,
+            file_pool=pdesper.StreamingFilePool())
+        source.wait()
+
+        assert source.ready
+        assert isinstance(source, pyglet.media.StreamingSource)
+        assert 0 < len(source._buffer) < len(expected)
+        assert read_all(source) == expected
+
+        # Seek inside and outside the prebuffered data
+        source.seek(0)
+        assert read_all(source) == expected
+        source.seek(0.5)
+        assert len(read_all(source)) == len(expected) // 3
+
+        source.delete()
+        assert not source.is_open
+
+    def test_missing(self):
+        source = pdesper.PrebufferedSource('missing.wav')
+        with pytest.raises(FileNotFoundError):
+            source.wait()
+
+    def test_file_pool(self, wav_filename):
+        file_pool = pdesper.StreamingFilePool(max_open=2)
+        sources = [pdesper.PrebufferedSource(wav_filename, prebuffer=0.1,
+                                             file_pool=file_pool)
+                   for _ in range(3)]
+        for source in sources:
+            source.wait()
+
+        assert file_pool.open_count == 2
+        assert [source.is_open for source in sources].count(False) == 1
+
+        # Closed sources are opened again when needed
+        expected = read_all(pyglet.media.load_audio(wav_filename,
+                                                    streaming=True))
+        for source in sources:
+            assert read_all(source) == expected
+        assert file_pool.open_count == 2
+
+        # Sources queued on players are never closed
+        player = pyglet.media.AudioPlayer()
+        source = pdesper.PrebufferedSource(wav_filename, prebuffer=0.1,
+                                           file_pool=file_pool)
+        player.queue(source)
+        other = pdesper.PrebufferedSource(wav_filename, prebuffer=0.1,
+                                          file_pool=file_pool)
+        other.wait()
+        assert source.is_open
+        player.delete()
+
+    def test_file_pool_unlocked(self, wav_filename):
+        # Sources are registered to the pool without holding their lock,
+        # as the pool may close (and hence lock) other sources
+        class CheckingPool(pdesper.StreamingFilePool):
+            locked = []
+
+            def acquire(self, source):
+                def is_locked():
+                    if not source._lock.acquire(blocking=False):
+                        return True
+                    source._lock.release()
+                    return False
+
+                with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                    self.locked.append(executor.submit(is_locked).result())
+                super().acquire(source)
+
+        file_pool = CheckingPool(max_open=1)
+        sources = [pdesper.PrebufferedSource(wav_filename, prebuffer=0.1,
+                                             file_pool=file_pool)
+                   for _ in range(2)]
+        for source in sources:
+            source.wait()
+        # At least one file is opened again, closing the other source
+        for source in sources:
+            read_all(source)
+
+        assert len(file_pool.locked) >= 3
+        assert not any(file_pool.locked)
+
+    def test_handle(self, streaming_wav_filename):
+        file_pool = pdesper.StreamingFilePool()
+        handle = pdesper.MediaFileHandle(streaming_wav_filename,
+                                         streaming=True, prebuffer=0.5,
+                                         file_pool=file_pool)
+        source = handle()
+
+        assert isinstance(source, pdesper.PrebufferedSource)
+        assert source.duration > 0
+        assert file_pool.open_count == 1
+
+
+@pytest.fixture
+def sounds():
+    return [pyglet.media.StaticSource(pyglet.media.synthesis.Silence(0.5))
+            for _ in range(3)]
+
+
+def end_voice(voice):
+    voice.player.seek(voice.player.source.duration)
+
+
+class TestVoicePool:
+
+    def test_play(self, sounds):
+        voice_pool = pdesper.VoicePool(max_voices=2)
+        voice1 = voice_pool.play(sounds[0])
+        voice2 = voice_pool.play(sounds[1], volume=0.5)
+
+        assert voice1.active and voice2.active
+        assert voice1.player is not voice2.player
+        assert voice2.player.volume == 0.5
+        assert voice1.player.playing
+        assert voice_pool.active_voices == (voice1, voice2)
+        assert voice_pool.get_active_count(sounds[0]) == 1
+
+        # Steal the oldest voice among equal priorities
+        voice3 = voice_pool.play(sounds[2])
+        assert not voice1.active
+        assert voice3.player is voice1.player
+        assert voice_pool.active_voices == (voice2, voice3)
+        assert len(voice_pool.players) == 2
+        assert voice_pool.stolen == 1
+
+        # Lower priority sounds are rejected
+        assert voice_pool.play(sounds[0], priority=-1) is None
+        assert voice_pool.rejected == 1
+        assert voice_pool.played == 3
+
+    def test_priority(self, sounds):
+        voice_pool = pdesper.VoicePool(max_voices=2)
+        high = voice_pool.play(sounds[0], priority=1)
+        low = voice_pool.play(sounds[1])
+
+        voice = voice_pool.play(sounds[2], priority=1)
+        assert not low.active
+        assert high.active
+        assert voice.player is low.player
+
+    def test_limit(self, sounds):
+        voice_pool = pdesper.VoicePool(max_voices=4, default_limit=2)
+        voice_pool.set_limit(sounds[0], 1)
+
+        voice1 = voice_pool.play(sounds[0])
+        voice2 = voice_pool.play(sounds[0])
+        assert not voice1.active
+        assert voice_pool.get_active_count(sounds[0]) == 1
+
+        voice_pool.play(sounds[1])
+        voice_pool.play(sounds[1])
+        voice_pool.play(sounds[1])
+        assert voice_pool.get_active_count(sounds[1]) == 2
+        assert voice_pool.get_active_count() == 3
+
+        assert voice_pool.play(sounds[0], priority=-1) is None
+        assert voice_pool.play(sounds[0], limit=2) is not None
+
+        # Default limit
+        voice_pool.set_limit(sounds[0], None)
+        assert voice_pool.play(sounds[0]) is not None
+        assert not voice2.active
+        assert voice_pool.get_active_count(sounds[0]) == 2
+
+    def test_update(self, sounds):
+        voice_pool = pdesper.VoicePool(max_voices=2)
+        voice1 = voice_pool.play(sounds[0])
+        voice2 = voice_pool.play(sounds[1])
+
+        voice_pool.update()
+        assert voice_pool.get_active_count() == 2
+
+        end_voice(voice1)
+        voice_pool.update()
+        assert voice_pool.active_voices == (voice2,)
+        assert not voice1.player.playing
+
+        # Idle players are reused
+        voice3 = voice_pool.play(sounds[2])
+        assert voice3.player is voice1.player
+        assert not voice_pool.stolen
+
+        voice_pool.stop(voice3)
+        voice_pool.stop(voice3)
+        assert voice_pool.active_voices == (voice2,)
+
+        voice_pool.stop_all()
+        assert not voice_pool.active_voices
+
+        voice_pool.delete()
+        assert not voice_pool.players
+
+    def test_world(self, sounds, world):
+        world.add_processor(pdesper.VoicePoolProcessor())
+        voice_pool = pdesper.VoicePool()
+        entity = world.create_entity(voice_pool)
+        voice = voice_pool.play(sounds[0])
+
+        world.dispatch('on_switch_out', world, None)
+        assert not voice.player.playing
+        world.dispatch('on_switch_in', None, world)
+        assert voice.player.playing
+
+        end_voice(voice)
+        world.process(0)
+        assert not voice.active
+
+        world.delete_entity(entity)
+        world.process(0)
+        assert not voice_pool.players
+
+
+class TestAudioSyncProcessor:
+
+    def test_process(self, world, sounds):
+        processor = pdesper.AudioSyncProcessor()
+        world.add_processor(processor)
+        assert processor.get_listener_position() == (0., 0.)
+
+        world.create_entity(desper.Transform2D((100., 100.)),
+                            pdesper.AudioListener())
+        transform = desper.Transform2D((110., 100.))
+        emitter = pdesper.AudioEmitter(audible_range=50., z=1.)
+        world.create_entity(transform, emitter)
+
+        player = pyglet.media.AudioPlayer()
+        player.volume = 0.5
+        emitter.attach(player)
+        world.process(0)
+        assert processor.get_listener_position() == (100., 100.)
+        assert player.position == (10., 0., 1.)
+
+        # Out of range
+        transform.position = (300., 100.)
+        world.process(0)
+        assert emitter.muted
+        assert player.volume == 0.
+        assert player.position == (10., 0., 1.)
+
+        transform.position = (100., 120.)
+        world.process(0)
+        assert not emitter.muted
+        assert player.volume == 0.5
+        assert player.position == (0., 20., 1.)
+
+        emitter.detach(player)
+        transform.position = (100., 130.)
+        world.process(0)
+        assert player.position == (0., 20., 1.)
+        player.delete()
+
+    def test_voices(self, world, sounds):
+        world.add_processor(pdesper.AudioSyncProcessor(scale=0.5))
+        emitter = pdesper.AudioEmitter()
+        world.create_entity(desper.Transform2D((10., 20.)), emitter)
+        voice_pool = pdesper.VoicePool()
+
+        voice = emitter.play(voice_pool, sounds[0], priority=1)
+        world.process(0)
+        assert voice.priority == 1
+        assert voice.player.position == (5., 10., 0.)
+        assert emitter.get_players() == [voice.player]
+
+        voice_pool.stop(voice)
+        assert not emitter.get_players()
+
+        voice_pool.delete()
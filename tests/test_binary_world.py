@@ -0,0 +1,149 @@
+from context import pyglet_desper as pdesper
+
+import io
+import json
+import math
+import os.path as pt
+
+import desper
+import pytest
+
+from helpers import *       # NOQA
+
+
+def test_write_binary_world(world_dict):
+    fout = io.BytesIO()
+    pdesper.write_binary_world(world_dict, fout)
+
+    assert fout.getvalue().startswith(pdesper.BINARY_WORLD_MAGIC)
+    assert len(fout.getvalue()) < len(json.dumps(world_dict))
+
+    with pytest.raises(TypeError):
+        pdesper.write_binary_world(
+            {'entities': [{'components': [
+                {'type': 'a.B', 'args': [object()]}]}]}, io.BytesIO())
+
+
+def test_read_binary_world(world_dict, binary_world_filename):
+    read_dict = pdesper.read_binary_world(binary_world_filename)
+
+    assert read_dict['processors'] == world_dict['processors']
+    assert len(read_dict['entities']) == len(world_dict['entities'])
+
+    for read_entity, entity in zip(read_dict['entities'],
+                                   world_dict['entities']):
+        assert read_entity.get('id') == entity.get('id')
+        for read_component, component in zip(read_entity['components'],
+                                             entity['components']):
+            assert read_component['type'] == component['type']
+            assert read_component['args'] == component.get('args', [])
+            assert read_component['kwargs'] == component.get('kwargs', {})
+
+
+def test_is_binary_world_file(binary_world_filename, tmp_path):
+    json_filename = tmp_path / 'world.json'
+
+    assert pdesper.is_binary_world_file(binary_world_filename)
+    assert not pdesper.is_binary_world_file(str(json_filename))
+    assert not pdesper.is_binary_world_file(str(tmp_path / 'missing'))
+
+
+class TestBinaryWorldFromFileTransformer:
+
+    def test_call(self, binary_world_filename, window):
+        resource_map = desper.ResourceMap()
+        pdesper.resource_populator(
+            resource_map, get_filename('files', 'fake_project'),
+            trim_extensions=True)
+        handle = pdesper.world_from_file_handle(binary_world_filename)
+        resource_map['world'] = handle
+
+        assert any(isinstance(function,
+                              pdesper.BinaryWorldFromFileTransformer)
+                   for function in handle.transform_functions)
+        assert not any(isinstance(function, desper.WorldFromFileTransformer)
+                       for function in handle.transform_functions)
+
+        world = handle()
+
+        assert world.get_processor(desper.OnUpdateProcessor) is not None
+        assert world.get_processor(pdesper.CameraProcessor) is not None
+
+        for i in range(10):
+            transform = world.get_component(f'entity{i}', desper.Transform2D)
+            assert tuple(transform.position) == (i * 1.5, i)
+
+            component = world.get_component(f'entity{i}', WorldComponent)
+            assert component.args == (i, float(i), f'name{i % 3}', math.pi)
+            assert component.kwargs == {'flag': i % 2 == 0,
+                                        'constant': 'same',
+                                        'nested': {'key': [i, None]}}
+
+        assert world.get_component(1, WorldComponent).args == ()
+        assert world.get_component(2, WorldComponent).args == (
+            resource_map['media/yayuh'], resource_map.get('media/yayuh'))
+
+    def test_no_resource_map(self, tmp_path, window):
+        filename = str(tmp_path / 'world.bin')
+        with open(filename, 'wb') as fout:
+            pdesper.write_binary_world({'entities': [{'components': [
+                {'type': 'helpers.WorldComponent',
+                 'args': ['$res{image.logo}']}]}]}, fout)
+
+        with pytest.raises(TypeError):
+            pdesper.world_from_file_handle(filename)()
+
+    def test_constant_containers(self, tmp_path, window):
+        filename = str(tmp_path / 'world.bin')
+        with open(filename, 'wb') as fout:
+            pdesper.write_binary_world({'entities': [
+                {'id': i, 'components': [
+                    {'type': 'helpers.WorldComponent',
+                     'args': [[1, 2]], 'kwargs': {'nested': {'key': []}}}]}
+                for i in range(3)]}, fout)
+
+        world = pdesper.world_from_file_handle(filename)()
+        components = [world.get_component(i, WorldComponent)
+                      for i in range(3)]
+
+        # Constant lists and dictionaries are not shared among entities
+        assert components[0].args[0] == components[1].args[0] == [1, 2]
+        assert components[0].args[0] is not components[1].args[0]
+        assert (components[0].kwargs['nested']['key']
+                is not components[1].kwargs['nested']['key'])
+
+        read_dict = pdesper.read_binary_world(filename)
+        first, second = (entity['components'][0]
+                         for entity in read_dict['entities'][:2])
+        assert first['args'][0] is not second['args'][0]
+
+    def test_equivalent_to_json(self, world_dict, tmp_path, window):
+        json_filename = str(tmp_path / 'world.json')
+        with open(json_filename, 'w') as fout:
+            json.dump(world_dict, fout)
+        binary_filename = str(tmp_path / 'world.bin')
+        pdesper.convert_world_file(json_filename, binary_filename)
+
+        resource_map = desper.ResourceMap()
+        pdesper.resource_populator(
+            resource_map, get_filename('files', 'fake_project'),
+            trim_extensions=True)
+        resource_map['json'] = pdesper.world_from_file_handle(json_filename)
+        resource_map['binary'] = pdesper.world_from_file_handle(
+            binary_filename)
+
+        json_world = resource_map['json']
+        binary_world = resource_map['binary']
+
+        assert ({entity for entity, _ in json_world.get(WorldComponent)}
+                == {entity for entity, _ in binary_world.get(WorldComponent)})
+        for entity, json_component in json_world.get(WorldComponent):
+            binary_component = binary_world.get_component(entity,
+                                                          WorldComponent)
+            assert json_component.args == binary_component.args
+            assert json_component.kwargs == binary_component.kwargs
+
+
+def test_file_size(world_dict, binary_world_filename):
+    assert (pt.getsize(binary_world_filename)
+            < len(json.dumps(world_dict).encode()))
@@ -0,0 +1,126 @@
+from context import pyglet_desper as pdesper
+
+import desper
+import pytest
+import pyglet
+from pyglet.graphics import Batch
+
+from helpers import *       # NOQA
+
+
+class CheckpointComponent:
+
+    def __init__(self, sprite=None):
+        self.values = [1, 2]
+        self.sprite = sprite
+
+
+@desper.event_handler('on_add')
+class AddCounterComponent:
+    added = 0
+
+    def on_add(self, entity, world):
+        self.added += 1
+
+
+class TestWorldCheckpoint:
+
+    @pytest.fixture
+    def batch(self):
+        return Batch()
+
+    @pytest.fixture
+    def populated_world(self, world, png_image, batch, window):
+        sprite = pdesper.Sprite(png_image, batch=batch,
+                                group=pyglet.graphics.Group(1))
+        world.create_entity(desper.Transform2D((10, 20)), sprite,
+                            pdesper.SpriteSync(pdesper.Sprite),
+                            CheckpointComponent(sprite), AddCounterComponent(),
+                            entity_id='player')
+        world.create_entity(batch)
+        return world
+
+    def get_sprite(self, world):
+        return world.get_component('player', pdesper.Sprite)
+
+    def test_init(self, populated_world):
+        checkpoint = pdesper.WorldCheckpoint(populated_world)
+
+        assert set(checkpoint.entities) == set(populated_world.entities)
+
+    def test_restore_in_place(self, populated_world, batch):
+        world = populated_world
+        checkpoint = pdesper.WorldCheckpoint(world)
+        transform = world.get_component('player', desper.Transform2D)
+        component = world.get_component('player', CheckpointComponent)
+        sprite = self.get_sprite(world)
+        vertex_list = sprite._vertex_list
+
+        transform.position = desper.math.Vec2(50, 50)
+        sprite.color = (255, 0, 0, 255)
+        component.values.append(3)
+        component.counter = 5
+        checkpoint.restore()
+
+        assert world.get_component('player', desper.Transform2D) is transform
+        assert transform.position == (10, 20)
+        assert self.get_sprite(world) is sprite
+        assert sprite._vertex_list is vertex_list
+        assert sprite.position == (10, 20, 0)
+        assert sprite.color == (255, 255, 255, 255)
+        assert component.values == [1, 2]
+        assert not hasattr(component, 'counter')
+        assert component.sprite is sprite
+        assert world.get_component('player', AddCounterComponent).added == 1
+
+        # Transform is still synchronized
+        transform.position = desper.math.Vec2(30, 30)
+        assert sprite.position == (30, 30, 0)
+
+    def test_restore_entities(self, populated_world, batch, png_image):
+        world = populated_world
+        checkpoint = pdesper.WorldCheckpoint(world)
+        sprite = self.get_sprite(world)
+
+        new_entity = world.create_entity(CheckpointComponent())
+        world.delete_entity('player')
+        world.process(0)
+        checkpoint.restore()
+
+        assert not world.entity_exists(new_entity)
+        assert world.entity_exists('player')
+
+        new_sprite = self.get_sprite(world)
+        assert new_sprite is not sprite
+        assert new_sprite._vertex_list is not None
+        assert new_sprite.image is png_image.get_texture()
+        assert new_sprite.batch is batch
+        assert new_sprite.group is sprite.group
+        assert new_sprite.position == (10, 20, 0)
+        assert (world.get_component('player', CheckpointComponent).sprite
+                is new_sprite)
+        assert world.get_component('player', AddCounterComponent).added == 1
+
+        transform = world.get_component('player', desper.Transform2D)
+        transform.position = desper.math.Vec2(30, 30)
+        assert new_sprite.position == (30, 30, 0)
+
+        # Restore again, with a pending deletion
+        world.delete_entity('player')
+        checkpoint.restore()
+        assert world.entity_exists('player')
+        assert self.get_sprite(world) not in (sprite, new_sprite)
+        assert self.get_sprite(world).position == (10, 20, 0)
+
+    def test_restore_components(self, populated_world):
+        world = populated_world
+        checkpoint = pdesper.WorldCheckpoint(world)
+        counter = world.get_component('player', AddCounterComponent)
+
+        world.remove_component('player', AddCounterComponent)
+        world.add_component('player', pyglet.text.Label())
+        checkpoint.restore()
+
+        assert world.get_component('player', AddCounterComponent) is counter
+        assert counter.added == 1
+        assert world.get_component('player', pyglet.text.Label) is None
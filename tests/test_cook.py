@@ -0,0 +1,115 @@
+from context import pyglet_desper as pdesper
+
+import os
+import os.path as pt
+import shutil
+import json
+
+import desper
+import pytest
+import pyglet
+
+from helpers import *       # NOQA
+
+
+@pytest.fixture
+def cook_source(world_dict, tmp_path):
+    source = tmp_path / 'source'
+    shutil.copytree(get_filename('files', 'fake_project'), source)
+    (source / 'world').mkdir()
+    (source / 'world' / 'level.json').write_text(json.dumps(world_dict))
+
+    # Aseprite hash format
+    sheet = json.loads((source / 'image' / 'animation1.json').read_text())
+    sheet['frames'] = {str(i): frame for i, frame
+                       in enumerate(sheet['frames'])}
+    (source / 'image' / 'hash.json').write_text(json.dumps(sheet))
+    return source
+
+
+class TestCookResources:
+
+    def test_cook(self, cook_source, world_dict, tmp_path, window,
+                  monkeypatch):
+        destination = tmp_path / 'cooked'
+        report = pdesper.cook_resources(str(cook_source), str(destination),
+                                        max_workers=2)
+
+        assert not report.errors
+        assert not report.skipped
+        assert 'world/level.json' in report.cooked
+        assert len(report.cooked) == len(pdesper.load_manifest(
+            str(destination)))
+
+        level = str(destination / 'world' / 'level.json')
+        assert pdesper.is_binary_world_file(level)
+        assert pdesper.read_binary_world(level) == world_dict
+
+        original = json.loads(
+            (cook_source / 'image' / 'animation1.json').read_text())
+        normalized = json.loads(
+            (destination / 'image' / 'hash.json').read_text())
+        assert normalized['meta'] == {'image': original['meta']['image'],
+                                      'origin': original['meta']['origin']}
+        assert [frame['frame'] for frame in normalized['frames']] == [
+            frame['frame'] for frame in original['frames']]
+
+        # Cooked directories are populated as usual
+        window.switch_to()
+        monkeypatch.setattr(pdesper.model, 'default_texture_bin', None)
+        pdesper.clear_image_cache()
+        resource_map = desper.ResourceMap()
+        pdesper.resource_populator(resource_map, str(destination),
+                                   trim_extensions=True)
+        assert isinstance(resource_map['image/hash'], pyglet.image.Animation)
+
+    def test_incremental(self, cook_source, tmp_path):
+        destination = str(tmp_path / 'cooked')
+        first = pdesper.cook_resources(str(cook_source), destination)
+
+        report = pdesper.cook_resources(str(cook_source), destination)
+        assert not report.cooked
+        assert report.skipped == sorted(first.cooked)
+
+        # Referenced images invalidate spritesheets
+        (cook_source / 'image' / 'animation1.png').write_bytes(
+            (cook_source / 'image' / 'logo.png').read_bytes())
+        os.remove(cook_source / 'media' / 'yayuh.wav')
+        report = pdesper.cook_resources(str(cook_source), destination)
+        assert report.cooked == ['image/animation1.json',
+                                 'image/animation1.png', 'image/hash.json']
+        assert report.removed == ['media/yayuh.wav']
+        assert not pt.exists(pt.join(destination, 'media', 'yayuh.wav'))
+
+        report = pdesper.cook_resources(str(cook_source), destination,
+                                        force=True)
+        assert not report.skipped
+
+    def test_errors(self, cook_source, tmp_path):
+        (cook_source / 'image' / 'broken.png').write_bytes(b'not an image')
+        (cook_source / 'image' / 'oversized.json').write_text(json.dumps(
+            {'frames': [{'frame': {'x': 25, 'w': 10}}],
+             'meta': {'image': 'animation1.png'}}))
+
+        destination = str(tmp_path / 'cooked')
+        report = pdesper.cook_resources(str(cook_source), destination)
+
+        assert report.errors.keys() == {'image/broken.png',
+                                        'image/oversized.json'}
+        assert 'image/broken.png' not in pdesper.load_manifest(destination)
+
+        report = pdesper.cook_resources(str(cook_source), destination)
+        assert report.errors.keys() == {'image/broken.png',
+                                        'image/oversized.json'}
+        assert not report.cooked
+
+
+def test_normalize_spritesheet():
+    metadata = {'frames': [{'frame': {'x': 10, 'w': 10}, 'rotated': False}],
+                'meta': {'image': 'sheet.png', 'origin': {'y': 2},
+                         'app': 'aseprite'}}
+
+    assert pdesper.normalize_spritesheet(metadata, 20, 10) == {
+        'frames': [{'frame': {'x': 10, 'y': 0, 'w': 10, 'h': 10},
+                    'duration': 1000}],
+        'meta': {'image': 'sheet.png', 'origin': {'x': 0, 'y': 2}}}
@@ -36,6 +36,752 @@ class TestSprite:
         sprite.on_switch_out(None, None)
         assert sprite.paused
 
+    def test_get_sprite_group(self, window, image):
+        group = pyglet.graphics.Group()
+        sprite1 = pdesper.Sprite(image, group=group)
+        sprite2 = pdesper.Sprite(image, group=group)
+        sprite3 = pdesper.Sprite(image)
+
+        assert sprite1._group is sprite2._group
+        assert sprite1._group is not sprite3._group
+        sprite3.group = group
+        assert sprite3._group is sprite1._group
+
+
+@pytest.fixture
+def long_animation(image):
+    image2 = pyglet.image.SolidColorImagePattern(
+        (0, 255, 0, 255)).create_image(100, 100)
+    return pyglet.image.Animation([
+        pyglet.image.AnimationFrame(image, 1),
+        pyglet.image.AnimationFrame(image2, 1),
+    ])
+
+
+class TestAnimationProcessor:
+
+    def test_add(self, window, world, long_animation):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        sprite = pdesper.Sprite(long_animation)
+        world.create_entity(sprite)
+
+        assert sprite in processor.sprites
+        assert not sprite.paused
+        # Switch events are ignored
+        world.dispatch('on_switch_out', None, None)
+        assert not sprite.paused
+
+    def test_remove(self, window, world, long_animation):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        sprite = pdesper.Sprite(long_animation)
+        entity = world.create_entity(sprite)
+
+        world.delete_entity(entity)
+        world.process(0)
+
+        assert sprite not in processor.sprites
+        assert sprite.paused
+
+        # Animation is scheduled again in a world without processor
+        other_world = desper.World()
+        other_world.create_entity(sprite)
+        assert not sprite.paused
+        assert sprite._animate in (
+            item.func
+            for item in pyglet.clock.get_default()._schedule_interval_items)
+        pyglet.clock.unschedule(sprite._animate)
+
+    def test_switch_handlers(self, window, world, long_animation):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        sprite = pdesper.Sprite(long_animation)
+        world.create_entity(sprite)
+
+        assert not world.is_handler(sprite)
+
+    def test_process(self, window, world, long_animation):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        sprite = pdesper.Sprite(long_animation)
+        world.create_entity(sprite)
+
+        world.process(0.5)
+        assert sprite.frame_index == 0
+
+        world.process(0.6)
+        assert sprite.frame_index == 1
+
+        # Loop back
+        world.process(1.)
+        assert sprite.frame_index == 0
+
+        # Skip a full cycle
+        world.process(2.)
+        assert sprite.frame_index == 0
+
+        sprite.paused = True
+        world.process(1.)
+        assert sprite.frame_index == 0
+
+    def test_image(self, window, world, long_animation, image):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        sprite = pdesper.Sprite(long_animation)
+        world.create_entity(sprite)
+
+        sprite.image = image
+        world.process(2.)
+        assert not isinstance(sprite.image, pyglet.image.Animation)
+
+        sprite.image = long_animation
+        world.process(1.5)
+        assert sprite.frame_index == 1
+
+
+@pytest.fixture
+def tiled_image(window, image):
+    return pdesper.split_image(image, 40, 40,
+                               pyglet.graphics.TextureBin(64, 64))
+
+
+class TestTiledSprite:
+
+    def test_init(self, tiled_image):
+        batch = pyglet.graphics.Batch()
+        tiled_sprite = pdesper.TiledSprite(tiled_image, 1, 2, batch=batch)
+
+        assert tiled_sprite.image is tiled_image
+        assert len(tiled_sprite.tiles) == len(tiled_image.tiles)
+        for tile in tiled_sprite.tiles:
+            assert tile.position == (1, 2, 0)
+            assert tile.batch is batch
+
+    def test_update(self, tiled_image):
+        tiled_sprite = pdesper.TiledSprite(tiled_image)
+        tiled_sprite.update(x=3, y=4, rotation=10, scale_x=2, scale_y=3)
+
+        assert tiled_sprite.position == (3, 4, 0)
+        assert tiled_sprite.width == tiled_image.width * 2
+        assert tiled_sprite.height == tiled_image.height * 3
+        for tile in tiled_sprite.tiles:
+            assert tile.position == (3, 4, 0)
+            assert tile.rotation == 10
+            assert (tile.scale_x, tile.scale_y) == (2, 3)
+
+    def test_cull(self, tiled_image):
+        tiled_sprite = pdesper.TiledSprite(tiled_image)
+        tiled_sprite.cull(0, 0, 30, 30)
+
+        visible = [tile.visible for tile in tiled_sprite.tiles]
+        assert visible.count(True) == 1
+
+        tiled_sprite.cull(0, 0, 100, 100)
+        assert all(tile.visible for tile in tiled_sprite.tiles)
+
+    def test_sync(self, tiled_image, world):
+        tiled_sprite = pdesper.TiledSprite(tiled_image)
+        transform = desper.Transform2D((1, 2), 3, (4, 5))
+        world.create_entity(transform, tiled_sprite,
+                            pdesper.SpriteSync(pdesper.TiledSprite))
+
+        assert tiled_sprite.position[:2] == transform.position
+        assert tiled_sprite.rotation == transform.rotation
+        assert (tiled_sprite.scale_x, tiled_sprite.scale_y) == transform.scale
+
+
+@pytest.fixture
+def tileset(window, image):
+    texture = image.get_texture()
+    return [texture.get_region(x, y, 50, 50)
+            for y in (50, 0) for x in (0, 50)]
+
+
+def get_tile_positions(tilemap, column, row):
+    chunk = tilemap._chunks[column // tilemap.chunk_size,
+                            row // tilemap.chunk_size]
+    slot = (row - chunk.row) * chunk.columns + column - chunk.column
+    return tuple(chunk.vertex_list.position[slot * 12:slot * 12 + 12])
+
+
+class TestTilemap:
+
+    def test_init(self, tileset):
+        batch = pyglet.graphics.Batch()
+        tilemap = pdesper.Tilemap(tileset, [[0, 1, 2], [3], [-1, 0]],
+                                  chunk_size=2, batch=batch)
+
+        assert (tilemap.columns, tilemap.rows) == (3, 3)
+        assert (tilemap.width, tilemap.height) == (150, 150)
+        assert tilemap.chunk_count == 4
+        assert tilemap.get_tiles() == [[0, 1, 2], [3, -1, -1], [-1, 0, -1]]
+        assert tilemap.batch is batch
+
+        # Rows are listed from the top
+        assert get_tile_positions(tilemap, 0, 0)[:3] == (0, 100, 0)
+        assert get_tile_positions(tilemap, 2, 0)[6:9] == (150, 150, 0)
+        assert get_tile_positions(tilemap, 0, 2) == (0,) * 12
+        batch.draw()
+
+    def test_set_tile(self, tileset):
+        tilemap = pdesper.Tilemap(tileset, [[0, 1], [2, 3]], chunk_size=1)
+        chunk = tilemap._chunks[1, 1]
+
+        tilemap.set_tile(1, 1, 0)
+        assert tilemap.get_tile(1, 1) == 0
+        assert tuple(chunk.vertex_list.tex_coords) == tileset[0].tex_coords
+
+        tilemap.set_tile(1, 1, pdesper.EMPTY_TILE)
+        assert get_tile_positions(tilemap, 1, 1) == (0,) * 12
+        assert get_tile_positions(tilemap, 0, 1)[:3] == (0, 0, 0)
+
+    def test_position(self, tileset):
+        tilemap = pdesper.Tilemap(tileset, [[0, 1]], 1, 2, 3, chunk_size=1)
+
+        tilemap.position = 4, 5
+        assert tilemap.position == (4, 5, 3)
+        for chunk in tilemap._chunks.values():
+            assert tuple(chunk.vertex_list.translate) == (4, 5, 3) * 4
+
+        assert tilemap.get_cell(60, 10) == (1, 0)
+        assert tilemap.get_cell(0, 10) is None
+
+    def test_cull(self, tileset):
+        tiles = [[0] * 8 for _ in range(8)]
+        tilemap = pdesper.Tilemap(tileset, tiles, chunk_size=2)
+        assert tilemap.visible_chunk_count == 16
+
+        tilemap.cull(0, 0, 90, 90)
+        assert tilemap.visible_chunk_count == 1
+        assert tilemap._chunks[0, 3].group.visible
+
+        tilemap.cull(50, 50, 150, 100)
+        assert tilemap.visible_chunk_count == 4
+
+        tilemap.visible = False
+        assert tilemap.visible_chunk_count == 0
+        tilemap.visible = True
+        assert tilemap.visible_chunk_count == 16
+
+    def test_migrate(self, tileset):
+        batch = pyglet.graphics.Batch()
+        group = pyglet.graphics.Group()
+        tilemap = pdesper.Tilemap(tileset, [[0, 1], [2, 3]], chunk_size=1)
+        tilemap.set_tile(0, 0, 3)
+        tilemap.draw()
+
+        tilemap.migrate(batch, group)
+        assert tilemap.batch is batch
+        assert tilemap.group is group
+        assert tilemap.chunk_count == 4
+        for chunk in tilemap._chunks.values():
+            assert chunk.group.parent is group
+        assert (tuple(tilemap._chunks[0, 0].vertex_list.tex_coords)
+                == tileset[3].tex_coords)
+
+    def test_animation_tileset(self, tileset):
+        animation = pyglet.image.Animation.from_image_sequence(tileset, 1)
+        tilemap = pdesper.Tilemap(animation, [[3]])
+
+        assert [tile.tex_coords for tile in tilemap.tileset] == [
+            tile.tex_coords for tile in tileset]
+
+    def test_sync(self, tileset, world):
+        tilemap = pdesper.Tilemap(tileset, [[0]])
+        transform = desper.Transform2D((1, 2))
+        world.create_entity(transform, tilemap,
+                            pdesper.tilemap_sync_component())
+
+        assert tilemap.position[:2] == (1, 2)
+        transform.position = 3, 4
+        assert tilemap.position[:2] == (3, 4)
+
+    def test_remove(self, tileset, world):
+        batch = pyglet.graphics.Batch()
+        tilemap = pdesper.Tilemap(tileset, [[0, 1], [2, 3]], chunk_size=1,
+                                  batch=batch)
+        entity = world.create_entity(tilemap)
+        assert tilemap.chunk_count == 4
+
+        world.delete_entity(entity)
+        world.process()
+        assert tilemap.chunk_count == 0
+        batch.draw()
+
+    def test_pool(self, tileset, world):
+        pool = pdesper.GraphicPool(pdesper.Tilemap)
+        tilemap = pool.acquire(tileset, [[0, 1]])
+        entity = world.create_entity(desper.Transform2D(), tilemap,
+                                     pdesper.tilemap_sync_component(pool))
+
+        world.delete_entity(entity)
+        world.process()
+        assert pool.free == 1
+        assert not tilemap.visible
+
+        # Reused tilemaps build their chunks again
+        assert pool.acquire(tileset, [[0, 1]]) is tilemap
+        assert tilemap.visible
+        assert tilemap.chunk_count == 1
+
+
+class TestTilemapCullProcessor:
+
+    def test_process(self, tileset, world):
+        batch = pyglet.graphics.Batch()
+        camera = pdesper.Camera(batch, desper.math.Mat4.orthogonal_projection(
+            0, 100, 0, 100, -1, 1))
+        tilemap = pdesper.Tilemap(tileset, [[0] * 8 for _ in range(8)],
+                                  chunk_size=2, batch=batch)
+        unrendered_tilemap = pdesper.Tilemap(tileset, [[0] * 8] * 8,
+                                             chunk_size=2)
+        world.create_entity(camera)
+        world.create_entity(tilemap)
+        world.create_entity(unrendered_tilemap)
+        world.add_processor(pdesper.TilemapCullProcessor())
+
+        world.process()
+        assert tilemap.visible_chunk_count == 1
+        assert unrendered_tilemap.visible_chunk_count == 16
+
+        camera.view = desper.math.Mat4.from_translation(
+            desper.math.Vec3(-150, -150, 0))
+        world.process()
+        assert tilemap.visible_chunk_count == 4
+
+
+@pytest.fixture
+def atlas_images(window, image):
+    texture_bin = pyglet.graphics.TextureBin(256, 256)
+    image2 = pyglet.image.SolidColorImagePattern(
+        (0, 255, 0, 255)).create_image(50, 50)
+    return texture_bin.add(image), texture_bin.add(image2)
+
+
+class TestSpriteInstancer:
+
+    def test_create_instance(self, atlas_images):
+        batch = pyglet.graphics.Batch()
+        instancer = pdesper.SpriteInstancer(atlas_images[0], batch)
+        instance = instancer.create_instance(atlas_images[1], 1, 2, 3, 45)
+
+        assert instancer.instance_count == 1
+        assert tuple(instance.translate) == (1, 2, 3)
+        assert tuple(instance.rotation) == (45,)
+        assert tuple(instance.bounds) == (50, 50, 0, 0)
+
+        instance.delete()
+        assert instancer.instance_count == 0
+
+
+class TestInstancedSprite:
+
+    def test_init(self, atlas_images):
+        instancer = pdesper.SpriteInstancer(atlas_images[0])
+        sprite = pdesper.InstancedSprite(instancer, atlas_images[0], 1, 2)
+
+        assert sprite.position == (1, 2, 0)
+        assert instancer.instance_count == 1
+
+    def test_update(self, atlas_images):
+        instancer = pdesper.SpriteInstancer(atlas_images[0])
+        sprite = pdesper.InstancedSprite(instancer, atlas_images[0])
+
+        sprite.update(x=3, y=4, rotation=10, scale=2, scale_x=3)
+        assert tuple(sprite._instance.translate) == (3, 4, 0)
+        assert tuple(sprite._instance.rotation) == (10,)
+        assert tuple(sprite._instance.scale) == (6, 2)
+
+    def test_image(self, atlas_images):
+        instancer = pdesper.SpriteInstancer(atlas_images[0])
+        sprite = pdesper.InstancedSprite(instancer, atlas_images[0])
+
+        sprite.image = atlas_images[1]
+        assert tuple(sprite._instance.bounds) == (50, 50, 0, 0)
+
+        sprite.visible = False
+        assert tuple(sprite._instance.bounds) == (0, 0, 0, 0)
+
+    def test_sync(self, atlas_images, world):
+        instancer = pdesper.SpriteInstancer(atlas_images[0])
+        sprite = pdesper.InstancedSprite(instancer, atlas_images[0])
+        transform = desper.Transform2D((1, 2), 3, (4, 5))
+        entity = world.create_entity(
+            transform, sprite, pdesper.instanced_sprite_sync_component())
+
+        assert sprite.position == (1, 2, 0)
+        assert sprite.rotation == 3
+        assert (sprite.scale_x, sprite.scale_y) == (4, 5)
+
+        transform.position = desper.math.Vec2(7, 8)
+        assert sprite.position == (7, 8, 0)
+
+        world.delete_entity(entity)
+        world.process()
+        assert instancer.instance_count == 0
+
+
+class TestShapeBatch:
+
+    def test_add_remove(self, window):
+        shape_batch = pdesper.ShapeBatch()
+        instance = shape_batch.add('circle')
+        instance2 = shape_batch.add('circle')
+        shape_batch.write('circle', instance2, 'translate', (1, 2, 3))
+
+        assert shape_batch.get_count('circle') == 2
+        assert shape_batch.get_count('line') == 0
+        assert shape_batch.dirty
+
+        shape_batch.remove('circle', instance)
+        assert shape_batch.get_count('circle') == 1
+        assert shape_batch.get_record('circle', instance2,
+                                      'translate') == (1, 2, 3)
+
+    def test_delete(self, window):
+        batch = pyglet.graphics.Batch()
+        circle = pdesper.BatchedCircle(batch=batch)
+        shape_batch = circle.shape_batch
+
+        shape_batch.delete()
+        assert shape_batch.get_count('circle') == 0
+
+        # Records of the freed vertex list are ignored
+        other_circle = pdesper.BatchedCircle(batch=batch)
+        assert other_circle.shape_batch is shape_batch
+        circle.delete()
+        del circle
+        assert shape_batch.get_count('circle') == 1
+
+    def test_flush(self, window):
+        shape_batch = pdesper.ShapeBatch()
+        instance = shape_batch.add('rectangle')
+        shape_batch.write('rectangle', instance, 'size', (4, 5))
+
+        shape_batch.draw()
+        assert not shape_batch.dirty
+        assert tuple(instance.size) == (4, 5)
+
+    def test_get_shape_batch(self, window):
+        batch = pyglet.graphics.Batch()
+        group = pyglet.graphics.Group(1)
+        shape_batch = pdesper.get_shape_batch(batch, group)
+
+        assert shape_batch is pdesper.get_shape_batch(batch, group)
+        assert shape_batch is not pdesper.get_shape_batch(batch)
+        assert shape_batch.batch is batch
+
+
+class TestBatchedShape:
+
+    def test_init(self, window):
+        batch = pyglet.graphics.Batch()
+        circle = pdesper.BatchedCircle(1, 2, 3, (255, 0, 0), batch=batch)
+        shape_batch = circle.shape_batch
+
+        assert shape_batch is pdesper.get_shape_batch(batch)
+        assert circle.color == (255, 0, 0, 255)
+        assert shape_batch.get_record('circle', circle._instance,
+                                      'translate') == (1, 2, 0)
+        assert shape_batch.get_record('circle', circle._instance,
+                                      'size') == (3, 3)
+
+        circle.delete()
+        assert shape_batch.get_count('circle') == 0
+
+    def test_properties(self, window):
+        rectangle = pdesper.BatchedRectangle(1, 2, 3, 4)
+        shape_batch = rectangle.shape_batch
+
+        rectangle.x = 5
+        rectangle.rotation = 10
+        rectangle.anchor_position = 1, 2
+        rectangle.opacity = 100
+        assert rectangle.position == (5, 2, 0)
+        for name, values in (('translate', (5, 2, 0)), ('rotation', (10,)),
+                             ('anchor', (1, 2)),
+                             ('colors', (255, 255, 255, 100))):
+            assert shape_batch.get_record('rectangle', rectangle._instance,
+                                          name) == values
+
+        rectangle.visible = False
+        assert shape_batch.get_record('rectangle', rectangle._instance,
+                                      'size') == (0, 0)
+        rectangle.visible = True
+        assert shape_batch.get_record('rectangle', rectangle._instance,
+                                      'size') == (3, 4)
+
+    def test_line(self, window):
+        line = pdesper.BatchedLine(1, 1, 1, 4, 2)
+        shape_batch = line.shape_batch
+
+        assert shape_batch.get_record('line', line._instance,
+                                      'size') == (3, 2)
+        assert shape_batch.get_record('line', line._instance,
+                                      'rotation') == (-90,)
+
+        line.position = 2, 2
+        assert (line.x2, line.y2) == (2, 5)
+
+        line.x2 = 6
+        assert shape_batch.get_record('line', line._instance,
+                                      'size') == (5, 2)
+
+    def test_migrate(self, window):
+        batch = pyglet.graphics.Batch()
+        circle = pdesper.BatchedCircle(1, 2, 3)
+        circle.color = 0, 255, 0
+        old_shape_batch = circle.shape_batch
+
+        circle.group = pyglet.graphics.Group(2)
+        circle.batch = batch
+        assert circle.shape_batch is pdesper.get_shape_batch(batch,
+                                                             circle.group)
+        assert old_shape_batch.get_count('circle') == 0
+        assert circle.shape_batch.get_record('circle', circle._instance,
+                                             'colors') == (0, 255, 0, 255)
+        batch.draw()
+
+    def test_sync(self, window, world):
+        rectangle = pdesper.BatchedRectangle(
+            0, 0, 10, 10, batch=pyglet.graphics.Batch())
+        transform = desper.Transform2D((1, 2), 3)
+        entity = world.create_entity(
+            transform, rectangle, pdesper.batched_rectangle_sync_component())
+
+        assert rectangle.position == (1, 2, 0)
+        assert rectangle.rotation == 3
+
+        transform.position = desper.math.Vec2(7, 8)
+        transform.rotation = 9
+        assert rectangle.shape_batch.get_record(
+            'rectangle', rectangle._instance, 'translate') == (7, 8, 0)
+        assert rectangle.rotation == 9
+
+        shape_batch = rectangle.shape_batch
+        world.delete_entity(entity)
+        world.process()
+        assert shape_batch.get_count('rectangle') == 0
+
+        # With a pool, shapes are released to it
+        pool = pdesper.GraphicPool(pdesper.BatchedRectangle)
+        entity = world.create_entity(
+            desper.Transform2D(), pool.acquire(),
+            pdesper.batched_rectangle_sync_component(pool))
+        world.delete_entity(entity)
+        world.process()
+        assert pool.free == 1
+
+    def test_pool(self, window):
+        pool = pdesper.GraphicPool(pdesper.BatchedCircle)
+        circle = pool.acquire(1, 2, 3)
+        pool.release(circle)
+
+        assert pool.acquire(4, 5, 6) is circle
+        assert circle.position == (4, 5, 0)
+        assert circle.radius == 6
+        assert circle.visible
+
+
+class TestGraphicPool:
+
+    def test_acquire_release(self, window, image):
+        pool = pdesper.GraphicPool(pdesper.Sprite)
+        sprite = pool.acquire(image, 1, 2)
+
+        assert isinstance(sprite, pdesper.Sprite)
+        assert pool.misses == 1
+
+        sprite.rotation = 10
+        sprite.opacity = 100
+        pool.release(sprite)
+        assert not sprite.visible
+        assert pool.free == 1
+
+        assert pool.acquire(image, x=3) is sprite
+        assert sprite.visible
+        assert sprite.position == (3, 0, 0)
+        assert sprite.rotation == 0
+        assert sprite.opacity == 255
+        assert pool.hits == 1
+        assert pool.hit_rate == 0.5
+
+        pool.reset_stats()
+        assert pool.hit_rate == 0
+
+    def test_shape(self, window):
+        pool = pdesper.GraphicPool(pyglet.shapes.Circle)
+        circle = pool.acquire(1, 2, 3, color=(255, 0, 0, 255))
+        pool.release(circle)
+
+        assert pool.acquire(4, 5, 6) is circle
+        assert circle.position == (4, 5)
+        assert circle.radius == 6
+        assert tuple(circle.color) == (255, 255, 255, 255)
+
+    def test_max_size(self, window, image):
+        pool = pdesper.GraphicPool(pdesper.Sprite, max_size=1)
+        sprite1 = pool.acquire(image)
+        sprite2 = pool.acquire(image)
+
+        pool.release(sprite1)
+        pool.release(sprite2)
+        assert pool.free == 1
+        assert sprite2._vertex_list is None
+
+        pool.clear()
+        assert pool.free == 0
+        assert sprite1._vertex_list is None
+
+    def test_sync(self, window, image, world):
+        pool = pdesper.GraphicPool(pdesper.Sprite)
+        sprite = pool.acquire(image)
+        entity = world.create_entity(desper.Transform2D((1, 2)), sprite,
+                                     pdesper.SpriteSync(pdesper.Sprite, pool))
+
+        world.delete_entity(entity)
+        world.process()
+        assert pool.free == 1
+        assert sprite._vertex_list is not None
+        assert not sprite.visible
+
+        sprite = pool.acquire(image)
+        world.create_entity(desper.Transform2D((3, 4)), sprite,
+                            pdesper.SpriteSync(pdesper.Sprite, pool))
+        assert sprite.visible
+        assert sprite.position == (3, 4, 0)
+
+    def test_animated_sprite(self, window, world, long_animation):
+        processor = pdesper.AnimationProcessor()
+        world.add_processor(processor)
+        pool = pdesper.GraphicPool(pdesper.Sprite)
+
+        sprite = pool.acquire(long_animation)
+        entity = world.create_entity(desper.Transform2D(), sprite,
+                                     pdesper.SpriteSync(pdesper.Sprite, pool))
+        world.delete_entity(entity)
+        world.process(0)
+        assert sprite not in processor.sprites
+
+        sprite = pool.acquire(long_animation)
+        world.create_entity(desper.Transform2D(), sprite,
+                            pdesper.SpriteSync(pdesper.Sprite, pool))
+        assert sprite in processor.sprites
+
+
+class TestTransformBuffer:
+
+    def test_allocate(self):
+        transform_buffer = pdesper.TransformBuffer(2)
+        indices = [transform_buffer.allocate() for _ in range(3)]
+
+        assert indices == [0, 1, 2]
+        assert transform_buffer.capacity == 4
+        assert transform_buffer.size == 3
+        assert transform_buffer.get_record(2) == (0, 0, 0, 0, 1, 1)
+
+        transform_buffer.release(1)
+        assert transform_buffer.size == 2
+        assert transform_buffer.allocate() == 1
+
+    def test_set(self):
+        transform_buffer = pdesper.TransformBuffer()
+        index = transform_buffer.allocate()
+
+        transform_buffer.set_translation(index, 1, 2, 3)
+        transform_buffer.set_rotation(index, 4)
+        transform_buffer.set_scale(index, 5, 6)
+        assert transform_buffer.get_record(index) == (1, 2, 3, 4, 5, 6)
+
+    def test_upload(self, window):
+        transform_buffer = pdesper.TransformBuffer()
+        transform_buffer.allocate()
+
+        transform_buffer.bind(1)
+        assert not transform_buffer.dirty
+
+        transform_buffer.set_rotation(0, 10)
+        assert transform_buffer.dirty
+
+        transform_buffer.delete()
+
+
+class TestBufferedSprite:
+
+    def test_init(self, window, image):
+        transform_buffer = pdesper.TransformBuffer()
+        sprite = pdesper.BufferedSprite(image, 1, 2,
+                                        transform_buffer=transform_buffer)
+
+        assert sprite.transform_buffer is transform_buffer
+        assert transform_buffer.size == 1
+        assert transform_buffer.get_record(0)[:3] == (1, 2, 0)
+
+        sprite.delete()
+        assert transform_buffer.size == 0
+
+    def test_default_transform_buffer(self, window, image):
+        sprite = pdesper.BufferedSprite(image)
+
+        assert (sprite.transform_buffer
+                is pdesper.get_default_transform_buffer())
+        sprite.delete()
+
+    def test_update(self, window, image):
+        transform_buffer = pdesper.TransformBuffer()
+        sprite = pdesper.BufferedSprite(image,
+                                        transform_buffer=transform_buffer)
+
+        sprite.update(x=3, y=4, rotation=10, scale=2, scale_x=3)
+        assert sprite.position == (3, 4, 0)
+        assert transform_buffer.get_record(0) == (3, 4, 0, 10, 6, 2)
+
+        sprite.z = 5
+        sprite.scale_y = 2
+        assert transform_buffer.get_record(0) == (3, 4, 5, 10, 6, 4)
+
+    def test_set_transform(self, window, image):
+        transform_buffer = pdesper.TransformBuffer()
+        sprite = pdesper.BufferedSprite(image,
+                                        transform_buffer=transform_buffer)
+
+        sprite.set_transform((1, 2, 3), 4)
+        assert sprite.position == (1, 2, 3)
+        assert sprite.rotation == 4
+        assert transform_buffer.get_record(0)[:4] == (1, 2, 3, 4)
+
+        sprite.set_transform(rotation=5)
+        assert transform_buffer.get_record(0)[:4] == (1, 2, 3, 5)
+
+    def test_batch(self, window, image):
+        batch = pyglet.graphics.Batch()
+        sprite = pdesper.BufferedSprite(image, batch=batch)
+
+        sprite.group = pyglet.graphics.Group(3)
+        assert isinstance(sprite._group, pdesper.TransformBufferSpriteGroup)
+        assert sprite._group.parent is sprite.group
+        batch.draw()
+
+    def test_sync(self, window, image, world):
+        transform_buffer = pdesper.TransformBuffer()
+        sprite = pdesper.BufferedSprite(image,
+                                        transform_buffer=transform_buffer)
+        transform = desper.Transform2D((1, 2), 3, (4, 5))
+        entity = world.create_entity(
+            transform, sprite, pdesper.buffered_sprite_sync_component())
+
+        assert transform_buffer.get_record(0) == (1, 2, 0, 3, 4, 5)
+
+        transform.position = desper.math.Vec2(7, 8)
+        transform.rotation = 9
+        assert sprite.position == (7, 8, 0)
+        assert transform_buffer.get_record(0)[:4] == (7, 8, 0, 9)
+
+        world.delete_entity(entity)
+        world.process()
+        assert transform_buffer.size == 0
+
 
 class TestCamera:
 
@@ -59,6 +805,21 @@ class TestCamera:
 
         different_window.close()
 
+    def test_get_bounds(self, window):
+        camera = pdesper.Camera(pyglet.graphics.Batch(),
+                                desper.math.Mat4.orthogonal_projection(
+                                    0, 200, 0, 100, -1, 1))
+        assert camera.get_bounds() == pytest.approx((0, 0, 200, 100))
+
+        camera.view = desper.math.Mat4.from_translation(
+            desper.math.Vec3(-10, -20, 0))
+        assert camera.get_bounds() == pytest.approx((10, 20, 200, 100))
+
+        # Default, pyglet projection
+        camera = pdesper.Camera(pyglet.graphics.Batch())
+        assert camera.get_bounds() == pytest.approx(
+            (0, 0, window.width, window.height))
+
 
 class TestCameraProcessor:
 
@@ -74,6 +835,8 @@ class TestCameraProcessor:
         processor = pdesper.CameraProcessor(different_window)
 
         assert processor.window is different_window
+        different_window.close()
+        window.switch_to()
 
 
 class TestCameraTransform2D:
@@ -213,6 +976,18 @@ def test_arc_sync_component():
     (pdesper.polygon_sync_component, pyglet.shapes.Polygon,
      pdesper.PositionRotationSync2D),
 
+    # Batched shapes
+    (pdesper.batched_circle_sync_component, pdesper.BatchedCircle,
+     pdesper.BatchedShapeSync),
+    (pdesper.batched_rectangle_sync_component, pdesper.BatchedRectangle,
+     pdesper.BatchedShapeSync),
+    (pdesper.batched_line_sync_component, pdesper.BatchedLine,
+     pdesper.BatchedShapeSync),
+
+    # Tilemaps
+    (pdesper.tilemap_sync_component, pdesper.Tilemap,
+     pdesper.PositionSync2D),
+
     # Text
     (pdesper.documentlabel_sync_component, pyglet.text.DocumentLabel,
      pdesper.PositionRotationSync2D),
@@ -87,3 +87,241 @@ class TestLoop:
         loop.start()
 
         assert not handler.args_tuple
+
+    def test_coalesced_events(self, populated_world_handle, window):
+        loop = pdesper.Loop(
+            coalesced_events=pdesper.DEFAULT_COALESCED_EVENTS)
+        window.push_handlers()
+        loop.connect_window_events(window, 'on_mouse_motion',
+                                   'on_mouse_drag', 'on_key_press')
+
+        handler = OnMouseComponent()
+        populated_world_handle().create_entity(handler)
+        loop.switch(populated_world_handle)
+
+        for i in range(10):
+            window.dispatch_event('on_mouse_motion', i, i, 1, 2)
+        assert not handler.events
+
+        loop.iteration(0)
+        assert handler.events == [('on_mouse_motion', (9, 9, 10, 20))]
+
+        # Non matching drag events are not merged, order is preserved
+        handler.events.clear()
+        window.dispatch_event('on_mouse_drag', 1, 1, 1, 1, 1, 0)
+        window.dispatch_event('on_mouse_drag', 2, 2, 1, 1, 1, 0)
+        window.dispatch_event('on_mouse_drag', 3, 3, 1, 1, 2, 0)
+        window.dispatch_event('on_mouse_motion', 4, 4, 1, 1)
+        window.dispatch_event('on_key_press', 42, 42)
+        window.dispatch_event('on_mouse_motion', 5, 5, 1, 1)
+        loop.iteration(0)
+        assert handler.events == [
+            ('on_mouse_drag', (2, 2, 2, 2, 1, 0)),
+            ('on_mouse_drag', (3, 3, 1, 1, 2, 0)),
+            ('on_mouse_motion', (4, 4, 1, 1)),
+            ('on_key_press', (42, 42)),
+            ('on_mouse_motion', (5, 5, 1, 1))]
+
+        assert loop.raw_event_counts['on_mouse_motion'] == 12
+        assert loop.delivered_event_counts['on_mouse_motion'] == 3
+        assert loop.raw_event_counts['on_mouse_drag'] == 3
+        assert loop.delivered_event_counts['on_mouse_drag'] == 2
+
+        loop.reset_event_counts()
+        assert not loop.raw_event_counts
+        assert not loop.delivered_event_counts
+
+        window.pop_handlers()
+
+
+def test_keep_latest():
+    assert pdesper.keep_latest((1, 2), (3, 4)) == (3, 4)
+
+
+def test_accumulate_deltas():
+    coalesce = pdesper.accumulate_deltas((1,), (2,))
+
+    assert coalesce((1, 2, 0), (3, 4, 0)) == (3, 6, 0)
+    assert coalesce((1, 2, 0), (3, 4, 1)) is None
+
+
+class TestInputState:
+
+    def test_keys(self):
+        input_state = pdesper.InputState()
+        input_state.on_key_press(1, 0)
+        input_state.on_key_press(2, 0)
+        input_state.on_key_release(2, 0)
+        assert not input_state.held_keys
+
+        input_state.update()
+        assert input_state.is_held(1)
+        assert not input_state.is_held(2)
+        assert input_state.was_pressed(1)
+        assert input_state.was_pressed(2)
+        assert input_state.was_released(2)
+
+        input_state.update()
+        assert input_state.is_held(1)
+        assert not input_state.pressed_keys
+        assert not input_state.released_keys
+
+        input_state.on_deactivate()
+        input_state.update()
+        assert not input_state.held_keys
+        assert input_state.was_released(1)
+
+    def test_mouse(self):
+        input_state = pdesper.InputState()
+        input_state.on_mouse_motion(10, 10, 1, 2)
+        input_state.on_mouse_drag(20, 30, 1, 2, 1, 0)
+        input_state.on_mouse_press(20, 30, 1, 0)
+        input_state.on_mouse_press(20, 30, 4, 0)
+        input_state.on_mouse_release(20, 30, 4, 0)
+        input_state.on_mouse_scroll(20, 30, 0, 1)
+        input_state.on_mouse_scroll(20, 30, 0, 1)
+        input_state.update()
+
+        assert (input_state.mouse_x, input_state.mouse_y) == (20, 30)
+        assert (input_state.mouse_dx, input_state.mouse_dy) == (2, 4)
+        assert input_state.scroll_y == 2
+        assert input_state.is_button_held(1)
+        assert not input_state.is_button_held(4)
+        assert input_state.pressed_buttons == 5
+        assert input_state.released_buttons == 4
+
+        input_state.update()
+        assert (input_state.mouse_dx, input_state.mouse_dy) == (0, 0)
+        assert input_state.scroll_y == 0
+        assert input_state.is_button_held(1)
+        assert not input_state.pressed_buttons
+
+    def test_loop(self, populated_world_handle, window):
+        loop = pdesper.Loop()
+        window.push_handlers()
+        loop.switch(populated_world_handle)
+        input_state = loop.connect_input_state(window)
+
+        assert loop.connect_input_state(window) is input_state
+        assert pdesper.get_input_state(populated_world_handle(),
+                                       window) is input_state
+
+        # Input state still receives events consumed by the loop
+        loop.connect_window_events(window, 'on_key_press')
+        handler = OnKeyPressComponent()
+        populated_world_handle().create_entity(handler)
+
+        window.dispatch_event('on_key_press', 42, 0)
+        assert handler.args_tuple == (42, 0)
+        assert not input_state.is_held(42)
+        loop.iteration(0)
+        assert input_state.is_held(42)
+
+        # Added to other worlds on switch
+        other_handle = desper.WorldHandle()
+        loop.switch(other_handle)
+        assert pdesper.get_input_state(other_handle()) is input_state
+
+        loop.disconnect_input_state(window)
+        other_handle().process(0)
+        assert pdesper.get_input_state(other_handle()) is None
+        window.dispatch_event('on_key_release', 42, 0)
+        loop.iteration(0)
+        assert input_state.is_held(42)
+
+        window.pop_handlers()
+
+
+def test_resource_usage(wav_filename):
+    usage = pdesper.ResourceUsage()
+    loop = pdesper.Loop(resource_usage=usage)
+    shared = pdesper.MediaFileHandle(wav_filename)
+    exclusive = pdesper.MediaFileHandle(wav_filename)
+
+    def use_shared_and_exclusive(handle, world):
+        shared()
+        exclusive()
+
+    def use_shared(handle, world):
+        shared()
+
+    handle1 = desper.WorldHandle()
+    handle1.transform_functions.append(use_shared_and_exclusive)
+    handle2 = desper.WorldHandle()
+    handle2.transform_functions.append(use_shared)
+
+    loop.switch(handle1)
+    assert usage.get_handles(handle1) == {shared, exclusive}
+
+    loop.switch(handle2, clear_current=True)
+    assert usage.get_handles(handle2) == {shared}
+    assert shared.cached
+    assert not exclusive.cached
+    assert not handle1.cached
+
+    # Calls while a world is current are attributed to it
+    exclusive()
+    assert usage.get_handles(handle2) == {shared, exclusive}
+    loop.resource_usage = None
+
+
+def test_resource_usage_restart(wav_filename):
+    usage = pdesper.ResourceUsage()
+    loop = pdesper.Loop(resource_usage=usage)
+    kept = pdesper.MediaFileHandle(wav_filename)
+    dropped = pdesper.MediaFileHandle(wav_filename)
+    handles = [kept, dropped]
+
+    def use_handles(handle, world):
+        for resource_handle in handles:
+            resource_handle()
+
+    world_handle = desper.WorldHandle()
+    world_handle.transform_functions.append(use_handles)
+
+    loop.switch(world_handle)
+    world = loop.current_world
+    source = kept()
+
+    # Restarting reloads the world, freeing only unused resources
+    handles.remove(dropped)
+    loop.switch(world_handle, clear_current=True)
+    assert loop.current_world is not world
+    assert usage.get_handles(world_handle) == {kept}
+    assert kept() is source
+    assert not dropped.cached
+
+    # Replaced usages are detached
+    loop.resource_usage = None
+    dropped()
+    assert usage.get_handles(world_handle) == {kept}
+
+
+def test_resource_manifest(wav_filename):
+    resource_map = desper.ResourceMap()
+    resource_map['media'] = desper.ResourceMap()
+    resource_map['world'] = desper.ResourceMap()
+    resource_map['media/sound'] = pdesper.MediaFileHandle(wav_filename)
+    sound = resource_map.get('media/sound')
+    cached_on_load = []
+
+    def use_sound(handle, world):
+        cached_on_load.append(sound.cached)
+        sound()
+
+    resource_map['world/level'] = desper.WorldHandle()
+    world_handle = resource_map.get('world/level')
+    world_handle.transform_functions.append(use_sound)
+
+    # Record
+    manifest = pdesper.ResourceManifest()
+    manifest.attach()
+    pdesper.Loop(resource_manifest=manifest).switch(world_handle)
+    manifest.detach()
+    assert manifest.worlds == {'world/level': {'media/sound'}}
+
+    # Preload
+    sound.clear()
+    world_handle.clear()
+    pdesper.Loop(resource_manifest=manifest).switch(world_handle)
+    assert cached_on_load == [False, True]
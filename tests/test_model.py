@@ -5,6 +5,7 @@ import os
 import os.path as pt
 import json
 
+import desper
 import pytest
 import pyglet
 from pyglet.graphics import Batch
@@ -15,38 +16,11 @@ pyglet.resource.path = [pt.abspath(os.curdir).replace(os.sep, '/')]
 pyglet.resource.reindex()
 
 
-@pytest.fixture
-def wav_filename():
-    return get_filename('files', 'fake_project', 'media', 'yayuh.wav')
-
-
-@pytest.fixture
-def png_filename():
-    return get_filename('files', 'fake_project', 'image', 'logo.png')
-
-
-@pytest.fixture
-def png_image(png_filename):
-    return pyglet.image.load(png_filename)
-
-
-@pytest.fixture
-def animation_sheet_filename():
-    return get_filename('files', 'fake_project', 'image',
-                        'animation1.png')
-
-
 @pytest.fixture
 def animation_sheet(animation_sheet_filename):
     return pyglet.image.load(animation_sheet_filename)
 
 
-@pytest.fixture
-def animation_meta_filename():
-    return get_filename('files', 'fake_project', 'image',
-                        'animation1.json')
-
-
 @pytest.fixture
 def animation_meta(animation_meta_filename):
     with open(animation_meta_filename) as fin:
@@ -58,22 +32,6 @@ def gif_filename():
     return get_filename('files', 'fake_project', 'image', 'muybridge.gif')
 
 
-@pytest.fixture
-def font_filename():
-    return get_filename('files', 'fake_project', 'font', 'SillySet.ttf')
-
-
-@pytest.fixture
-def texture_bin():
-    return pyglet.graphics.TextureBin()
-
-
-@pytest.fixture
-def clear_cache():
-    yield
-    pdesper.clear_image_cache()
-
-
 def test_clear_image_cache(png_filename):
     pdesper.model._image_cache[png_filename] = None
 
@@ -96,6 +54,48 @@ class TestMediaFileHandle:
 
         assert isinstance(source, pyglet.media.Source)
 
+    def test_audio_cache(self, wav_filename):
+        audio_cache = pdesper.AudioCache()
+        handle1 = pdesper.MediaFileHandle(wav_filename,
+                                          audio_cache=audio_cache)
+        handle2 = pdesper.MediaFileHandle(wav_filename,
+                                          audio_cache=audio_cache)
+
+        assert handle1() is handle2()
+        assert audio_cache.misses == 1
+        assert audio_cache.hits == 1
+
+        streaming_handle = pdesper.MediaFileHandle(
+            wav_filename, streaming=True, audio_cache=audio_cache)
+        assert streaming_handle.preload() is None
+        assert streaming_handle() is not handle1()
+        assert len(audio_cache) == 1
+
+    def test_preload(self, wav_filename):
+        audio_cache = pdesper.AudioCache()
+        handle = pdesper.MediaFileHandle(wav_filename,
+                                         audio_cache=audio_cache)
+
+        source = handle.preload().result()
+        audio_cache.shutdown()
+
+        assert handle() is source
+        assert audio_cache.is_cached(wav_filename)
+
+
+def test_preload_media():
+    resource_map = desper.ResourceMap()
+    pdesper.resource_populator(resource_map,
+                               get_filename('files', 'fake_project'),
+                               trim_extensions=True)
+    pdesper.default_audio_cache.clear()
+
+    futures = pdesper.preload_media(resource_map)
+
+    assert len(futures) == 1
+    assert futures[0].result() is resource_map['media/yayuh']
+    assert pdesper.default_audio_cache.hits == 1
+
 
 class TestImageFileHandle:
 
@@ -129,6 +129,37 @@ class TestImageFileHandle:
 
         assert not texture_bin.atlases
 
+    def test_load_split_oversized(self, png_filename, png_image, clear_cache):
+        texture_bin = pyglet.graphics.TextureBin(64, 64)
+        handle = pdesper.ImageFileHandle(png_filename, texture_bin=texture_bin,
+                                         split_oversized=True)
+        image = handle.load()
+
+        assert isinstance(image, pdesper.TiledImage)
+        assert image.width == png_image.width
+        assert image.height == png_image.height
+        assert texture_bin.atlases
+
+
+def test_split_image(png_image, texture_bin):
+    png_image.anchor_x = 10
+    tiled_image = pdesper.split_image(png_image, 50, 60, texture_bin)
+
+    # 128x138 image
+    assert len(tiled_image.tiles) == 3 * 3
+    assert sum(tile.width for x, y, tile in tiled_image.tiles
+               if y == 0) == png_image.width
+
+    for x_offset, y_offset, tile in tiled_image.tiles:
+        assert tile.width <= 50
+        assert tile.height <= 60
+        assert tile.anchor_x == 10 - x_offset
+        assert tile.anchor_y == -y_offset
+
+    tiled_image.anchor_y = 5
+    for x_offset, y_offset, tile in tiled_image.tiles:
+        assert tile.anchor_y == 5 - y_offset
+
 
 class TestParseSpritesheet():
 
@@ -223,6 +254,7 @@ def test_default_processors_transformer():
     pdesper.default_processors_transformer(handle, world)
 
     assert world.get_processor(pdesper.CameraProcessor) is not None
+    assert world.get_processor(pdesper.AnimationProcessor) is not None
 
 
 def test_retrieve_batch(world, default_loop):
@@ -264,6 +296,19 @@ class TestWantsGroupBatch:
         assert group.order == order
         # Don't test for type, as the factory might be a simple function
 
+    def test_get_group(self):
+        pdesper.clear_group_cache()
+        wants1 = pdesper.WantsGroupBatch(3)
+        wants2 = pdesper.WantsGroupBatch(3)
+        wants3 = pdesper.WantsGroupBatch(4)
+
+        assert wants1.get_group() is wants2.get_group()
+        assert wants1.get_group() is not wants3.get_group()
+        assert wants3.get_group().order == 4
+
+        pdesper.clear_group_cache()
+        assert not pdesper.model._group_cache
+
 
 def test_init_graphics_transformer(png_image):
     handle = desper.WorldHandle()
@@ -281,17 +326,37 @@ def test_init_graphics_transformer(png_image):
 
     excluded_sprite = pdesper.Sprite(png_image)
 
+    tiled_sprite = pdesper.TiledSprite(
+        pdesper.split_image(png_image, 64, 64))
+    wants3 = pdesper.WantsGroupBatch(2)
+
+    circle = pdesper.BatchedCircle(0, 0, 10)
+    wants4 = pdesper.WantsGroupBatch(3)
+
+    tilemap = pdesper.Tilemap(png_image, [[0, 0]])
+    wants5 = pdesper.WantsGroupBatch(4)
+
     world.create_entity(sprite, sprite2, wants1)
     world.create_entity(text, wants2)
     world.create_entity(excluded_sprite)
+    world.create_entity(tiled_sprite, wants3)
+    world.create_entity(circle, wants4)
+    world.create_entity(tilemap, wants5)
 
     pdesper.init_graphics_transformer(handle, world)
 
-    assert sprite.batch is sprite2.batch is text.batch
+    assert sprite.batch is sprite2.batch is text.batch is tiled_sprite.batch
+    assert tiled_sprite.group.order == wants3.order
     assert sprite.batch is not excluded_sprite.batch
     assert sprite.group.order == sprite2.group.order == wants1.order
+    assert sprite.group is sprite2.group
     assert text.group.order == wants2.order
     assert excluded_sprite.group is None
+    assert circle.batch is sprite.batch
+    assert circle.group.order == wants4.order
+    assert circle.shape_batch.batch is sprite.batch
+    assert tilemap.batch is sprite.batch
+    assert tilemap.group.order == wants5.order
 
     assert not world.get(pdesper.WantsGroupBatch)
 
@@ -0,0 +1,63 @@
+from context import pyglet_desper as pdesper
+
+
+import importlib
+import inspect
+import subprocess
+import sys
+
+import pytest
+
+from helpers import *
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, '-c', code], check=True,
+                          capture_output=True, text=True,
+                          cwd=get_filename('..')).stdout
+
+
+def test_lazy_import():
+    output = run_python(
+        'import sys\n'
+        'import pyglet_desper\n'
+        'print("pyglet" in sys.modules)\n'
+        'import pyglet_desper.binary_world\n'
+        'print("pyglet" in sys.modules, "pyglet_desper.model" in sys.modules)'
+    )
+    assert output.split() == ['False', 'False', 'False']
+
+
+@pytest.mark.parametrize('submodule', pdesper._SUBMODULE_NAMES)
+def test_exported_names(submodule):
+    # NumPy is an optional dependency, only needed by particles
+    if submodule == 'particles':
+        pytest.importorskip('numpy')
+    module = importlib.import_module(f'pyglet_desper.{submodule}')
+
+    for name in pdesper._SUBMODULE_NAMES[submodule]:
+        assert getattr(pdesper, name) is getattr(module, name)
+
+    # Classes and functions defined in the submodule must be exported
+    for name, value in vars(module).items():
+        if (not name.startswith('_')
+                and (inspect.isclass(value) or inspect.isfunction(value))
+                and value.__module__.startswith(module.__name__)):
+            assert name in pdesper.__all__
+
+
+def test_star_import_without_numpy():
+    output = run_python(
+        'import sys\n'
+        'sys.modules["numpy"] = None\n'
+        'from pyglet_desper import *\n'
+        'print("Loop" in dir(), "ParticleEmitter" in dir())')
+    assert output.split()[-2:] == ['True', 'False']
+
+
+def test_missing_name():
+    with pytest.raises(AttributeError):
+        pdesper.missing_name
+
+    assert 'Loop' in dir(pdesper)
+    assert pdesper.model is importlib.import_module('pyglet_desper.model')
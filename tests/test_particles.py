@@ -0,0 +1,194 @@
+from context import pyglet_desper as pdesper
+
+import pyglet
+import pytest
+
+from helpers import *           # NOQA
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def image():
+    return pyglet.image.SolidColorImagePattern(
+        (255, 0, 0, 255)).create_image(8, 8)
+
+
+def get_vertex_array(emitter, name, size):
+    return np.ctypeslib.as_array(
+        getattr(emitter._vertex_list, name)).reshape(-1, 4, size)
+
+
+class TestParticleEmitter:
+
+    def test_emit(self, window, image):
+        emitter = pdesper.ParticleEmitter(image, 10, 20, capacity=5,
+                                          speed=10, direction=0, spread=0)
+
+        emitter.emit(3)
+        assert emitter.count == 3
+        assert np.allclose(emitter.positions, (10, 20))
+        assert np.allclose(emitter.velocities, (10, 0))
+
+        emitter.emit(10)
+        assert emitter.count == 5
+
+        emitter.clear()
+        assert emitter.count == 0
+
+    def test_update(self, window, image):
+        emitter = pdesper.ParticleEmitter(image, capacity=10, rate=10,
+                                          lifetime=1, speed=10, direction=90,
+                                          spread=0, gravity=(0, -10))
+
+        emitter.update(0.5)
+        assert emitter.count == 5
+        assert np.allclose(emitter.positions, 0)
+
+        emitter.emitting = False
+        emitter.update(0.25)
+        assert np.allclose(emitter.velocities, (0, 7.5))
+        assert np.allclose(emitter.positions, (0, 7.5 * 0.25))
+
+        # Particles die after their lifetime
+        emitter.update(0.8)
+        assert emitter.count == 0
+
+    def test_lifetime_range(self, window, image):
+        emitter = pdesper.ParticleEmitter(image, rate=0, lifetime=(1, 2),
+                                          seed=0)
+        emitter.emit(100)
+        emitter.update(1.5)
+        assert 0 < emitter.count < 100
+        assert np.all(emitter.ages == 1.5)
+
+    def test_vertices(self, window, image):
+        image.anchor_x = 4
+        emitter = pdesper.ParticleEmitter(image, 1, 2, 3, capacity=4,
+                                          rate=0, speed=0,
+                                          color_start=(0, 0, 0),
+                                          color_end=(200, 100, 0, 0))
+
+        emitter.emit(2)
+        emitter.update(0.5)
+        translations = get_vertex_array(emitter, 'translate', 3)
+        vertices = get_vertex_array(emitter, 'position', 3)
+        colors = get_vertex_array(emitter, 'colors', 4)
+
+        assert np.allclose(translations[:2], (1, 2, 3))
+        assert np.allclose(vertices[0, :, 0], (-4, 4, 4, -4))
+        assert np.all(colors[:2] == (100, 50, 0, 127))
+        assert np.all(vertices[2:] == 0)
+
+        # Vertices of dead particles are collapsed
+        emitter.update(1)
+        assert np.all(get_vertex_array(emitter, 'position', 3) == 0)
+
+    def test_frames(self, window, image):
+        texture = image.get_texture()
+        frames = [texture.get_region(x, 0, 2, 8) for x in range(0, 8, 2)]
+        emitter = pdesper.ParticleEmitter(frames, capacity=4, rate=0,
+                                          lifetime=1)
+        assert len(emitter.frames) == 4
+
+        emitter.emit(1)
+        emitter.update(0.6)
+        assert emitter.get_frame_indices().tolist() == [2]
+        tex_coords = get_vertex_array(emitter, 'tex_coords', 3)
+        assert np.allclose(tex_coords[0].ravel(), frames[2].tex_coords)
+
+    def test_position(self, window, image):
+        emitter = pdesper.ParticleEmitter(image, 1, 2, 3)
+
+        emitter.position = 4, 5
+        assert emitter.position == (4, 5, 3)
+        emitter.z = 6
+        assert (emitter.x, emitter.y, emitter.z) == (4, 5, 6)
+
+    def test_visible(self, window, image):
+        emitter = pdesper.ParticleEmitter(image, capacity=4, rate=0)
+        emitter.emit(2)
+        emitter.update(0.1)
+
+        emitter.visible = False
+        emitter.update(0.1)
+        assert emitter.count == 2
+        assert np.all(get_vertex_array(emitter, 'position', 3) == 0)
+
+        emitter.visible = True
+        assert np.any(get_vertex_array(emitter, 'position', 3)[:2] != 0)
+
+        emitter.delete()
+        emitter.update(0.1)
+        emitter.batch = pyglet.graphics.Batch()
+        assert emitter._vertex_list is None
+
+        emitter.visible = True
+        assert emitter._vertex_list is not None
+        assert emitter.count == 0
+
+    def test_batch(self, window, image, world):
+        batch = pyglet.graphics.Batch()
+        world.create_entity(pdesper.Camera(batch))
+        emitter = pdesper.ParticleEmitter(image, rate=10)
+        emitter.emit(5)
+        emitter.draw()
+
+        entity = world.create_entity(emitter)
+        assert emitter.batch is batch
+        assert emitter.count == 5
+        batch.draw()
+
+        world.delete_entity(entity)
+        world.process()
+        assert emitter._vertex_list is None
+
+
+class TestParticleProcessor:
+
+    def test_process(self, window, image, world):
+        batch = pyglet.graphics.Batch()
+        emitters = [pdesper.ParticleEmitter(image, rate=10, batch=batch)
+                    for _ in range(2)]
+        for emitter in emitters:
+            world.create_entity(emitter)
+        world.add_processor(pdesper.ParticleProcessor())
+
+        world.process(0.5)
+        assert [emitter.count for emitter in emitters] == [5, 5]
+
+    def test_sync(self, window, image, world):
+        emitter = pdesper.ParticleEmitter(image, batch=pyglet.graphics.Batch())
+        transform = desper.Transform2D((10, 20))
+        world.create_entity(transform, emitter,
+                            pdesper.particle_emitter_sync_component())
+
+        assert emitter.position[:2] == (10, 20)
+        transform.position = 30, 40
+        assert emitter.position[:2] == (30, 40)
+
+    def test_pool(self, window, image, world):
+        world.add_processor(pdesper.ParticleProcessor())
+        pool = pdesper.GraphicPool(pdesper.ParticleEmitter)
+        batch = pyglet.graphics.Batch()
+
+        emitter = pool.acquire(image, rate=10, batch=batch)
+        entity = world.create_entity(
+            desper.Transform2D((10, 20)), emitter,
+            pdesper.particle_emitter_sync_component(pool))
+        world.process(0.5)
+        world.delete_entity(entity)
+        world.process(0.5)
+        assert pool.free == 1
+        assert not emitter.visible
+
+        reused = pool.acquire(image, rate=10, batch=batch)
+        assert reused is emitter
+        assert reused.visible
+        assert reused.count == 0
+        world.create_entity(desper.Transform2D((30, 40)), reused,
+                            pdesper.particle_emitter_sync_component(pool))
+        world.process(0.5)
+        assert reused.count == 5
+        assert reused.position[:2] == (30, 40)
+        batch.draw()
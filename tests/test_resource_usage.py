@@ -0,0 +1,121 @@
+from context import pyglet_desper as pdesper
+
+import os.path as pt
+import json
+
+import desper
+import pytest
+
+from helpers import *       # NOQA
+
+
+class TestResourceUsage:
+
+    def test_use(self, png_filename, animation_meta_filename,
+                 animation_sheet_filename, monkeypatch):
+        # Images are not uploaded, only cache entries are checked
+        image_cache = {pt.abspath(png_filename): 'image',
+                       pt.abspath(animation_sheet_filename): 'sheet'}
+        monkeypatch.setattr(pdesper.model, '_image_cache', image_cache)
+        usage = pdesper.ResourceUsage()
+        world1, world2 = desper.WorldHandle(), desper.WorldHandle()
+        image = pdesper.ImageFileHandle(png_filename)
+        sheet = pdesper.RichImageFileHandle(animation_meta_filename)
+        image()
+        monkeypatch.setattr(pdesper.model, 'parse_spritesheet',
+                            lambda sheet, metadata: sheet)
+        assert sheet() == 'sheet'
+
+        usage.use(world1, image, sheet)
+        usage.use(world2, image)
+        usage.use(world2, image)
+        assert usage.get_handles(world1) == {image, sheet}
+        assert usage.get_count(image) == 2
+        assert pdesper.get_image_filenames(sheet) == {
+            pt.abspath(animation_meta_filename),
+            pt.abspath(animation_sheet_filename)}
+
+        # Shared resources are kept
+        assert usage.release(world1) == [sheet]
+        assert image.cached
+        assert not sheet.cached
+        assert list(image_cache) == [pt.abspath(png_filename)]
+
+        assert usage.release(world2) == [image]
+        assert not image.cached
+        assert not image_cache
+        assert usage.freed == 2
+        assert not usage.world_handles
+
+    def test_recording(self, wav_filename):
+        usage = pdesper.ResourceUsage()
+        world = desper.WorldHandle()
+        handle = pdesper.MediaFileHandle(wav_filename)
+
+        handle()
+        usage.attach()
+        with usage.recording(world):
+            handle()
+        handle()
+        usage.detach()
+
+        assert usage.get_handles(world) == {handle}
+        assert usage.current is None
+
+
+@pytest.fixture
+def manifest_resource_map(wav_filename):
+    resource_map = desper.ResourceMap()
+    # Submaps are added explicitly to link them to their parent
+    resource_map['media'] = desper.ResourceMap()
+    resource_map['world'] = desper.ResourceMap()
+    resource_map['media/sound'] = pdesper.MediaFileHandle(wav_filename)
+    resource_map['media/other'] = pdesper.MediaFileHandle(wav_filename)
+    resource_map['world/level'] = desper.WorldHandle()
+    return resource_map
+
+
+class TestResourceManifest:
+
+    def test_record(self, manifest_resource_map, wav_filename, tmp_path):
+        manifest = pdesper.ResourceManifest()
+        world_handle = manifest_resource_map.get('world/level')
+        sound = manifest_resource_map.get('media/sound')
+
+        manifest.attach()
+        assert manifest.recording
+        sound()
+        manifest.current = world_handle
+        sound()
+        # Handles outside resource maps are ignored
+        pdesper.MediaFileHandle(wav_filename)()
+        manifest.detach()
+        manifest_resource_map['media/other']
+
+        assert pdesper.get_handle_key(sound) == 'media/sound'
+        assert manifest.worlds == {'world/level': {'media/sound'}}
+        assert manifest.get_handles(world_handle) == [sound]
+
+        filename = str(tmp_path / 'manifest.json')
+        manifest.save(filename)
+        assert pdesper.ResourceManifest.load(filename).worlds == \
+            manifest.worlds
+
+    def test_preload(self, manifest_resource_map):
+        manifest = pdesper.ResourceManifest(
+            {'world/level': ['media/sound', 'media/missing']})
+        world_handle = manifest_resource_map.get('world/level')
+
+        assert list(manifest.iter_preload(world_handle)) == [(1, 1)]
+        assert manifest_resource_map.get('media/sound').cached
+        assert not manifest_resource_map.get('media/other').cached
+        assert manifest.preload(world_handle) == 0
+
+    def test_load(self, tmp_path):
+        assert not pdesper.ResourceManifest.load(
+            str(tmp_path / 'missing.json')).worlds
+
+        filename = tmp_path / 'manifest.json'
+        filename.write_text(json.dumps({'version': -1}))
+        with pytest.raises(ValueError):
+            pdesper.ResourceManifest.load(str(filename))
@@ -0,0 +1,190 @@
+from context import pyglet_desper as pdesper
+
+import concurrent.futures
+import os.path as pt
+import json
+
+import desper
+import pytest
+from pyglet.graphics import Batch
+
+from helpers import *       # NOQA
+
+
+@pytest.fixture
+def chunked_world_filename(tmp_path):
+    # A 4x4 grid of chunks of size 100, two entities each
+    entities = [
+        {'components': [
+            {'type': 'desper.Transform2D',
+             'args': [[x * 50. + 10., y * 50. + 10.]]},
+            {'type': 'helpers.WorldComponent', 'args': [x, y]}]}
+        for x in range(8) for y in range(8) if x % 2 == 0]
+    entities.append({'id': 'global', 'components': [
+        {'type': 'helpers.WorldComponent'}]})
+    entities.append({'components': [
+        {'type': 'desper.Transform2D', 'kwargs': {'position': [-5., -5.]}},
+        {'type': 'helpers.WorldComponent'}]})
+
+    filename = tmp_path / 'level.json'
+    filename.write_text(json.dumps({
+        'processors': [{'type': 'desper.OnUpdateProcessor'}],
+        'entities': entities}))
+    return str(filename)
+
+
+def test_split_world_file(chunked_world_filename, tmp_path):
+    directory = str(tmp_path / 'chunks')
+    chunks = pdesper.split_world_file(chunked_world_filename, directory, 100)
+
+    assert chunks == sorted({(x, y) for x in range(4) for y in range(4)}
+                            | {(-1, -1)})
+    with open(pt.join(directory, pdesper.CHUNK_INDEX_FILENAME)) as fin:
+        index = json.load(fin)
+    assert index['chunk_size'] == 100
+    assert list(map(tuple, index['chunks'])) == chunks
+
+    base_dict = pdesper.read_binary_world(
+        pt.join(directory, pdesper.BASE_WORLD_FILENAME))
+    assert len(base_dict['processors']) == 1
+    assert [entity['id'] for entity in base_dict['entities']] == ['global']
+
+    chunk_dict = pdesper.read_binary_world(
+        pdesper.get_chunk_filename(directory, (1, 2)))
+    assert len(chunk_dict['entities']) == 2
+    for entity_dict in chunk_dict['entities']:
+        assert pdesper.get_chunk(pdesper.transform_position(entity_dict),
+                                 100) == (1, 2)
+
+
+class TestChunkStreamingProcessor:
+
+    @pytest.fixture
+    def processor(self, chunked_world_filename, tmp_path, world):
+        directory = str(tmp_path / 'chunks')
+        pdesper.split_world_file(chunked_world_filename, directory, 100)
+
+        processor = pdesper.ChunkStreamingProcessor(directory, load_radius=1,
+                                                    unload_radius=2)
+        world.add_processor(processor)
+        yield processor
+        processor.shutdown()
+
+    def get_chunks(self, world):
+        chunks = set()
+        for entity, transform in world.get(desper.Transform2D):
+            chunks.add(pdesper.get_chunk(transform.position, 100))
+        return chunks
+
+    def test_init(self, processor):
+        assert processor.chunk_size == 100
+        assert (1, 2) in processor.chunks
+        assert not processor.loaded_chunks
+
+    def test_update(self, processor, world):
+        processor.update((150., 150.))
+        assert processor.pending_chunks <= {
+            (x, y) for x in range(3) for y in range(3)}
+        processor.flush()
+
+        expected = {(x, y) for x in range(3) for y in range(3)}
+        assert processor.loaded_chunks == expected
+        assert not processor.pending_chunks
+        assert self.get_chunks(world) == expected
+        assert len(world.get(WorldComponent)) == 2 * len(expected)
+
+        # Hysteresis, chunks at distance 2 are kept
+        processor.update((250., 150.))
+        world.process(0)
+        processor.flush()
+        assert (0, 0) in processor.loaded_chunks
+        assert (3, 0) in processor.loaded_chunks
+
+        processor.update((350., 350.))
+        world.process(0)
+        assert (0, 0) not in processor.loaded_chunks
+        assert (0, 0) not in self.get_chunks(world)
+        processor.flush()
+
+        assert len(world.get(WorldComponent)) == 2 * len(
+            processor.loaded_chunks)
+
+    def test_max_deletions_per_frame(self, processor, world):
+        processor.flush()
+        processor.load_chunk((0, 0))
+        processor.load_chunk((1, 0))
+        processor.max_deletions_per_frame = 3
+
+        processor.update((1050., 50.))
+        world.process(0)
+        assert len(world.get(WorldComponent)) == 1
+        assert (0, 0) not in processor.pending_chunks
+
+        processor.update((1050., 50.))
+        world.process(0)
+        assert not world.get(WorldComponent)
+
+    def test_frame_budget(self, processor, world):
+        processor.frame_budget = 0
+        processor.request_chunks([(0, 0)])
+        concurrent.futures.wait(processor._pending.values())
+
+        # One entity per frame
+        processor.update((50., 50.))
+        assert len(world.get(WorldComponent)) == 1
+        assert (0, 0) in processor.pending_chunks
+        processor.update((50., 50.))
+        assert len(world.get(WorldComponent)) == 2
+        processor.update((50., 50.))
+        assert (0, 0) in processor.loaded_chunks
+
+        # Partially loaded chunks can be unloaded
+        processor.unload_chunk((0, 0))
+        processor.flush()
+        world.process(0)
+        assert (0, 0) not in processor.loaded_chunks
+        assert len(world.get(WorldComponent)) == sum(
+            len(processor.get_chunk_entities(chunk))
+            for chunk in processor.loaded_chunks)
+
+    def test_load_chunk(self, processor, world):
+        processor.load_chunk((-1, -1))
+        entities = processor.get_chunk_entities((-1, -1))
+
+        assert processor.loaded_chunks == {(-1, -1)}
+        assert len(entities) == 1
+        assert world.get_component(entities[0], WorldComponent) is not None
+
+        processor.unload_chunk((-1, -1))
+        assert not processor.loaded_chunks
+        processor.load_chunk((-1, -1))
+        assert not processor.loaded_chunks
+
+        processor.delete_unloaded()
+        world.process(0)
+        assert not world.entity_exists(entities[0])
+
+    def test_cache(self, processor, world):
+        processor.cache = pdesper.WorldCache()
+        processor.load_chunk((0, 0))
+        processor.unload_chunk((0, 0))
+        processor.flush()
+        world.process(0)
+        processor.load_chunk((0, 0))
+
+        assert processor.cache.hits == 1
+        assert len(world.get(WorldComponent)) == 2
+
+    def test_get_focus(self, processor, world, window):
+        assert processor.get_focus() is None
+
+        camera = pdesper.Camera(Batch(), viewport=(0, 0, 200, 100))
+        world.create_entity(desper.Transform2D((50., 50.), scale=(2., 2.)),
+                            camera, pdesper.CameraTransform2D())
+
+        assert processor.get_focus() == (100., 75.)
+
+        world.process(0)
+        processor.flush()
+        assert processor.loaded_chunks == {(x, y) for x in range(3)
+                                           for y in range(2)}
@@ -0,0 +1,113 @@
+from context import pyglet_desper as pdesper
+
+import os
+
+import desper
+
+from helpers import *       # NOQA
+
+
+class TestWorldCache:
+
+    def test_get_snapshot(self, json_world_filename):
+        cache = pdesper.WorldCache()
+        snapshot = cache.get_snapshot(json_world_filename)
+
+        assert isinstance(snapshot, pdesper.WorldSnapshot)
+        assert cache.get_snapshot(json_world_filename) is snapshot
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+        assert cache.get_snapshot(json_world_filename,
+                                  [pdesper.init_graphics_transformer]) \
+            is not snapshot
+
+    def test_modified(self, json_world_filename):
+        cache = pdesper.WorldCache()
+        snapshot = cache.get_snapshot(json_world_filename)
+
+        stat = os.stat(json_world_filename)
+        os.utime(json_world_filename,
+                 ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert cache.get_snapshot(json_world_filename) is not snapshot
+        assert cache.misses == 2
+
+    def test_disk(self, json_world_filename, world_dict, tmp_path):
+        directory = str(tmp_path / 'cache')
+        pdesper.WorldCache(directory).get_snapshot(json_world_filename)
+        assert len(os.listdir(directory)) == 1
+
+        cache = pdesper.WorldCache(directory)
+        snapshot = cache.get_snapshot(json_world_filename)
+        assert cache.hits == 1
+        assert cache.misses == 0
+        assert snapshot.to_dict()['processors'] == world_dict['processors']
+
+        # Outdated versions are replaced
+        stat = os.stat(json_world_filename)
+        os.utime(json_world_filename,
+                 ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        cache.get_snapshot(json_world_filename)
+        assert cache.misses == 1
+        assert len(os.listdir(directory)) == 1
+
+        cache.clear(disk=True)
+        assert not os.listdir(directory)
+
+    def test_corrupted(self, json_world_filename, tmp_path):
+        directory = str(tmp_path / 'cache')
+        cache = pdesper.WorldCache(directory)
+        key = cache.get_key(json_world_filename)
+        os.makedirs(directory)
+        with open(cache.get_cache_filename(key), 'wb') as fout:
+            fout.write(b'garbage')
+
+        assert isinstance(cache.get_snapshot(json_world_filename),
+                          pdesper.WorldSnapshot)
+        assert cache.misses == 1
+
+    def test_world_from_file_handle(self, json_world_filename, window):
+        cache = pdesper.WorldCache()
+        resource_map = desper.ResourceMap()
+        pdesper.resource_populator(
+            resource_map, get_filename('files', 'fake_project'),
+            trim_extensions=True)
+        handle = pdesper.world_from_file_handle(json_world_filename, cache)
+        resource_map['world'] = handle
+
+        assert any(isinstance(function,
+                              pdesper.CachedWorldFromFileTransformer)
+                   for function in handle.transform_functions)
+        assert pdesper.init_graphics_transformer in handle.transform_functions
+
+        world = handle()
+        component = world.get_component('entity3', WorldComponent)
+        handle.clear()
+        new_world = handle()
+        new_component = new_world.get_component('entity3', WorldComponent)
+
+        assert new_world is not world
+        assert cache.hits == 1
+        assert new_component is not component
+        assert new_component.args == component.args
+        assert new_component.kwargs == component.kwargs
+        # Containers are never shared
+        assert (new_component.kwargs['nested']
+                is not component.kwargs['nested'])
+        assert (world.get_component('entity4', WorldComponent).kwargs['nested']
+                is not component.kwargs['nested'])
+        assert world.get_processor(desper.OnUpdateProcessor) is not None
+
+    def test_custom_dict_transformers(self, json_world_filename,
+                                      monkeypatch):
+        # Same transformers in a different order are not supported
+        monkeypatch.setattr(
+            pdesper.model, 'DEFAULT_DICT_TRANSFORMERS',
+            tuple(reversed(pdesper.DEFAULT_DICT_TRANSFORMERS)))
+        handle = pdesper.world_from_file_handle(json_world_filename,
+                                                pdesper.WorldCache())
+
+        assert not any(isinstance(function,
+                                  pdesper.CachedWorldFromFileTransformer)
+                       for function in handle.transform_functions)